@@ -91,66 +91,19 @@ def montant_en_lettres(montant, devise='francs guinéens'):
 
 def reponse_excel(titre, sous_titre, entetes, lignes, nom_fichier, totaux=None):
     """Génère un fichier .xlsx : titre, sous-titre, tableau, ligne de totaux."""
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = (titre[:28] or 'Etat')
-
-    gras = Font(bold=True)
-    entete_fill = PatternFill(start_color='1A5276', end_color='1A5276', fill_type='solid')
-    entete_font = Font(bold=True, color='FFFFFF')
-    bordure = Border(*[Side(style='thin')] * 4)
-
-    ws.cell(row=1, column=1, value=titre).font = Font(bold=True, size=14)
-    ws.cell(row=2, column=1, value=sous_titre or '')
-    ligne_debut = 4
-
-    for col, entete in enumerate(entetes, start=1):
-        c = ws.cell(row=ligne_debut, column=col, value=entete)
-        c.font = entete_font
-        c.fill = entete_fill
-        c.border = bordure
-        c.alignment = Alignment(horizontal='center')
-
-    r = ligne_debut + 1
+    from core.excel_utils import ClasseurExcel
+
+    classeur = ClasseurExcel(couleur_entete='1A5276', couleur_total='D6EAF8')
+    feuille = classeur.feuille(titre[:28] or 'Etat')
+    feuille.ligne([titre], style='titre')
+    feuille.ligne([sous_titre or ''], style='sous_titre')
+    feuille.vide()
+    feuille.ligne(entetes, style='entete')
     for ligne in lignes:
-        for col, valeur in enumerate(ligne, start=1):
-            if isinstance(valeur, Decimal):
-                valeur = float(valeur)
-            c = ws.cell(row=r, column=col, value=valeur)
-            c.border = bordure
-            if isinstance(valeur, (int, float)):
-                c.number_format = '#,##0'
-        r += 1
-
+        feuille.ligne(ligne)
     if totaux:
-        for col, valeur in enumerate(totaux, start=1):
-            if isinstance(valeur, Decimal):
-                valeur = float(valeur)
-            c = ws.cell(row=r, column=col, value=valeur)
-            c.font = gras
-            c.border = bordure
-            if isinstance(valeur, (int, float)):
-                c.number_format = '#,##0'
-
-    # Largeurs de colonnes approximatives
-    for col in range(1, len(entetes) + 1):
-        longueur = len(str(entetes[col - 1]))
-        for ligne in lignes[:50]:
-            if col <= len(ligne):
-                longueur = max(longueur, len(str(ligne[col - 1])))
-        ws.column_dimensions[ws.cell(row=ligne_debut, column=col).column_letter].width = min(longueur + 4, 45)
-
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    response = HttpResponse(
-        buffer.getvalue(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="{nom_fichier}.xlsx"'
-    return response
+        feuille.ligne(totaux, style='total')
+    return classeur.reponse(f'{nom_fichier}.xlsx')
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -0,0 +1,178 @@
+"""
+Grand livre paginé par clé (keyset) avec solde progressif calculé en base.
+
+Les lignes validées sont parcourues dans l'ordre (numéro de compte, date,
+identifiant de ligne). Une page reprend après la dernière clé affichée au lieu
+d'un OFFSET : son coût ne dépend pas de sa position dans un exercice de
+plusieurs centaines de milliers de lignes. Le solde progressif est une fonction
+fenêtre (SUM … OVER) ; le solde d'ouverture de chaque compte vient des soldes
+mensuels matérialisés (voir soldes.py) et, pour un compte repris en cours de
+page, du cumul de ses lignes déjà affichées.
+
+Les exports Excel et PDF parcourent les pages une à une (``parcourir_grand_livre``)
+sans jamais charger tout le grand livre en mémoire.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, Q, Sum, Window
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_date
+
+from .models import LigneEcriture
+from .soldes import soldes_comptes
+
+ZERO = Decimal('0')
+TAILLE_PAGE = 500
+
+_MONTANT = DecimalField(max_digits=18, decimal_places=2)
+
+
+def lire_date(valeur):
+    """Date 'AAAA-MM-JJ' d'un paramètre GET, None si absente ou invalide."""
+    try:
+        return parse_date(valeur or '')
+    except ValueError:
+        return None
+
+
+def encoder_curseur(curseur):
+    """Curseur (numéro de compte, date, id de ligne) → paramètre d'URL."""
+    numero, jour, pk = curseur
+    return f"{numero}|{jour:%Y-%m-%d}|{pk}"
+
+
+def decoder_curseur(texte):
+    """(numéro de compte, date, id de ligne) ou None si le curseur est illisible."""
+    try:
+        numero, jour, pk = (texte or '').split('|')
+        return numero, date.fromisoformat(jour), int(pk)
+    except ValueError:
+        return None
+
+
+def _lignes(entreprise, compte_id=None, date_debut=None, date_fin=None):
+    lignes = LigneEcriture.objects.filter(ecriture__entreprise=entreprise, ecriture__est_validee=True)
+    if compte_id:
+        lignes = lignes.filter(compte_id=compte_id)
+    if date_debut:
+        lignes = lignes.filter(ecriture__date_ecriture__gte=date_debut)
+    if date_fin:
+        lignes = lignes.filter(ecriture__date_ecriture__lte=date_fin)
+    return lignes
+
+
+def _apres(curseur):
+    numero, jour, pk = curseur
+    return (Q(compte__numero_compte__gt=numero)
+            | Q(compte__numero_compte=numero, ecriture__date_ecriture__gt=jour)
+            | Q(compte__numero_compte=numero, ecriture__date_ecriture=jour, pk__gt=pk))
+
+
+def _jusqu_a(curseur):
+    numero, jour, pk = curseur
+    return Q(compte__numero_compte=numero) & (
+        Q(ecriture__date_ecriture__lt=jour) | Q(ecriture__date_ecriture=jour, pk__lte=pk))
+
+
+def page_grand_livre(entreprise, compte_id=None, date_debut=None, date_fin=None,
+                     apres=None, taille=TAILLE_PAGE, ouvertures=None):
+    """
+    Une page du grand livre.
+
+    :param apres: curseur (tuple de ``decoder_curseur``) de la dernière ligne déjà lue
+    :param ouvertures: soldes d'ouverture {compte_id: solde} déjà calculés (parcours complet)
+    :return: (lignes, curseur suivant ou None) ; chaque ligne est un dict portant
+             ``solde`` (solde progressif) et ``fin_compte`` (dernière ligne du compte)
+    """
+    lignes = _lignes(entreprise, compte_id, date_debut, date_fin)
+    if ouvertures is None:
+        ouvertures = soldes_ouverture(entreprise, date_debut)
+    report = ZERO
+    if apres is not None:
+        report = lignes.filter(_jusqu_a(apres)).aggregate(
+            s=Coalesce(Sum(F('montant_debit') - F('montant_credit'), output_field=_MONTANT), ZERO))['s']
+        lignes = lignes.filter(_apres(apres))
+
+    cumul = Window(
+        Sum(F('montant_debit') - F('montant_credit'), output_field=_MONTANT),
+        partition_by=[F('compte_id')],
+        order_by=[F('ecriture__date_ecriture').asc(), F('pk').asc()],
+    )
+    rangees = list(
+        lignes.annotate(cumul=cumul)
+        .order_by('compte__numero_compte', 'ecriture__date_ecriture', 'pk')
+        .values('id', 'compte_id', 'montant_debit', 'montant_credit', 'cumul',
+                numero_compte=F('compte__numero_compte'), intitule=F('compte__intitule'),
+                date=F('ecriture__date_ecriture'), journal=F('ecriture__journal__code'),
+                numero_ecriture=F('ecriture__numero_ecriture'), libelle_ligne=F('libelle'),
+                libelle_ecriture=F('ecriture__libelle'))[:taille + 1]
+    )
+    # La ligne en trop dit si la dernière ligne de la page clôt son compte
+    prochaine = rangees[taille] if len(rangees) > taille else None
+    rangees = rangees[:taille]
+
+    premier_compte = apres[0] if apres is not None else None
+    for i, ligne in enumerate(rangees):
+        ouverture = ouvertures.get(ligne['compte_id'], ZERO)
+        if ligne['numero_compte'] == premier_compte:
+            ouverture += report
+        ligne['solde'] = ouverture + (ligne.pop('cumul') or ZERO)
+        libelle_ligne, libelle_ecriture = ligne.pop('libelle_ligne'), ligne.pop('libelle_ecriture')
+        ligne['libelle'] = libelle_ligne or libelle_ecriture
+        suivante = rangees[i + 1] if i + 1 < len(rangees) else prochaine
+        ligne['fin_compte'] = suivante is None or suivante['compte_id'] != ligne['compte_id']
+
+    curseur = None
+    if prochaine is not None:
+        derniere = rangees[-1]
+        curseur = (derniere['numero_compte'], derniere['date'], derniere['id'])
+    return rangees, curseur
+
+
+def soldes_ouverture(entreprise, date_debut):
+    """{compte_id: débit − crédit} des écritures validées antérieures à ``date_debut``."""
+    if not date_debut:
+        return {}
+    return {compte_id: d - c for compte_id, (d, c)
+            in soldes_comptes(entreprise, None, date_debut - timedelta(days=1)).items()}
+
+
+def parcourir_grand_livre(entreprise, compte_id=None, date_debut=None, date_fin=None,
+                          taille=2000):
+    """Toutes les lignes du grand livre, page par page (pour les exports)."""
+    ouvertures = soldes_ouverture(entreprise, date_debut)
+    curseur = None
+    while True:
+        lignes, curseur = page_grand_livre(entreprise, compte_id, date_debut, date_fin,
+                                           apres=curseur, taille=taille, ouvertures=ouvertures)
+        yield from lignes
+        if curseur is None:
+            return
+
+
+def grouper_par_compte(lignes, totaux):
+    """
+    Regroupe des lignes consécutives par compte pour l'affichage :
+    {numero_compte, intitule, report, lignes, total_debit, total_credit, solde, complet}.
+    Les totaux (de la période entière) ne sont fournis que si le compte se termine
+    dans ces lignes.
+    """
+    groupes = []
+    for ligne in lignes:
+        if not groupes or groupes[-1]['compte_id'] != ligne['compte_id']:
+            groupes.append({
+                'compte_id': ligne['compte_id'],
+                'numero_compte': ligne['numero_compte'],
+                'intitule': ligne['intitule'],
+                'report': ligne['solde'] - ligne['montant_debit'] + ligne['montant_credit'],
+                'lignes': [],
+                'complet': False,
+            })
+        groupe = groupes[-1]
+        groupe['lignes'].append(ligne)
+        groupe['solde'] = ligne['solde']
+        if ligne['fin_compte']:
+            groupe['complet'] = True
+            groupe['total_debit'], groupe['total_credit'] = totaux.get(ligne['compte_id'], (ZERO, ZERO))
+    return groupes
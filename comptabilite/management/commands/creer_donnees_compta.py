@@ -7,6 +7,7 @@ from django.utils import timezone
 from decimal import Decimal
 from datetime import date, timedelta
 
+from comptabilite.soldes import reconstruire_soldes
 from comptabilite.models import (
     PlanComptable, Journal, ExerciceComptable, EcritureComptable, LigneEcriture, 
     Tiers, Facture, LigneFacture, Reglement
@@ -450,6 +451,7 @@ class Command(BaseCommand):
             
             nb_ecritures += 1
         
+        reconstruire_soldes(entreprise)
         self.stdout.write(f'  {nb_ecritures} écritures créées')
 
     def creer_factures(self, entreprise):
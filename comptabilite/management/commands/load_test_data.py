@@ -10,6 +10,7 @@ from datetime import date, timedelta
 import random
 
 from core.models import Entreprise, Utilisateur
+from comptabilite.soldes import reconstruire_soldes
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -572,6 +573,7 @@ class Command(BaseCommand):
                 )
                 ecritures_creees += 1
         
+        reconstruire_soldes(entreprise)
         self.stdout.write(f'    {ecritures_creees} écritures créées.')
 
     def create_immobilisations(self, entreprise):
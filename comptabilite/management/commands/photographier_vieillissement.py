@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+Photographie quotidienne du vieillissement des créances et des dettes
+(tables vieillissements_creances et analyses_impayes), lue par les courbes
+d'évolution des pages de vieillissement. À planifier une fois par jour.
+
+Usage :
+    python manage.py photographier_vieillissement            # toutes les entreprises
+    python manage.py photographier_vieillissement --entreprise <uuid>
+
+Linux (crontab -e) :
+    30 6 * * * cd /path/to/GestionnaireRH && python manage.py photographier_vieillissement
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import Entreprise
+from comptabilite.vieillissement import photographier_vieillissement
+
+
+class Command(BaseCommand):
+    help = 'Enregistre la photographie du jour du vieillissement des factures ouvertes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entreprise', help='UUID d\'une entreprise précise (défaut : toutes)')
+
+    def handle(self, *args, **options):
+        entreprises = Entreprise.objects.filter(type_module__in=['compta', 'both'])
+        if options.get('entreprise'):
+            entreprises = Entreprise.objects.filter(pk=options['entreprise'])
+        for entreprise in entreprises:
+            nombre = photographier_vieillissement(entreprise)
+            self.stdout.write(self.style.SUCCESS(
+                f'{entreprise.nom_entreprise} : {nombre} facture(s) ouverte(s) photographiée(s).'))
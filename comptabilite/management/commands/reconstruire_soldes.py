@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+Reconstruit les soldes mensuels matérialisés (table soldes_comptes_mensuels)
+à partir des lignes des écritures validées, pour une ou toutes les entreprises.
+À lancer après un import direct en base ou une correction manuelle d'écritures.
+
+Usage :
+    python manage.py reconstruire_soldes            # toutes les entreprises
+    python manage.py reconstruire_soldes --entreprise <uuid>
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import Entreprise
+from comptabilite.soldes import reconstruire_soldes
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit les soldes mensuels des comptes depuis les écritures validées.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entreprise', help='UUID d\'une entreprise précise (défaut : toutes)')
+
+    def handle(self, *args, **options):
+        if not options.get('entreprise'):
+            nombre = reconstruire_soldes()
+            self.stdout.write(self.style.SUCCESS(f'{nombre} solde(s) mensuel(s) reconstruit(s).'))
+            return
+        for entreprise in Entreprise.objects.filter(pk=options['entreprise']):
+            nombre = reconstruire_soldes(entreprise)
+            self.stdout.write(self.style.SUCCESS(
+                f'{entreprise.nom_entreprise} : {nombre} solde(s) mensuel(s) reconstruit(s).'))
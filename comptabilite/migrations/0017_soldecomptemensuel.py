@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:21
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def initialiser_soldes(apps, schema_editor):
+    """Cumuls mensuels des écritures validées existantes."""
+    LigneEcriture = apps.get_model('comptabilite', 'LigneEcriture')
+    SoldeCompteMensuel = apps.get_model('comptabilite', 'SoldeCompteMensuel')
+    agregats = (LigneEcriture.objects.filter(ecriture__est_validee=True).order_by()
+                .annotate(annee=ExtractYear('ecriture__date_ecriture'),
+                          mois=ExtractMonth('ecriture__date_ecriture'))
+                .values('ecriture__entreprise_id', 'compte_id', 'annee', 'mois')
+                .annotate(d=Sum('montant_debit'), c=Sum('montant_credit')))
+    SoldeCompteMensuel.objects.bulk_create(
+        (SoldeCompteMensuel(entreprise_id=a['ecriture__entreprise_id'], compte_id=a['compte_id'],
+                            annee=a['annee'], mois=a['mois'],
+                            total_debit=a['d'] or Decimal('0'), total_credit=a['c'] or Decimal('0'))
+         for a in agregats.iterator()),
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_compteur_sequence'),
+        ('comptabilite', '0016_reglevalidation_demandeapprobation_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SoldeCompteMensuel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('annee', models.PositiveSmallIntegerField()),
+                ('mois', models.PositiveSmallIntegerField()),
+                ('total_debit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('total_credit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('compte', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='soldes_mensuels', to='comptabilite.plancomptable')),
+                ('entreprise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='soldes_comptes', to='core.entreprise')),
+            ],
+            options={
+                'verbose_name': 'Solde mensuel de compte',
+                'verbose_name_plural': 'Soldes mensuels de comptes',
+                'db_table': 'soldes_comptes_mensuels',
+                'indexes': [models.Index(fields=['entreprise', 'annee', 'mois'], name='idx_solde_ent_periode')],
+                'unique_together': {('compte', 'annee', 'mois')},
+            },
+        ),
+        migrations.RunPython(initialiser_soldes, migrations.RunPython.noop),
+    ]
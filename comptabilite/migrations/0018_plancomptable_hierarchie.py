@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:27
+
+from django.db import migrations, models
+from django.db.models.functions import Substr
+
+
+def renseigner_hierarchie(apps, schema_editor):
+    """Classe, sous-classe et compte principal des comptes existants."""
+    PlanComptable = apps.get_model('comptabilite', 'PlanComptable')
+    PlanComptable.objects.update(sous_classe=Substr('numero_compte', 1, 2),
+                                 racine=Substr('numero_compte', 1, 3))
+    PlanComptable.objects.filter(numero_compte__regex=r'^[1-9]').update(
+        classe=Substr('numero_compte', 1, 1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comptabilite', '0017_soldecomptemensuel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plancomptable',
+            name='racine',
+            field=models.CharField(blank=True, editable=False, max_length=3, verbose_name='Compte principal'),
+        ),
+        migrations.AddField(
+            model_name='plancomptable',
+            name='sous_classe',
+            field=models.CharField(blank=True, editable=False, max_length=2, verbose_name='Sous-classe'),
+        ),
+        migrations.AddIndex(
+            model_name='plancomptable',
+            index=models.Index(fields=['entreprise', 'classe'], name='idx_plan_ent_classe'),
+        ),
+        migrations.AddIndex(
+            model_name='plancomptable',
+            index=models.Index(fields=['entreprise', 'sous_classe'], name='idx_plan_ent_sous_classe'),
+        ),
+        migrations.AddIndex(
+            model_name='plancomptable',
+            index=models.Index(fields=['entreprise', 'racine'], name='idx_plan_ent_racine'),
+        ),
+        migrations.RunPython(renseigner_hierarchie, migrations.RunPython.noop),
+    ]
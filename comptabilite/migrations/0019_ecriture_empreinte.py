@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:04
+
+import hashlib
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def _empreinte(journal_id, date_ecriture, libelle, total):
+    # Copie de comptabilite.models.empreinte_ecriture, figée pour la migration
+    libelle = ' '.join((libelle or '').split()).casefold()
+    brut = f"{journal_id}|{date_ecriture:%Y-%m-%d}|{libelle}|{Decimal(total or 0):.2f}"
+    return hashlib.sha256(brut.encode('utf-8')).hexdigest()
+
+
+def renseigner_empreintes(apps, schema_editor):
+    """Empreinte des écritures existantes, par lots de 1000 dans l'ordre des clés."""
+    EcritureComptable = apps.get_model('comptabilite', 'EcritureComptable')
+    ecritures = (EcritureComptable.objects.order_by('pk')
+                 .annotate(total=Sum('lignes__montant_debit'))
+                 .values_list('pk', 'journal_id', 'date_ecriture', 'libelle', 'total'))
+    dernier = None
+    while True:
+        lot = list((ecritures.filter(pk__gt=dernier) if dernier else ecritures)[:1000])
+        if not lot:
+            return
+        EcritureComptable.objects.bulk_update(
+            [EcritureComptable(pk=ligne[0], empreinte=_empreinte(*ligne[1:])) for ligne in lot],
+            ['empreinte'])
+        dernier = lot[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comptabilite', '0018_plancomptable_hierarchie'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ecriturecomptable',
+            name='empreinte',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Empreinte anti-doublon'),
+        ),
+        migrations.AddIndex(
+            model_name='ecriturecomptable',
+            index=models.Index(fields=['entreprise', 'empreinte'], name='idx_ecriture_empreinte'),
+        ),
+        migrations.RunPython(renseigner_empreintes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:54
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def renseigner_totaux(apps, schema_editor):
+    """Totaux des écritures existantes, en deux UPDATE corrélés."""
+    EcritureComptable = apps.get_model('comptabilite', 'EcritureComptable')
+    LigneEcriture = apps.get_model('comptabilite', 'LigneEcriture')
+    montant = models.DecimalField(max_digits=18, decimal_places=2)
+
+    def somme(champ):
+        return Coalesce(Subquery(
+            LigneEcriture.objects.filter(ecriture=OuterRef('pk')).order_by()
+            .values('ecriture').annotate(s=Sum(champ)).values('s'),
+            output_field=montant), Decimal('0.00'), output_field=montant)
+
+    EcritureComptable.objects.update(total_debit=somme('montant_debit'),
+                                     total_credit=somme('montant_credit'))
+    EcritureComptable.objects.exclude(total_debit=F('total_credit')).update(est_equilibree=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comptabilite', '0019_ecriture_empreinte'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ecriturecomptable',
+            name='est_equilibree',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Équilibrée'),
+        ),
+        migrations.AddField(
+            model_name='ecriturecomptable',
+            name='total_credit',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=18, verbose_name='Total crédit'),
+        ),
+        migrations.AddField(
+            model_name='ecriturecomptable',
+            name='total_debit',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=18, verbose_name='Total débit'),
+        ),
+        migrations.AddIndex(
+            model_name='ecriturecomptable',
+            index=models.Index(fields=['entreprise', 'total_debit'], name='idx_ecriture_montant'),
+        ),
+        migrations.RunPython(renseigner_totaux, migrations.RunPython.noop),
+    ]
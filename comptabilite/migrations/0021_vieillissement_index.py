@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comptabilite', '0020_ecriture_totaux'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='facture',
+            index=models.Index(fields=['entreprise', 'type_facture', 'statut'], name='idx_facture_ent_type_statut'),
+        ),
+        migrations.AddIndex(
+            model_name='vieillissementcreances',
+            index=models.Index(fields=['date_calcul', 'categorie'], name='idx_vieillissement_date'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
+from django.db.models import Q
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
 from decimal import Decimal
+import hashlib
 import uuid
 from core.models import Entreprise, Utilisateur
 
@@ -27,6 +29,9 @@ class PlanComptable(models.Model):
     numero_compte = models.CharField(max_length=20, verbose_name='N° Compte')
     intitule = models.CharField(max_length=200, verbose_name='Intitulé')
     classe = models.CharField(max_length=1, choices=CLASSES)
+    # Hiérarchie SYSCOHADA déduite du numéro à l'enregistrement (voir filtre_prefixes)
+    sous_classe = models.CharField(max_length=2, blank=True, editable=False, verbose_name='Sous-classe')
+    racine = models.CharField(max_length=3, blank=True, editable=False, verbose_name='Compte principal')
     compte_parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='sous_comptes')
     est_actif = models.BooleanField(default=True)
     solde_debiteur = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'))
@@ -39,10 +44,43 @@ class PlanComptable(models.Model):
         verbose_name_plural = 'Plan comptable'
         unique_together = ['entreprise', 'numero_compte']
         ordering = ['numero_compte']
+        indexes = [
+            models.Index(fields=['entreprise', 'classe'], name='idx_plan_ent_classe'),
+            models.Index(fields=['entreprise', 'sous_classe'], name='idx_plan_ent_sous_classe'),
+            models.Index(fields=['entreprise', 'racine'], name='idx_plan_ent_racine'),
+        ]
     
     def __str__(self):
         return f"{self.numero_compte} - {self.intitule}"
     
+    def save(self, *args, **kwargs):
+        numero = (self.numero_compte or '').strip()
+        if numero and numero[0] in '123456789':
+            self.classe = numero[0]
+        self.sous_classe = numero[:2]
+        self.racine = numero[:3]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'numero_compte' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'classe', 'sous_classe', 'racine'}
+        super().save(*args, **kwargs)
+    
+    @staticmethod
+    def filtre_prefixes(prefixes, chemin=''):
+        """Q « numéro commençant par l'un des préfixes » : les préfixes de 1 à 3
+        chiffres passent par classe / sous_classe / racine (indexés), les autres
+        par startswith. ``chemin`` = relation vers le compte (ex. 'compte__')."""
+        par_niveau = {1: [], 2: [], 3: []}
+        q = Q()
+        for prefixe in prefixes:
+            if len(prefixe) in par_niveau:
+                par_niveau[len(prefixe)].append(prefixe)
+            else:
+                q |= Q(**{f'{chemin}numero_compte__startswith': prefixe})
+        for longueur, champ in ((1, 'classe'), (2, 'sous_classe'), (3, 'racine')):
+            if par_niveau[longueur]:
+                q |= Q(**{f'{chemin}{champ}__in': par_niveau[longueur]})
+        return q
+    
     @property
     def solde(self):
         return self.solde_debiteur - self.solde_crediteur
@@ -132,6 +170,13 @@ class PieceComptable(models.Model):
         return f"{self.numero} - {self.libelle}"
 
 
+def empreinte_ecriture(journal_id, date_ecriture, libelle, total):
+    """Empreinte anti-doublon : journal, date, libellé normalisé (casse, espaces) et total débit."""
+    libelle = ' '.join((libelle or '').split()).casefold()
+    brut = f"{journal_id}|{date_ecriture:%Y-%m-%d}|{libelle}|{Decimal(total):.2f}"
+    return hashlib.sha256(brut.encode('utf-8')).hexdigest()
+
+
 class EcritureComptable(models.Model):
     """Écritures comptables"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -148,6 +193,14 @@ class EcritureComptable(models.Model):
     date_validation = models.DateTimeField(null=True, blank=True)
     validee_par = models.ForeignKey('core.Utilisateur', on_delete=models.SET_NULL, null=True, blank=True)
     date_creation = models.DateTimeField(auto_now_add=True)
+    empreinte = models.CharField(max_length=64, blank=True, editable=False,
+                                 verbose_name='Empreinte anti-doublon')
+    # Totaux des lignes, tenus à jour à chaque écriture de ligne (voir signals.py)
+    total_debit = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'),
+                                      editable=False, verbose_name='Total débit')
+    total_credit = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'),
+                                       editable=False, verbose_name='Total crédit')
+    est_equilibree = models.BooleanField(default=True, editable=False, verbose_name='Équilibrée')
     
     class Meta:
         db_table = 'ecritures_comptables'
@@ -158,22 +211,46 @@ class EcritureComptable(models.Model):
             models.Index(fields=['journal', 'date_ecriture'], name='idx_ecriture_journal_date'),
             models.Index(fields=['entreprise', 'date_ecriture'], name='idx_ecriture_ent_date'),
             models.Index(fields=['exercice'], name='idx_ecriture_exercice'),
+            models.Index(fields=['entreprise', 'empreinte'], name='idx_ecriture_empreinte'),
+            models.Index(fields=['entreprise', 'total_debit'], name='idx_ecriture_montant'),
         ]
     
     def __str__(self):
         return f"{self.numero_ecriture} - {self.libelle}"
     
-    @property
-    def total_debit(self):
-        return sum(l.montant_debit for l in self.lignes.all())
-    
-    @property
-    def total_credit(self):
-        return sum(l.montant_credit for l in self.lignes.all())
-    
-    @property
-    def est_equilibree(self):
-        return self.total_debit == self.total_credit
+    def actualiser_empreinte(self):
+        """Recalcule l'empreinte depuis les lignes (à appeler avant save() à la validation)."""
+        total = self.lignes.aggregate(t=models.Sum('montant_debit'))['t'] or Decimal('0')
+        self.empreinte = empreinte_ecriture(self.journal_id, self.date_ecriture, self.libelle, total)
+    
+    def marquer_validee(self, utilisateur):
+        """Valide l'écriture par une mise à jour conditionnelle (est_validee=False).
+
+        Retourne False si elle était déjà validée (double clic, autre onglet) :
+        ses mouvements ne doivent alors pas être reportés une seconde fois
+        dans les soldes mensuels.
+        """
+        from django.utils import timezone
+        self.actualiser_empreinte()
+        maintenant = timezone.now()
+        if not EcritureComptable.objects.filter(pk=self.pk, est_validee=False).update(
+                est_validee=True, date_validation=maintenant, validee_par=utilisateur,
+                empreinte=self.empreinte):
+            return False
+        self.est_validee = True
+        self.date_validation = maintenant
+        self.validee_par = utilisateur
+        return True
+
+    def actualiser_totaux(self):
+        """Recalcule depuis les lignes les totaux stockés (en base et sur l'instance)."""
+        totaux = self.lignes.aggregate(d=models.Sum('montant_debit'), c=models.Sum('montant_credit'))
+        self.total_debit = totaux['d'] or Decimal('0.00')
+        self.total_credit = totaux['c'] or Decimal('0.00')
+        self.est_equilibree = self.total_debit == self.total_credit
+        EcritureComptable.objects.filter(pk=self.pk).update(
+            total_debit=self.total_debit, total_credit=self.total_credit,
+            est_equilibree=self.est_equilibree)
 
 
 class LigneEcriture(models.Model):
@@ -196,6 +273,30 @@ class LigneEcriture(models.Model):
         return f"{self.compte.numero_compte} - D:{self.montant_debit} C:{self.montant_credit}"
 
 
+class SoldeCompteMensuel(models.Model):
+    """Cumul mensuel des mouvements validés d'un compte (voir comptabilite/soldes.py).
+    Tenu à jour à chaque validation / suppression d'écriture ; reconstruit par
+    ``manage.py reconstruire_soldes``."""
+    entreprise = models.ForeignKey('core.Entreprise', on_delete=models.CASCADE, related_name='soldes_comptes')
+    compte = models.ForeignKey(PlanComptable, on_delete=models.CASCADE, related_name='soldes_mensuels')
+    annee = models.PositiveSmallIntegerField()
+    mois = models.PositiveSmallIntegerField()
+    total_debit = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    total_credit = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        db_table = 'soldes_comptes_mensuels'
+        verbose_name = 'Solde mensuel de compte'
+        verbose_name_plural = 'Soldes mensuels de comptes'
+        unique_together = ['compte', 'annee', 'mois']
+        indexes = [
+            models.Index(fields=['entreprise', 'annee', 'mois'], name='idx_solde_ent_periode'),
+        ]
+
+    def __str__(self):
+        return f"{self.compte.numero_compte} {self.mois:02d}/{self.annee} - D:{self.total_debit} C:{self.total_credit}"
+
+
 class Tiers(models.Model):
     """Tiers (clients, fournisseurs)"""
     TYPES_TIERS = [
@@ -273,6 +374,7 @@ class Facture(models.Model):
             models.Index(fields=['tiers', 'date_facture'], name='idx_facture_tiers_date'),
             models.Index(fields=['statut'], name='idx_facture_statut'),
             models.Index(fields=['date_echeance'], name='idx_facture_echeance'),
+            models.Index(fields=['entreprise', 'type_facture', 'statut'], name='idx_facture_ent_type_statut'),
         ]
     
     def __str__(self):
@@ -1202,6 +1304,9 @@ class VieillissementCreances(models.Model):
         db_table = 'vieillissements_creances'
         verbose_name = 'Vieillissement créances'
         verbose_name_plural = 'Vieillissements créances'
+        indexes = [
+            models.Index(fields=['date_calcul', 'categorie'], name='idx_vieillissement_date'),
+        ]
     
     def __str__(self):
         return f"{self.tiers.raison_sociale} - {self.categorie}"
@@ -19,10 +19,12 @@ from datetime import date as date_type
 from django.db import transaction
 from django.utils import timezone
 
+from core.services.sequences import SequenceService
 from .models import (
     PlanComptable, Journal, ExerciceComptable, EcritureComptable, LigneEcriture,
-    RegleEcriture,
+    RegleEcriture, empreinte_ecriture,
 )
+from .soldes import ajouter_lignes
 
 ZERO = Decimal('0')
 
@@ -125,19 +127,16 @@ def obtenir_exercice(entreprise, date_operation):
     return exercice
 
 
-def _prochain_numero_ecriture(entreprise, date_operation):
-    annee = date_operation.year
-    base = f'ECR-{annee}-'
+def _dernier_numero_ecriture(entreprise, base):
     derniere = (EcritureComptable.objects
                 .filter(entreprise=entreprise, numero_ecriture__startswith=base)
                 .order_by('-numero_ecriture').first())
-    seq = 1
     if derniere:
         try:
-            seq = int(derniere.numero_ecriture.split('-')[-1]) + 1
+            return int(derniere.numero_ecriture.split('-')[-1])
         except ValueError:
-            seq = 1
-    return f'{base}{seq:05d}'
+            pass
+    return 0
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -152,60 +151,160 @@ def generer_ecriture(entreprise, utilisateur, type_journal, date_operation, libe
     équilibre débit = crédit, exercice ouvert, détection de doublon.
     Journalise l'opération dans la piste d'audit.
     """
-    lignes = [(c, l, d or ZERO, cr or ZERO) for c, l, d, cr in lignes if (d or ZERO) > 0 or (cr or ZERO) > 0]
+    return generer_ecritures_en_masse(entreprise, utilisateur, [{
+        'type_journal': type_journal, 'date': date_operation, 'libelle': libelle,
+        'lignes': lignes, 'centre_analyse': centre_analyse, 'piece_jointe': piece_jointe,
+    }], verifier_doublon=verifier_doublon)[0]
+
+
+def _controler_lignes(lignes):
+    """Lignes non nulles (compte, libellé, débit, crédit, centre) et total, ou ErreurComptabilisation.
+    Le centre d'analyse propre à une ligne est un 5e élément facultatif."""
+    lignes = [(c, l, d or ZERO, cr or ZERO, centre[0] if centre else None)
+              for c, l, d, cr, *centre in lignes if (d or ZERO) > 0 or (cr or ZERO) > 0]
     if len(lignes) < 2:
         raise ErreurComptabilisation("Écriture incomplète : au moins un débit et un crédit sont requis.")
-    total_debit = sum((d for _, _, d, _ in lignes), ZERO)
-    total_credit = sum((c for _, _, _, c in lignes), ZERO)
+    total_debit = sum((ligne[2] for ligne in lignes), ZERO)
+    total_credit = sum((ligne[3] for ligne in lignes), ZERO)
     if total_debit != total_credit:
         raise ErreurComptabilisation(
             f"Écriture déséquilibrée : débit {total_debit:,.0f} ≠ crédit {total_credit:,.0f}.")
     if total_debit <= 0:
         raise ErreurComptabilisation("Le montant de l'opération doit être supérieur à zéro.")
+    return lignes, total_debit
 
-    exercice = obtenir_exercice(entreprise, date_operation)
-    journal = obtenir_journal(entreprise, type_journal)
+
+def generer_ecritures_en_masse(entreprise, utilisateur, operations, verifier_doublon=True, rejets=None):
+    """Comptabilise un lot d'opérations en quelques requêtes.
+
+    :param operations: dicts {type_journal, date, libelle, lignes[, centre_analyse, piece_jointe]},
+                       ``lignes`` au format de ``generer_ecriture``, avec en 5e élément
+                       facultatif le centre d'analyse de la ligne
+    :param rejets: liste recevant (indice, message) des opérations refusées, les autres
+                   étant comptabilisées ; si None, le premier refus lève
+                   ErreurComptabilisation et rien n'est écrit
+    :return: écritures créées dans l'ordre des opérations (None pour une opération rejetée)
+
+    Mêmes contrôles que ``generer_ecriture`` ; les exercices et journaux sont
+    résolus une fois pour tout le lot, les doublons recherchés en une requête
+    (y compris à l'intérieur du lot), les numéros réservés en un bloc par année,
+    puis écritures, lignes et piste d'audit sont insérées par bulk_create.
+    """
+    journaux, exercices = {}, []
+    retenues = []          # (indice, opération, lignes, total, journal, exercice, empreinte)
+
+    def refuser(indice, operation, exc):
+        if rejets is None:
+            if len(operations) > 1:
+                raise ErreurComptabilisation(f"{operation['libelle']} : {exc}") from exc
+            raise exc
+        rejets.append((indice, str(exc)))
+
+    for indice, operation in enumerate(operations):
+        try:
+            lignes, total = _controler_lignes(operation['lignes'])
+            jour = operation['date']
+            exercice = next((ex for ex in exercices if ex.date_debut <= jour <= ex.date_fin), None)
+            if exercice is None:
+                exercice = obtenir_exercice(entreprise, jour)
+                exercices.append(exercice)
+            if operation['type_journal'] not in journaux:
+                journaux[operation['type_journal']] = obtenir_journal(entreprise, operation['type_journal'])
+        except ErreurComptabilisation as exc:
+            refuser(indice, operation, exc)
+            continue
+        journal = journaux[operation['type_journal']]
+        empreinte = empreinte_ecriture(journal.pk, jour, operation['libelle'][:200], total)
+        retenues.append((indice, operation, lignes, total, journal, exercice, empreinte))
 
     # Contrôle anti-doublon : même journal, même date, même libellé, même total
     if verifier_doublon:
-        doublon = (EcritureComptable.objects
-                   .filter(entreprise=entreprise, journal=journal,
-                           date_ecriture=date_operation, libelle=libelle[:200])
-                   .filter(lignes__montant_debit=lignes[0][2] or lignes[0][3])
-                   .first())
-        if doublon:
-            raise ErreurComptabilisation(
-                f"Doublon probable : l'écriture {doublon.numero_ecriture} du "
-                f"{date_operation} porte déjà le même libellé et le même montant. "
-                f"Modifiez le libellé pour confirmer qu'il s'agit d'une opération distincte.")
+        existantes = rechercher_doublons(entreprise, [r[6] for r in retenues])
+        uniques = []
+        for retenue in retenues:
+            indice, operation, empreinte = retenue[0], retenue[1], retenue[6]
+            if empreinte in existantes:
+                refuser(indice, operation, ErreurComptabilisation(
+                    f"Doublon probable : l'écriture {existantes[empreinte]} du "
+                    f"{operation['date']} porte déjà le même libellé et le même montant. "
+                    f"Modifiez le libellé pour confirmer qu'il s'agit d'une opération distincte."))
+                continue
+            existantes[empreinte] = 'précédente du lot'
+            uniques.append(retenue)
+        retenues = uniques
+
+    resultat = [None] * len(operations)
+    if not retenues:
+        return resultat
 
     with transaction.atomic():
-        ecriture = EcritureComptable.objects.create(
-            entreprise=entreprise, exercice=exercice, journal=journal,
-            numero_ecriture=_prochain_numero_ecriture(entreprise, date_operation),
-            date_ecriture=date_operation, libelle=libelle[:200],
-            piece_jointe=piece_jointe,
-            est_validee=True, date_validation=timezone.now(), validee_par=utilisateur)
-        for compte, lib_ligne, debit, credit in lignes:
-            LigneEcriture.objects.create(
-                ecriture=ecriture, compte=compte, libelle=(lib_ligne or libelle)[:200],
-                montant_debit=debit, montant_credit=credit,
-                centre_analyse=centre_analyse)
-        _piste_audit(entreprise, utilisateur, ecriture, total_debit)
-    return ecriture
-
-
-def _piste_audit(entreprise, utilisateur, ecriture, montant):
-    """Trace la génération d'écriture dans la piste d'audit (non bloquant)."""
+        # Numéros réservés en un bloc par année, attribués dans l'ordre du lot
+        par_annee = {}
+        for retenue in retenues:
+            par_annee.setdefault(retenue[1]['date'].year, []).append(retenue)
+        numeros = {}
+        for annee, groupe in par_annee.items():
+            base = f'ECR-{annee}-'
+            premier = SequenceService.reserver(
+                base, annee, len(groupe), entreprise=entreprise,
+                depart=lambda base=base: _dernier_numero_ecriture(entreprise, base))
+            for rang, retenue in enumerate(groupe):
+                numeros[retenue[0]] = f'{base}{premier + rang:05d}'
+
+        maintenant = timezone.now()
+        ecritures, lignes_creees, mouvements = [], [], []
+        for indice, operation, lignes, total, journal, exercice, empreinte in retenues:
+            libelle = operation['libelle'][:200]
+            ecriture = EcritureComptable(
+                entreprise=entreprise, exercice=exercice, journal=journal,
+                numero_ecriture=numeros[indice], date_ecriture=operation['date'], libelle=libelle,
+                piece_jointe=operation.get('piece_jointe'), empreinte=empreinte,
+                # bulk_create ne déclenche pas les signaux des lignes : totaux posés ici
+                total_debit=total, total_credit=total, est_equilibree=True,
+                est_validee=True, date_validation=maintenant, validee_par=utilisateur)
+            for compte, lib_ligne, debit, credit, centre in lignes:
+                lignes_creees.append(LigneEcriture(
+                    ecriture=ecriture, compte=compte, libelle=(lib_ligne or libelle)[:200],
+                    montant_debit=debit, montant_credit=credit,
+                    centre_analyse=centre or operation.get('centre_analyse')))
+                mouvements.append((compte.pk, operation['date'], debit, credit))
+            ecritures.append(ecriture)
+            resultat[indice] = ecriture
+
+        EcritureComptable.objects.bulk_create(ecritures, batch_size=500)
+        LigneEcriture.objects.bulk_create(lignes_creees, batch_size=1000)
+        ajouter_lignes(entreprise.pk, mouvements)
+        _piste_audit(entreprise, utilisateur, [(e, r[3]) for e, r in zip(ecritures, retenues)])
+    return resultat
+
+
+def rechercher_doublons(entreprise, empreintes):
+    """{empreinte: numéro de l'écriture existante} pour un lot d'empreintes
+    (une requête par tranche de 500, sur l'index entreprise + empreinte)."""
+    empreintes = list(set(empreintes))
+    trouvees = {}
+    for i in range(0, len(empreintes), 500):
+        trouvees.update(EcritureComptable.objects
+                        .filter(entreprise=entreprise, empreinte__in=empreintes[i:i + 500])
+                        .order_by().values_list('empreinte', 'numero_ecriture'))
+    return trouvees
+
+
+def _piste_audit(entreprise, utilisateur, ecritures):
+    """Trace la génération des écritures [(écriture, montant)] dans la piste d'audit (non bloquant)."""
     try:
         from .models import PisteAudit
-        PisteAudit.objects.create(
-            entreprise=entreprise, utilisateur=utilisateur,
-            action='GENERATION_AUTO', module='MOTEUR_COMPTABLE',
-            type_objet='EcritureComptable', id_objet=str(ecriture.pk),
-            donnees_nouvelles=f"{ecriture.numero_ecriture} | {ecriture.journal.code} | "
-                              f"{ecriture.date_ecriture} | {ecriture.libelle} | "
-                              f"{montant:,.0f} GNF")
+        with transaction.atomic():
+            PisteAudit.objects.bulk_create([
+                PisteAudit(
+                    entreprise=entreprise, utilisateur=utilisateur,
+                    action='GENERATION_AUTO', module='MOTEUR_COMPTABLE',
+                    type_objet='EcritureComptable', id_objet=str(ecriture.pk),
+                    donnees_nouvelles=f"{ecriture.numero_ecriture} | {ecriture.journal.code} | "
+                                      f"{ecriture.date_ecriture} | {ecriture.libelle} | "
+                                      f"{montant:,.0f} GNF")
+                for ecriture, montant in ecritures
+            ], batch_size=500)
     except Exception:
         pass
 
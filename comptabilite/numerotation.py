@@ -0,0 +1,55 @@
+"""
+Numérotation des documents comptables (factures, règlements)
+via les compteurs de séquence par entreprise.
+"""
+from datetime import datetime
+
+from core.services.sequences import SequenceService
+
+
+def _dernier_numero_document(entreprise, prefixe_complet, modele, champ):
+    """Dernier numéro séquentiel déjà utilisé pour ce préfixe (reprise du compteur)."""
+    dernier = modele.objects.filter(
+        entreprise=entreprise,
+        **{f"{champ}__startswith": prefixe_complet}
+    ).order_by(f"-{champ}").values_list(champ, flat=True).first()
+    if dernier:
+        try:
+            # Extraire le numéro séquentiel
+            if '-' in dernier:
+                return int(dernier.split('-')[-1])
+            return int(dernier[-4:])
+        except (ValueError, IndexError):
+            pass
+    return 0
+
+
+def generer_numero_unique(entreprise, prefixe, modele, champ='numero', reserver=True):
+    """Génère un numéro unique via le compteur de séquence de l'entreprise.
+
+    Avec ``reserver=False`` le numéro est seulement proposé (formulaire) : il
+    n'est consommé qu'à l'enregistrement, via ``constater_numero``.
+    """
+    annee = datetime.now().year
+    prefixe_complet = f"{prefixe}{annee}-"
+
+    def depart():
+        return _dernier_numero_document(entreprise, f"{prefixe}{annee}", modele, champ)
+
+    if reserver:
+        numero = SequenceService.prochain(prefixe_complet, annee, entreprise=entreprise, depart=depart)
+    else:
+        numero = SequenceService.apercu(prefixe_complet, annee, entreprise=entreprise, depart=depart)
+    return f"{prefixe_complet}{numero:04d}"
+
+
+def constater_numero(entreprise, prefixe, modele, valeur, champ='numero'):
+    """Avance le compteur si ``valeur`` (numéro saisi ou proposé) suit la séquence."""
+    annee = datetime.now().year
+    prefixe_complet = f"{prefixe}{annee}-"
+    numero = SequenceService.extraire_numero(valeur, prefixe_complet)
+    if numero is not None:
+        SequenceService.constater(
+            prefixe_complet, annee, numero, entreprise=entreprise,
+            depart=lambda: _dernier_numero_document(entreprise, f"{prefixe}{annee}", modele, champ),
+        )
@@ -7,6 +7,7 @@ import logging
 
 from .base_service import BaseComptaService
 from ..models import EcritureComptable, LigneEcriture
+from ..soldes import ajouter_ecriture
 
 logger = logging.getLogger(__name__)
 
@@ -44,12 +45,12 @@ class EcritureService(BaseComptaService):
         # Valide que l'exercice est ouvert
         self.valider_exercice(ecriture.exercice)
         
-        # Marque comme validée
-        ecriture.est_validee = True
-        ecriture.validee_par = self.utilisateur
-        from django.utils import timezone
-        ecriture.date_validation = timezone.now()
-        ecriture.save()
+        # Marque comme validée (une seule fois : les soldes ne sont reportés
+        # que par l'appel qui a effectivement validé l'écriture)
+        if not ecriture.marquer_validee(self.utilisateur):
+            logger.info(f"Écriture déjà validée: {ecriture.numero_ecriture}")
+            return
+        ajouter_ecriture(ecriture)
         
         self.enregistrer_audit(
             'validation', 'Écritures comptables', 'EcritureComptable',
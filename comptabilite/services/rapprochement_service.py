@@ -7,8 +7,11 @@ Encapsule la logique métier:
 - Gestion des écarts
 """
 
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
 from decimal import Decimal
 from django.db import transaction
+from django.db.models import Q, Sum
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import timedelta
@@ -23,6 +26,100 @@ from ..models import (
 logger = logging.getLogger(__name__)
 
 
+def apparier(operations, lignes, tolerance_jours=5, tolerance_montant=Decimal('0')):
+    """
+    Apparie des opérations bancaires et des lignes du compte de banque.
+
+    Les deux listes sont des dicts {id, date, montant, sens} où ``sens`` vaut
+    'D' pour une entrée d'argent (crédit en banque, débit au 512) et 'C' pour
+    une sortie ; les lignes portent aussi ``ecriture_id``. Trois passes :
+
+    1. montant exact : index {(sens, montant): lignes triées par date}, la ligne
+       la plus proche en date dans la fenêtre est retenue ;
+    2. montant à ``tolerance_montant`` près : lignes restantes triées par
+       montant, fenêtre de montants lue par dichotomie ;
+    3. plusieurs opérations pour une ligne : suite d'opérations consécutives
+       (par date, dans la fenêtre) dont la somme égale le montant de la ligne.
+
+    Une écriture n'est appariée qu'une fois.
+
+    :return: liste de (ids des opérations, ligne, 'exact' | 'tolerance' | 'groupe')
+    """
+    fenetre = timedelta(days=tolerance_jours)
+    appariements = []
+    ecritures_prises = set()
+    restantes = sorted(operations, key=lambda o: (o['date'], str(o['id'])))
+
+    def libre(ligne):
+        return ligne['ecriture_id'] not in ecritures_prises
+
+    def prendre(ops, ligne, nature):
+        ecritures_prises.add(ligne['ecriture_id'])
+        appariements.append(([o['id'] for o in ops], ligne, nature))
+
+    # 1. Montant exact, date la plus proche
+    index = defaultdict(list)
+    for ligne in sorted(lignes, key=lambda l: l['date']):
+        index[(ligne['sens'], ligne['montant'])].append(ligne)
+    reste = []
+    for op in restantes:
+        candidates = index.get((op['sens'], op['montant']), [])
+        dates = [l['date'] for l in candidates]
+        debut, fin = bisect_left(dates, op['date'] - fenetre), bisect_right(dates, op['date'] + fenetre)
+        choix = min((i for i in range(debut, fin) if libre(candidates[i])),
+                    key=lambda i: abs((dates[i] - op['date']).days), default=None)
+        if choix is None:
+            reste.append(op)
+            continue
+        prendre([op], candidates.pop(choix), 'exact')
+    restantes = reste
+
+    lignes_restantes = {sens: sorted((l for cle, ls in index.items() if cle[0] == sens for l in ls if libre(l)),
+                                     key=lambda l: l['montant'])
+                        for sens in ('D', 'C')}
+
+    # 2. Montant à la tolérance près
+    if tolerance_montant > 0:
+        reste = []
+        montants_restants = {sens: [l['montant'] for l in ls] for sens, ls in lignes_restantes.items()}
+        for op in restantes:
+            candidates, montants = lignes_restantes[op['sens']], montants_restants[op['sens']]
+            debut = bisect_left(montants, op['montant'] - tolerance_montant)
+            fin = bisect_right(montants, op['montant'] + tolerance_montant)
+            choix = min((i for i in range(debut, fin)
+                         if libre(candidates[i]) and abs(candidates[i]['date'] - op['date']) <= fenetre),
+                        key=lambda i: (abs(montants[i] - op['montant']), abs(candidates[i]['date'] - op['date'])),
+                        default=None)
+            if choix is None:
+                reste.append(op)
+                continue
+            montants.pop(choix)
+            prendre([op], candidates.pop(choix), 'tolerance')
+        restantes = reste
+
+    # 3. Plusieurs opérations pour une même ligne (remise de chèques, paiement fractionné…)
+    par_sens = {sens: [op for op in restantes if op['sens'] == sens] for sens in ('D', 'C')}
+    for sens, candidates in lignes_restantes.items():
+        ops = par_sens[sens]
+        dates = [o['date'] for o in ops]
+        for ligne in sorted(candidates, key=lambda l: l['date']):
+            if not libre(ligne) or len(ops) < 2:
+                continue
+            debut, fin = bisect_left(dates, ligne['date'] - fenetre), bisect_right(dates, ligne['date'] + fenetre)
+            gauche, somme = debut, Decimal('0')
+            for droite in range(debut, fin):
+                somme += ops[droite]['montant']
+                while somme > ligne['montant'] and gauche <= droite:
+                    somme -= ops[gauche]['montant']
+                    gauche += 1
+                if somme == ligne['montant'] and droite > gauche:
+                    prendre(ops[gauche:droite + 1], ligne, 'groupe')
+                    del ops[gauche:droite + 1]
+                    del dates[gauche:droite + 1]
+                    break
+    return appariements
+
+
 class RapprochementService(BaseComptaService):
     """Service métier pour les rapprochements bancaires."""
     
@@ -37,25 +134,15 @@ class RapprochementService(BaseComptaService):
         Returns:
             Decimal: Solde comptable
         """
-        from ..models import PlanComptable
-        
         if not compte_bancaire.compte_comptable:
             raise ValidationError("Compte bancaire non lié à un compte comptable")
         
-        # Récupère toutes les écritures jusqu'à la date
-        compte = compte_bancaire.compte_comptable
-        total_debit = Decimal('0.00')
-        total_credit = Decimal('0.00')
-        
-        for ligne in LigneEcriture.objects.filter(
-            compte=compte,
-            ecriture__date_ecriture__lte=date_fin
-        ):
-            total_debit += ligne.montant_debit
-            total_credit += ligne.montant_credit
-        
-        solde = total_debit - total_credit
-        return solde
+        # Cumul en base des lignes jusqu'à la date
+        lignes = LigneEcriture.objects.filter(compte=compte_bancaire.compte_comptable)
+        if date_fin is not None:
+            lignes = lignes.filter(ecriture__date_ecriture__lte=date_fin)
+        totaux = lignes.aggregate(d=Sum('montant_debit'), c=Sum('montant_credit'))
+        return (totaux['d'] or Decimal('0.00')) - (totaux['c'] or Decimal('0.00'))
     
     def calculer_solde_bancaire(self, releve):
         """
@@ -141,19 +228,22 @@ class RapprochementService(BaseComptaService):
         Returns:
             LettrageOperation: Nouveau lettrage
         """
-        # Valide les montants
-        if operation_bancaire.montant != ecriture_comptable.total_debit:
-            if operation_bancaire.montant != ecriture_comptable.total_credit:
-                raise ValidationError(
-                    f"Montants différents: {operation_bancaire.montant} vs "
-                    f"{max(ecriture_comptable.total_debit, ecriture_comptable.total_credit)}"
-                )
+        # Valide les montants (totaux stockés sur l'écriture)
+        total_debit, total_credit = ecriture_comptable.total_debit, ecriture_comptable.total_credit
+        if operation_bancaire.montant not in (total_debit, total_credit):
+            raise ValidationError(
+                f"Montants différents: {operation_bancaire.montant} vs "
+                f"{max(total_debit, total_credit)}"
+            )
         
         # Crée le lettrage
         lettrage = LettrageOperation.objects.create(
             operation_bancaire=operation_bancaire,
             ecriture=ecriture_comptable
         )
+        operation_bancaire.ecriture = ecriture_comptable
+        operation_bancaire.lettrage_id = str(lettrage.id)
+        operation_bancaire.save(update_fields=['ecriture', 'lettrage_id'])
         
         # Enregistre l'audit
         self.enregistrer_audit(
@@ -174,27 +264,115 @@ class RapprochementService(BaseComptaService):
         Returns:
             List[EcartBancaire]: Liste des écarts
         """
-        ecarts = []
-        
-        # Trouve les opérations non lettrées
+        # Opérations non lettrées antérieures au délai de compensation
+        # (délai de compensation, frais bancaires, etc.), insérées en une fois
         operations_non_lettrees = OperationBancaire.objects.filter(
             releve__compte_bancaire=rapprochement.compte_bancaire,
-            lettrage_id__isnull=True
-        )
+            lettrage_id__isnull=True,
+            date_operation__lt=rapprochement.date_rapprochement - timedelta(days=10),
+        ).only('montant', 'description')
         
-        for op in operations_non_lettrees:
-            # Crée un écart potentiel
-            # (Peut être un délai de compensation, frais bancaires, etc.)
-            if op.date_operation < rapprochement.date_rapprochement - timedelta(days=10):
-                ecart = EcartBancaire.objects.create(
-                    rapprochement=rapprochement,
-                    type_ecart='retard',
-                    montant=op.montant,
-                    description=f"Opération non compensée: {op.description}"
-                )
-                ecarts.append(ecart)
+        return EcartBancaire.objects.bulk_create([
+            EcartBancaire(
+                rapprochement=rapprochement,
+                type_ecart='retard',
+                montant=op.montant,
+                description=f"Opération non compensée: {op.description}"
+            )
+            for op in operations_non_lettrees
+        ], batch_size=500)
+    
+    @transaction.atomic
+    def rapprocher_automatiquement(self, rapprochement, tolerance_jours=5,
+                                   tolerance_montant=Decimal('0')):
+        """
+        Lettrage automatique des opérations non lettrées du compte bancaire.
+        
+        Opérations et lignes candidates du compte de banque (écritures
+        validées non encore lettrées) sont lues en deux requêtes, appariées
+        en mémoire (voir ``apparier``), puis lettrages, mises à jour des
+        opérations et écarts sont écrits par lots.
+        
+        Args:
+            rapprochement: Instance de RapprochementBancaire
+            tolerance_jours: Écart de dates admis entre banque et comptabilité
+            tolerance_montant: Écart de montant admis (0 = montant exact) ;
+                               la différence est enregistrée comme écart
         
-        return ecarts
+        Returns:
+            dict: nombre d'appariements par nature et d'écarts créés
+        """
+        compte_bancaire = rapprochement.compte_bancaire
+        if not compte_bancaire.compte_comptable_id:
+            raise ValidationError("Compte bancaire non lié à un compte comptable")
+        date_fin = rapprochement.date_rapprochement
+        
+        operations = [
+            {'id': op['id'], 'date': op['date_operation'], 'montant': op['montant'],
+             'sens': 'D' if op['type_operation'] == 'credit' else 'C'}
+            for op in OperationBancaire.objects.filter(
+                releve__compte_bancaire=compte_bancaire,
+                ecriture__isnull=True, lettrage_id__isnull=True,
+                date_operation__lte=date_fin,
+            ).values('id', 'date_operation', 'montant', 'type_operation')
+        ]
+        if not operations:
+            return {'exact': 0, 'tolerance': 0, 'groupe': 0, 'ecarts': 0}
+        
+        deja_lettrees = OperationBancaire.objects.filter(ecriture__isnull=False).values('ecriture')
+        lignes = [
+            {'id': l['id'], 'ecriture_id': l['ecriture_id'], 'date': l['ecriture__date_ecriture'],
+             'montant': l['montant_debit'] or l['montant_credit'],
+             'sens': 'D' if l['montant_debit'] else 'C'}
+            for l in LigneEcriture.objects.filter(
+                compte_id=compte_bancaire.compte_comptable_id,
+                ecriture__entreprise=compte_bancaire.entreprise_id,
+                ecriture__est_validee=True,
+                ecriture__lettrage_bancaire__isnull=True,
+                ecriture__date_ecriture__lte=date_fin + timedelta(days=tolerance_jours),
+            ).filter(
+                Q(montant_debit__gt=0) | Q(montant_credit__gt=0)
+            ).exclude(
+                ecriture__in=deja_lettrees
+            ).values('id', 'ecriture_id', 'ecriture__date_ecriture', 'montant_debit', 'montant_credit')
+        ]
+        
+        appariements = apparier(operations, lignes, tolerance_jours, tolerance_montant)
+        
+        # Un lettrage par écriture, porté par la première opération appariée
+        lettrages = LettrageOperation.objects.bulk_create([
+            LettrageOperation(operation_bancaire_id=ids[0], ecriture_id=ligne['ecriture_id'])
+            for ids, ligne, _ in appariements
+        ], batch_size=500)
+        
+        par_id = {op['id']: op for op in operations}
+        mises_a_jour, ecarts = [], []
+        compteur = {'exact': 0, 'tolerance': 0, 'groupe': 0}
+        for lettrage, (ids, ligne, nature) in zip(lettrages, appariements):
+            compteur[nature] += 1
+            for op_id in ids:
+                mises_a_jour.append(OperationBancaire(
+                    id=op_id, ecriture_id=ligne['ecriture_id'], lettrage_id=str(lettrage.id)))
+            difference = par_id[ids[0]]['montant'] - ligne['montant']
+            if nature == 'tolerance' and difference:
+                ecarts.append(EcartBancaire(
+                    rapprochement=rapprochement,
+                    type_ecart='frais' if difference < 0 else 'autre',
+                    montant=abs(difference),
+                    ecriture_id=ligne['ecriture_id'],
+                    description=f"Écart de lettrage automatique: banque {par_id[ids[0]]['montant']} "
+                                f"vs comptabilité {ligne['montant']}"
+                ))
+        OperationBancaire.objects.bulk_update(mises_a_jour, ['ecriture', 'lettrage_id'], batch_size=500)
+        EcartBancaire.objects.bulk_create(ecarts, batch_size=500)
+        
+        resultat = dict(compteur, ecarts=len(ecarts))
+        self.enregistrer_audit(
+            'create', 'Rapprochements bancaires', 'RapprochementBancaire',
+            rapprochement.id, {'lettrage_automatique': resultat}
+        )
+        logger.info(f"Lettrage automatique {rapprochement}: {resultat}")
+        return resultat
     
     @transaction.atomic
     def valider_rapprochement(self, rapprochement):
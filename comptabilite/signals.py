@@ -7,7 +7,7 @@ Gère:
 - Audit automatique
 """
 
-from django.db.models.signals import post_save, pre_delete
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 from django.utils.translation import gettext as _
 import logging
@@ -61,3 +61,30 @@ def on_compte_deleted(sender, instance, **kwargs):
         raise ValueError(
             _("Impossible de supprimer un compte bancaire ayant des opérations")
         )
+
+
+def _actualiser_totaux_ecriture(ligne):
+    """Reporte sur l'écriture les totaux de ses lignes."""
+    from .models import EcritureComptable, LigneEcriture
+
+    if LigneEcriture._meta.get_field('ecriture').is_cached(ligne):
+        ligne.ecriture.actualiser_totaux()
+    else:
+        EcritureComptable(pk=ligne.ecriture_id).actualiser_totaux()
+
+
+@receiver(post_save, sender='comptabilite.LigneEcriture')
+def on_ligne_ecriture_saved(sender, instance, **kwargs):
+    """Maintient les totaux débit / crédit stockés sur l'écriture."""
+    _actualiser_totaux_ecriture(instance)
+
+
+@receiver(post_delete, sender='comptabilite.LigneEcriture')
+def on_ligne_ecriture_deleted(sender, instance, origin=None, **kwargs):
+    """Idem à la suppression d'une ligne, sauf si l'écriture entière est supprimée."""
+    from .models import EcritureComptable
+
+    if isinstance(origin, EcritureComptable) or (
+            getattr(origin, 'model', None) is EcritureComptable):
+        return
+    _actualiser_totaux_ecriture(instance)
@@ -0,0 +1,212 @@
+"""
+Soldes mensuels matérialisés du grand livre.
+
+Chaque écriture validée ajoute ses mouvements au cumul (compte, mois) de la
+table ``soldes_comptes_mensuels`` ; les états (balance, bilan, compte de
+résultat, flux de trésorerie, tableau de bord) lisent ces cumuls au lieu de
+re-sommer toutes les lignes d'écriture depuis l'origine : leur coût dépend du
+nombre de comptes et de mois, plus du nombre de lignes.
+
+Seules les écritures validées sont cumulées. Une période qui ne commence pas
+un 1er ou ne finit pas en fin de mois complète les mois entiers par les
+lignes des jours restants.
+"""
+import calendar
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from .models import LigneEcriture, PlanComptable, SoldeCompteMensuel
+
+ZERO = Decimal('0')
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# MISE À JOUR INCRÉMENTALE
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _mouvements(ecriture):
+    """{compte_id: (débit, crédit)} des lignes de l'écriture."""
+    return {
+        ligne['compte_id']: (ligne['d'] or ZERO, ligne['c'] or ZERO)
+        for ligne in ecriture.lignes.order_by().values('compte_id').annotate(
+            d=Sum('montant_debit'), c=Sum('montant_credit'))
+    }
+
+
+def _appliquer(entreprise_id, mouvements, signe):
+    """Reporte {(compte_id, année, mois): (débit, crédit)} sur les cumuls."""
+    with transaction.atomic():
+        for (compte_id, annee, mois), (debit, credit) in mouvements.items():
+            cumul = SoldeCompteMensuel.objects.filter(compte_id=compte_id, annee=annee, mois=mois)
+            delta = {'total_debit': F('total_debit') + signe * debit,
+                     'total_credit': F('total_credit') + signe * credit}
+            if cumul.update(**delta):
+                continue
+            try:
+                with transaction.atomic():
+                    SoldeCompteMensuel.objects.create(
+                        entreprise_id=entreprise_id, compte_id=compte_id,
+                        annee=annee, mois=mois,
+                        total_debit=signe * debit, total_credit=signe * credit)
+            except IntegrityError:
+                # Créé entre-temps par une autre transaction
+                cumul.update(**delta)
+
+
+def _cumuler(ecriture, signe):
+    annee, mois = ecriture.date_ecriture.year, ecriture.date_ecriture.month
+    _appliquer(ecriture.entreprise_id,
+               {(compte_id, annee, mois): montants for compte_id, montants in _mouvements(ecriture).items()},
+               signe)
+
+
+def ajouter_ecriture(ecriture):
+    """Ajoute aux cumuls les mouvements d'une écriture qui vient d'être validée."""
+    if ecriture.est_validee:
+        _cumuler(ecriture, 1)
+
+
+def ajouter_lignes(entreprise_id, lignes):
+    """
+    Ajoute aux cumuls des lignes d'écritures validées créées en masse, sans les
+    relire : ``lignes`` est une suite de (compte_id, date, débit, crédit).
+    Une seule mise à jour par (compte, mois) pour tout le lot.
+    """
+    mouvements = defaultdict(lambda: [ZERO, ZERO])
+    for compte_id, jour, debit, credit in lignes:
+        cumul = mouvements[(compte_id, jour.year, jour.month)]
+        cumul[0] += debit
+        cumul[1] += credit
+    _appliquer(entreprise_id, mouvements, 1)
+
+
+def reconstruire_soldes(entreprise=None):
+    """Recalcule tous les cumuls (d'une entreprise ou de toutes) depuis les lignes validées."""
+    lignes = LigneEcriture.objects.filter(ecriture__est_validee=True)
+    cumuls = SoldeCompteMensuel.objects.all()
+    if entreprise is not None:
+        lignes = lignes.filter(ecriture__entreprise=entreprise)
+        cumuls = cumuls.filter(entreprise=entreprise)
+    agregats = (lignes.order_by()
+                .annotate(annee=ExtractYear('ecriture__date_ecriture'),
+                          mois=ExtractMonth('ecriture__date_ecriture'))
+                .values('ecriture__entreprise_id', 'compte_id', 'annee', 'mois')
+                .annotate(d=Sum('montant_debit'), c=Sum('montant_credit')))
+    with transaction.atomic():
+        cumuls.delete()
+        objets = SoldeCompteMensuel.objects.bulk_create(
+            (SoldeCompteMensuel(entreprise_id=a['ecriture__entreprise_id'], compte_id=a['compte_id'],
+                                annee=a['annee'], mois=a['mois'],
+                                total_debit=a['d'] or ZERO, total_credit=a['c'] or ZERO)
+             for a in agregats.iterator()),
+            batch_size=1000)
+    return len(objets)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# LECTURE
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _fin_de_mois(jour):
+    return jour.replace(day=calendar.monthrange(jour.year, jour.month)[1])
+
+
+def _depuis_mois(jour):
+    return Q(annee__gt=jour.year) | Q(annee=jour.year, mois__gte=jour.month)
+
+
+def _jusqu_au_mois(jour):
+    return Q(annee__lt=jour.year) | Q(annee=jour.year, mois__lte=jour.month)
+
+
+def soldes_comptes(entreprise, date_debut=None, date_fin=None, prefixes=None):
+    """
+    Mouvements validés par compte sur la période (bornes incluses, None = sans borne).
+
+    :param prefixes: ne retenir que les comptes dont le numéro commence par l'un d'eux
+    :return: {compte_id: (débit, crédit)}
+    """
+    filtre_compte = PlanComptable.filtre_prefixes(prefixes or (), 'compte__')
+
+    # Mois entiers couverts par la période
+    debut_mois = date_debut
+    if date_debut is not None and date_debut.day != 1:
+        debut_mois = _fin_de_mois(date_debut) + timedelta(days=1)
+    fin_mois = date_fin
+    if date_fin is not None and date_fin != _fin_de_mois(date_fin):
+        fin_mois = date_fin.replace(day=1) - timedelta(days=1)
+
+    totaux = defaultdict(lambda: [ZERO, ZERO])
+
+    def cumuler(lignes):
+        for compte_id, d, c in lignes:
+            totaux[compte_id][0] += d or ZERO
+            totaux[compte_id][1] += c or ZERO
+
+    def lignes_entre(debut, fin):
+        return (LigneEcriture.objects
+                .filter(filtre_compte, ecriture__entreprise=entreprise, ecriture__est_validee=True,
+                        ecriture__date_ecriture__gte=debut, ecriture__date_ecriture__lte=fin)
+                .order_by().values('compte_id')
+                .annotate(d=Sum('montant_debit'), c=Sum('montant_credit'))
+                .values_list('compte_id', 'd', 'c'))
+
+    if debut_mois is not None and fin_mois is not None and debut_mois > fin_mois:
+        # Période contenue dans un mois (ou deux mois partiels)
+        cumuler(lignes_entre(date_debut, date_fin))
+    else:
+        cumuls = SoldeCompteMensuel.objects.filter(filtre_compte, entreprise=entreprise)
+        if debut_mois is not None:
+            cumuls = cumuls.filter(_depuis_mois(debut_mois))
+        if fin_mois is not None:
+            cumuls = cumuls.filter(_jusqu_au_mois(fin_mois))
+        cumuler(cumuls.order_by().values('compte_id')
+                .annotate(d=Sum('total_debit'), c=Sum('total_credit'))
+                .values_list('compte_id', 'd', 'c'))
+        if debut_mois != date_debut:
+            cumuler(lignes_entre(date_debut, debut_mois - timedelta(days=1)))
+        if fin_mois != date_fin:
+            cumuler(lignes_entre(fin_mois + timedelta(days=1), date_fin))
+
+    return {compte_id: (d, c) for compte_id, (d, c) in totaux.items()}
+
+
+def soldes_par_prefixe(entreprise, prefixes, date_debut=None, date_fin=None):
+    """(débit, crédit) cumulés des comptes commençant par l'un des préfixes."""
+    debit = credit = ZERO
+    for d, c in soldes_comptes(entreprise, date_debut, date_fin, prefixes).values():
+        debit += d
+        credit += c
+    return debit, credit
+
+
+def comptes_avec_totaux(comptes, date_debut=None, date_fin=None):
+    """
+    Comptes (PlanComptable d'une même entreprise) munis de ``total_debit`` et
+    ``total_credit`` comme l'annotation ``Sum('lignes_ecritures__…')`` qu'ils
+    remplacent (None si aucun mouvement).
+    """
+    comptes = list(comptes)
+    if not comptes:
+        return comptes
+    totaux = soldes_comptes(comptes[0].entreprise_id, date_debut, date_fin)
+    for compte in comptes:
+        compte.total_debit, compte.total_credit = totaux.get(compte.pk, (None, None))
+    return comptes
+
+
+def comptes_par_groupe(comptes, champ='classe', date_debut=None, date_fin=None):
+    """
+    ``comptes_avec_totaux`` regroupés par niveau de hiérarchie (``classe``,
+    ``sous_classe`` ou ``racine``), dans l'ordre des numéros : un état qui
+    ventile plusieurs classes ou sous-classes lit le plan une seule fois.
+    """
+    groupes = defaultdict(list)
+    for compte in comptes_avec_totaux(comptes.order_by('numero_compte'), date_debut, date_fin):
+        groupes[getattr(compte, champ)].append(compte)
+    return groupes
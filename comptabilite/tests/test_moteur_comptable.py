@@ -7,7 +7,7 @@ Chaque test tourne dans une base de test isolée et jetable.
 from datetime import date
 from decimal import Decimal
 
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 
 from core.models import (Entreprise, Utilisateur, AccesEntreprise,
                          PermissionRole, Delegation)
@@ -19,7 +19,7 @@ from comptabilite.models import (
 from comptabilite.moteur_comptable import (
     operation_simple, comptabiliser_facture, comptabiliser_reglement,
     comptabiliser_piece_caisse, obtenir_compte_auxiliaire, obtenir_compte,
-    generer_ecriture, ErreurComptabilisation, ZERO,
+    generer_ecriture, generer_ecritures_en_masse, ErreurComptabilisation, ZERO,
 )
 
 
@@ -177,6 +177,23 @@ class TestControles(BaseMoteurTest):
             operation_simple(self.e, self.u, 'vente', date(2026, 5, 2), 'Vente unique',
                              Decimal('100000'), tiers=self.client_t)
 
+    def test_doublon_par_empreinte(self):
+        from comptabilite.moteur_comptable import rechercher_doublons
+        ec = operation_simple(self.e, self.u, 'vente', date(2026, 5, 2), 'Vente  Unique',
+                              Decimal('100000'), tiers=self.client_t)
+        self.assertEqual(len(ec.empreinte), 64)
+        # Casse et espaces du libellé ne distinguent pas deux opérations
+        with self.assertRaises(ErreurComptabilisation):
+            operation_simple(self.e, self.u, 'vente', date(2026, 5, 2), 'vente unique',
+                             Decimal('100000'), tiers=self.client_t)
+        # Un autre montant est une opération distincte
+        autre = operation_simple(self.e, self.u, 'vente', date(2026, 5, 2), 'Vente unique',
+                                 Decimal('120000'), tiers=self.client_t)
+        with self.assertNumQueries(1):
+            trouvees = rechercher_doublons(self.e, [ec.empreinte, autre.empreinte, '0' * 64])
+        self.assertEqual(trouvees, {ec.empreinte: ec.numero_ecriture,
+                                    autre.empreinte: autre.numero_ecriture})
+
     def test_refus_exercice_cloture(self):
         ExerciceComptable.objects.create(
             entreprise=self.e, libelle='Exercice 2020', statut='cloture',
@@ -209,6 +226,136 @@ class TestControles(BaseMoteurTest):
         self.assertNotIn('7011', self.comptes(ec))
 
 
+class TestNumerotation(BaseMoteurTest):
+    """Compteurs de séquence : écritures, factures, réservation par bloc."""
+
+    def test_numeros_ecriture_sequentiels_et_reprise(self):
+        from core.models import CompteurSequence
+        ec1 = operation_simple(self.e, self.u, 'salaire', date(2026, 6, 30),
+                               'Salaires juin', Decimal('100000'))
+        self.assertEqual(ec1.numero_ecriture, 'ECR-2026-00001')
+        # Compteur absent (données antérieures) : reprise après le dernier numéro existant
+        CompteurSequence.objects.all().delete()
+        ec2 = operation_simple(self.e, self.u, 'salaire', date(2026, 7, 31),
+                               'Salaires juillet', Decimal('100000'))
+        self.assertEqual(ec2.numero_ecriture, 'ECR-2026-00002')
+
+    def test_numero_facture_propose_puis_constate(self):
+        from comptabilite.numerotation import constater_numero, generer_numero_unique
+        annee = date.today().year
+        propose = generer_numero_unique(self.e, 'FA', Facture, reserver=False)
+        self.assertEqual(propose, f'FA{annee}-0001')
+        # Une suggestion n'est pas consommée
+        self.assertEqual(generer_numero_unique(self.e, 'FA', Facture, reserver=False), propose)
+
+        constater_numero(self.e, 'FA', Facture, propose)
+        self.assertEqual(generer_numero_unique(self.e, 'FA', Facture), f'FA{annee}-0002')
+        # Compteurs distincts par préfixe et par entreprise
+        self.assertEqual(generer_numero_unique(self.e, 'RG', Reglement), f'RG{annee}-0001')
+        autre = Entreprise.objects.create(nom_entreprise='Autre', slug='autre', email='a@a.gn')
+        self.assertEqual(generer_numero_unique(autre, 'FA', Facture), f'FA{annee}-0001')
+
+    def test_reservation_par_bloc(self):
+        from core.services.sequences import SequenceService
+        premier = SequenceService.reserver('LOT-', 2026, quantite=5, entreprise=self.e,
+                                           depart=lambda: 10)
+        self.assertEqual(premier, 11)
+        self.assertEqual(SequenceService.prochain('LOT-', 2026, entreprise=self.e), 16)
+        self.assertEqual(SequenceService.prochain('LOT-', 2026), 1)
+
+
+class TestEcrituresEnMasse(BaseMoteurTest):
+    """Comptabilisation par lot : contrôles, numérotation par bloc, soldes."""
+
+    def operations(self, nombre, montant=Decimal('10000')):
+        banque = obtenir_compte(self.e, 'banque')
+        charges = obtenir_compte(self.e, 'charges_diverses')
+        return [{'type_journal': 'BQ', 'date': date(2026, 3, 1 + i % 28), 'libelle': f'Frais {i}',
+                 'lignes': [(charges, '', montant, ZERO), (banque, '', ZERO, montant)]}
+                for i in range(nombre)]
+
+    def test_lot_numerote_et_cumule(self):
+        from comptabilite.soldes import soldes_comptes
+        operation_simple(self.e, self.u, 'salaire', date(2026, 2, 28), 'Salaires', Decimal('5000'))
+        ecritures = generer_ecritures_en_masse(self.e, self.u, self.operations(30))
+        self.assertEqual([e.numero_ecriture for e in ecritures],
+                         [f'ECR-2026-{n:05d}' for n in range(2, 32)])
+        for ec in EcritureComptable.objects.filter(pk__in=[e.pk for e in ecritures]):
+            self.assertTrue(ec.est_validee)
+            self.assert_equilibree(ec)
+        charges = obtenir_compte(self.e, 'charges_diverses')
+        self.assertEqual(soldes_comptes(self.e)[charges.pk], (Decimal('300000'), ZERO))
+
+    def test_requetes_independantes_de_la_taille_du_lot(self):
+        generer_ecritures_en_masse(self.e, self.u, self.operations(1))
+        operations = self.operations(60)
+        for operation in operations:
+            operation['libelle'] += ' bis'
+        with self.assertNumQueries(19):
+            generer_ecritures_en_masse(self.e, self.u, operations)
+
+    def test_rejets_et_doublons(self):
+        operations = self.operations(3)
+        operations[1]['lignes'] = operations[1]['lignes'][:1]       # déséquilibrée
+        operations.append(dict(operations[0]))                        # doublon dans le lot
+        with self.assertRaises(ErreurComptabilisation):
+            generer_ecritures_en_masse(self.e, self.u, operations)
+        self.assertFalse(EcritureComptable.objects.filter(entreprise=self.e).exists())
+
+        rejets = []
+        ecritures = generer_ecritures_en_masse(self.e, self.u, operations, rejets=rejets)
+        self.assertEqual([i for i, _ in rejets], [1, 3])
+        self.assertIsNone(ecritures[1])
+        self.assertEqual([e.numero_ecriture for e in ecritures if e],
+                         ['ECR-2026-00001', 'ECR-2026-00002'])
+        # Rejoué : seules les opérations encore absentes sont comptabilisées
+        rejets = []
+        ecritures = generer_ecritures_en_masse(self.e, self.u, self.operations(3), rejets=rejets)
+        self.assertEqual([i for i, _ in rejets], [0, 2])
+        self.assertEqual(ecritures[1].numero_ecriture, 'ECR-2026-00003')
+
+
+class TestTotauxEcriture(BaseMoteurTest):
+    """Totaux débit / crédit stockés sur l'écriture, tenus à jour avec les lignes."""
+
+    def test_totaux_des_ecritures_en_masse(self):
+        banque = obtenir_compte(self.e, 'banque')
+        charges = obtenir_compte(self.e, 'charges_diverses')
+        generer_ecritures_en_masse(self.e, self.u, [
+            {'type_journal': 'BQ', 'date': date(2026, 3, 2), 'libelle': f'Frais {m}',
+             'lignes': [(charges, '', Decimal(m), ZERO), (banque, '', ZERO, Decimal(m))]}
+            for m in (500, 20000, 7000)])
+        ecritures = EcritureComptable.objects.filter(entreprise=self.e)
+        for ec in ecritures:
+            self.assert_equilibree(ec)
+            self.assertEqual(ec.total_debit, sum(l.montant_debit for l in ec.lignes.all()))
+            self.assertEqual(ec.total_credit, ec.total_debit)
+            self.assertTrue(ec.est_equilibree)
+        # Filtre et tri par montant en SQL
+        self.assertEqual([ec.libelle for ec in ecritures.filter(total_debit__gte=1000).order_by('-total_debit')],
+                         ['Frais 20000', 'Frais 7000'])
+
+    def test_totaux_suivent_les_lignes(self):
+        from comptabilite.models import LigneEcriture
+        ec = operation_simple(self.e, self.u, 'sortie_caisse', date(2026, 3, 5),
+                              'Fournitures', Decimal('15000'))
+        ligne = LigneEcriture.objects.create(
+            ecriture=ec, compte=obtenir_compte(self.e, 'charges_diverses'),
+            montant_debit=Decimal('2500'), montant_credit=ZERO)
+        ec.refresh_from_db()
+        self.assertEqual((ec.total_debit, ec.total_credit), (Decimal('17500'), Decimal('15000')))
+        self.assertFalse(ec.est_equilibree)
+
+        ligne = LigneEcriture.objects.get(pk=ligne.pk)         # écriture non chargée
+        ligne.delete()
+        ec.refresh_from_db()
+        self.assertEqual((ec.total_debit, ec.total_credit), (Decimal('15000'), Decimal('15000')))
+        self.assertTrue(ec.est_equilibree)
+
+        ec.delete()
+        self.assertFalse(EcritureComptable.objects.filter(pk=ec.pk).exists())
+
+
 class TestAmortissementsEtCloture(BaseMoteurTest):
     """Dotations automatiques et clôture/réouverture d'exercice."""
 
@@ -333,6 +480,322 @@ class TestWorkflowValidation(BaseMoteurTest):
         self.assertEqual(demande.nb_approbations_recues, demande.nb_approbations_requises)
 
 
+class TestSoldesMensuels(BaseMoteurTest):
+    """Soldes mensuels matérialisés : mise à jour incrémentale et lecture."""
+
+    def setUp(self):
+        super().setUp()
+        operation_simple(self.e, self.u, 'entree_caisse', date(2026, 1, 10),
+                         'Apport janvier', Decimal('1000000'))
+        operation_simple(self.e, self.u, 'sortie_caisse', date(2026, 2, 20),
+                         'Charges février', Decimal('300000'))
+        operation_simple(self.e, self.u, 'sortie_caisse', date(2026, 3, 5),
+                         'Charges mars', Decimal('200000'))
+
+    def _solde_lignes(self, prefixes, date_debut=None, date_fin=None):
+        from django.db.models import Q, Sum
+        from comptabilite.models import LigneEcriture
+        q = Q()
+        for p in prefixes:
+            q |= Q(compte__numero_compte__startswith=p)
+        lignes = LigneEcriture.objects.filter(q, ecriture__entreprise=self.e, ecriture__est_validee=True)
+        if date_debut:
+            lignes = lignes.filter(ecriture__date_ecriture__gte=date_debut)
+        if date_fin:
+            lignes = lignes.filter(ecriture__date_ecriture__lte=date_fin)
+        aggr = lignes.aggregate(d=Sum('montant_debit'), c=Sum('montant_credit'))
+        return (aggr['d'] or ZERO), (aggr['c'] or ZERO)
+
+    def test_soldes_identiques_aux_lignes(self):
+        from comptabilite.soldes import soldes_par_prefixe
+        for periode in [(None, None), (date(2026, 1, 1), date(2026, 12, 31)),
+                        (date(2026, 2, 1), date(2026, 2, 28)),
+                        (date(2026, 1, 15), date(2026, 3, 10)),
+                        (date(2026, 2, 10), date(2026, 2, 25))]:
+            for prefixes in (['57'], ['6'], ['5', '6']):
+                self.assertEqual(soldes_par_prefixe(self.e, prefixes, *periode),
+                                 self._solde_lignes(prefixes, *periode), (prefixes, periode))
+
+    def test_mois_entiers_lus_sans_les_lignes(self):
+        from comptabilite.soldes import soldes_comptes
+        with self.assertNumQueries(1):
+            soldes_comptes(self.e, date(2026, 1, 1), date(2026, 12, 31))
+
+    def _ecriture_brouillon(self):
+        from comptabilite.models import LigneEcriture
+        modele = EcritureComptable.objects.filter(entreprise=self.e).first()
+        ecriture = EcritureComptable.objects.create(
+            entreprise=self.e, exercice=modele.exercice, journal=modele.journal,
+            numero_ecriture='OD-1', date_ecriture=date(2026, 2, 14), libelle='Virement interne')
+        LigneEcriture.objects.create(ecriture=ecriture, compte=obtenir_compte(self.e, 'banque'),
+                                     montant_debit=Decimal('50000'))
+        LigneEcriture.objects.create(ecriture=ecriture, compte=obtenir_compte(self.e, 'caisse'),
+                                     montant_credit=Decimal('50000'))
+        return ecriture
+
+    def test_validation_met_a_jour(self):
+        from comptabilite.soldes import ajouter_ecriture, soldes_par_prefixe
+        from comptabilite.services.ecriture_service import EcritureService
+        ecriture = self._ecriture_brouillon()
+        avant = soldes_par_prefixe(self.e, ['52'])
+
+        ajouter_ecriture(ecriture)  # brouillon : ignorée
+        self.assertEqual(soldes_par_prefixe(self.e, ['52']), avant)
+
+        EcritureService(self.e, self.u).valider_ecriture_comptable(ecriture)
+        self.assertEqual(soldes_par_prefixe(self.e, ['52']), (avant[0] + Decimal('50000'), avant[1]))
+        self.assertEqual(soldes_par_prefixe(self.e, ['57'], date(2026, 2, 1), date(2026, 2, 28)),
+                         self._solde_lignes(['57'], date(2026, 2, 1), date(2026, 2, 28)))
+
+    def test_double_validation_ne_cumule_pas(self):
+        from comptabilite.soldes import soldes_par_prefixe
+        from comptabilite.services.ecriture_service import EcritureService
+        ecriture = self._ecriture_brouillon()
+        avant = soldes_par_prefixe(self.e, ['52'])
+        # deux exemplaires chargés avant toute validation (double clic, deux onglets)
+        premier = EcritureComptable.objects.get(pk=ecriture.pk)
+        second = EcritureComptable.objects.get(pk=ecriture.pk)
+
+        EcritureService(self.e, self.u).valider_ecriture_comptable(premier)
+        apres = soldes_par_prefixe(self.e, ['52'])
+        EcritureService(self.e, self.u).valider_ecriture_comptable(second)
+
+        self.assertEqual(apres, (avant[0] + Decimal('50000'), avant[1]))
+        self.assertEqual(soldes_par_prefixe(self.e, ['52']), apres)
+        self.assertFalse(second.marquer_validee(self.u))
+
+    def test_reconstruction_identique(self):
+        from comptabilite.models import SoldeCompteMensuel
+        from comptabilite.soldes import reconstruire_soldes
+        champs = ('compte_id', 'annee', 'mois', 'total_debit', 'total_credit')
+        incremental = sorted(SoldeCompteMensuel.objects.filter(entreprise=self.e).values_list(*champs))
+        SoldeCompteMensuel.objects.filter(entreprise=self.e).update(total_debit=0)
+
+        self.assertEqual(reconstruire_soldes(self.e), len(incremental))
+        self.assertEqual(
+            sorted(SoldeCompteMensuel.objects.filter(entreprise=self.e).values_list(*champs)),
+            incremental)
+
+
+class TestHierarchiePlan(BaseMoteurTest):
+    """Classe / sous-classe / racine dérivées du numéro de compte."""
+
+    def test_save_derive_la_hierarchie(self):
+        compte = PlanComptable.objects.create(entreprise=self.e, numero_compte='411999',
+                                              intitule='Client test', classe='9')
+        self.assertEqual((compte.classe, compte.sous_classe, compte.racine), ('4', '41', '411'))
+        compte.numero_compte = '445610'
+        compte.save(update_fields=['numero_compte'])
+        compte.refresh_from_db()
+        self.assertEqual((compte.classe, compte.sous_classe, compte.racine), ('4', '44', '445'))
+
+    def test_filtre_prefixes_equivaut_a_startswith(self):
+        from django.db.models import Q
+        for numero in ('4431', '44310', '4456', '5711', '5211', '601'):
+            PlanComptable.objects.get_or_create(entreprise=self.e, numero_compte=numero,
+                                                defaults={'intitule': numero})
+        prefixes = ['57', '445', '4431', '6']
+        comptes = PlanComptable.objects.filter(entreprise=self.e)
+        attendu = Q()
+        for prefixe in prefixes:
+            attendu |= Q(numero_compte__startswith=prefixe)
+        self.assertEqual(
+            sorted(comptes.filter(PlanComptable.filtre_prefixes(prefixes)).values_list('numero_compte', flat=True)),
+            sorted(comptes.filter(attendu).values_list('numero_compte', flat=True)))
+
+
+class TestGrandLivre(BaseMoteurTest):
+    """Grand livre paginé par clé : solde progressif et reprise entre pages."""
+
+    def setUp(self):
+        super().setUp()
+        for jour, sens, montant in [(date(2026, 1, 10), 'entree_caisse', '1000000'),
+                                    (date(2026, 2, 3), 'sortie_caisse', '150000'),
+                                    (date(2026, 2, 3), 'sortie_caisse', '50000'),
+                                    (date(2026, 2, 20), 'entree_caisse', '400000'),
+                                    (date(2026, 3, 5), 'sortie_caisse', '200000')]:
+            operation_simple(self.e, self.u, sens, jour, f'{sens} {jour}', Decimal(montant))
+
+    def _attendu(self, date_debut):
+        """(numéro de compte, id, solde progressif) recalculés depuis toutes les lignes."""
+        from comptabilite.models import LigneEcriture
+        soldes, attendu = {}, []
+        lignes = LigneEcriture.objects.filter(ecriture__entreprise=self.e).order_by(
+            'compte__numero_compte', 'ecriture__date_ecriture', 'pk')
+        for l in lignes.select_related('compte', 'ecriture'):
+            soldes[l.compte_id] = soldes.get(l.compte_id, ZERO) + l.montant_debit - l.montant_credit
+            if l.ecriture.date_ecriture >= date_debut:
+                attendu.append((l.compte.numero_compte, l.pk, soldes[l.compte_id]))
+        return attendu
+
+    def test_pages_identiques_au_parcours_complet(self):
+        from comptabilite.grand_livre import page_grand_livre
+        date_debut = date(2026, 2, 1)
+        attendu = self._attendu(date_debut)
+        for taille in (1, 2, 3, 100):
+            lues, curseur = [], None
+            while True:
+                lignes, curseur = page_grand_livre(self.e, date_debut=date_debut,
+                                                   apres=curseur, taille=taille)
+                lues += [(l['numero_compte'], l['id'], l['solde']) for l in lignes]
+                if curseur is None:
+                    break
+            self.assertEqual(lues, attendu, taille)
+
+    def test_groupes_portent_les_totaux_de_periode(self):
+        from comptabilite.grand_livre import grouper_par_compte, parcourir_grand_livre
+        from comptabilite.soldes import soldes_comptes
+        date_debut = date(2026, 2, 1)
+        totaux = soldes_comptes(self.e, date_debut, None)
+        groupes = grouper_par_compte(parcourir_grand_livre(self.e, date_debut=date_debut, taille=2), totaux)
+        caisse = next(g for g in groupes if g['numero_compte'] == '5711')
+        self.assertTrue(caisse['complet'])
+        self.assertEqual(caisse['report'], Decimal('1000000'))
+        self.assertEqual((caisse['total_debit'], caisse['total_credit']),
+                         (Decimal('400000'), Decimal('400000')))
+        self.assertEqual(caisse['solde'], Decimal('1000000'))
+
+
+class TestFiltreMontant(SimpleTestCase):
+    """Montants des filtres GET de la liste des écritures."""
+
+    def test_valeurs_non_finies_ignorees(self):
+        from comptabilite.urls import comptabilite_views
+        lire = comptabilite_views._decimal_ou_none
+        self.assertEqual(lire('1 250 000,50'), Decimal('1250000.50'))
+        for valeur in ('', None, 'abc', 'NaN', 'nan', 'sNaN', 'Infinity', '-Inf', 'inf'):
+            self.assertIsNone(lire(valeur), valeur)
+
+
+class TestVieillissement(BaseMoteurTest):
+    """Tranches d'âge calculées en base et photographies quotidiennes."""
+
+    def setUp(self):
+        super().setUp()
+        from datetime import timedelta
+        self.au = date.today()
+        autre = Tiers.objects.create(entreprise=self.e, code='C002',
+                                     raison_sociale='Client Gamma', type_tiers='client')
+        # (tiers, retard en jours ou None sans échéance, TTC, payé)
+        for i, (tiers, retard, ttc, paye) in enumerate([
+                (self.client_t, -10, 1000, 0),      # non échu
+                (self.client_t, 5, 2000, 500),      # 0-30
+                (autre, 45, 4000, 0),               # 31-60
+                (autre, 120, 8000, 0),              # > 90
+                (autre, 200, 3000, 3000),           # soldée : ignorée
+        ]):
+            Facture.objects.create(
+                entreprise=self.e, numero=f'FV-{i}', type_facture='vente', tiers=tiers,
+                date_facture=self.au - timedelta(days=max(retard, 0) + 30),
+                date_echeance=self.au - timedelta(days=retard),
+                montant_ttc=Decimal(ttc), montant_paye=Decimal(paye), statut='validee')
+        Facture.objects.create(
+            entreprise=self.e, numero='FA-1', type_facture='achat', tiers=self.frs_t,
+            date_facture=self.au - timedelta(days=70), montant_ttc=Decimal('900'), statut='validee')
+
+    def test_tranches_en_une_requete(self):
+        from comptabilite.vieillissement import TYPES_CREANCES, TYPES_DETTES, vieillissement
+        with self.assertNumQueries(1):
+            tranches, total = vieillissement(self.e, TYPES_CREANCES, self.au)
+        self.assertEqual({cle: t['total'] for cle, t in tranches.items()},
+                         {'non_echu': 1000, '0_30': 1500, '31_60': 4000, '61_90': 0, 'plus_90': 8000})
+        self.assertEqual(total, Decimal('14500'))
+        tranches, total = vieillissement(self.e, TYPES_DETTES, self.au)
+        self.assertEqual((tranches['61_90']['nombre'], total), (1, Decimal('900')))
+
+    def test_par_tiers(self):
+        from comptabilite.vieillissement import TYPES_CREANCES, vieillissement_par_tiers
+        lignes = vieillissement_par_tiers(self.e, TYPES_CREANCES, self.au)
+        self.assertEqual([(l['raison_sociale'], l['total']) for l in lignes],
+                         [('Client Gamma', Decimal('12000')), ('Client Alpha', Decimal('2500'))])
+        self.assertEqual(lignes[0]['tranches'], [0, 0, 4000, 0, 8000])
+
+    def test_photographie_et_tendance(self):
+        from comptabilite.models import AnalyseImpayes, VieillissementCreances
+        from comptabilite.vieillissement import (
+            TYPES_CREANCES, photographier_vieillissement, tendance_vieillissement)
+        self.assertEqual(photographier_vieillissement(self.e), 5)
+        self.assertEqual(photographier_vieillissement(self.e), 5)      # remplace celle du jour
+        self.assertEqual(VieillissementCreances.objects.count(), 5)
+        self.assertEqual(AnalyseImpayes.objects.count(), 4)
+        tendance = tendance_vieillissement(self.e, TYPES_CREANCES)
+        self.assertEqual(len(tendance), 1)
+        self.assertEqual(tendance[0]['tranches'], [1000, 1500, 4000, 0, 8000])
+
+    def test_analyse_saisie_conservee_sans_doublon(self):
+        from comptabilite.models import AnalyseImpayes
+        from comptabilite.vieillissement import photographier_vieillissement
+        photographier_vieillissement(self.e)
+        analyse = AnalyseImpayes.objects.get(facture__numero='FV-3')
+        analyse.raison_impaye = 'Client en redressement'
+        analyse.save()
+        Facture.objects.filter(numero='FV-3').update(montant_paye=Decimal('2000'))
+
+        photographier_vieillissement(self.e)
+
+        self.assertEqual(AnalyseImpayes.objects.count(), 4)
+        analyse = AnalyseImpayes.objects.get(facture__numero='FV-3')
+        self.assertEqual((analyse.raison_impaye, analyse.montant_impaye),
+                         ('Client en redressement', Decimal('6000')))
+
+
+class TestRapprochementAutomatique(BaseMoteurTest):
+    """Lettrage automatique : montant exact, tolérance, opérations groupées."""
+
+    def setUp(self):
+        super().setUp()
+        from comptabilite.models import CompteBancaire, RapprochementBancaire, ReleveBancaire
+        self.compte = CompteBancaire.objects.create(
+            entreprise=self.e, code='BQ1', libelle='Banque principale', banque='BICIGUI',
+            compte_comptable=obtenir_compte(self.e, 'banque'))
+        self.releve = ReleveBancaire.objects.create(
+            compte_bancaire=self.compte, numero='R-03', date_debut=date(2026, 3, 1),
+            date_fin=date(2026, 3, 31), solde_initial=ZERO, solde_final=ZERO)
+        self.rapprochement = RapprochementBancaire.objects.create(
+            compte_bancaire=self.compte, date_rapprochement=date(2026, 3, 31),
+            solde_bancaire=ZERO, solde_comptable=ZERO)
+
+    def operation(self, jour, montant, sens='credit'):
+        from comptabilite.models import OperationBancaire
+        return OperationBancaire.objects.create(
+            releve=self.releve, date_operation=date(2026, 3, jour), description=f'Op {jour}',
+            montant=Decimal(montant), type_operation=sens)
+
+    def test_lettrage_exact_tolerance_et_groupe(self):
+        from comptabilite.models import EcartBancaire, LettrageOperation
+        from comptabilite.services.rapprochement_service import RapprochementService
+        enc1 = operation_simple(self.e, self.u, 'encaissement_client', date(2026, 3, 1), 'Règlement A',
+                                Decimal('100000'), tiers=self.client_t)
+        enc2 = operation_simple(self.e, self.u, 'encaissement_client', date(2026, 3, 5), 'Remise chèques',
+                                Decimal('250000'), tiers=self.client_t)
+        pai = operation_simple(self.e, self.u, 'paiement_fournisseur', date(2026, 3, 10), 'Virement Beta',
+                               Decimal('80000'), tiers=self.frs_t)
+        exact = self.operation(3, '100000')
+        cheques = [self.operation(6, '150000'), self.operation(6, '100000')]
+        virement = self.operation(11, '79500', 'debit')
+        orpheline = self.operation(15, '5000', 'debit')
+
+        service = RapprochementService(self.e, self.u)
+        with self.assertNumQueries(8):
+            resultat = service.rapprocher_automatiquement(
+                self.rapprochement, tolerance_montant=Decimal('1000'))
+
+        self.assertEqual(resultat, {'exact': 1, 'tolerance': 1, 'groupe': 1, 'ecarts': 1})
+        for op in [exact, virement, orpheline, *cheques]:
+            op.refresh_from_db()
+        self.assertEqual(exact.ecriture, enc1)
+        self.assertEqual(virement.ecriture, pai)
+        self.assertEqual({c.ecriture_id for c in cheques}, {enc2.pk})
+        self.assertEqual(cheques[0].lettrage_id, cheques[1].lettrage_id)
+        self.assertIsNone(orpheline.lettrage_id)
+        self.assertEqual(LettrageOperation.objects.count(), 3)
+        ecart = EcartBancaire.objects.get()
+        self.assertEqual((ecart.type_ecart, ecart.montant), ('frais', Decimal('500')))
+        # Rejoué : plus rien à apparier
+        resultat = service.rapprocher_automatiquement(self.rapprochement, tolerance_montant=Decimal('1000'))
+        self.assertEqual(resultat['exact'] + resultat['tolerance'] + resultat['groupe'], 0)
+
+
 class TestMultiSocietes(TestCase):
     """Suppression d'entreprise sans perte d'utilisateur, cloisonnement."""
 
@@ -18,7 +18,7 @@ from comptabilite.views.rapprochements.views import (
     CompteBancaireListView, CompteBancaireDetailView, CompteBancaireCreateView, CompteBancaireUpdateView, CompteBancaireDeleteView,
     RapprochementListView, RapprochementDetailView, RapprochementCreateView, RapprochementUpdateView, RapprochementDeleteView,
     OperationImportView,
-    LettrageView, LettrageAnnulationView, RapprochementFinalisationView,
+    LettrageView, LettrageAutomatiqueView, LettrageAnnulationView, RapprochementFinalisationView,
 )
 
 # Importer les vues principales depuis views.py
@@ -98,6 +98,8 @@ try:
 
     # États financiers
     grand_livre_view = comptabilite_views.grand_livre
+    grand_livre_pdf_view = comptabilite_views.grand_livre_pdf
+    grand_livre_excel_view = comptabilite_views.grand_livre_excel
     balance_view = comptabilite_views.balance
     journal_general_view = comptabilite_views.journal_general
     bilan_view = comptabilite_views.bilan
@@ -1401,6 +1403,9 @@ except Exception as e:
             'total_general_credit': sum(data['total_credit'] for data in comptes_data.values()),
         })
     
+    grand_livre_pdf_view = grand_livre_view
+    grand_livre_excel_view = grand_livre_view
+    
     @login_required
     def balance_view(request):
         """Vue simple pour la balance"""
@@ -1711,8 +1716,8 @@ compte_fournisseur_patterns = [
 # États Financiers URLs
 etats_patterns = [
     path('grand-livre/', grand_livre_view, name='grand_livre'),
-    path('grand-livre/pdf/', grand_livre_view, name='grand_livre_pdf'),
-    path('grand-livre/excel/', grand_livre_view, name='grand_livre_excel'),
+    path('grand-livre/pdf/', grand_livre_pdf_view, name='grand_livre_pdf'),
+    path('grand-livre/excel/', grand_livre_excel_view, name='grand_livre_excel'),
     path('balance/', balance_view, name='balance'),
     path('balance/pdf/', balance_view, name='balance_pdf'),
     path('balance/excel/', balance_view, name='balance_excel'),
@@ -1749,6 +1754,7 @@ rapprochement_patterns = [
 # Lettrage (Matching) URLs
 lettrage_patterns = [
     path('rapprochements/<uuid:rapprochement_id>/lettrer/', LettrageView.as_view(), name='rapprochement-lettrage'),
+    path('rapprochements/<uuid:rapprochement_id>/lettrer-auto/', LettrageAutomatiqueView.as_view(), name='rapprochement-lettrage-auto'),
     path('rapprochements/<uuid:rapprochement_id>/lettrage/<uuid:lettrage_id>/supprimer/', LettrageAnnulationView.as_view(), name='rapprochement-lettrage-delete'),
 ]
 
@@ -0,0 +1,181 @@
+"""
+Vieillissement des créances clients et des dettes fournisseurs.
+
+Les tranches d'âge (non échu, 0-30, 31-60, 61-90, plus de 90 jours de retard
+sur l'échéance, ou sur la date de facture à défaut) sont calculées en base par
+agrégation conditionnelle (SUM … FILTER) : une requête pour les totaux de
+toutes les tranches, une requête groupée par tiers, quel que soit le nombre de
+factures ouvertes.
+
+Une photographie quotidienne (``photographier_vieillissement``, commande
+``photographier_vieillissement``) enregistre le reste dû de chaque facture
+ouverte dans VieillissementCreances et celui des factures échues dans
+AnalyseImpayes : les courbes d'évolution lisent ces lignes précalculées.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import AnalyseImpayes, Facture, VieillissementCreances
+
+ZERO = Decimal('0')
+
+# (clé, libellé, catégorie de VieillissementCreances, retard min, retard max en jours)
+TRANCHES = (
+    ('non_echu', 'Non échu', 'courant', None, 0),
+    ('0_30', '0-30 jours', '30j', 1, 30),
+    ('31_60', '31-60 jours', '60j', 31, 60),
+    ('61_90', '61-90 jours', '90j', 61, 90),
+    ('plus_90', '> 90 jours', 'plus90j', 91, None),
+)
+
+TYPES_CREANCES = ('vente', 'acompte')
+TYPES_DETTES = ('achat',)
+
+_MONTANT = DecimalField(max_digits=15, decimal_places=2)
+
+
+def factures_ouvertes(entreprise, types):
+    """Factures validées non soldées, annotées de ``date_reference`` et ``reste_du``."""
+    return (Facture.objects
+            .filter(entreprise=entreprise, type_facture__in=types, statut='validee',
+                    montant_paye__lt=F('montant_ttc'))
+            .annotate(date_reference=Coalesce('date_echeance', 'date_facture'),
+                      reste_du=ExpressionWrapper(F('montant_ttc') - F('montant_paye'),
+                                                 output_field=_MONTANT)))
+
+
+def filtre_tranche(cle, au):
+    """Condition sur ``date_reference`` d'une tranche, à la date ``au``."""
+    _, _, _, jours_min, jours_max = next(t for t in TRANCHES if t[0] == cle)
+    condition = Q()
+    if jours_min is not None:
+        condition &= Q(date_reference__lte=au - timedelta(days=jours_min))
+    if jours_max is not None:
+        condition &= Q(date_reference__gte=au - timedelta(days=jours_max))
+    return condition
+
+
+def tranche_de(jours_retard):
+    """Tranche (clé, libellé, catégorie, min, max) d'un retard en jours."""
+    for tranche in TRANCHES:
+        if tranche[4] is None or jours_retard <= tranche[4]:
+            return tranche
+
+
+def _sommes_par_tranche(au):
+    agregats = {}
+    for cle, *_ in TRANCHES:
+        condition = filtre_tranche(cle, au)
+        agregats[f't_{cle}'] = Sum('reste_du', filter=condition)
+        agregats[f'n_{cle}'] = Count('pk', filter=condition)
+    return agregats
+
+
+def vieillissement(entreprise, types, au=None):
+    """
+    Totaux par tranche en une requête.
+
+    :return: ({clé: {'label', 'total', 'nombre'}} dans l'ordre des tranches, total général)
+    """
+    au = au or timezone.now().date()
+    resultat = factures_ouvertes(entreprise, types).aggregate(**_sommes_par_tranche(au))
+    tranches = {cle: {'label': label, 'total': resultat[f't_{cle}'] or ZERO,
+                      'nombre': resultat[f'n_{cle}']}
+                for cle, label, *_ in TRANCHES}
+    return tranches, sum((t['total'] for t in tranches.values()), ZERO)
+
+
+def vieillissement_par_tiers(entreprise, types, au=None):
+    """Une ligne par tiers (tranches et total), du plus gros encours au plus petit."""
+    au = au or timezone.now().date()
+    lignes = (factures_ouvertes(entreprise, types)
+              .values('tiers_id', raison_sociale=F('tiers__raison_sociale'))
+              .annotate(total=Sum('reste_du'), **_sommes_par_tranche(au))
+              .order_by('-total', 'raison_sociale'))
+    return [{'tiers_id': ligne['tiers_id'], 'raison_sociale': ligne['raison_sociale'],
+             'total': ligne['total'] or ZERO,
+             'tranches': [ligne[f't_{cle}'] or ZERO for cle, *_ in TRANCHES]}
+            for ligne in lignes]
+
+
+def factures_de_tranche(entreprise, types, cle, au=None, limite=None):
+    """Factures d'une tranche, les plus anciennes d'abord, munies de ``jours_retard``."""
+    au = au or timezone.now().date()
+    factures = (factures_ouvertes(entreprise, types).filter(filtre_tranche(cle, au))
+                .select_related('tiers').order_by('date_reference', 'numero'))
+    factures = list(factures[:limite] if limite else factures)
+    for facture in factures:
+        facture.jours_retard = (au - facture.date_reference).days
+    return factures
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# PHOTOGRAPHIES QUOTIDIENNES
+# ═══════════════════════════════════════════════════════════════════════════
+
+def photographier_vieillissement(entreprise):
+    """
+    Photographie du jour des factures ouvertes (clients et fournisseurs).
+    Remplace celle du même jour ; une seule analyse d'impayé par facture et
+    par jour : celles saisies à la main (raison, action ou relance
+    renseignée) sont conservées et leurs montants mis à jour.
+
+    :return: nombre de factures photographiées
+    """
+    au = date.today()    # valeur posée par auto_now_add sur date_calcul
+    factures = (factures_ouvertes(entreprise, TYPES_CREANCES + TYPES_DETTES)
+                .order_by()
+                .values_list('pk', 'tiers_id', 'date_facture', 'date_reference', 'reste_du'))
+    vieillissements, impayes = [], []
+    for facture_id, tiers_id, date_facture, date_reference, reste in factures.iterator():
+        jours = (au - date_reference).days
+        vieillissements.append(VieillissementCreances(
+            tiers_id=tiers_id, facture_id=facture_id, categorie=tranche_de(jours)[2],
+            montant=reste, date_facture=date_facture, date_echeance=date_reference))
+        if jours > 0:
+            impayes.append(AnalyseImpayes(facture_id=facture_id, montant_impaye=reste,
+                                          jours_retard=jours))
+
+    with transaction.atomic():
+        VieillissementCreances.objects.filter(tiers__entreprise=entreprise, date_calcul=au).delete()
+        du_jour = AnalyseImpayes.objects.filter(facture__entreprise=entreprise, date_analyse__date=au)
+        du_jour.filter(raison_impaye__isnull=True, action_prevue__isnull=True,
+                       date_relance__isnull=True).delete()
+        conservees = {analyse.facture_id: analyse for analyse in du_jour}
+        a_creer, a_actualiser = [], []
+        for analyse in impayes:
+            existante = conservees.get(analyse.facture_id)
+            if existante is None:
+                a_creer.append(analyse)
+            else:
+                existante.montant_impaye, existante.jours_retard = analyse.montant_impaye, analyse.jours_retard
+                a_actualiser.append(existante)
+        VieillissementCreances.objects.bulk_create(vieillissements, batch_size=1000)
+        AnalyseImpayes.objects.bulk_update(a_actualiser, ['montant_impaye', 'jours_retard'], batch_size=1000)
+        AnalyseImpayes.objects.bulk_create(a_creer, batch_size=1000)
+    return len(vieillissements)
+
+
+def tendance_vieillissement(entreprise, types, jours=90):
+    """
+    Évolution des tranches d'après les photographies des ``jours`` derniers jours.
+
+    :return: [{'date', 'tranches': [montant par tranche], 'total'}] dans l'ordre chronologique
+    """
+    colonnes = {categorie: i for i, (_, _, categorie, _, _) in enumerate(TRANCHES)}
+    photos = {}
+    lignes = (VieillissementCreances.objects
+              .filter(tiers__entreprise=entreprise, facture__type_facture__in=types,
+                      date_calcul__gte=date.today() - timedelta(days=jours))
+              .values('date_calcul', 'categorie').annotate(total=Sum('montant'))
+              .order_by('date_calcul'))
+    for ligne in lignes:
+        photo = photos.setdefault(ligne['date_calcul'], [ZERO] * len(TRANCHES))
+        photo[colonnes[ligne['categorie']]] += ligne['total'] or ZERO
+    return [{'date': jour, 'tranches': montants, 'total': sum(montants, ZERO)}
+            for jour, montants in photos.items()]
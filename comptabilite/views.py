@@ -2,15 +2,14 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from core.decorators import reauth_required
 from django.contrib import messages
-from django.db.models import Sum, Q, F, Count
+from django.db.models import Sum, Q, Count
 from django.db import transaction
 from django.utils import timezone
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse
+from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator
-from decimal import Decimal
-from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
 import io
-from datetime import datetime
 
 from .models import (
     PlanComptable, Journal, ExerciceComptable, EcritureComptable,
@@ -20,6 +19,11 @@ from .forms import (
     PlanComptableForm, JournalForm, ExerciceForm, EcritureForm,
     TiersForm, FactureForm, ReglementForm
 )
+from .numerotation import generer_numero_unique, constater_numero
+from .soldes import ajouter_ecriture, comptes_avec_totaux, comptes_par_groupe, soldes_comptes
+from .grand_livre import (
+    decoder_curseur, encoder_curseur, grouper_par_compte, lire_date, page_grand_livre, parcourir_grand_livre,
+)
 
 
 def compta_required(view_func):
@@ -37,48 +41,13 @@ def compta_required(view_func):
     return wrapper
 
 
-def generer_numero_unique(entreprise, prefixe, modele, champ='numero'):
-    """Génère un numéro unique avec gestion des doublons"""
-    annee = datetime.now().year
-    max_attempts = 10
-    
-    for attempt in range(max_attempts):
-        with transaction.atomic():
-            # Récupérer le dernier numéro avec un verrou row-level
-            dernier = modele.objects.select_for_update().filter(
-                entreprise=entreprise,
-                **{f"{champ}__startswith": f"{prefixe}{annee}"}
-            ).order_by(f"-{champ}").first()
-            
-            if dernier:
-                try:
-                    # Extraire le numéro séquentiel
-                    dernier_numero = getattr(dernier, champ)
-                    if '-' in dernier_numero:
-                        numero = int(dernier_numero.split('-')[-1]) + 1
-                    else:
-                        numero = int(dernier_numero[-4:]) + 1
-                except (ValueError, IndexError):
-                    numero = 1
-            else:
-                numero = 1
-            
-            nouveau_numero = f"{prefixe}{annee}-{numero:04d}"
-            
-            # Vérifier si le numéro existe déjà (double sécurité)
-            if not modele.objects.filter(
-                entreprise=entreprise,
-                **{champ: nouveau_numero}
-            ).exists():
-                return nouveau_numero
-            
-            # Si existe déjà, incrémenter et réessayer
-            numero += 1
-    
-    # Si toutes les tentatives échouent, générer un numéro avec timestamp
-    import time
-    timestamp = int(time.time()) % 10000
-    return f"{prefixe}{annee}-{timestamp:04d}"
+def _decimal_ou_none(valeur):
+    """Montant saisi dans un filtre GET, None si vide, invalide ou non fini (NaN, Infinity)."""
+    try:
+        montant = Decimal(valeur.replace(' ', '').replace(',', '.')) if valeur else None
+    except InvalidOperation:
+        return None
+    return montant if montant is not None and montant.is_finite() else None
 
 
 @reauth_required
@@ -456,8 +425,21 @@ def ecriture_list(request):
         ecritures = ecritures.filter(date_ecriture__gte=date_debut)
     if date_fin:
         ecritures = ecritures.filter(date_ecriture__lte=date_fin)
-    
-    ecritures = ecritures.order_by('-date_ecriture', '-numero_ecriture')
+    # Filtres et tri sur les totaux stockés de l'écriture (index entreprise + total_debit)
+    montant_min = _decimal_ou_none(request.GET.get('montant_min'))
+    montant_max = _decimal_ou_none(request.GET.get('montant_max'))
+    if montant_min is not None:
+        ecritures = ecritures.filter(total_debit__gte=montant_min)
+    if montant_max is not None:
+        ecritures = ecritures.filter(total_debit__lte=montant_max)
+    if request.GET.get('desequilibrees'):
+        ecritures = ecritures.filter(est_equilibree=False)
+    
+    tri = request.GET.get('tri', '')
+    if tri in ('montant', '-montant'):
+        ecritures = ecritures.order_by(tri.replace('montant', 'total_debit'), '-date_ecriture')
+    else:
+        ecritures = ecritures.order_by('-date_ecriture', '-numero_ecriture')
     
     paginator = Paginator(ecritures, 25)
     page = request.GET.get('page', 1)
@@ -468,6 +450,7 @@ def ecriture_list(request):
     context = {
         'ecritures': ecritures,
         'journaux': journaux,
+        'tri': tri,
     }
     return render(request, 'comptabilite/ecritures/list.html', context)
 
@@ -588,6 +571,7 @@ def ecriture_update(request, pk):
 @reauth_required
 @login_required
 @compta_required
+@require_POST
 def ecriture_valider(request, pk):
     """Valider une écriture"""
     ecriture = get_object_or_404(EcritureComptable, pk=pk, entreprise=request.user.entreprise)
@@ -596,12 +580,15 @@ def ecriture_valider(request, pk):
         messages.error(request, "L'écriture n'est pas équilibrée.")
         return redirect('comptabilite:ecriture_detail', pk=pk)
     
-    ecriture.est_validee = True
-    ecriture.date_validation = timezone.now()
-    ecriture.validee_par = request.user
-    ecriture.save()
+    with transaction.atomic():
+        validee = ecriture.marquer_validee(request.user)
+        if validee:
+            ajouter_ecriture(ecriture)
     
-    messages.success(request, "Écriture validée avec succès.")
+    if validee:
+        messages.success(request, "Écriture validée avec succès.")
+    else:
+        messages.info(request, "Cette écriture est déjà validée.")
     return redirect('comptabilite:ecriture_detail', pk=pk)
 
 
@@ -616,8 +603,9 @@ def ecriture_delete(request, pk):
         return redirect('comptabilite:ecriture_detail', pk=pk)
     if request.method == 'POST':
         numero = ecriture.numero_ecriture
-        ecriture.lignes.all().delete()
-        ecriture.delete()
+        with transaction.atomic():
+            ecriture.lignes.all().delete()
+            ecriture.delete()
         messages.success(request, f'Écriture "{numero}" supprimée avec succès.')
         return redirect('comptabilite:ecriture_list')
     return render(request, 'comptabilite/confirm_delete.html', {
@@ -784,14 +772,16 @@ def facture_create(request):
                     facture.entreprise = request.user.entreprise
                     
                     # Générer un numéro unique si vide
+                    prefixe = 'FA' if type_facture == 'vente' else 'FF'
                     if not facture.numero:
-                        prefixe = 'FA' if type_facture == 'vente' else 'FF'
                         facture.numero = generer_numero_unique(
                             request.user.entreprise, 
                             prefixe, 
                             Facture, 
                             'numero'
                         )
+                    else:
+                        constater_numero(request.user.entreprise, prefixe, Facture, facture.numero)
                     
                     facture.save()
                     messages.success(request, f"Facture {facture.numero} créée.")
@@ -807,7 +797,8 @@ def facture_create(request):
             request.user.entreprise, 
             prefixe, 
             Facture, 
-            'numero'
+            'numero',
+            reserver=False,
         )
         form = FactureForm(
             entreprise=request.user.entreprise, 
@@ -984,6 +975,8 @@ def reglement_create(request):
                             Reglement, 
                             'numero'
                         )
+                    else:
+                        constater_numero(request.user.entreprise, 'RG', Reglement, reglement.numero)
                     
                     reglement.save()
                     
@@ -1019,7 +1012,8 @@ def reglement_create(request):
             request.user.entreprise, 
             'RG', 
             Reglement, 
-            'numero'
+            'numero',
+            reserver=False,
         )
         initial['numero'] = numero_suggestion
         
@@ -1102,272 +1096,216 @@ def reglement_delete(request, pk):
 
 # ==================== ÉTATS FINANCIERS ====================
 
+def _filtres_grand_livre(request):
+    """Compte (pk) et bornes de dates du grand livre lus dans la requête."""
+    compte_id = request.GET.get('compte', '')
+    if not compte_id.isdigit():
+        compte_id = ''
+    return compte_id, lire_date(request.GET.get('date_debut')), lire_date(request.GET.get('date_fin'))
+
+
 @reauth_required
 @login_required
 @compta_required
 def grand_livre(request):
-    """Grand livre comptable"""
+    """Grand livre comptable, paginé par clé avec solde progressif"""
     entreprise = request.user.entreprise
-    compte_id = request.GET.get('compte', '')
-    date_debut = request.GET.get('date_debut', '')
-    date_fin = request.GET.get('date_fin', '')
+    compte_id, date_debut, date_fin = _filtres_grand_livre(request)
+    apres = decoder_curseur(request.GET.get('apres'))
     
-    lignes = LigneEcriture.objects.filter(
-        ecriture__entreprise=entreprise,
-        ecriture__est_validee=True
-    ).select_related('compte', 'ecriture', 'ecriture__journal')
-    
-    if compte_id:
-        lignes = lignes.filter(compte_id=compte_id)
-    if date_debut:
-        lignes = lignes.filter(ecriture__date_ecriture__gte=date_debut)
-    if date_fin:
-        lignes = lignes.filter(ecriture__date_ecriture__lte=date_fin)
-    
-    lignes = lignes.order_by('compte__numero_compte', 'ecriture__date_ecriture')
-    
-    # Regrouper les lignes par compte avec totaux
-    from collections import OrderedDict
-    comptes_groupes = OrderedDict()
-    for ligne in lignes:
-        compte = ligne.compte
-        if compte.pk not in comptes_groupes:
-            comptes_groupes[compte.pk] = {
-                'compte': compte,
-                'lignes': [],
-                'total_debit': Decimal('0'),
-                'total_credit': Decimal('0'),
-            }
-        comptes_groupes[compte.pk]['lignes'].append(ligne)
-        comptes_groupes[compte.pk]['total_debit'] += ligne.montant_debit or Decimal('0')
-        comptes_groupes[compte.pk]['total_credit'] += ligne.montant_credit or Decimal('0')
+    lignes, suivant = page_grand_livre(entreprise, compte_id, date_debut, date_fin, apres=apres)
+    totaux = soldes_comptes(entreprise, date_debut, date_fin)
     
     comptes = PlanComptable.objects.filter(entreprise=entreprise, est_actif=True).order_by('numero_compte')
     
     context = {
-        'comptes_groupes': comptes_groupes.values(),
+        'comptes_groupes': grouper_par_compte(lignes, totaux),
         'comptes': comptes,
         'compte_id': compte_id,
         'date_debut': date_debut,
         'date_fin': date_fin,
+        'est_suite': apres is not None,
+        'curseur_suivant': encoder_curseur(suivant) if suivant else '',
     }
     return render(request, 'comptabilite/etats/grand_livre.html', context)
 
 
-def _get_grand_livre_data(request):
-    """Helper pour récupérer les données du grand livre"""
-    entreprise = request.user.entreprise
-    compte_id = request.GET.get('compte', '')
-    date_debut = request.GET.get('date_debut', '')
-    date_fin = request.GET.get('date_fin', '')
-    
-    lignes = LigneEcriture.objects.filter(
-        ecriture__entreprise=entreprise,
-        ecriture__est_validee=True
-    ).select_related('compte', 'ecriture', 'ecriture__journal')
-    
-    if compte_id:
-        lignes = lignes.filter(compte_id=compte_id)
-    if date_debut:
-        lignes = lignes.filter(ecriture__date_ecriture__gte=date_debut)
-    if date_fin:
-        lignes = lignes.filter(ecriture__date_ecriture__lte=date_fin)
-    
-    lignes = lignes.order_by('compte__numero_compte', 'ecriture__date_ecriture')
-    
-    comptes_groupes = OrderedDict()
-    for ligne in lignes:
-        compte = ligne.compte
-        if compte.pk not in comptes_groupes:
-            comptes_groupes[compte.pk] = {
-                'compte': compte,
-                'lignes': [],
-                'total_debit': Decimal('0'),
-                'total_credit': Decimal('0'),
-            }
-        comptes_groupes[compte.pk]['lignes'].append(ligne)
-        comptes_groupes[compte.pk]['total_debit'] += ligne.montant_debit or Decimal('0')
-        comptes_groupes[compte.pk]['total_credit'] += ligne.montant_credit or Decimal('0')
-    
-    return comptes_groupes, entreprise, date_debut, date_fin
-
-
 @reauth_required
 @login_required
 @compta_required
 def grand_livre_excel(request):
-    """Export Excel du Grand Livre"""
-    import openpyxl
-    from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-    from openpyxl.utils import get_column_letter
-    
-    comptes_groupes, entreprise, date_debut, date_fin = _get_grand_livre_data(request)
+    """Export Excel du Grand Livre (lignes lues par pages, classeur en écriture seule)"""
+    from core.excel_utils import ClasseurExcel
     
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Grand Livre"
+    entreprise = request.user.entreprise
+    compte_id, date_debut, date_fin = _filtres_grand_livre(request)
     
-    # Styles
-    header_font = Font(bold=True, size=14)
-    title_font = Font(bold=True, size=11)
-    header_fill = PatternFill(start_color="FFD699", end_color="FFD699", fill_type="solid")
-    total_fill = PatternFill(start_color="E8E8E8", end_color="E8E8E8", fill_type="solid")
-    thin_border = Border(
-        left=Side(style='thin'), right=Side(style='thin'),
-        top=Side(style='thin'), bottom=Side(style='thin')
-    )
+    classeur = ClasseurExcel(couleur_entete='EF7707', couleur_total='E8E8E8')
+    ws = classeur.feuille("Grand Livre", largeurs=[12, 10, 16, 40, 15, 15, 16])
     
     # En-tête
-    ws.merge_cells('A1:F1')
-    ws['A1'] = entreprise.nom_entreprise
-    ws['A1'].font = header_font
-    ws['A1'].alignment = Alignment(horizontal='center')
-    
-    ws.merge_cells('A2:F2')
-    periode = f"GRAND LIVRE - Du {date_debut or '--'} au {date_fin or '--'}"
-    ws['A2'] = periode
-    ws['A2'].alignment = Alignment(horizontal='center')
-    
-    row = 4
-    for groupe in comptes_groupes.values():
-        compte = groupe['compte']
+    ws.ligne([entreprise.nom_entreprise], style='titre')
+    ws.ligne([f"GRAND LIVRE - Du {date_debut or '--'} au {date_fin or '--'}"], style='sous_titre')
+    ws.vide()
+    
+    headers = ['Date', 'Journal', 'N° Pièce', 'Libellé', 'Débit', 'Crédit', 'Solde']
+    compte_courant = None
+    for ligne in parcourir_grand_livre(entreprise, compte_id, date_debut, date_fin):
+        if ligne['compte_id'] != compte_courant:
+            compte_courant = ligne['compte_id']
+            total_debit = total_credit = Decimal('0')
+            ws.ligne([f"{ligne['numero_compte']} - {ligne['intitule']}"], style='section')
+            ws.ligne(headers, style='entete')
+            report = ligne['solde'] - ligne['montant_debit'] + ligne['montant_credit']
+            if report:
+                ws.ligne([None, None, None, "Solde d'ouverture", None, None, report], style='gras')
         
-        # En-tête du compte
-        ws.merge_cells(f'A{row}:F{row}')
-        ws[f'A{row}'] = f"{compte.numero_compte} - {compte.intitule}"
-        ws[f'A{row}'].font = title_font
-        ws[f'A{row}'].fill = header_fill
-        row += 1
-        
-        # En-têtes colonnes
-        headers = ['Date', 'Journal', 'N° Pièce', 'Libellé', 'Débit', 'Crédit']
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=row, column=col, value=header)
-            cell.font = Font(bold=True)
-            cell.border = thin_border
-        row += 1
-        
-        # Lignes
-        for ligne in groupe['lignes']:
-            ws.cell(row=row, column=1, value=ligne.ecriture.date_ecriture.strftime('%d/%m/%Y')).border = thin_border
-            ws.cell(row=row, column=2, value=ligne.ecriture.journal.code).border = thin_border
-            ws.cell(row=row, column=3, value=ligne.ecriture.numero_ecriture).border = thin_border
-            ws.cell(row=row, column=4, value=ligne.libelle or ligne.ecriture.libelle).border = thin_border
-            cell_d = ws.cell(row=row, column=5, value=float(ligne.montant_debit) if ligne.montant_debit else None)
-            cell_d.border = thin_border
-            cell_d.number_format = '#,##0'
-            cell_c = ws.cell(row=row, column=6, value=float(ligne.montant_credit) if ligne.montant_credit else None)
-            cell_c.border = thin_border
-            cell_c.number_format = '#,##0'
-            row += 1
+        total_debit += ligne['montant_debit']
+        total_credit += ligne['montant_credit']
+        ws.ligne([
+            ligne['date'].strftime('%d/%m/%Y'),
+            ligne['journal'],
+            ligne['numero_ecriture'],
+            ligne['libelle'],
+            ligne['montant_debit'] or None,
+            ligne['montant_credit'] or None,
+            ligne['solde'],
+        ])
         
-        # Total compte
-        ws.merge_cells(f'A{row}:D{row}')
-        ws[f'A{row}'] = f"Total compte {compte.numero_compte}"
-        ws[f'A{row}'].font = Font(bold=True)
-        ws[f'A{row}'].fill = total_fill
-        ws[f'A{row}'].alignment = Alignment(horizontal='right')
-        cell_td = ws.cell(row=row, column=5, value=float(groupe['total_debit']))
-        cell_td.font = Font(bold=True)
-        cell_td.fill = total_fill
-        cell_td.number_format = '#,##0'
-        cell_tc = ws.cell(row=row, column=6, value=float(groupe['total_credit']))
-        cell_tc.font = Font(bold=True)
-        cell_tc.fill = total_fill
-        cell_tc.number_format = '#,##0'
-        row += 2
-    
-    # Ajuster largeurs colonnes
-    ws.column_dimensions['A'].width = 12
-    ws.column_dimensions['B'].width = 10
-    ws.column_dimensions['C'].width = 12
-    ws.column_dimensions['D'].width = 40
-    ws.column_dimensions['E'].width = 15
-    ws.column_dimensions['F'].width = 15
+        if ligne['fin_compte']:
+            ws.ligne([None, None, None, f"Total compte {ligne['numero_compte']}",
+                      total_debit, total_credit, ligne['solde']], style='total')
+            ws.vide()
     
-    # Réponse
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="grand_livre_{timezone.now().strftime("%Y%m%d")}.xlsx"'
-    wb.save(response)
-    return response
+    return classeur.reponse(f'grand_livre_{timezone.now().strftime("%Y%m%d")}.xlsx')
 
 
 @reauth_required
 @login_required
 @compta_required
 def grand_livre_pdf(request):
-    """Export PDF du Grand Livre"""
+    """Export PDF du Grand Livre (dessin ligne à ligne, lignes lues par pages)"""
+    import tempfile
     from reportlab.lib import colors
     from reportlab.lib.pagesizes import A4, landscape
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
     from reportlab.lib.units import cm
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.pdfgen import canvas
     
-    comptes_groupes, entreprise, date_debut, date_fin = _get_grand_livre_data(request)
-    
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), leftMargin=1*cm, rightMargin=1*cm, topMargin=1*cm, bottomMargin=1*cm)
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('Title', parent=styles['Heading1'], fontSize=16, alignment=1, spaceAfter=10)
-    subtitle_style = ParagraphStyle('Subtitle', parent=styles['Normal'], fontSize=10, alignment=1, spaceAfter=20)
-    compte_style = ParagraphStyle('Compte', parent=styles['Heading3'], fontSize=11, backColor=colors.HexColor('#FFD699'), spaceAfter=5)
-    
-    elements = []
-    
-    # En-tête
-    elements.append(Paragraph(entreprise.nom_entreprise, title_style))
-    periode = f"GRAND LIVRE COMPTABLE - Du {date_debut or '--/--/----'} au {date_fin or '--/--/----'}"
-    elements.append(Paragraph(periode, subtitle_style))
-    
-    for groupe in comptes_groupes.values():
-        compte = groupe['compte']
-        
-        # Titre du compte
-        elements.append(Paragraph(f"<b>{compte.numero_compte}</b> - {compte.intitule}", compte_style))
-        
-        # Table des lignes
-        data = [['Date', 'Journal', 'N° Pièce', 'Libellé', 'Débit', 'Crédit']]
-        for ligne in groupe['lignes']:
-            data.append([
-                ligne.ecriture.date_ecriture.strftime('%d/%m/%Y'),
-                ligne.ecriture.journal.code,
-                ligne.ecriture.numero_ecriture,
-                (ligne.libelle or ligne.ecriture.libelle)[:50],
-                f"{ligne.montant_debit:,.0f}" if ligne.montant_debit else '',
-                f"{ligne.montant_credit:,.0f}" if ligne.montant_credit else '',
-            ])
+    entreprise = request.user.entreprise
+    compte_id, date_debut, date_fin = _filtres_grand_livre(request)
+    
+    fichier = tempfile.TemporaryFile()
+    largeur, hauteur = landscape(A4)
+    p = canvas.Canvas(fichier, pagesize=(largeur, hauteur))
+    
+    marge = 1 * cm
+    hauteur_ligne = 0.5 * cm
+    colonnes = [2.5*cm, 2*cm, 3*cm, 9.5*cm, 3.5*cm, 3.5*cm, 3.5*cm]
+    positions = [marge]
+    for w in colonnes[:-1]:
+        positions.append(positions[-1] + w)
+    fin_tableau = positions[-1] + colonnes[-1]
+    headers = ['Date', 'Journal', 'N° Pièce', 'Libellé', 'Débit', 'Crédit', 'Solde']
+    etat = {'page': 0, 'y': 0}
+    
+    def fmt(valeur):
+        return f"{valeur:,.0f}" if valeur else ''
+    
+    def rangee(valeurs, fond=None, texte=colors.black, gras=False):
+        y = etat['y'] - hauteur_ligne
+        if fond is not None:
+            p.setFillColor(fond)
+            p.rect(marge, y, fin_tableau - marge, hauteur_ligne, stroke=0, fill=1)
+        p.setStrokeColor(colors.grey)
+        p.setLineWidth(0.5)
+        p.rect(marge, y, fin_tableau - marge, hauteur_ligne, stroke=1, fill=0)
+        p.setFillColor(texte)
+        p.setFont('Helvetica-Bold' if gras else 'Helvetica', 8)
+        for i, valeur in enumerate(valeurs):
+            if not valeur:
+                continue
+            if i >= 4:
+                p.drawRightString(positions[i] + colonnes[i] - 3, y + 4, valeur)
+            else:
+                p.drawString(positions[i] + 3, y + 4, valeur)
+        etat['y'] = y
+    
+    def titre_compte(ligne, suite=False):
+        y = etat['y'] - 0.7 * cm
+        p.setFillColor(colors.HexColor('#FFD699'))
+        p.rect(marge, y, fin_tableau - marge, 0.6 * cm, stroke=0, fill=1)
+        p.setFillColor(colors.black)
+        p.setFont('Helvetica-Bold', 10)
+        p.drawString(marge + 3, y + 5, f"{ligne['numero_compte']} - {ligne['intitule']}"
+                     + (' (suite)' if suite else ''))
+        etat['y'] = y
+        rangee(headers, fond=colors.HexColor('#EF7707'), texte=colors.white, gras=True)
+    
+    def nouvelle_page():
+        if etat['page']:
+            p.showPage()
+        etat['page'] += 1
+        y = hauteur - marge
+        if etat['page'] == 1:
+            p.setFont('Helvetica-Bold', 16)
+            p.drawCentredString(largeur / 2, y - 16, entreprise.nom_entreprise)
+            p.setFont('Helvetica', 10)
+            p.drawCentredString(largeur / 2, y - 34, "GRAND LIVRE COMPTABLE - Du {} au {}".format(
+                date_debut.strftime('%d/%m/%Y') if date_debut else '--/--/----',
+                date_fin.strftime('%d/%m/%Y') if date_fin else '--/--/----'))
+            y -= 1.6 * cm
+        p.setFont('Helvetica', 7)
+        p.setFillColor(colors.grey)
+        p.drawRightString(fin_tableau, marge / 2, f"Page {etat['page']}")
+        etat['y'] = y
+    
+    def place(hauteur_requise, ligne=None):
+        """Saute de page si la place manque ; répète le titre du compte en cours."""
+        if etat['y'] - hauteur_requise >= marge:
+            return
+        nouvelle_page()
+        if ligne is not None:
+            titre_compte(ligne, suite=True)
+    
+    nouvelle_page()
+    compte_courant = None
+    for ligne in parcourir_grand_livre(entreprise, compte_id, date_debut, date_fin):
+        if ligne['compte_id'] != compte_courant:
+            compte_courant = ligne['compte_id']
+            total_debit = total_credit = Decimal('0')
+            place(0.7 * cm + 3 * hauteur_ligne)
+            titre_compte(ligne)
+            report = ligne['solde'] - ligne['montant_debit'] + ligne['montant_credit']
+            if report:
+                rangee(['', '', '', "Solde d'ouverture", '', '', fmt(report)], gras=True)
         
-        # Ligne total
-        data.append([
-            '', '', '', f"Total compte {compte.numero_compte}",
-            f"{groupe['total_debit']:,.0f}",
-            f"{groupe['total_credit']:,.0f}"
+        place(hauteur_ligne, ligne)
+        total_debit += ligne['montant_debit']
+        total_credit += ligne['montant_credit']
+        rangee([
+            ligne['date'].strftime('%d/%m/%Y'),
+            ligne['journal'],
+            ligne['numero_ecriture'],
+            (ligne['libelle'] or '')[:55],
+            fmt(ligne['montant_debit']),
+            fmt(ligne['montant_credit']),
+            fmt(ligne['solde']),
         ])
         
-        table = Table(data, colWidths=[2.5*cm, 2*cm, 3*cm, 10*cm, 3.5*cm, 3.5*cm])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#EF7707')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 9),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('ALIGN', (4, 0), (5, -1), 'RIGHT'),
-            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#E8E8E8')),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
-        
-        elements.append(table)
-        elements.append(Spacer(1, 0.5*cm))
-    
-    doc.build(elements)
-    buffer.seek(0)
-    
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="grand_livre_{timezone.now().strftime("%Y%m%d")}.pdf"'
-    return response
+        if ligne['fin_compte']:
+            place(hauteur_ligne, ligne)
+            rangee(['', '', '', f"Total compte {ligne['numero_compte']}",
+                    fmt(total_debit), fmt(total_credit), fmt(ligne['solde'])],
+                   fond=colors.HexColor('#E8E8E8'), gras=True)
+            etat['y'] -= 0.5 * cm
+    
+    p.save()
+    fichier.seek(0)
+    return FileResponse(
+        fichier, as_attachment=True,
+        filename=f'grand_livre_{timezone.now().strftime("%Y%m%d")}.pdf',
+        content_type='application/pdf',
+    )
 
 
 @reauth_required
@@ -1377,12 +1315,9 @@ def balance(request):
     """Balance générale"""
     entreprise = request.user.entreprise
     
-    comptes = PlanComptable.objects.filter(
+    comptes = comptes_avec_totaux(PlanComptable.objects.filter(
         entreprise=entreprise, est_actif=True
-    ).annotate(
-        total_debit=Sum('lignes_ecritures__montant_debit'),
-        total_credit=Sum('lignes_ecritures__montant_credit')
-    ).order_by('numero_compte')
+    ).order_by('numero_compte'))
     
     # Calculer les totaux
     total_debit = Decimal('0')
@@ -1415,12 +1350,9 @@ def _get_balance_data(request):
     """Helper pour récupérer les données de la balance"""
     entreprise = request.user.entreprise
     
-    comptes = PlanComptable.objects.filter(
+    comptes = comptes_avec_totaux(PlanComptable.objects.filter(
         entreprise=entreprise, est_actif=True
-    ).annotate(
-        total_debit=Sum('lignes_ecritures__montant_debit'),
-        total_credit=Sum('lignes_ecritures__montant_credit')
-    ).order_by('numero_compte')
+    ).order_by('numero_compte'))
     
     total_debit = Decimal('0')
     total_credit = Decimal('0')
@@ -1455,85 +1387,31 @@ def _get_balance_data(request):
 @compta_required
 def balance_excel(request):
     """Export Excel de la Balance"""
-    import openpyxl
-    from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+    from core.excel_utils import ClasseurExcel
     
     comptes, entreprise, total_debit, total_credit, total_solde_debit, total_solde_credit = _get_balance_data(request)
     
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Balance"
-    
-    header_font = Font(bold=True, size=14)
-    header_fill = PatternFill(start_color="FFD699", end_color="FFD699", fill_type="solid")
-    total_fill = PatternFill(start_color="FFD699", end_color="FFD699", fill_type="solid")
-    thin_border = Border(
-        left=Side(style='thin'), right=Side(style='thin'),
-        top=Side(style='thin'), bottom=Side(style='thin')
-    )
+    classeur = ClasseurExcel(couleur_entete='EF7707', couleur_total='FFD699')
+    ws = classeur.feuille("Balance", largeurs=[12, 40, 15, 15, 15, 15])
     
     # En-tête
-    ws.merge_cells('A1:F1')
-    ws['A1'] = entreprise.nom_entreprise
-    ws['A1'].font = header_font
-    ws['A1'].alignment = Alignment(horizontal='center')
+    ws.ligne([entreprise.nom_entreprise], style='titre_centre')
+    ws.fusionner(1, 6)
+    ws.ligne([f"BALANCE GÉNÉRALE - Arrêtée au {timezone.now().strftime('%d/%m/%Y')}"], style='sous_titre_centre')
+    ws.fusionner(1, 6)
+    ws.vide()
     
-    ws.merge_cells('A2:F2')
-    ws['A2'] = f"BALANCE GÉNÉRALE - Arrêtée au {timezone.now().strftime('%d/%m/%Y')}"
-    ws['A2'].alignment = Alignment(horizontal='center')
-    
-    # En-têtes colonnes
-    headers = ['N° Compte', 'Intitulé', 'Mvt Débit', 'Mvt Crédit', 'Solde Débit', 'Solde Crédit']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=4, column=col, value=header)
-        cell.font = Font(bold=True)
-        cell.fill = header_fill
-        cell.border = thin_border
-    
-    # Données
-    row = 5
+    ws.ligne(['N° Compte', 'Intitulé', 'Mvt Débit', 'Mvt Crédit', 'Solde Débit', 'Solde Crédit'], style='entete')
     for c in comptes:
-        ws.cell(row=row, column=1, value=c['numero']).border = thin_border
-        ws.cell(row=row, column=2, value=c['intitule']).border = thin_border
-        cell_md = ws.cell(row=row, column=3, value=float(c['mvt_debit']))
-        cell_md.border = thin_border
-        cell_md.number_format = '#,##0'
-        cell_mc = ws.cell(row=row, column=4, value=float(c['mvt_credit']))
-        cell_mc.border = thin_border
-        cell_mc.number_format = '#,##0'
-        cell_sd = ws.cell(row=row, column=5, value=float(c['solde_debit']) if c['solde_debit'] else None)
-        cell_sd.border = thin_border
-        cell_sd.number_format = '#,##0'
-        cell_sc = ws.cell(row=row, column=6, value=float(c['solde_credit']) if c['solde_credit'] else None)
-        cell_sc.border = thin_border
-        cell_sc.number_format = '#,##0'
-        row += 1
+        ws.ligne([
+            c['numero'], c['intitule'], c['mvt_debit'], c['mvt_credit'],
+            c['solde_debit'] or None, c['solde_credit'] or None,
+        ])
     
     # Totaux
-    ws.cell(row=row, column=1, value='').border = thin_border
-    ws.cell(row=row, column=2, value='TOTAUX').border = thin_border
-    ws[f'B{row}'].font = Font(bold=True)
-    ws[f'B{row}'].fill = total_fill
-    for col in range(1, 7):
-        ws.cell(row=row, column=col).fill = total_fill
-        ws.cell(row=row, column=col).font = Font(bold=True)
-    ws.cell(row=row, column=3, value=float(total_debit)).number_format = '#,##0'
-    ws.cell(row=row, column=4, value=float(total_credit)).number_format = '#,##0'
-    ws.cell(row=row, column=5, value=float(total_solde_debit)).number_format = '#,##0'
-    ws.cell(row=row, column=6, value=float(total_solde_credit)).number_format = '#,##0'
-    
-    # Largeurs colonnes
-    ws.column_dimensions['A'].width = 12
-    ws.column_dimensions['B'].width = 40
-    ws.column_dimensions['C'].width = 15
-    ws.column_dimensions['D'].width = 15
-    ws.column_dimensions['E'].width = 15
-    ws.column_dimensions['F'].width = 15
+    ws.ligne(['', 'TOTAUX', total_debit, total_credit, total_solde_debit, total_solde_credit], style='total')
     
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="balance_{timezone.now().strftime("%Y%m%d")}.xlsx"'
-    wb.save(response)
-    return response
+    return classeur.reponse(f'balance_{timezone.now().strftime("%Y%m%d")}.xlsx')
 
 
 @reauth_required
@@ -1630,12 +1508,16 @@ def journal_general(request):
         ecritures = ecritures.filter(date_ecriture__lte=date_fin)
     
     ecritures = ecritures.order_by('date_ecriture', 'numero_ecriture')
+    totaux = ecritures.aggregate(nombre=Count('pk'), debit=Sum('total_debit'), credit=Sum('total_credit'))
     
     journaux = Journal.objects.filter(entreprise=entreprise, est_actif=True)
     
     context = {
         'ecritures': ecritures,
         'journaux': journaux,
+        'total_ecritures': totaux['nombre'],
+        'total_debit': totaux['debit'] or 0,
+        'total_credit': totaux['credit'] or 0,
     }
     return render(request, 'comptabilite/etats/journal_general.html', context)
 
@@ -1649,18 +1531,16 @@ def bilan(request):
     
     exercice = ExerciceComptable.objects.filter(entreprise=entreprise, est_courant=True).first()
     
+    # Classes 1 à 5 lues en une fois, regroupées par classe
+    comptes_bilan = comptes_par_groupe(PlanComptable.objects.filter(
+        entreprise=entreprise,
+        classe__in=['1', '2', '3', '4', '5'],
+        est_actif=True
+    ), 'classe')
+    
     def get_comptes_avec_solde(classes):
-        comptes = PlanComptable.objects.filter(
-            entreprise=entreprise,
-            classe__in=classes,
-            est_actif=True
-        ).annotate(
-            total_debit=Sum('lignes_ecritures__montant_debit'),
-            total_credit=Sum('lignes_ecritures__montant_credit')
-        ).order_by('numero_compte')
-        
         result = []
-        for c in comptes:
+        for c in (c for classe in classes for c in comptes_bilan.get(classe, ())):
             d = c.total_debit or Decimal('0')
             cr = c.total_credit or Decimal('0')
             solde = d - cr if d > cr else cr - d
@@ -1674,10 +1554,7 @@ def bilan(request):
     # Actif circulant (classes 3, 4 débiteur, 5)
     actif_circulant = get_comptes_avec_solde(['3', '5'])
     # Ajouter comptes classe 4 débiteurs
-    comptes_4 = PlanComptable.objects.filter(entreprise=entreprise, classe='4', est_actif=True).annotate(
-        total_debit=Sum('lignes_ecritures__montant_debit'),
-        total_credit=Sum('lignes_ecritures__montant_credit')
-    )
+    comptes_4 = comptes_bilan.get('4', [])
     for c in comptes_4:
         d = c.total_debit or Decimal('0')
         cr = c.total_credit or Decimal('0')
@@ -1722,18 +1599,16 @@ def compte_resultat(request):
     entreprise = request.user.entreprise
     exercice = ExerciceComptable.objects.filter(entreprise=entreprise, est_courant=True).first()
     
-    def get_comptes_classe(classe_prefix):
-        comptes = PlanComptable.objects.filter(
-            entreprise=entreprise,
-            numero_compte__startswith=classe_prefix,
-            est_actif=True
-        ).annotate(
-            total_debit=Sum('lignes_ecritures__montant_debit'),
-            total_credit=Sum('lignes_ecritures__montant_credit')
-        ).order_by('numero_compte')
-        
+    # Classes 6 et 7 lues en une fois, regroupées par sous-classe (60, 61…)
+    comptes_gestion = comptes_par_groupe(PlanComptable.objects.filter(
+        entreprise=entreprise,
+        classe__in=['6', '7'],
+        est_actif=True
+    ), 'sous_classe')
+    
+    def get_comptes_classe(*sous_classes):
         result = []
-        for c in comptes:
+        for c in (c for sc in sous_classes for c in comptes_gestion.get(sc, ())):
             d = c.total_debit or Decimal('0')
             cr = c.total_credit or Decimal('0')
             solde = d - cr if d > cr else cr - d
@@ -1742,16 +1617,16 @@ def compte_resultat(request):
         return result
     
     # Charges d'exploitation (60-65)
-    charges_exploitation = get_comptes_classe('60') + get_comptes_classe('61') + get_comptes_classe('62') + get_comptes_classe('63') + get_comptes_classe('64') + get_comptes_classe('65')
+    charges_exploitation = get_comptes_classe('60', '61', '62', '63', '64', '65')
     
     # Charges financières (66-67)
-    charges_financieres = get_comptes_classe('66') + get_comptes_classe('67')
+    charges_financieres = get_comptes_classe('66', '67')
     
     # Produits d'exploitation (70-75)
-    produits_exploitation = get_comptes_classe('70') + get_comptes_classe('71') + get_comptes_classe('72') + get_comptes_classe('73') + get_comptes_classe('74') + get_comptes_classe('75')
+    produits_exploitation = get_comptes_classe('70', '71', '72', '73', '74', '75')
     
     # Produits financiers (76-77)
-    produits_financiers = get_comptes_classe('76') + get_comptes_classe('77')
+    produits_financiers = get_comptes_classe('76', '77')
     
     # Totaux
     total_charges = sum(c['solde'] for c in charges_exploitation) + sum(c['solde'] for c in charges_financieres)
@@ -1928,16 +1803,13 @@ def _get_bilan_data(request):
     entreprise = request.user.entreprise
     exercice = ExerciceComptable.objects.filter(entreprise=entreprise, est_courant=True).first()
     
+    comptes_bilan = comptes_par_groupe(PlanComptable.objects.filter(
+        entreprise=entreprise, classe__in=['1', '2', '3', '4', '5'], est_actif=True
+    ), 'classe')
+    
     def get_comptes_avec_solde(classes):
-        comptes = PlanComptable.objects.filter(
-            entreprise=entreprise, classe__in=classes, est_actif=True
-        ).annotate(
-            total_debit=Sum('lignes_ecritures__montant_debit'),
-            total_credit=Sum('lignes_ecritures__montant_credit')
-        ).order_by('numero_compte')
-        
         result = []
-        for c in comptes:
+        for c in (c for classe in classes for c in comptes_bilan.get(classe, ())):
             d = c.total_debit or Decimal('0')
             cr = c.total_credit or Decimal('0')
             solde = d - cr if d > cr else cr - d
@@ -1948,10 +1820,7 @@ def _get_bilan_data(request):
     actif_immobilise = get_comptes_avec_solde(['2'])
     actif_circulant = get_comptes_avec_solde(['3', '5'])
     
-    comptes_4 = PlanComptable.objects.filter(entreprise=entreprise, classe='4', est_actif=True).annotate(
-        total_debit=Sum('lignes_ecritures__montant_debit'),
-        total_credit=Sum('lignes_ecritures__montant_credit')
-    )
+    comptes_4 = comptes_bilan.get('4', [])
     for c in comptes_4:
         d = c.total_debit or Decimal('0')
         cr = c.total_credit or Decimal('0')
@@ -2176,16 +2045,13 @@ def _get_compte_resultat_data(request):
     entreprise = request.user.entreprise
     exercice = ExerciceComptable.objects.filter(entreprise=entreprise, est_courant=True).first()
     
-    def get_comptes_classe(classe_prefix):
-        comptes = PlanComptable.objects.filter(
-            entreprise=entreprise, numero_compte__startswith=classe_prefix, est_actif=True
-        ).annotate(
-            total_debit=Sum('lignes_ecritures__montant_debit'),
-            total_credit=Sum('lignes_ecritures__montant_credit')
-        ).order_by('numero_compte')
-        
+    comptes_gestion = comptes_par_groupe(PlanComptable.objects.filter(
+        entreprise=entreprise, classe__in=['6', '7'], est_actif=True
+    ), 'sous_classe')
+    
+    def get_comptes_classe(*sous_classes):
         result = []
-        for c in comptes:
+        for c in (c for sc in sous_classes for c in comptes_gestion.get(sc, ())):
             d = c.total_debit or Decimal('0')
             cr = c.total_credit or Decimal('0')
             solde = d - cr if d > cr else cr - d
@@ -2193,10 +2059,10 @@ def _get_compte_resultat_data(request):
                 result.append({'numero_compte': c.numero_compte, 'intitule': c.intitule, 'solde': solde})
         return result
     
-    charges_exploitation = get_comptes_classe('60') + get_comptes_classe('61') + get_comptes_classe('62') + get_comptes_classe('63') + get_comptes_classe('64') + get_comptes_classe('65')
-    charges_financieres = get_comptes_classe('66') + get_comptes_classe('67')
-    produits_exploitation = get_comptes_classe('70') + get_comptes_classe('71') + get_comptes_classe('72') + get_comptes_classe('73') + get_comptes_classe('74') + get_comptes_classe('75')
-    produits_financiers = get_comptes_classe('76') + get_comptes_classe('77')
+    charges_exploitation = get_comptes_classe('60', '61', '62', '63', '64', '65')
+    charges_financieres = get_comptes_classe('66', '67')
+    produits_exploitation = get_comptes_classe('70', '71', '72', '73', '74', '75')
+    produits_financiers = get_comptes_classe('76', '77')
     
     total_charges = sum(c['solde'] for c in charges_exploitation) + sum(c['solde'] for c in charges_financieres)
     total_produits = sum(c['solde'] for c in produits_exploitation) + sum(c['solde'] for c in produits_financiers)
@@ -2617,63 +2483,39 @@ def compte_fournisseur_detail(request, pk):
     return render(request, 'comptabilite/clients_fournisseurs/compte_fournisseur_detail.html', context)
 
 
+# Factures détaillées par tranche sur les pages de vieillissement / impayés
+LIMITE_DETAIL_VIEILLISSEMENT = 100
+IMPAYES_PAR_PAGE = 50
+
+
+def _contexte_vieillissement(entreprise, types):
+    """Tranches (totaux en une requête, factures les plus anciennes), encours par tiers et tendance."""
+    from .vieillissement import (
+        TRANCHES, factures_de_tranche, tendance_vieillissement, vieillissement, vieillissement_par_tiers,
+    )
+    today = timezone.now().date()
+    tranches, total = vieillissement(entreprise, types, today)
+    for cle, tranche in tranches.items():
+        tranche['factures'] = (factures_de_tranche(entreprise, types, cle, today, LIMITE_DETAIL_VIEILLISSEMENT)
+                               if tranche['nombre'] else [])
+    return {
+        'tranches': tranches,
+        'libelles_tranches': [label for _, label, *_ in TRANCHES],
+        'par_tiers': vieillissement_par_tiers(entreprise, types, today),
+        'tendance': tendance_vieillissement(entreprise, types),
+        'limite_detail': LIMITE_DETAIL_VIEILLISSEMENT,
+        'today': today,
+    }, total
+
+
 @reauth_required
 @login_required
 @compta_required
 def vieillissement_creances(request):
     """Analyse du vieillissement des créances clients"""
-    entreprise = request.user.entreprise
-    today = timezone.now().date()
-    
-    # Récupérer les factures clients non totalement payées
-    factures = Facture.objects.filter(
-        entreprise=entreprise,
-        type_facture='vente',
-        statut='validee'
-    ).exclude(
-        montant_paye__gte=F('montant_ttc')
-    ).select_related('tiers').order_by('tiers__raison_sociale', 'date_echeance')
-    
-    # Classifier par tranche d'âge
-    tranches = {
-        'non_echu': {'label': 'Non échu', 'factures': [], 'total': Decimal('0')},
-        '0_30': {'label': '0-30 jours', 'factures': [], 'total': Decimal('0')},
-        '31_60': {'label': '31-60 jours', 'factures': [], 'total': Decimal('0')},
-        '61_90': {'label': '61-90 jours', 'factures': [], 'total': Decimal('0')},
-        'plus_90': {'label': '> 90 jours', 'factures': [], 'total': Decimal('0')},
-    }
-    
-    for facture in factures:
-        reste = facture.montant_ttc - facture.montant_paye
-        date_ref = facture.date_echeance or facture.date_facture
-        jours_retard = (today - date_ref).days
-        
-        facture.reste_a_payer = reste
-        facture.jours_retard = jours_retard
-        
-        if jours_retard <= 0:
-            tranches['non_echu']['factures'].append(facture)
-            tranches['non_echu']['total'] += reste
-        elif jours_retard <= 30:
-            tranches['0_30']['factures'].append(facture)
-            tranches['0_30']['total'] += reste
-        elif jours_retard <= 60:
-            tranches['31_60']['factures'].append(facture)
-            tranches['31_60']['total'] += reste
-        elif jours_retard <= 90:
-            tranches['61_90']['factures'].append(facture)
-            tranches['61_90']['total'] += reste
-        else:
-            tranches['plus_90']['factures'].append(facture)
-            tranches['plus_90']['total'] += reste
-    
-    total_creances = sum(t['total'] for t in tranches.values())
-    
-    context = {
-        'tranches': tranches,
-        'total_creances': total_creances,
-        'today': today,
-    }
+    from .vieillissement import TYPES_CREANCES
+    context, total = _contexte_vieillissement(request.user.entreprise, TYPES_CREANCES)
+    context['total_creances'] = total
     return render(request, 'comptabilite/clients_fournisseurs/vieillissement_creances.html', context)
 
 
@@ -2682,57 +2524,30 @@ def vieillissement_creances(request):
 @compta_required
 def vieillissement_dettes(request):
     """Analyse du vieillissement des dettes fournisseurs"""
-    entreprise = request.user.entreprise
+    from .vieillissement import TYPES_DETTES
+    context, total = _contexte_vieillissement(request.user.entreprise, TYPES_DETTES)
+    context['total_dettes'] = total
+    return render(request, 'comptabilite/clients_fournisseurs/vieillissement_dettes.html', context)
+
+
+def _contexte_impayes(request, types):
+    """Factures non soldées paginées ; total et nombre agrégés en base."""
+    from .vieillissement import factures_ouvertes
     today = timezone.now().date()
-    
-    factures = Facture.objects.filter(
-        entreprise=entreprise,
-        type_facture='achat',
-        statut='validee'
-    ).exclude(
-        montant_paye__gte=F('montant_ttc')
-    ).select_related('tiers').order_by('tiers__raison_sociale', 'date_echeance')
-    
-    tranches = {
-        'non_echu': {'label': 'Non échu', 'factures': [], 'total': Decimal('0')},
-        '0_30': {'label': '0-30 jours', 'factures': [], 'total': Decimal('0')},
-        '31_60': {'label': '31-60 jours', 'factures': [], 'total': Decimal('0')},
-        '61_90': {'label': '61-90 jours', 'factures': [], 'total': Decimal('0')},
-        'plus_90': {'label': '> 90 jours', 'factures': [], 'total': Decimal('0')},
-    }
-    
-    for facture in factures:
-        reste = facture.montant_ttc - facture.montant_paye
-        date_ref = facture.date_echeance or facture.date_facture
-        jours_retard = (today - date_ref).days
-        
-        facture.reste_a_payer = reste
-        facture.jours_retard = jours_retard
-        
-        if jours_retard <= 0:
-            tranches['non_echu']['factures'].append(facture)
-            tranches['non_echu']['total'] += reste
-        elif jours_retard <= 30:
-            tranches['0_30']['factures'].append(facture)
-            tranches['0_30']['total'] += reste
-        elif jours_retard <= 60:
-            tranches['31_60']['factures'].append(facture)
-            tranches['31_60']['total'] += reste
-        elif jours_retard <= 90:
-            tranches['61_90']['factures'].append(facture)
-            tranches['61_90']['total'] += reste
-        else:
-            tranches['plus_90']['factures'].append(facture)
-            tranches['plus_90']['total'] += reste
-    
-    total_dettes = sum(t['total'] for t in tranches.values())
-    
-    context = {
-        'tranches': tranches,
-        'total_dettes': total_dettes,
+    factures = factures_ouvertes(request.user.entreprise, types).select_related('tiers')
+    totaux = factures.aggregate(total=Sum('reste_du'), nombre=Count('pk'))
+    page = Paginator(factures.order_by('-date_facture', 'numero'), IMPAYES_PAR_PAGE).get_page(
+        request.GET.get('page', 1))
+    for facture in page:
+        facture.reste_a_payer_calc = facture.reste_du
+        facture.jours_retard = (today - facture.date_reference).days
+        facture.est_en_retard = facture.jours_retard > 0
+    return {
+        'factures': page,
+        'total_impayes': totaux['total'] or Decimal('0'),
+        'nb_impayes': totaux['nombre'],
         'today': today,
     }
-    return render(request, 'comptabilite/clients_fournisseurs/vieillissement_dettes.html', context)
 
 
 @reauth_required
@@ -2740,32 +2555,8 @@ def vieillissement_dettes(request):
 @compta_required
 def impayes_clients(request):
     """Liste des factures clients impayées"""
-    entreprise = request.user.entreprise
-    today = timezone.now().date()
-    
-    factures = Facture.objects.filter(
-        entreprise=entreprise,
-        type_facture='vente',
-        statut='validee'
-    ).exclude(
-        montant_paye__gte=F('montant_ttc')
-    ).select_related('tiers').order_by('-date_facture')
-    
-    for facture in factures:
-        facture.reste_a_payer_calc = facture.montant_ttc - facture.montant_paye
-        date_ref = facture.date_echeance or facture.date_facture
-        facture.jours_retard = (today - date_ref).days
-        facture.est_en_retard = facture.jours_retard > 0
-    
-    total_impayes = sum(f.reste_a_payer_calc for f in factures)
-    nb_impayes = factures.count()
-    
-    context = {
-        'factures': factures,
-        'total_impayes': total_impayes,
-        'nb_impayes': nb_impayes,
-        'today': today,
-    }
+    from .vieillissement import TYPES_CREANCES
+    context = _contexte_impayes(request, TYPES_CREANCES)
     return render(request, 'comptabilite/clients_fournisseurs/impayes_clients.html', context)
 
 
@@ -2774,30 +2565,6 @@ def impayes_clients(request):
 @compta_required
 def impayes_fournisseurs(request):
     """Liste des factures fournisseurs impayées"""
-    entreprise = request.user.entreprise
-    today = timezone.now().date()
-    
-    factures = Facture.objects.filter(
-        entreprise=entreprise,
-        type_facture='achat',
-        statut='validee'
-    ).exclude(
-        montant_paye__gte=F('montant_ttc')
-    ).select_related('tiers').order_by('-date_facture')
-    
-    for facture in factures:
-        facture.reste_a_payer_calc = facture.montant_ttc - facture.montant_paye
-        date_ref = facture.date_echeance or facture.date_facture
-        facture.jours_retard = (today - date_ref).days
-        facture.est_en_retard = facture.jours_retard > 0
-    
-    total_impayes = sum(f.reste_a_payer_calc for f in factures)
-    nb_impayes = factures.count()
-    
-    context = {
-        'factures': factures,
-        'total_impayes': total_impayes,
-        'nb_impayes': nb_impayes,
-        'today': today,
-    }
+    from .vieillissement import TYPES_DETTES
+    context = _contexte_impayes(request, TYPES_DETTES)
     return render(request, 'comptabilite/clients_fournisseurs/impayes_fournisseurs.html', context)
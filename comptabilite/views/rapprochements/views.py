@@ -286,6 +286,35 @@ class LettrageView(ComptaAjaxView):
             return self.get_error_response(str(e))
 
 
+class LettrageAutomatiqueView(ComptaAjaxView):
+    """AJAX pour le lettrage automatique d'un rapprochement."""
+    
+    def post(self, request, rapprochement_id, *args, **kwargs):
+        """Apparie en masse les opérations non lettrées du compte."""
+        try:
+            rapprochement = get_object_or_404(
+                RapprochementBancaire, id=rapprochement_id,
+                compte_bancaire__entreprise=request.user.entreprise
+            )
+            tolerance_jours = int(request.POST.get('tolerance_jours') or 5)
+            tolerance_montant = Decimal(request.POST.get('tolerance_montant') or '0')
+            
+            service = RapprochementService(
+                request.user.entreprise,
+                request.user
+            )
+            resultat = service.rapprocher_automatiquement(
+                rapprochement, tolerance_jours, tolerance_montant
+            )
+            
+            return self.get_success_response(
+                _("Lettrage automatique terminé"), resultat
+            )
+            
+        except Exception as e:
+            return self.get_error_response(str(e))
+
+
 class LettrageAnnulationView(ComptaAjaxView):
     """AJAX pour annuler un lettrage."""
     
@@ -26,6 +26,8 @@ from .models import (
     PieceCaisse, BordereauRemise, LigneBordereau, Emprunt, ArreteCaisse,
     ChequeEmis, DeclarationPatente,
 )
+from .soldes import soldes_par_prefixe
+from .vieillissement import factures_ouvertes
 
 
 def compta_required(view_func):
@@ -89,11 +91,8 @@ def journal_par_type(request, type_journal):
     if date_fin:
         ecritures = ecritures.filter(date_ecriture__lte=date_fin)
 
-    total_debit = total_credit = ZERO
-    for e in ecritures:
-        for l in e.lignes.all():
-            total_debit += l.montant_debit or ZERO
-            total_credit += l.montant_credit or ZERO
+    totaux = ecritures.aggregate(d=Sum('total_debit'), c=Sum('total_credit'))
+    total_debit, total_credit = totaux['d'] or ZERO, totaux['c'] or ZERO
 
     export = exporter_etat(
         request, TYPES_JOURNAUX_LIBELLES[type_journal],
@@ -650,17 +649,9 @@ def emprunt_detail(request, pk):
 
 def _soldes_par_prefixe(entreprise, prefixes, date_debut=None, date_fin=None, sens='solde'):
     """Somme (débit − crédit) des lignes validées dont le compte commence
-    par l'un des préfixes. sens='debit'/'credit' pour un seul côté."""
-    q = Q()
-    for p in prefixes:
-        q |= Q(compte__numero_compte__startswith=p)
-    lignes = LigneEcriture.objects.filter(q, ecriture__entreprise=entreprise, ecriture__est_validee=True)
-    if date_debut:
-        lignes = lignes.filter(ecriture__date_ecriture__gte=date_debut)
-    if date_fin:
-        lignes = lignes.filter(ecriture__date_ecriture__lte=date_fin)
-    aggr = lignes.aggregate(d=Sum('montant_debit'), c=Sum('montant_credit'))
-    d, c = aggr['d'] or ZERO, aggr['c'] or ZERO
+    par l'un des préfixes. sens='debit'/'credit' pour un seul côté.
+    Lue dans les soldes mensuels matérialisés (comptabilite/soldes.py)."""
+    d, c = soldes_par_prefixe(entreprise, prefixes, date_debut, date_fin)
     if sens == 'debit':
         return d
     if sens == 'credit':
@@ -1064,29 +1055,20 @@ def echeancier_tiers(request, categorie):
     types = TYPES_VENTE if categorie == 'clients' else TYPES_ACHAT
     aujourd_hui = timezone.now().date()
 
-    factures = (Facture.objects
-                .filter(entreprise=entreprise, type_facture__in=types)
-                .exclude(statut__in=['brouillon', 'annulee', 'payee'])
+    # Sélection et totaux en base ; seules les factures affichées sont lues
+    factures = (factures_ouvertes(entreprise, types)
                 .select_related('tiers')
                 .order_by('date_echeance', 'date_facture'))
-    echues, a_venir, sans_echeance = [], [], []
-    total_echu = total_a_venir = ZERO
-    for f in factures:
-        reste = f.reste_a_payer
-        if reste <= 0:
-            continue
-        item = {'facture': f, 'reste': reste}
-        if f.date_echeance is None:
-            sans_echeance.append(item)
-            total_echu += reste
-        elif f.date_echeance < aujourd_hui:
-            item['retard'] = (aujourd_hui - f.date_echeance).days
-            echues.append(item)
-            total_echu += reste
-        else:
-            item['dans'] = (f.date_echeance - aujourd_hui).days
-            a_venir.append(item)
-            total_a_venir += reste
+    filtre_echu = Q(date_echeance__isnull=True) | Q(date_echeance__lt=aujourd_hui)
+    totaux = factures.aggregate(echu=Sum('reste_du', filter=filtre_echu),
+                                a_venir=Sum('reste_du', filter=Q(date_echeance__gte=aujourd_hui)))
+    total_echu, total_a_venir = totaux['echu'] or ZERO, totaux['a_venir'] or ZERO
+    echues = [{'facture': f, 'reste': f.reste_du, 'retard': (aujourd_hui - f.date_echeance).days}
+              for f in factures.filter(date_echeance__lt=aujourd_hui)]
+    sans_echeance = [{'facture': f, 'reste': f.reste_du}
+                     for f in factures.filter(date_echeance__isnull=True)]
+    a_venir = [{'facture': f, 'reste': f.reste_du, 'dans': (f.date_echeance - aujourd_hui).days}
+               for f in factures.filter(date_echeance__gte=aujourd_hui)]
 
     export = exporter_etat(
         request, f"Échéancier {'clients' if categorie == 'clients' else 'fournisseurs'}",
@@ -1130,8 +1112,7 @@ def journal_tva(request):
     entreprise = request.user.entreprise
     date_debut, date_fin = _periode(request)
     lignes = (LigneEcriture.objects
-              .filter(Q(compte__numero_compte__startswith='443') |
-                      Q(compte__numero_compte__startswith='445'),
+              .filter(PlanComptable.filtre_prefixes(['443', '445'], 'compte__'),
                       ecriture__entreprise=entreprise, ecriture__est_validee=True)
               .select_related('compte', 'ecriture', 'ecriture__journal')
               .order_by('ecriture__date_ecriture'))
@@ -1254,7 +1235,7 @@ def livre_amortissements(request):
 def _totaux_par_compte(entreprise, prefixe, date_debut='', date_fin=''):
     """Totaux (débit, crédit, solde) par compte commençant par `prefixe`."""
     lignes = (LigneEcriture.objects
-              .filter(compte__numero_compte__startswith=prefixe,
+              .filter(PlanComptable.filtre_prefixes([prefixe], 'compte__'),
                       ecriture__entreprise=entreprise, ecriture__est_validee=True))
     if date_debut:
         lignes = lignes.filter(ecriture__date_ecriture__gte=date_debut)
@@ -1790,13 +1771,17 @@ def _dotations_a_generer(entreprise, exercice):
     immobilisations = Immobilisation.objects.filter(
         entreprise=entreprise, est_actif=True,
         date_acquisition__lte=exercice.date_fin)
-    for immo in immobilisations:
-        if Amortissement.objects.filter(immobilisation=immo, exercice=exercice).exists():
+    amortissements = Amortissement.objects.filter(immobilisation__in=immobilisations)
+    deja_dotees = set(amortissements.filter(exercice=exercice).values_list('immobilisation_id', flat=True))
+    cumuls = dict(amortissements.order_by().values('immobilisation_id')
+                  .annotate(t=Sum('montant_amortissement'))
+                  .values_list('immobilisation_id', 't'))
+    for immo in immobilisations.select_related('compte_amortissement'):
+        if immo.pk in deja_dotees:
             continue
         if not immo.duree_vie_ans:
             continue
-        cumul = Amortissement.objects.filter(immobilisation=immo).aggregate(
-            t=Sum('montant_amortissement'))['t'] or ZERO
+        cumul = cumuls.get(immo.pk) or ZERO
         vnc = immo.valeur_acquisition - cumul
         if vnc <= 0:
             continue
@@ -1814,7 +1799,7 @@ def _dotations_a_generer(entreprise, exercice):
 def cloture_periode(request):
     """Écritures automatiques de fin de période : calcule et comptabilise
     les dotations aux amortissements de l'exercice (linéaire)."""
-    from .moteur_comptable import generer_ecriture, obtenir_compte, ErreurComptabilisation
+    from .moteur_comptable import generer_ecritures_en_masse, obtenir_compte
     entreprise = request.user.entreprise
     exercices = ExerciceComptable.objects.filter(entreprise=entreprise).order_by('-date_debut')
     exercice_id = request.GET.get('exercice') or request.POST.get('exercice')
@@ -1829,28 +1814,35 @@ def cloture_periode(request):
             return redirect('comptabilite:cloture_periode')
         compte_dotation = obtenir_compte(entreprise, '6811',
                                          'Dotations aux amortissements d\'exploitation')
-        nb = 0
-        total = ZERO
+        compte_amort_defaut = None
+        operations = []
         for p in propositions:
             immo = p['immo']
-            compte_amort = immo.compte_amortissement or obtenir_compte(
-                entreprise, '2841', 'Amortissements du matériel')
+            compte_amort = immo.compte_amortissement
+            if compte_amort is None:
+                compte_amort = compte_amort_defaut = compte_amort_defaut or obtenir_compte(
+                    entreprise, '2841', 'Amortissements du matériel')
             lib = f"Dotation {exercice.libelle} - {immo.numero} {immo.designation}"
-            try:
-                ecriture = generer_ecriture(
-                    entreprise, request.user, 'OD', exercice.date_fin, lib,
-                    [(compte_dotation, lib, p['dotation'], ZERO),
-                     (compte_amort, lib, ZERO, p['dotation'])],
-                    verifier_doublon=False)
-            except ErreurComptabilisation as exc:
-                messages.warning(request, f"{immo.numero} : {exc}")
-                continue
-            Amortissement.objects.create(
-                immobilisation=immo, exercice=exercice,
+            operations.append({
+                'type_journal': 'OD', 'date': exercice.date_fin, 'libelle': lib,
+                'lignes': [(compte_dotation, lib, p['dotation'], ZERO),
+                           (compte_amort, lib, ZERO, p['dotation'])],
+            })
+        rejets = []
+        ecritures = generer_ecritures_en_masse(entreprise, request.user, operations,
+                                               verifier_doublon=False, rejets=rejets)
+        for indice, erreur in rejets:
+            messages.warning(request, f"{propositions[indice]['immo'].numero} : {erreur}")
+        amortissements = [
+            Amortissement(
+                immobilisation=p['immo'], exercice=exercice,
                 taux_amortissement=p['taux'], montant_amortissement=p['dotation'],
                 montant_cumule=p['cumul'] + p['dotation'], ecriture=ecriture)
-            nb += 1
-            total += p['dotation']
+            for p, ecriture in zip(propositions, ecritures) if ecriture is not None
+        ]
+        Amortissement.objects.bulk_create(amortissements)
+        nb = len(amortissements)
+        total = sum((a.montant_amortissement for a in amortissements), ZERO)
         messages.success(request,
                          f"Clôture : {nb} dotation(s) comptabilisée(s) pour "
                          f"{total:,.0f} GNF (exercice {exercice.libelle}).")
@@ -1893,7 +1885,7 @@ def _controles_pre_cloture(entreprise, exercice):
         'ok': not desequilibres, 'bloquant': True,
         'detail': "Chaque journal doit être équilibré (débit = crédit)."})
     # 3. Comptes d'attente (47x) non soldés
-    attente = lignes.filter(compte__numero_compte__startswith='47').aggregate(
+    attente = lignes.filter(compte__sous_classe='47').aggregate(
         d=Sum('montant_debit'), c=Sum('montant_credit'))
     solde_attente = (attente['d'] or ZERO) - (attente['c'] or ZERO)
     controles.append({
@@ -1950,15 +1942,16 @@ def cloture_exercice(request):
                 lignes_soldes = (LigneEcriture.objects
                                  .filter(ecriture__entreprise=entreprise, ecriture__exercice=exercice,
                                          ecriture__est_validee=True)
-                                 .filter(Q(compte__numero_compte__startswith='6') |
-                                         Q(compte__numero_compte__startswith='7'))
+                                 .filter(compte__classe__in=['6', '7'])
                                  .values('compte').annotate(d=Sum('montant_debit'), c=Sum('montant_credit')))
+                lignes_soldes = list(lignes_soldes)
+                comptes = PlanComptable.objects.in_bulk([l['compte'] for l in lignes_soldes])
                 lignes_affectation = []
                 for l in lignes_soldes:
                     solde = (l['d'] or ZERO) - (l['c'] or ZERO)
                     if solde == 0:
                         continue
-                    compte = PlanComptable.objects.get(pk=l['compte'])
+                    compte = comptes[l['compte']]
                     if solde > 0:   # solde débiteur → on crédite pour solder
                         lignes_affectation.append((compte, 'Solde pour affectation du résultat', ZERO, solde))
                     else:           # solde créditeur → on débite pour solder
@@ -1990,16 +1983,16 @@ def cloture_exercice(request):
                 soldes_bilan = (LigneEcriture.objects
                                 .filter(ecriture__entreprise=entreprise, ecriture__est_validee=True,
                                         ecriture__date_ecriture__lte=exercice.date_fin)
-                                .exclude(Q(compte__numero_compte__startswith='6') |
-                                         Q(compte__numero_compte__startswith='7') |
-                                         Q(compte__numero_compte__startswith='8'))
+                                .exclude(compte__classe__in=['6', '7', '8'])
                                 .values('compte').annotate(d=Sum('montant_debit'), c=Sum('montant_credit')))
+                soldes_bilan = list(soldes_bilan)
+                comptes = PlanComptable.objects.in_bulk([l['compte'] for l in soldes_bilan])
                 lignes_an = []
                 for l in soldes_bilan:
                     solde = (l['d'] or ZERO) - (l['c'] or ZERO)
                     if solde == 0:
                         continue
-                    compte = PlanComptable.objects.get(pk=l['compte'])
+                    compte = comptes[l['compte']]
                     if solde > 0:
                         lignes_an.append((compte, 'À-nouveaux', solde, ZERO))
                     else:
@@ -5,3 +5,7 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
     verbose_name = 'Configuration système'
+
+    def ready(self):
+        """Importe les signaux (invalidation du contexte entreprise)."""
+        import core.signals  # noqa: F401
@@ -1,31 +1,31 @@
 from django.conf import settings
-from .models import Societe, Entreprise
+from django.utils.functional import SimpleLazyObject
+from .models import Societe
+from .services.contexte_entreprise import contexte_entreprise
 
 
 def company_info(request):
     """Ajoute les informations de la société au contexte"""
-    societe = None
-    try:
-        if request.user.is_authenticated and hasattr(request.user, 'entreprise') and request.user.entreprise:
-            societe = Societe.objects.filter(
-                entreprise=request.user.entreprise,
-                actif=True
-            ).first()
-    except Exception:
-        societe = None
-    
+    ctx = contexte_entreprise(request)
+
+    def societe_active():
+        if ctx is None:
+            return None
+        return Societe.objects.filter(entreprise_id=ctx.entreprise_id, actif=True).first()
+
     # Ajouter le logo de l'entreprise de l'utilisateur connecté
-    entreprise_logo = None
+    entreprise_logo_url = None
     entreprise_nom = None
-    
-    if request.user.is_authenticated and hasattr(request.user, 'entreprise'):
-        if request.user.entreprise:
-            entreprise_logo = request.user.entreprise.logo
-            entreprise_nom = request.user.entreprise.nom_entreprise
-    
+
+    if ctx is not None:
+        entreprise_logo_url = ctx.logo_url
+        entreprise_nom = ctx.nom_entreprise
+
     return {
         'COMPANY_NAME': settings.COMPANY_NAME,
-        'societe': societe,
-        'entreprise_logo': entreprise_logo,
+        # Requête seulement si un gabarit s'en sert
+        'societe': SimpleLazyObject(societe_active),
+        'entreprise_logo_url': entreprise_logo_url,
         'entreprise_nom': entreprise_nom,
+        'entreprise_ctx': ctx,
     }
@@ -0,0 +1,184 @@
+"""
+Moteur d'export Excel en écriture seule, partagé par la comptabilité et la paie.
+
+Le classeur openpyxl est ouvert en mode ``write_only`` : chaque ligne est
+sérialisée dès son ajout au lieu de garder une cellule stylée par valeur en
+mémoire. Les styles sont des styles nommés enregistrés une fois par classeur
+(une cellule ne porte que le nom de son style). Les largeurs de colonnes sont
+mesurées au fil des premières lignes, sans relire les données. Le fichier
+final est écrit dans un fichier temporaire servi par blocs.
+
+Usage :
+    classeur = ClasseurExcel(couleur_entete='1A5276')
+    feuille = classeur.feuille('Balance')
+    feuille.ligne(['BALANCE GÉNÉRALE'], style='titre')
+    feuille.ligne(['Compte', 'Intitulé', 'Solde'], style='entete')
+    for compte in comptes:
+        feuille.ligne([compte.numero_compte, compte.intitule, compte.solde])
+    return classeur.reponse('balance.xlsx')
+"""
+import tempfile
+from decimal import Decimal
+
+from django.http import FileResponse
+
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Lignes observées pour estimer les largeurs avant d'écrire la feuille
+LIGNES_MESUREES = 100
+LARGEUR_MAX = 45
+
+# Variante appliquée automatiquement aux valeurs numériques
+_NUMERIQUE = {'cellule': 'montant', 'total': 'total_montant', 'gras': 'gras_montant'}
+# Styles de texte libre, hors calcul des largeurs
+_NON_MESURES = {'titre', 'titre_centre', 'sous_titre', 'sous_titre_centre', 'section'}
+
+
+def _styles_nommes(couleur_entete, couleur_total):
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+
+    bordure = Border(*[Side(style='thin')] * 4)
+    fond_total = PatternFill(start_color=couleur_total, end_color=couleur_total, fill_type='solid')
+    centre = Alignment(horizontal='center')
+    definitions = {
+        'titre': dict(font=Font(bold=True, size=14)),
+        'titre_centre': dict(font=Font(bold=True, size=14), alignment=centre),
+        'sous_titre': dict(),
+        'sous_titre_centre': dict(alignment=centre),
+        'section': dict(font=Font(bold=True, size=11)),
+        'entete': dict(font=Font(bold=True, color='FFFFFF'), border=bordure,
+                       fill=PatternFill(start_color=couleur_entete, end_color=couleur_entete, fill_type='solid'),
+                       alignment=Alignment(horizontal='center', vertical='center', wrap_text=True)),
+        'cellule': dict(border=bordure),
+        'montant': dict(border=bordure, number_format='#,##0'),
+        'gras': dict(font=Font(bold=True)),
+        'gras_montant': dict(font=Font(bold=True), number_format='#,##0'),
+        'total': dict(font=Font(bold=True), border=bordure, fill=fond_total),
+        'total_montant': dict(font=Font(bold=True), border=bordure, fill=fond_total, number_format='#,##0'),
+    }
+    return {nom: NamedStyle(name=f'export_{nom}', **attributs) for nom, attributs in definitions.items()}
+
+
+class ClasseurExcel:
+    """Classeur en écriture seule muni des styles nommés de l'export."""
+
+    def __init__(self, couleur_entete='1A5276', couleur_total='D9E2F3'):
+        from openpyxl import Workbook
+
+        self._classeur = Workbook(write_only=True)
+        self.styles = {}
+        for nom, style in _styles_nommes(couleur_entete, couleur_total).items():
+            self._classeur.add_named_style(style)
+            self.styles[nom] = style.name
+        self._feuilles = []
+
+    def feuille(self, titre, largeurs=None):
+        """
+        Ajoute une feuille.
+
+        :param largeurs: largeurs fixes des colonnes (liste) ; sinon elles sont
+                         estimées sur les premières lignes écrites
+        """
+        feuille = FeuilleExcel(self, self._classeur.create_sheet(title=titre[:31] or 'Feuille'), largeurs)
+        self._feuilles.append(feuille)
+        return feuille
+
+    def enregistrer(self, fichier):
+        """Écrit le classeur dans un fichier ouvert en binaire."""
+        for feuille in self._feuilles:
+            feuille.vider_tampon()
+        self._classeur.save(fichier)
+
+    def reponse(self, nom_fichier):
+        """FileResponse servant le classeur depuis un fichier temporaire."""
+        fichier = tempfile.TemporaryFile()
+        self.enregistrer(fichier)
+        fichier.seek(0)
+        return FileResponse(fichier, as_attachment=True, filename=nom_fichier,
+                            content_type=CONTENT_TYPE_XLSX)
+
+
+class FeuilleExcel:
+    """Feuille en écriture seule : les lignes s'ajoutent dans l'ordre, sans retour arrière."""
+
+    def __init__(self, classeur, ws, largeurs=None):
+        self._classeur = classeur
+        self._ws = ws
+        self._tampon = []
+        self._nombre_lignes = 0
+        self._longueurs = {}
+        self._lignes_mesurees = 0
+        self._largeurs_fixees = False
+        if largeurs:
+            self._fixer_largeurs(dict(enumerate(largeurs, start=1)))
+
+    def ligne(self, valeurs=(), style='cellule', styles=None):
+        """
+        Ajoute une ligne.
+
+        :param style: style nommé de toutes les cellules (None : aucun) ; les valeurs
+                      numériques prennent la variante montant (format ``#,##0``)
+        :param styles: surcharges {index de colonne (0-based): style}
+        """
+        from openpyxl.cell import WriteOnlyCell
+
+        noms = self._classeur.styles
+        cellules = []
+        mesurer = not self._largeurs_fixees and style not in _NON_MESURES
+        for i, valeur in enumerate(valeurs):
+            if isinstance(valeur, Decimal):
+                valeur = float(valeur)
+            nom = styles.get(i, style) if styles else style
+            if nom is None:
+                cellules.append(valeur)
+            else:
+                if isinstance(valeur, (int, float)) and not isinstance(valeur, bool):
+                    nom = _NUMERIQUE.get(nom, nom)
+                cellule = WriteOnlyCell(self._ws, value=valeur)
+                cellule.style = noms[nom]
+                cellules.append(cellule)
+            if mesurer and valeur is not None:
+                longueur = len(f'{valeur:,.0f}' if isinstance(valeur, float) else str(valeur))
+                if longueur > self._longueurs.get(i + 1, 0):
+                    self._longueurs[i + 1] = longueur
+
+        self._nombre_lignes += 1
+        if self._largeurs_fixees:
+            self._ws.append(cellules)
+            return
+        self._tampon.append(cellules)
+        if mesurer and cellules:
+            self._lignes_mesurees += 1
+            if self._lignes_mesurees >= LIGNES_MESUREES:
+                self.vider_tampon()
+
+    def vide(self):
+        """Ligne vide."""
+        self.ligne([], style=None)
+
+    def fusionner(self, premiere_colonne, derniere_colonne, numero_ligne=None):
+        """Fusionne des colonnes (1-based) de la ligne donnée, par défaut la dernière ajoutée."""
+        from openpyxl.utils import get_column_letter
+        from openpyxl.worksheet.cell_range import CellRange
+
+        if numero_ligne is None:
+            numero_ligne = self._nombre_lignes
+        self._ws.merged_cells.add(CellRange(
+            f'{get_column_letter(premiere_colonne)}{numero_ligne}:'
+            f'{get_column_letter(derniere_colonne)}{numero_ligne}'))
+
+    def vider_tampon(self):
+        """Fige les largeurs mesurées et écrit les lignes en attente."""
+        if not self._largeurs_fixees:
+            self._fixer_largeurs({col: min(longueur + 4, LARGEUR_MAX)
+                                  for col, longueur in self._longueurs.items()})
+        for cellules in self._tampon:
+            self._ws.append(cellules)
+        self._tampon = []
+
+    def _fixer_largeurs(self, largeurs):
+        from openpyxl.utils import get_column_letter
+
+        for col, largeur in largeurs.items():
+            self._ws.column_dimensions[get_column_letter(col)].width = largeur
+        self._largeurs_fixees = True
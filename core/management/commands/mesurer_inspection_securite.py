@@ -0,0 +1,91 @@
+"""
+Mesure du coût de l'inspection SQL/XSS des requêtes.
+Usage: python manage.py mesurer_inspection_securite [--iterations N]
+
+Compare, sur des requêtes représentatives (saisie de paie en masse, JSON de
+simulation, liste filtrée), la paire SQLInjectionProtectionMiddleware +
+XSSProtectionMiddleware et RequestInspectionMiddleware.
+"""
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from core.middleware import (
+    RequestInspectionMiddleware, SQLInjectionProtectionMiddleware, XSSProtectionMiddleware,
+)
+
+
+def _reponse(request):
+    return HttpResponse()
+
+
+def _saisie_paie(factory, lignes):
+    """Formulaire de saisie des éléments variables : 4 champs par employé."""
+    data = {}
+    for i in range(lignes):
+        data[f'matricule_{i}'] = f'EMP{i:05d}'
+        data[f'heures_sup_{i}'] = '12.5'
+        data[f'prime_{i}'] = '250000'
+        data[f'commentaire_{i}'] = 'Prime de rendement du trimestre, validée par le chef de service'
+    return lambda: factory.post('/paie/saisie/', data)
+
+
+def _simulation_json(factory, lignes):
+    """Corps JSON d'une simulation de masse salariale."""
+    corps = json.dumps({
+        'periode': '2025-06',
+        'hypotheses': {'augmentation': '3.5', 'libelle': 'Revalorisation annuelle des salaires'},
+        'employes': [{'matricule': f'EMP{i:05d}', 'salaire_base': 3500000 + i,
+                      'poste': 'Agent administratif', 'service': 'Comptabilité et finances',
+                      'primes': [{'code': 'PRIME_TRANSPORT', 'montant': '150000'},
+                                 {'code': 'PRIME_LOGEMENT', 'montant': '300000'}]}
+                     for i in range(lignes)],
+    })
+    return lambda: factory.post('/paie/simulation/api/', corps, content_type='application/json')
+
+
+def _liste_filtree(factory):
+    return lambda: factory.get('/employes/', {'q': 'Camara', 'service': '12', 'statut': 'actif',
+                                              'tri': '-date_embauche', 'page': '3'})
+
+
+class Command(BaseCommand):
+    help = "Compare le coût de l'inspection SQL/XSS (paire de middlewares / passe unique)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Répétitions par scénario')
+        parser.add_argument('--lignes', type=int, default=2000, help='Employés par requête de masse')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        iterations = options['iterations']
+        lignes = options['lignes']
+        paire = SQLInjectionProtectionMiddleware(XSSProtectionMiddleware(_reponse))
+        unique = RequestInspectionMiddleware(_reponse)
+        unique.max_chars = sys.maxsize    # comparaison à périmètre égal : valeurs entières
+
+        scenarios = [
+            (f'Saisie de paie ({lignes * 4} champs)', _saisie_paie(factory, lignes)),
+            (f'Simulation JSON ({lignes} employés)', _simulation_json(factory, lignes)),
+            ('Liste filtrée (GET)', _liste_filtree(factory)),
+        ]
+        self.stdout.write(f"{'Scénario':<36}{'paire (ms)':>12}{'passe unique (ms)':>20}{'gain':>8}")
+        for libelle, fabriquer in scenarios:
+            durees = []
+            for middleware in (paire, unique):
+                total = 0.0
+                for _ in range(iterations):
+                    request = fabriquer()
+                    request.POST    # décodage du formulaire hors mesure : commun aux deux variantes
+                    debut = time.perf_counter()
+                    response = middleware(request)
+                    total += time.perf_counter() - debut
+                    if response.status_code != 200:
+                        self.stderr.write(f"{libelle} : requête rejetée ({response.status_code})")
+                durees.append(total / iterations * 1000)
+            gain = durees[0] / durees[1] if durees[1] else 0
+            self.stdout.write(f"{libelle:<36}{durees[0]:>12.2f}{durees[1]:>20.2f}{gain:>7.1f}x")
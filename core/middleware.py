@@ -3,6 +3,7 @@ Middleware de sécurité personnalisé pour l'application
 """
 import logging
 import json
+import time
 from django.http import HttpResponseForbidden
 from django.core.cache import cache
 from django.conf import settings
@@ -78,6 +79,7 @@ class SecurityHeadersMiddleware:
 class SQLInjectionProtectionMiddleware:
     """
     Protection contre les injections SQL
+    (remplacé dans MIDDLEWARE par RequestInspectionMiddleware)
     """
     # Patterns suspects d'injection SQL
     SQL_PATTERNS = [
@@ -133,6 +135,7 @@ class SQLInjectionProtectionMiddleware:
 class XSSProtectionMiddleware:
     """
     Protection contre les attaques XSS
+    (remplacé dans MIDDLEWARE par RequestInspectionMiddleware)
     """
     XSS_PATTERNS = [
         r"<script[^>]*>.*?</script>",
@@ -179,6 +182,74 @@ class XSSProtectionMiddleware:
         return False
 
 
+class RequestInspectionMiddleware:
+    """
+    Protection contre les injections SQL et le XSS en une seule passe.
+
+    Remplace la paire SQLInjectionProtectionMiddleware + XSSProtectionMiddleware
+    (mêmes motifs) : le corps JSON est décodé une seule fois. Chaque valeur
+    passe d'abord un préfiltre (mots-clés littéraux dont l'un au moins figure
+    dans toute chaîne reconnue par un motif) ; seules les valeurs retenues
+    sont confirmées par une expression unique, alternance de tous les motifs.
+    Seuls les SECURITY_INSPECTION_MAX_CHARS premiers caractères d'une valeur
+    sont examinés. La durée de l'inspection est exposée dans
+    ``request.inspection_securite`` (et l'en-tête Server-Timing en DEBUG).
+    """
+    PATTERN = re.compile(
+        '(?P<sql>' + '|'.join(SQLInjectionProtectionMiddleware.SQL_PATTERNS) + ')'
+        '|(?P<xss>' + '|'.join(XSSProtectionMiddleware.XSS_PATTERNS) + ')',
+        re.IGNORECASE,
+    )
+    # Comparé à la valeur passée par casefold(), comme re.IGNORECASE
+    PREFILTRE = re.compile('|'.join(re.escape(mot) for mot in (
+        'union', 'select', 'insert', 'delete', 'drop', 'update', '--', 'or', 'and', 'exec',
+        '<script', 'javascript:', 'onerror', 'onload', 'onclick', '<iframe', '<embed', '<object',
+    )))
+    LIBELLES = {'sql': "d'injection SQL", 'xss': 'XSS'}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.max_chars = getattr(settings, 'SECURITY_INSPECTION_MAX_CHARS', 20000)
+
+    def __call__(self, request):
+        # Fichiers statiques/media → pas de paramètres utilisateur, skip
+        if request.path.startswith(('/static/', '/media/', '/favicon')):
+            return self.get_response(request)
+
+        debut = time.perf_counter()
+        champs = 0
+        for source, valeurs in self._sources(request):
+            for key, value in valeurs:
+                if not isinstance(value, str):
+                    continue
+                champs += 1
+                value_inspectee = value[:self.max_chars]
+                if not self.PREFILTRE.search(value_inspectee.casefold()):
+                    continue
+                match = self.PATTERN.search(value_inspectee)
+                if match:
+                    libelle = self.LIBELLES[match.lastgroup]
+                    if source == 'GET':
+                        logger.warning(f"Tentative {libelle} détectée dans GET: {key}={value} depuis {request.META.get('REMOTE_ADDR')}")
+                    else:
+                        logger.warning(f"Tentative {libelle} détectée dans POST: {key} depuis {request.META.get('REMOTE_ADDR')}")
+                    return HttpResponseForbidden("Requête invalide détectée")
+
+        duree_ms = (time.perf_counter() - debut) * 1000
+        request.inspection_securite = {'champs': champs, 'duree_ms': duree_ms}
+        logger.debug(f"Inspection sécurité {request.path}: {champs} champs en {duree_ms:.2f} ms")
+
+        response = self.get_response(request)
+        if settings.DEBUG:
+            response['Server-Timing'] = f'inspection;dur={duree_ms:.2f}'
+        return response
+
+    def _sources(self, request):
+        yield 'GET', request.GET.items()
+        if request.method == 'POST':
+            yield 'POST', _iter_request_strings(request)
+
+
 class IPWhitelistMiddleware:
     """
     Middleware pour restreindre l'accès à certaines IPs (optionnel)
@@ -239,6 +310,21 @@ class RequestLoggingMiddleware:
         return response
 
 
+class EntrepriseContextMiddleware:
+    """
+    Résout une fois par requête le contexte entreprise de l'utilisateur
+    (plan, modules, quotas, échéance, licence) dans ``request.entreprise_ctx``.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path.startswith(('/static/', '/media/', '/favicon')):
+            from core.services.contexte_entreprise import contexte_entreprise
+            contexte_entreprise(request)
+        return self.get_response(request)
+
+
 class EntrepriseQuotaMiddleware:
     """
     Middleware pour vérifier les quotas d'abonnement et l'accès aux modules
@@ -280,25 +366,22 @@ class EntrepriseQuotaMiddleware:
         self.get_response = get_response
 
     def __call__(self, request):
-        if not request.user.is_authenticated or not hasattr(request.user, 'entreprise'):
-            return self.get_response(request)
-
-        entreprise = request.user.entreprise
-        if not entreprise:
+        from core.services.contexte_entreprise import contexte_entreprise
+        ctx = contexte_entreprise(request)
+        if ctx is None:
             return self.get_response(request)
 
         from django.shortcuts import redirect
         from django.contrib import messages
 
         # ── 1. Entreprise désactivée ──
-        if not entreprise.actif:
+        if not ctx.actif:
             messages.error(request, "Votre entreprise est désactivée. Contactez le support.")
             return redirect('core:login')
 
         # ── 2. Abonnement expiré ──
-        if entreprise.date_expiration:
-            from django.utils import timezone
-            if timezone.now().date() > entreprise.date_expiration:
+        if ctx.date_expiration:
+            if ctx.est_expire:
                 # Permettre l'accès aux pages de paiement uniquement
                 if not any(request.path.startswith(p) for p in ('/payments/', '/renouvellement/', '/static/', '/media/', '/core/login/')):
                     messages.warning(
@@ -311,8 +394,8 @@ class EntrepriseQuotaMiddleware:
         path = request.path
         for url_prefix, module_name in self.MODULE_URL_MAP.items():
             if path.startswith(url_prefix):
-                if not entreprise.has_module(module_name):
-                    plan = entreprise.plan_abonnement or 'gratuit'
+                if not ctx.has_module(module_name):
+                    plan = ctx.plan or 'gratuit'
                     messages.warning(
                         request,
                         f"Le module « {module_name.title()} » n'est pas inclus dans votre "
@@ -323,11 +406,12 @@ class EntrepriseQuotaMiddleware:
 
         # ── 4. Quota d'utilisateurs (lors de la création) ──
         if request.path == '/manage-users/' and request.method == 'POST':
-            current_users = entreprise.utilisateurs.filter(actif=True).count()
-            if current_users >= entreprise.max_utilisateurs:
+            from core.models import Utilisateur
+            current_users = Utilisateur.objects.filter(entreprise_id=ctx.entreprise_id, actif=True).count()
+            if current_users >= ctx.max_utilisateurs:
                 messages.error(
                     request,
-                    f"Quota d'utilisateurs atteint ({current_users}/{entreprise.max_utilisateurs}). "
+                    f"Quota d'utilisateurs atteint ({current_users}/{ctx.max_utilisateurs}). "
                     f"Veuillez upgrader votre plan."
                 )
                 return redirect('core:manage_users')
@@ -337,8 +421,8 @@ class EntrepriseQuotaMiddleware:
             # Ne bloquer que sur les vues de création (pas modification)
             if '/ajouter' in path or '/create' in path or '/import' in path:
                 from employes.models import Employe
-                current_count = Employe.objects.filter(entreprise=entreprise).count()
-                max_emp = getattr(entreprise, 'max_employes', 9999)
+                current_count = Employe.objects.filter(entreprise_id=ctx.entreprise_id).count()
+                max_emp = ctx.max_employes
                 if current_count >= max_emp:
                     messages.error(
                         request,
@@ -4,16 +4,21 @@ Middleware de Protection Anti-Falsification — GestionnaireRH Guinée
 Auteur  : ICG Guinea
 Version : 2.0.0
 
-Ce middleware vérifie l'intégrité du projet à chaque requête (avec cache)
-et bloque l'application si une modification non autorisée est détectée.
+Ce middleware bloque l'application si une modification non autorisée est
+détectée. Les vérifications (guardian et runtime_shield) tournent dans un
+thread de fond, lancé à la première requête de chaque processus, qui publie
+son verdict dans ``_guardian_cache`` : une requête ne fait que lire ce
+verdict, elle ne parcourt ni ne hache aucun fichier.
 
 AVERTISSEMENT LÉGAL :
   Ce logiciel est la propriété exclusive de ICG Guinea.
   Toute modification, redistribution ou ingénierie inverse est interdite.
 """
 
+import os
 import time
 import logging
+import threading
 from django.http import HttpResponse
 
 logger = logging.getLogger('project_guardian')
@@ -26,6 +31,12 @@ _guardian_cache = {
 }
 _CACHE_TTL = 3600  # 1 heure (vérifié au démarrage, inutile de re-scanner souvent)
 
+_verificateur = None
+_verificateur_pid = None
+_verificateur_lock = threading.Lock()
+_premier_verdict = threading.Event()
+_ATTENTE_PREMIER_VERDICT = 30  # secondes d'attente maximale à la première requête
+
 
 # ─── Page HTML de blocage sécurité ─────────────────────────────────────────────
 _SECURITY_BLOCK_HTML = """<!DOCTYPE html>
@@ -80,11 +91,89 @@ _SECURITY_BLOCK_HTML = """<!DOCTYPE html>
 </html>"""
 
 
+def _executer_verification() -> dict:
+    """Exécute les vérifications guardian puis runtime_shield et renvoie le verdict."""
+    now = time.time()
+    try:
+        from project_guardian import full_security_check
+        report = full_security_check()
+        blocked = report['blocked']
+        reason = report.get('reason', '')
+
+        # ── Vérification runtime_shield en complément ──
+        if not blocked:
+            try:
+                from runtime_shield import periodic_shield_check
+                shield_report = periodic_shield_check()
+                if shield_report.get('blocked'):
+                    blocked = True
+                    reason = shield_report.get('reason', 'Falsification détectée par le bouclier.')
+            except ImportError:
+                import sys as _sys
+                if getattr(_sys, 'frozen', False):
+                    blocked = True
+                    reason = (
+                        "Module runtime_shield introuvable. "
+                        "Le système de protection a été altéré."
+                    )
+            except Exception:
+                pass
+
+        return {'blocked': blocked, 'reason': reason, 'checked_at': now}
+    except ImportError:
+        # Si le guardian est absent, c'est un signe de falsification
+        return {
+            'blocked': True,
+            'reason': (
+                "Module de protection introuvable (project_guardian.py). "
+                "Le projet a été altéré."
+            ),
+            'checked_at': now,
+        }
+    except Exception as e:
+        logger.error("Erreur vérification intégrité : %s", e)
+        return {'blocked': False, 'reason': '', 'checked_at': now}
+
+
+def _boucle_verification():
+    """Thread de fond : établit le verdict puis le renouvelle toutes les ``_CACHE_TTL`` secondes."""
+    global _guardian_cache
+    while True:
+        # Remplacement du dict entier : les lecteurs voient l'ancien ou le nouveau verdict
+        _guardian_cache = _executer_verification()
+        _premier_verdict.set()
+        time.sleep(_CACHE_TTL)
+
+
+def demarrer_verification():
+    """
+    Lance le thread de vérification du processus courant s'il ne tourne pas.
+
+    Appelée à chaque requête : un thread ne survit pas au fork des workers
+    (gunicorn --preload charge l'application dans le processus maître), le
+    pid enregistré permet à chaque worker de lancer le sien à sa première
+    requête.
+    """
+    global _verificateur, _verificateur_pid
+    pid = os.getpid()
+    if _verificateur_pid == pid and _verificateur.is_alive():
+        return
+    with _verificateur_lock:
+        if _verificateur_pid != pid or not _verificateur.is_alive():
+            _verificateur = threading.Thread(
+                target=_boucle_verification, name='project-guardian', daemon=True
+            )
+            _verificateur.start()
+            _verificateur_pid = pid
+
+
 class ProjectIntegrityMiddleware:
     """
     Middleware Django qui vérifie l'intégrité des fichiers critiques du projet.
     Bloque TOUTES les requêtes si une falsification est détectée.
-    Intègre les vérifications du guardian ET du runtime_shield.
+    Intègre les vérifications du guardian ET du runtime_shield, exécutées
+    hors du chemin des requêtes par le thread de ``demarrer_verification`` ;
+    seule la première requête d'un processus attend le premier verdict.
     """
 
     def __init__(self, get_response):
@@ -95,62 +184,13 @@ class ProjectIntegrityMiddleware:
         if request.path.startswith(('/static/', '/media/', '/favicon')):
             return self.get_response(request)
 
-        global _guardian_cache
-        now = time.time()
-
-        # Vérification avec cache
-        if (now - _guardian_cache['checked_at'] > _CACHE_TTL
-                or _guardian_cache['blocked'] is None):
-            try:
-                from project_guardian import full_security_check
-                report = full_security_check()
-                blocked = report['blocked']
-                reason = report.get('reason', '')
-
-                # ── Vérification runtime_shield en complément ──
-                if not blocked:
-                    try:
-                        from runtime_shield import periodic_shield_check
-                        shield_report = periodic_shield_check()
-                        if shield_report.get('blocked'):
-                            blocked = True
-                            reason = shield_report.get('reason', 'Falsification détectée par le bouclier.')
-                    except ImportError:
-                        import sys as _sys
-                        if getattr(_sys, 'frozen', False):
-                            blocked = True
-                            reason = (
-                                "Module runtime_shield introuvable. "
-                                "Le système de protection a été altéré."
-                            )
-                    except Exception:
-                        pass
-
-                _guardian_cache = {
-                    'blocked': blocked,
-                    'reason': reason,
-                    'checked_at': now,
-                }
-            except ImportError:
-                # Si le guardian est absent, c'est un signe de falsification
-                _guardian_cache = {
-                    'blocked': True,
-                    'reason': (
-                        "Module de protection introuvable (project_guardian.py). "
-                        "Le projet a été altéré."
-                    ),
-                    'checked_at': now,
-                }
-            except Exception as e:
-                logger.error("Erreur vérification intégrité : %s", e)
-                _guardian_cache = {
-                    'blocked': False,
-                    'reason': '',
-                    'checked_at': now,
-                }
-
-        if _guardian_cache['blocked']:
-            reason = _guardian_cache['reason'] or "Intégrité du projet compromise."
+        demarrer_verification()
+        verdict = _guardian_cache
+        if verdict['blocked'] is None:
+            _premier_verdict.wait(_ATTENTE_PREMIER_VERDICT)
+            verdict = _guardian_cache
+        if verdict['blocked']:
+            reason = verdict['reason'] or "Intégrité du projet compromise."
             logger.critical(
                 "GUARDIAN BLOCK REQUEST | path=%s | ip=%s | reason=%s",
                 request.path, request.META.get('REMOTE_ADDR', '?'), reason
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_accesentreprise_actif_accesentreprise_date_debut_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompteurSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle', models.CharField(help_text='entreprise:préfixe:année', max_length=150, unique=True)),
+                ('prefixe', models.CharField(max_length=50)),
+                ('annee', models.IntegerField()),
+                ('dernier_numero', models.PositiveIntegerField(default=0)),
+                ('date_maj', models.DateTimeField(auto_now=True)),
+                ('entreprise', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='compteurs_sequence', to='core.entreprise')),
+            ],
+            options={
+                'verbose_name': 'Compteur de séquence',
+                'verbose_name_plural': 'Compteurs de séquence',
+                'db_table': 'compteurs_sequence',
+            },
+        ),
+    ]
@@ -1112,3 +1112,30 @@ class TentativeCodeAcces(models.Model):
             succes=succes,
             user_agent=(request.META.get('HTTP_USER_AGENT', '') or '')[:500]
         )
+
+
+class CompteurSequence(models.Model):
+    """Compteur de numérotation des documents (bulletins, écritures, factures, règlements)
+
+    Une ligne par (entreprise, préfixe, année) ; l'entreprise est vide pour les
+    numéros uniques sur toute l'instance (bulletins de paie).
+    """
+    cle = models.CharField(max_length=150, unique=True, help_text="entreprise:préfixe:année")
+    entreprise = models.ForeignKey(Entreprise, on_delete=models.CASCADE, related_name='compteurs_sequence', null=True, blank=True)
+    prefixe = models.CharField(max_length=50)
+    annee = models.IntegerField()
+    dernier_numero = models.PositiveIntegerField(default=0)
+    date_maj = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'compteurs_sequence'
+        verbose_name = 'Compteur de séquence'
+        verbose_name_plural = 'Compteurs de séquence'
+
+    def __str__(self):
+        return f"{self.prefixe} {self.annee} : {self.dernier_numero}"
+
+    @staticmethod
+    def construire_cle(entreprise, prefixe, annee):
+        entreprise_id = getattr(entreprise, 'pk', entreprise) or 0
+        return f"{entreprise_id}:{prefixe}:{annee}"
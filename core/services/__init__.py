@@ -1,3 +1,5 @@
 from .devises import DeviseService
 from .irpp import IRPPService
 from .cnss import CNSSService
+from .sequences import SequenceService
+from .contexte_entreprise import ContexteEntrepriseService, contexte_entreprise
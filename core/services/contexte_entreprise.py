@@ -0,0 +1,139 @@
+"""
+Contexte entreprise résolu une fois par requête
+"""
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from core.models import AccesEntreprise, Entreprise
+
+CACHE_TIMEOUT = 300  # borne la péremption entre processus (cache LocMem)
+
+MODULES = ('paie', 'conges', 'recrutement', 'formation', 'comptabilite', 'portail')
+
+
+def cle_entreprise(entreprise_id):
+    return f'entreprise_ctx:{entreprise_id}'
+
+
+def cle_acces(utilisateur_id, entreprise_id):
+    return f'entreprise_ctx:acces:{utilisateur_id}:{entreprise_id}'
+
+
+@dataclass(frozen=True)
+class ContexteEntreprise:
+    """
+    Plan, modules, quotas, échéance et licence de l'entreprise de l'utilisateur
+    connecté, exposé dans ``request.entreprise_ctx``.
+
+    Le contexte ne contient que des valeurs en lecture seule : une vue qui
+    modifie l'entreprise la lit depuis ``request.user.entreprise``, chargée en
+    base, jamais depuis le cache.
+    """
+    entreprise_id: int
+    nom_entreprise: str
+    logo_url: Optional[str]
+    plan: str
+    type_module: str
+    actif: bool
+    date_expiration: Optional[date]
+    modules: frozenset
+    max_utilisateurs: int
+    max_employes: int
+    role: Optional[str]
+    licence_valide: bool
+    licence_essai: bool
+    licence_jours_restants: int
+
+    @property
+    def est_expire(self):
+        return bool(self.date_expiration) and timezone.now().date() > self.date_expiration
+
+    def has_module(self, module_name):
+        return module_name in self.modules
+
+
+class ContexteEntrepriseService:
+    """
+    Construction du contexte : l'entreprise et l'accès de l'utilisateur sont
+    lus dans le cache, invalidés par les signaux de ``core.signals`` à chaque
+    enregistrement ou suppression d'une Entreprise ou d'un AccesEntreprise.
+    """
+
+    @staticmethod
+    def entreprise(entreprise_id):
+        """Valeurs de l'entreprise utiles au contexte (dict), ou None si elle n'existe pas."""
+        valeurs = cache.get(cle_entreprise(entreprise_id))
+        if valeurs is None:
+            entreprise = Entreprise.objects.filter(pk=entreprise_id).first()
+            if entreprise is None:
+                return None
+            valeurs = {
+                'nom_entreprise': entreprise.nom_entreprise,
+                'logo_url': entreprise.logo.url if entreprise.logo else None,
+                'plan': entreprise.plan_abonnement,
+                'type_module': entreprise.type_module,
+                'actif': entreprise.actif,
+                'date_expiration': entreprise.date_expiration,
+                'modules': frozenset(m for m in MODULES if entreprise.has_module(m)),
+                'max_utilisateurs': entreprise.max_utilisateurs,
+                'max_employes': entreprise.max_employes,
+            }
+            cache.set(cle_entreprise(entreprise_id), valeurs, CACHE_TIMEOUT)
+        return valeurs
+
+    @staticmethod
+    def role(utilisateur, entreprise_id):
+        """Équivalent de ``Utilisateur.role_dans`` avec l'accès mis en cache."""
+        if utilisateur.is_superuser or utilisateur.est_admin_entreprise:
+            return 'administrateur'
+        cle = cle_acces(utilisateur.pk, entreprise_id)
+        acces = cache.get(cle)
+        if acces is None:
+            acces = AccesEntreprise.objects.filter(
+                utilisateur=utilisateur, entreprise_id=entreprise_id
+            ).first() or False
+            cache.set(cle, acces, CACHE_TIMEOUT)
+        if acces and acces.est_valide():
+            return acces.role
+        return None
+
+    @classmethod
+    def construire(cls, utilisateur):
+        """Contexte de l'utilisateur, ou None s'il n'est rattaché à aucune entreprise."""
+        entreprise_id = getattr(utilisateur, 'entreprise_id', None)
+        if not entreprise_id:
+            return None
+        valeurs = cls.entreprise(entreprise_id)
+        if valeurs is None:
+            return None
+
+        from core.middleware_licence import _check_license_cached
+        licence = _check_license_cached()
+        return ContexteEntreprise(
+            entreprise_id=entreprise_id,
+            role=cls.role(utilisateur, entreprise_id),
+            licence_valide=licence['valid'],
+            licence_essai=licence.get('trial', False),
+            licence_jours_restants=licence.get('days_left', 0),
+            **valeurs,
+        )
+
+
+def contexte_entreprise(request):
+    """
+    Contexte entreprise de la requête, construit au premier appel puis conservé
+    dans ``request.entreprise_ctx`` (None pour un visiteur anonyme ou un
+    utilisateur sans entreprise).
+    """
+    if hasattr(request, 'entreprise_ctx'):
+        return request.entreprise_ctx
+    ctx = None
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        ctx = ContexteEntrepriseService.construire(user)
+    request.entreprise_ctx = ctx
+    return ctx
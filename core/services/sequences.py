@@ -0,0 +1,91 @@
+"""
+Service de numérotation séquentielle des documents
+"""
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import CompteurSequence
+
+
+class SequenceService:
+    """
+    Attribution atomique de numéros via la table ``compteurs_sequence``.
+
+    Chaque attribution est un ``UPDATE ... SET dernier_numero = dernier_numero + n``
+    suivi de la relecture du compteur dans la même transaction : la ligne reste
+    verrouillée jusqu'au commit (PostgreSQL, MySQL) ou la base l'est (SQLite),
+    sans parcours des documents existants ni nouvelle tentative.
+
+    ``depart`` est une fonction retournant le dernier numéro déjà attribué hors
+    compteur ; elle n'est appelée qu'à la création du compteur, pour reprendre
+    la numérotation des documents existants.
+    """
+
+    @staticmethod
+    def reserver(prefixe, annee, quantite=1, entreprise=None, depart=None):
+        """Réserve ``quantite`` numéros consécutifs et retourne le premier."""
+        if quantite < 1:
+            raise ValueError("La quantité de numéros à réserver doit être positive")
+        cle = CompteurSequence.construire_cle(entreprise, prefixe, annee)
+        with transaction.atomic():
+            if not SequenceService._incrementer(cle, quantite):
+                SequenceService._creer(cle, prefixe, annee, entreprise, depart)
+                SequenceService._incrementer(cle, quantite)
+            dernier = CompteurSequence.objects.filter(cle=cle).values_list('dernier_numero', flat=True).get()
+        return dernier - quantite + 1
+
+    @staticmethod
+    def prochain(prefixe, annee, entreprise=None, depart=None):
+        """Attribue le numéro suivant."""
+        return SequenceService.reserver(prefixe, annee, 1, entreprise, depart)
+
+    @staticmethod
+    def apercu(prefixe, annee, entreprise=None, depart=None):
+        """Numéro qui serait attribué ensuite, sans le réserver (suggestion de formulaire)."""
+        cle = CompteurSequence.construire_cle(entreprise, prefixe, annee)
+        dernier = CompteurSequence.objects.filter(cle=cle).values_list('dernier_numero', flat=True).first()
+        if dernier is None:
+            dernier = depart() if depart else 0
+        return dernier + 1
+
+    @staticmethod
+    def constater(prefixe, annee, numero, entreprise=None, depart=None):
+        """Avance le compteur jusqu'à ``numero`` attribué hors service (saisie manuelle)."""
+        cle = CompteurSequence.construire_cle(entreprise, prefixe, annee)
+        with transaction.atomic():
+            if not CompteurSequence.objects.filter(cle=cle).exists():
+                SequenceService._creer(cle, prefixe, annee, entreprise, depart)
+            CompteurSequence.objects.filter(cle=cle, dernier_numero__lt=numero).update(
+                dernier_numero=numero, date_maj=timezone.now(),
+            )
+
+    @staticmethod
+    def extraire_numero(valeur, prefixe_complet):
+        """Partie numérique finale de ``valeur`` si elle commence par ``prefixe_complet``, sinon None."""
+        correspondance = re.fullmatch(re.escape(prefixe_complet) + r'(\d+)', valeur or '')
+        return int(correspondance.group(1)) if correspondance else None
+
+    @staticmethod
+    def _incrementer(cle, quantite):
+        return CompteurSequence.objects.filter(cle=cle).update(
+            dernier_numero=F('dernier_numero') + quantite,
+            date_maj=timezone.now(),
+        )
+
+    @staticmethod
+    def _creer(cle, prefixe, annee, entreprise, depart):
+        try:
+            with transaction.atomic():
+                CompteurSequence.objects.create(
+                    cle=cle,
+                    entreprise=entreprise,
+                    prefixe=prefixe,
+                    annee=annee,
+                    dernier_numero=depart() if depart else 0,
+                )
+        except IntegrityError:
+            # Créé entre-temps par une autre transaction
+            pass
@@ -0,0 +1,24 @@
+"""
+Signaux Django du module core.
+
+Gère:
+- Invalidation du contexte entreprise mis en cache (request.entreprise_ctx)
+"""
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .services.contexte_entreprise import cle_acces, cle_entreprise
+
+
+@receiver(post_save, sender='core.Entreprise')
+@receiver(post_delete, sender='core.Entreprise')
+def invalider_contexte_entreprise(sender, instance, **kwargs):
+    cache.delete(cle_entreprise(instance.pk))
+
+
+@receiver(post_save, sender='core.AccesEntreprise')
+@receiver(post_delete, sender='core.AccesEntreprise')
+def invalider_acces_entreprise(sender, instance, **kwargs):
+    cache.delete(cle_acces(instance.utilisateur_id, instance.entreprise_id))
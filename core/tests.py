@@ -0,0 +1,202 @@
+"""
+Tests du contexte entreprise mis en cache (request.entreprise_ctx), de
+l'inspection SQL/XSS des requêtes et de la vérification d'intégrité
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import middleware_guardian
+from core.middleware import (
+    RequestInspectionMiddleware, SQLInjectionProtectionMiddleware, XSSProtectionMiddleware,
+)
+from core.models import Entreprise, Utilisateur
+from core.services.contexte_entreprise import (
+    ContexteEntrepriseService, cle_entreprise, contexte_entreprise,
+)
+
+
+class ContexteEntrepriseTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.entreprise = Entreprise.objects.create(
+            nom_entreprise='Contexte SARL', slug='contexte-sarl',
+            email='contact@contexte.gn', plan_abonnement='starter')
+        self.user = Utilisateur.objects.create_user(
+            username='admin_ctx', password='x', email='admin@contexte.gn',
+            entreprise=self.entreprise, est_admin_entreprise=True, actif=True)
+
+    def requete(self):
+        request = RequestFactory().get('/')
+        request.user = Utilisateur.objects.get(pk=self.user.pk)
+        return request
+
+    def test_contexte_mis_en_cache_puis_invalide_par_les_signaux(self):
+        self.assertEqual(contexte_entreprise(self.requete()).plan, 'starter')
+        self.assertIsNotNone(cache.get(cle_entreprise(self.entreprise.pk)))
+        with self.assertNumQueries(0):
+            ContexteEntrepriseService.entreprise(self.entreprise.pk)
+
+        self.entreprise.plan_abonnement = 'premium'
+        self.entreprise.save()
+        self.assertIsNone(cache.get(cle_entreprise(self.entreprise.pk)))
+        self.assertEqual(contexte_entreprise(self.requete()).plan, 'premium')
+
+        self.entreprise.delete()
+        self.assertIsNone(cache.get(cle_entreprise(self.entreprise.pk)))
+
+    def test_utilisateur_entreprise_non_alimente_par_le_cache(self):
+        contexte_entreprise(self.requete())
+        request = self.requete()
+        ctx = contexte_entreprise(request)
+        self.assertEqual(ctx.entreprise_id, self.entreprise.pk)
+        self.assertFalse(request.user._meta.get_field('entreprise').is_cached(request.user))
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_parametres_apres_changement_de_plan_concurrent(self):
+        self.client.force_login(self.user)
+        url = reverse('core:entreprise_settings')
+        self.client.get(url)  # contexte mis en cache avec le plan starter
+        # changement de plan par un autre processus : son cache local n'est pas celui-ci
+        Entreprise.objects.filter(pk=self.entreprise.pk).update(
+            plan_abonnement='premium', max_employes=500)
+
+        self.client.post(url, {
+            'nom_entreprise': 'Contexte SA', 'pays': 'Guinée',
+            'email': 'contact@contexte.gn',
+        })
+
+        self.entreprise.refresh_from_db()
+        self.assertEqual(self.entreprise.nom_entreprise, 'Contexte SA')
+        self.assertEqual(self.entreprise.plan_abonnement, 'premium')
+        self.assertEqual(self.entreprise.max_employes, 500)
+
+
+def _reponse(request):
+    return HttpResponse('ok')
+
+
+class InspectionRequeteTest(TestCase):
+    """RequestInspectionMiddleware rend le même verdict que la paire qu'il remplace"""
+
+    CHARGES = [
+        "1' OR '1'='1", "x UNION SELECT password FROM users", "a; DROP TABLE employes --",
+        "UPDATE paie SET net=0", "exec(cmd)", "<script>alert(1)</script>",
+        '<img src=x onerror=alert(1)>', 'javascript:alert(1)', '<IFRAME src=x>',
+        "INSERT INTO t VALUES (1)", "delete from bulletins",
+    ]
+    # sans mot-clé du préfiltre
+    PROPRES_ECARTEES = ['Diallo Mamadou', 'Conakry, Kaloum', '1 250 000', 'fatou.bah@exemple.gn', 'Mise à jour']
+    # avec un mot-clé du préfiltre, mais sans motif reconnu
+    PROPRES_RETENUES = ['Ordre de mission', 'Standard et décoration', 'Selection', 'Undropped',
+                        'Coordination = 3', 'Événement onload']
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.paire = SQLInjectionProtectionMiddleware(XSSProtectionMiddleware(_reponse))
+        self.unique = RequestInspectionMiddleware(_reponse)
+
+    def requetes(self, valeur):
+        yield self.factory.get('/employes/', {'q': valeur})
+        yield self.factory.post('/employes/', {'nom': valeur})
+        yield self.factory.post('/employes/', json.dumps({'employe': {'nom': [valeur]}}),
+                                content_type='application/json')
+
+    def verdicts(self, middleware, valeur):
+        return [middleware(requete).status_code for requete in self.requetes(valeur)]
+
+    def test_memes_verdicts_que_la_paire(self):
+        for valeur in self.CHARGES:
+            self.assertEqual(self.verdicts(self.unique, valeur), [403] * 3, valeur)
+            self.assertEqual(self.verdicts(self.unique, valeur), self.verdicts(self.paire, valeur), valeur)
+
+    def test_valeurs_propres_acceptees(self):
+        for valeurs, retenue in ((self.PROPRES_ECARTEES, False), (self.PROPRES_RETENUES, True)):
+            for valeur in valeurs:
+                self.assertEqual(bool(RequestInspectionMiddleware.PREFILTRE.search(valeur.casefold())),
+                                 retenue, valeur)
+                self.assertEqual(self.verdicts(self.unique, valeur), [200] * 3, valeur)
+                self.assertEqual(self.verdicts(self.paire, valeur), [200] * 3, valeur)
+
+    @override_settings(SECURITY_INSPECTION_MAX_CHARS=50)
+    def test_seuls_les_premiers_caracteres_sont_examines(self):
+        unique = RequestInspectionMiddleware(_reponse)
+        self.assertEqual(self.verdicts(unique, 'x' * 40 + '<iframe'), [403] * 3)
+        self.assertEqual(self.verdicts(unique, 'x' * 50 + '<iframe'), [200] * 3)
+        request = self.factory.get('/employes/', {'q': 'Diallo', 'page': '2'})
+        unique(request)
+        self.assertEqual(request.inspection_securite['champs'], 2)
+
+
+class VerificationIntegriteTest(SimpleTestCase):
+    """Empreintes mémorisées, verdict bloquant et thread relancé par processus"""
+
+    def setUp(self):
+        etat = ('_guardian_cache', '_verificateur', '_verificateur_pid')
+        sauvegarde = {nom: getattr(middleware_guardian, nom) for nom in etat}
+        self.addCleanup(lambda: [setattr(middleware_guardian, nom, valeur)
+                                 for nom, valeur in sauvegarde.items()])
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        self.fichier = Path(dossier.name) / 'module.py'
+        self.fichier.write_text('VALEUR = 1\n')
+
+    def test_empreinte_recalculee_seulement_si_le_fichier_change(self):
+        import project_guardian
+        import runtime_shield
+        cas = ((project_guardian, '_hash_file_incremental'), (runtime_shield, '_generate_file_checksum'))
+        for module, fonction in cas:
+            self.fichier.write_text('VALEUR = 1\n')
+            with mock.patch.object(Path, 'read_bytes', autospec=True, side_effect=Path.read_bytes) as lu:
+                premiere = getattr(module, fonction)(self.fichier)
+                self.assertEqual(getattr(module, fonction)(self.fichier), premiere)
+                self.assertEqual(lu.call_count, 1, fonction)
+
+                self.fichier.write_text('VALEUR = 22\n')
+                self.assertNotEqual(getattr(module, fonction)(self.fichier), premiere)
+                self.assertEqual(lu.call_count, 2, fonction)
+
+    def test_verdict_bloquant(self):
+        middleware = middleware_guardian.ProjectIntegrityMiddleware(_reponse)
+        requete = RequestFactory().get('/paie/')
+        with mock.patch.object(middleware_guardian, 'demarrer_verification'):
+            middleware_guardian._guardian_cache = {'blocked': True, 'reason': 'Fichier altéré : paie/models.py',
+                                                   'checked_at': 0}
+            with self.assertLogs('project_guardian', 'CRITICAL'):
+                reponse = middleware(requete)
+            self.assertEqual(reponse.status_code, 403)
+            self.assertIn('Fichier altéré : paie/models.py', reponse.content.decode())
+            self.assertEqual(middleware(RequestFactory().get('/static/app.css')).status_code, 200)
+
+            middleware_guardian._guardian_cache = {'blocked': False, 'reason': '', 'checked_at': 0}
+            self.assertEqual(middleware(requete).status_code, 200)
+
+    def test_thread_lance_par_processus(self):
+        verdict = {'blocked': False, 'reason': '', 'checked_at': 0}
+        with mock.patch.object(middleware_guardian, '_executer_verification', return_value=verdict) as verification:
+            middleware_guardian._verificateur = middleware_guardian._verificateur_pid = None
+            middleware_guardian.demarrer_verification()
+            premier = middleware_guardian._verificateur
+            self.assertEqual(middleware_guardian._verificateur_pid, os.getpid())
+            self.assertTrue(middleware_guardian._premier_verdict.wait(5))
+
+            middleware_guardian.demarrer_verification()
+            self.assertIs(middleware_guardian._verificateur, premier)
+
+            # Worker issu d'un fork : le thread du maître n'existe pas dans l'enfant
+            enfant = os.getpid() + 1
+            middleware_guardian._premier_verdict.clear()
+            with mock.patch.object(middleware_guardian.os, 'getpid', return_value=enfant):
+                middleware_guardian.demarrer_verification()
+                self.assertIsNot(middleware_guardian._verificateur, premier)
+                self.assertEqual(middleware_guardian._verificateur_pid, enfant)
+            self.assertTrue(middleware_guardian._premier_verdict.wait(5))
+            self.assertEqual(verification.call_count, 2)
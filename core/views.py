@@ -543,7 +543,8 @@ def entreprise_settings(request):
     if request.method == 'POST':
         form = EntrepriseSettingsForm(request.POST, request.FILES, instance=entreprise)
         if form.is_valid():
-            form.save()
+            # Seuls les champs du formulaire : le plan et les quotas restent ceux en base
+            form.save(commit=False).save(update_fields=form._meta.fields)
             log_activity(request, 'Modification paramètres entreprise', 'core')
             messages.success(request, 'Paramètres de l\'entreprise mis à jour avec succès!')
             return redirect('core:entreprise_settings')
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0021_compteur_sequence'),
+        ('employes', '0017_ajout_vehicule_assigne'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportEmploye',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom_fichier', models.CharField(max_length=255)),
+                ('statut', models.CharField(choices=[('analyse', 'Analysé'), ('en_cours', 'Importation en cours'), ('termine', 'Terminé'), ('echec', 'Échec')], default='analyse', max_length=20)),
+                ('total_lignes', models.IntegerField(default=0)),
+                ('total_ok', models.IntegerField(default=0)),
+                ('total_avertissements', models.IntegerField(default=0)),
+                ('total_erreurs', models.IntegerField(default=0)),
+                ('lignes_traitees', models.IntegerField(default=0, help_text="Progression de l'importation")),
+                ('total_crees', models.IntegerField(default=0)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_fin', models.DateTimeField(blank=True, null=True)),
+                ('entreprise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='imports_employes', to='core.entreprise')),
+                ('utilisateur', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='imports_employes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': "Import d'employés",
+                'verbose_name_plural': "Imports d'employés",
+                'db_table': 'imports_employes',
+                'ordering': ['-date_creation'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LigneImportEmploye',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.IntegerField()),
+                ('donnees', models.JSONField(default=dict, help_text='Valeurs de la ligne par champ du modèle Employe')),
+                ('matricule', models.CharField(blank=True, default='', max_length=50)),
+                ('num_cnss', models.CharField(blank=True, default='', max_length=50)),
+                ('statut', models.CharField(choices=[('ok', 'OK'), ('avertissement', 'Avertissement'), ('erreur', 'Erreur')], default='ok', max_length=20)),
+                ('erreurs', models.JSONField(blank=True, default=list)),
+                ('avertissements', models.JSONField(blank=True, default=list)),
+                ('employe', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='employes.employe')),
+                ('etablissement', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.etablissement')),
+                ('import_employe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lignes', to='employes.importemploye')),
+                ('poste', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.poste')),
+                ('service', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.service')),
+            ],
+            options={
+                'verbose_name': "Ligne d'import d'employés",
+                'verbose_name_plural': "Lignes d'import d'employés",
+                'db_table': 'lignes_imports_employes',
+                'ordering': ['import_employe', 'numero'],
+                'indexes': [models.Index(fields=['import_employe', 'matricule'], name='idx_ligne_import_matricule'), models.Index(fields=['import_employe', 'num_cnss'], name='idx_ligne_import_cnss'), models.Index(fields=['import_employe', 'statut', 'numero'], name='idx_ligne_import_statut')],
+            },
+        ),
+    ]
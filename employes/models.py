@@ -843,3 +843,6 @@ from .models_rh_legal import (
     FinContrat, CongeMaternite, AllocationFamiliale, EnfantEmploye,
     ConjointEmploye, PensionRetraite
 )
+
+# Import des modèles d'importation par lots
+from .models_import import ImportEmploye, LigneImportEmploye
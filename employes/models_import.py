@@ -0,0 +1,86 @@
+"""
+Modèles de l'importation des employés par lots (table de transit).
+"""
+from django.db import models
+
+
+class ImportEmploye(models.Model):
+    """Import d'un fichier d'employés : ses lignes attendent dans LigneImportEmploye"""
+    STATUTS = (
+        ('analyse', 'Analysé'),
+        ('en_cours', 'Importation en cours'),
+        ('termine', 'Terminé'),
+        ('echec', 'Échec'),
+    )
+
+    entreprise = models.ForeignKey('core.Entreprise', on_delete=models.CASCADE, related_name='imports_employes')
+    utilisateur = models.ForeignKey('core.Utilisateur', on_delete=models.SET_NULL, null=True, blank=True,
+                                    related_name='imports_employes')
+    nom_fichier = models.CharField(max_length=255)
+    statut = models.CharField(max_length=20, choices=STATUTS, default='analyse')
+    total_lignes = models.IntegerField(default=0)
+    total_ok = models.IntegerField(default=0)
+    total_avertissements = models.IntegerField(default=0)
+    total_erreurs = models.IntegerField(default=0)
+    lignes_traitees = models.IntegerField(default=0, help_text='Progression de l\'importation')
+    total_crees = models.IntegerField(default=0)
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'imports_employes'
+        verbose_name = 'Import d\'employés'
+        verbose_name_plural = 'Imports d\'employés'
+        ordering = ['-date_creation']
+
+    def __str__(self):
+        return f"{self.nom_fichier} ({self.get_statut_display()})"
+
+    @property
+    def total_importables(self):
+        return self.total_ok + self.total_avertissements
+
+    @property
+    def progression(self):
+        """Pourcentage de lignes importables déjà traitées"""
+        if not self.total_importables:
+            return 100 if self.statut == 'termine' else 0
+        return min(100, round(self.lignes_traitees * 100 / self.total_importables))
+
+
+class LigneImportEmploye(models.Model):
+    """Ligne d'un fichier d'import, normalisée et validée avant création de l'employé"""
+    STATUTS = (
+        ('ok', 'OK'),
+        ('avertissement', 'Avertissement'),
+        ('erreur', 'Erreur'),
+    )
+
+    import_employe = models.ForeignKey(ImportEmploye, on_delete=models.CASCADE, related_name='lignes')
+    numero = models.IntegerField()
+    donnees = models.JSONField(default=dict, help_text='Valeurs de la ligne par champ du modèle Employe')
+    matricule = models.CharField(max_length=50, blank=True, default='')
+    num_cnss = models.CharField(max_length=50, blank=True, default='')
+    etablissement = models.ForeignKey('core.Etablissement', on_delete=models.SET_NULL, null=True, blank=True,
+                                      related_name='+')
+    service = models.ForeignKey('core.Service', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    poste = models.ForeignKey('core.Poste', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    statut = models.CharField(max_length=20, choices=STATUTS, default='ok')
+    erreurs = models.JSONField(default=list, blank=True)
+    avertissements = models.JSONField(default=list, blank=True)
+    employe = models.ForeignKey('employes.Employe', on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='+')
+
+    class Meta:
+        db_table = 'lignes_imports_employes'
+        verbose_name = 'Ligne d\'import d\'employés'
+        verbose_name_plural = 'Lignes d\'import d\'employés'
+        ordering = ['import_employe', 'numero']
+        indexes = [
+            models.Index(fields=['import_employe', 'matricule'], name='idx_ligne_import_matricule'),
+            models.Index(fields=['import_employe', 'num_cnss'], name='idx_ligne_import_cnss'),
+            models.Index(fields=['import_employe', 'statut', 'numero'], name='idx_ligne_import_statut'),
+        ]
+
+    def __str__(self):
+        return f"Ligne {self.numero} - {self.get_statut_display()}"
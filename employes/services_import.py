@@ -0,0 +1,568 @@
+"""
+Importation des employés par lots (Excel .xlsx / CSV .csv)
+
+Le fichier est lu en flux (openpyxl en lecture seule, csv ligne à ligne) et
+chaque ligne, normalisée par champ du modèle Employe, est déposée dans la
+table de transit LigneImportEmploye par paquets. La validation se fait
+ensuite sur l'ensemble des lignes : doublons de matricule et de N° CNSS par
+jointure avec les employés existants et regroupement dans le fichier,
+références (établissement, service, poste) résolues en une requête chacune.
+L'importation crée les employés par bulk_create, lot par lot, avec des
+matricules réservés par blocs dans le compteur de séquence, et publie sa
+progression dans ImportEmploye.lignes_traitees.
+"""
+import csv
+import io
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from core.models import Etablissement, Poste, Service
+from core.services import SequenceService
+from .models import Employe, ImportEmploye, LigneImportEmploye
+
+TAILLE_LOT = 1000
+
+
+class ErreurImport(ValueError):
+    """Fichier ou import refusé (message affichable à l'utilisateur)"""
+
+
+# ============================================================
+#  COLONNES DU TEMPLATE D'IMPORTATION
+# ============================================================
+IMPORT_COLUMNS = [
+    # (nom_colonne, champ_model, obligatoire, description, exemple)
+    # --- RENSEIGNEMENTS ---
+    ('Matricule', 'matricule', False, 'Laisser vide pour génération automatique', 'EMP-001'),
+    ('Civilité', 'civilite', False, 'M. / Mme / Mlle', 'M.'),
+    ('Nom*', 'nom', True, 'Nom de famille (obligatoire)', 'DIALLO'),
+    ('Prénoms*', 'prenoms', True, 'Prénoms (obligatoire)', 'Mamadou Alpha'),
+    ('Sexe', 'sexe', False, 'M ou F', 'M'),
+    ('N° CNSS', 'num_cnss_individuel', False, 'Numéro CNSS individuel', 'CNSS-2024-001'),
+    ('N° Pièce identité', 'numero_piece_identite', False, 'Numéro du document', 'CNI-123456'),
+    ('Statut', 'statut_employe', False, 'actif / suspendu / demissionnaire / licencie / retraite', 'actif'),
+    # --- CONDUCTEUR / TRANSPORT ---
+    ('ID Conducteur', 'id_conducteur', False, 'Identifiant conducteur', 'COND-001'),
+    ('Tracteur', 'tracteur', False, 'Immatriculation ou nom tracteur', 'RC-1234-AB'),
+    ('Citerne', 'citerne', False, 'Immatriculation ou nom citerne', 'CT-5678-CD'),
+    ('N° Permis', 'numero_permis', False, 'Numéro du permis de conduire', 'PG-2024-12345'),
+    ('Date obtention permis', 'date_obtention_permis', False, 'Format JJ/MM/AAAA', '10/05/2015'),
+    ('Date validité permis', 'date_validite_permis', False, 'Format JJ/MM/AAAA', '10/05/2030'),
+    ('Groupe sanguin', 'groupe_sanguin', False, 'A+ / A- / B+ / B- / AB+ / AB- / O+ / O-', 'O+'),
+    ('Chauffeur basé à', 'base_chauffeur', False, 'Lieu d\'affectation du chauffeur', 'Conakry'),
+    ('Camion/Voiture assigné(e)', 'vehicule_assigne', False, 'Véhicule assigné (immat. ou description)', 'RC-9999-AB / Toyota Hilux'),
+    # --- IMMATRICULATIONS / ÉTAT CIVIL ---
+    ('Date de naissance', 'date_naissance', False, 'Format JJ/MM/AAAA', '15/03/1990'),
+    ('Lieu de naissance', 'lieu_naissance', False, 'Ville de naissance', 'Conakry'),
+    ('Nationalité', 'nationalite', False, 'Par défaut : Guinéenne', 'Guinéenne'),
+    ('Situation matrimoniale', 'situation_matrimoniale', False, 'celibataire / marie / divorce / veuf', 'celibataire'),
+    ('Téléphone', 'telephone_principal', False, 'Numéro principal', '+224 620 00 00 00'),
+    ('Email professionnel', 'email_professionnel', False, 'Adresse email pro', 'mdiallo@entreprise.gn'),
+    ('Adresse', 'adresse_actuelle', False, 'Adresse de résidence', 'Kaloum, Conakry'),
+    ('Date embauche', 'date_embauche', False, 'Format JJ/MM/AAAA', '01/01/2024'),
+    # --- PROFESSIONNEL ---
+    ('Établissement', 'etablissement', False, 'Nom de l\'établissement (doit exister)', 'Siège Conakry'),
+    ('Service', 'service', False, 'Nom du service (doit exister)', 'Ressources Humaines'),
+    ('Poste', 'poste', False, 'Intitulé du poste (doit exister)', 'Responsable RH'),
+    ('Type contrat', 'type_contrat', False, 'CDI / CDD / Stage / etc.', 'CDI'),
+    # --- FORMATION TRANSPORT / SÉCURITÉ ---
+    ('Date formation APTH', 'date_formation_apth', False, 'Format JJ/MM/AAAA', '15/06/2023'),
+    ('Ancienneté transport HCL (ans)', 'anciennete_transport_hcl', False, 'Nombre d\'années', '5'),
+    ('Date dernier recyclage', 'date_dernier_recyclage', False, 'Format JJ/MM/AAAA', '20/01/2025'),
+    ('Formation extincteur', 'formation_extincteur', False, 'OUI / NON', 'OUI'),
+    # --- VISITE MÉDICALE ---
+    ('Date visite médicale', 'date_derniere_visite_medicale', False, 'Format JJ/MM/AAAA', '10/02/2025'),
+    ('Service médical accrédité', 'service_medical_accredite', False, 'Nom du centre médical', 'CMC Kaloum'),
+    ('Prochaine visite médicale', 'date_prochaine_visite_medicale', False, 'Format JJ/MM/AAAA', '10/02/2026'),
+    # --- FILIATION ---
+    ('Nombre de femmes', 'nombre_femmes', False, 'Nombre entier', '1'),
+    ('Nombre enfants', 'nombre_enfants', False, 'Nombre entier', '2'),
+    ('Nom du père', 'nom_pere', False, 'Nom complet du père', 'DIALLO Ibrahima'),
+    ('Nom de la mère', 'nom_mere', False, 'Nom complet de la mère', 'BAH Fatoumata'),
+    # --- CONTACT D\'URGENCE ---
+    ('Contact urgence - Nom', 'contact_urgence_nom', False, 'Nom et prénoms', 'CAMARA Moussa'),
+    ('Contact urgence - Lien', 'contact_urgence_lien', False, 'Lien de parenté', 'Frère'),
+    ('Contact urgence - Téléphone', 'contact_urgence_telephone', False, 'Numéro de téléphone', '+224 621 11 11 11'),
+    # --- BANCAIRE ---
+    ('Mode paiement', 'mode_paiement', False, 'virement / cheque / especes / mobile_money', 'virement'),
+    ('Nom banque', 'nom_banque', False, 'Nom de la banque', 'BCRG'),
+    ('N° Compte', 'numero_compte', False, 'Numéro de compte bancaire', '001-234567-89'),
+    ('RIB', 'rib', False, 'Relevé d\'identité bancaire', 'GN12345678901234'),
+]
+
+
+def _parse_date(value):
+    """Parse une date depuis différents formats"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (date, datetime)):
+        if isinstance(value, datetime):
+            return value.date()
+        return value
+
+    value = str(value).strip()
+    formats = ['%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%d.%m.%Y', '%Y/%m/%d']
+    for fmt in formats:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_int(value, default=0):
+    """Parse un entier"""
+    if value is None or value == '':
+        return default
+    try:
+        return int(float(str(value).strip()))
+    except (ValueError, TypeError):
+        return default
+
+
+def _clean_str(value):
+    """Nettoie une chaîne"""
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+CHAMPS_DATES = (
+    'date_naissance', 'date_embauche', 'date_obtention_permis', 'date_validite_permis',
+    'date_formation_apth', 'date_dernier_recyclage',
+    'date_derniere_visite_medicale', 'date_prochaine_visite_medicale',
+)
+
+LIBELLES_COLONNES = {champ: nom.rstrip('*') for nom, champ, _, _, _ in IMPORT_COLUMNS}
+
+GROUPES_SANGUINS = ('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-')
+TYPES_CONTRAT_VALIDES = ('CDI', 'CDD', 'CDImp', 'CTI', 'stage', 'apprentissage', 'temporaire')
+STATUTS_VALIDES = ('actif', 'suspendu', 'demissionnaire', 'licencie', 'retraite')
+
+
+def max_lignes_import():
+    return getattr(settings, 'IMPORT_EMPLOYES_MAX_LIGNES', 20000)
+
+
+# ============================================================
+#  LECTURE EN FLUX
+# ============================================================
+def _header_map():
+    """En-têtes du template (et noms de champs) → champ du modèle"""
+    header_map = {}
+    for col_name, field_name, _, _, _ in IMPORT_COLUMNS:
+        header_map[col_name.lower().rstrip('*')] = field_name
+        header_map[field_name.lower()] = field_name
+    return header_map
+
+
+def _normaliser(valeurs):
+    """
+    {champ: valeur} d'une ligne, limité aux colonnes du template : chaînes
+    nettoyées, dates Excel converties au format AAAA-MM-JJ (sérialisables).
+    """
+    donnees = {}
+    for champ, valeur in valeurs.items():
+        if champ not in LIBELLES_COLONNES:
+            continue
+        if isinstance(valeur, datetime):
+            valeur = valeur.date()
+        if isinstance(valeur, date):
+            donnees[champ] = valeur.isoformat()
+        else:
+            donnees[champ] = _clean_str(valeur)
+    return donnees
+
+
+def iter_lignes_xlsx(fichier):
+    """Lignes d'un fichier Excel, normalisées (générateur)"""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(fichier, read_only=True, data_only=True)
+    try:
+        rows_iter = wb.active.iter_rows(values_only=True)
+        headers_raw = next(rows_iter, None)
+        if not headers_raw:
+            return
+
+        header_map = _header_map()
+        champs = [header_map.get(_clean_str(h).lower().rstrip('*')) if h else None for h in headers_raw]
+
+        # Ligne 2 = descriptions, Ligne 3 = exemple → à ignorer
+        next(rows_iter, None)
+        next(rows_iter, None)
+
+        for row_values in rows_iter:
+            if not any(v for v in row_values):
+                continue  # ligne vide
+            yield _normaliser({champ: val for champ, val in zip(champs, row_values) if champ})
+    finally:
+        wb.close()
+
+
+def iter_lignes_csv(fichier):
+    """Lignes d'un fichier CSV (séparateur ;), normalisées (générateur)"""
+    texte = io.TextIOWrapper(fichier, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.DictReader(texte, delimiter=';')
+        header_map = _header_map()
+
+        def normaliser(row):
+            return _normaliser({header_map.get(key.strip().lower().rstrip('*')): val
+                                for key, val in row.items() if key})
+
+        # Si le CSV vient du template, les 2 premières lignes de données
+        # sont les descriptions et l'exemple → les ignorer
+        first_row = next(reader, None)
+        if first_row:
+            first_vals = [str(v).strip().lower() for v in first_row.values() if v]
+            is_template_desc = any(
+                kw in ' '.join(first_vals)
+                for kw in ['obligatoire', 'laisser vide', 'format jj/mm', 'numéro']
+            )
+            if is_template_desc:
+                next(reader, None)
+            else:
+                yield normaliser(first_row)
+
+        for row in reader:
+            yield normaliser(row)
+    finally:
+        texte.detach()
+
+
+# ============================================================
+#  ANALYSE : TABLE DE TRANSIT ET VALIDATION
+# ============================================================
+def _verifier_ligne(donnees):
+    """Contrôles propres à une ligne : (erreurs, avertissements)"""
+    erreurs, avertissements = [], []
+    if len(donnees.get('matricule', '')) > 20:
+        erreurs.append('Matricule trop long (20 caractères maximum)')
+    if len(donnees.get('num_cnss_individuel', '')) > 50:
+        erreurs.append('N° CNSS trop long (50 caractères maximum)')
+    if not donnees.get('nom'):
+        erreurs.append('Nom obligatoire')
+    if not donnees.get('prenoms'):
+        erreurs.append('Prénoms obligatoire')
+
+    for champ in CHAMPS_DATES:
+        valeur = donnees.get(champ)
+        if valeur and not _parse_date(valeur):
+            avertissements.append(f'{LIBELLES_COLONNES[champ]} invalide : "{valeur}"')
+
+    gs = donnees.get('groupe_sanguin')
+    if gs and gs not in GROUPES_SANGUINS:
+        avertissements.append(f'Groupe sanguin invalide : "{gs}"')
+    sexe = donnees.get('sexe')
+    if sexe and sexe not in ('M', 'F'):
+        avertissements.append(f'Sexe invalide : "{sexe}" (attendu M ou F)')
+    type_contrat = donnees.get('type_contrat')
+    if type_contrat and type_contrat not in TYPES_CONTRAT_VALIDES:
+        avertissements.append(f'Type contrat invalide : "{type_contrat}"')
+    return erreurs, avertissements
+
+
+def analyser_fichier(fichier, entreprise, utilisateur=None):
+    """
+    Dépose les lignes du fichier dans la table de transit puis les valide.
+
+    :return: ImportEmploye au statut 'analyse'
+    :raises ErreurImport: format non supporté, fichier vide ou trop volumineux
+    """
+    nom_fichier = fichier.name.lower()
+    if nom_fichier.endswith('.xlsx'):
+        lignes = iter_lignes_xlsx(fichier)
+    elif nom_fichier.endswith('.csv'):
+        lignes = iter_lignes_csv(fichier)
+    else:
+        raise ErreurImport('Format non supporté. Utilisez .xlsx ou .csv')
+
+    maximum = max_lignes_import()
+    with transaction.atomic():
+        # Aperçus abandonnés du même utilisateur
+        if utilisateur is not None:
+            ImportEmploye.objects.filter(entreprise=entreprise, utilisateur=utilisateur, statut='analyse').delete()
+        import_employe = ImportEmploye.objects.create(
+            entreprise=entreprise, utilisateur=utilisateur, nom_fichier=fichier.name)
+        lot = []
+        numero = 0
+        for numero, donnees in enumerate(lignes, 1):
+            if numero > maximum:
+                raise ErreurImport(f'Le fichier contient plus de {maximum} lignes. Maximum autorisé : {maximum}.')
+            lot.append(LigneImportEmploye(
+                import_employe=import_employe, numero=numero, donnees=donnees,
+                matricule=donnees.get('matricule', '')[:50],
+                num_cnss=donnees.get('num_cnss_individuel', '')[:50],
+            ))
+            if len(lot) >= TAILLE_LOT:
+                LigneImportEmploye.objects.bulk_create(lot)
+                lot = []
+        LigneImportEmploye.objects.bulk_create(lot)
+        if not numero:
+            raise ErreurImport('Le fichier est vide ou ne contient aucune donnée.')
+        import_employe.total_lignes = numero
+        valider_import(import_employe)
+    return import_employe
+
+
+def _references(entreprise):
+    """{nom en minuscules: pk} des établissements, services et postes actifs"""
+    return (
+        {nom.lower(): pk for pk, nom in Etablissement.objects.filter(
+            societe__entreprise=entreprise, actif=True).values_list('pk', 'nom_etablissement')},
+        {nom.lower(): pk for pk, nom in Service.objects.filter(
+            entreprise=entreprise, actif=True).values_list('pk', 'nom_service')},
+        {nom.lower(): pk for pk, nom in Poste.objects.filter(
+            entreprise=entreprise, actif=True).values_list('pk', 'intitule_poste')},
+    )
+
+
+def _doublons_fichier(lignes, champ):
+    """{valeur: numéro de sa première ligne} des valeurs répétées dans le fichier"""
+    return dict(lignes.exclude(**{champ: ''}).order_by().values(champ)
+                .annotate(n=Count('id'), premier=Min('numero')).filter(n__gt=1)
+                .values_list(champ, 'premier'))
+
+
+def valider_import(import_employe):
+    """
+    Validation des lignes de transit : contrôles propres à chaque ligne,
+    doublons (matricule et N° CNSS sont uniques sur toute l'instance) et
+    références résolus par quelques requêtes ensemblistes, puis statut et
+    compteurs de l'import. Peut être relancée (après création d'un service
+    manquant, par exemple).
+    """
+    lignes = import_employe.lignes.all()
+    matricules_existants = set(lignes.filter(
+        matricule__in=Employe.objects.values('matricule')).values_list('matricule', flat=True))
+    cnss_existants = set(lignes.filter(
+        num_cnss__in=Employe.objects.exclude(num_cnss_individuel__isnull=True)
+        .values('num_cnss_individuel')).values_list('num_cnss', flat=True))
+    matricules_doublons = _doublons_fichier(lignes, 'matricule')
+    cnss_doublons = _doublons_fichier(lignes, 'num_cnss')
+    etabs, services, postes = _references(import_employe.entreprise)
+
+    a_jour = []
+    for ligne in lignes.iterator(chunk_size=TAILLE_LOT):
+        donnees = ligne.donnees
+        erreurs, avertissements = _verifier_ligne(donnees)
+
+        if ligne.matricule:
+            if ligne.matricule in matricules_existants:
+                erreurs.append(f'Matricule "{ligne.matricule}" existe déjà')
+            elif matricules_doublons.get(ligne.matricule, ligne.numero) != ligne.numero:
+                erreurs.append(f'Matricule "{ligne.matricule}" en doublon dans le fichier')
+        if ligne.num_cnss:
+            if ligne.num_cnss in cnss_existants:
+                erreurs.append(f'N° CNSS "{ligne.num_cnss}" existe déjà')
+            elif cnss_doublons.get(ligne.num_cnss, ligne.numero) != ligne.numero:
+                erreurs.append(f'N° CNSS "{ligne.num_cnss}" en doublon dans le fichier')
+
+        for champ, references, libelle in (('etablissement', etabs, 'Établissement'),
+                                           ('service', services, 'Service'),
+                                           ('poste', postes, 'Poste')):
+            nom = donnees.get(champ)
+            pk = references.get(nom.lower()) if nom else None
+            setattr(ligne, f'{champ}_id', pk)
+            if nom and pk is None:
+                avertissements.append(f'{libelle} "{nom}" introuvable')
+
+        ligne.erreurs, ligne.avertissements = erreurs, avertissements
+        ligne.statut = 'erreur' if erreurs else 'avertissement' if avertissements else 'ok'
+        a_jour.append(ligne)
+        if len(a_jour) >= TAILLE_LOT:
+            LigneImportEmploye.objects.bulk_update(
+                a_jour, ['erreurs', 'avertissements', 'statut', 'etablissement', 'service', 'poste'])
+            a_jour = []
+    LigneImportEmploye.objects.bulk_update(
+        a_jour, ['erreurs', 'avertissements', 'statut', 'etablissement', 'service', 'poste'])
+
+    comptes = dict(lignes.order_by().values('statut').annotate(n=Count('id')).values_list('statut', 'n'))
+    import_employe.total_ok = comptes.get('ok', 0)
+    import_employe.total_avertissements = comptes.get('avertissement', 0)
+    import_employe.total_erreurs = comptes.get('erreur', 0)
+    import_employe.save()
+
+
+# ============================================================
+#  IMPORTATION EFFECTIVE
+# ============================================================
+def _dernier_matricule(prefixe):
+    """Dernier numéro de matricule ``<prefixe>NNNN`` attribué hors compteur"""
+    dernier = (Employe.objects.filter(matricule__startswith=prefixe)
+               .order_by('-matricule').values_list('matricule', flat=True).first())
+    return SequenceService.extraire_numero(dernier, prefixe) or 0
+
+
+def allouer_matricules(quantite, reserves=()):
+    """
+    Réserve ``quantite`` matricules ``EMP<année>NNNN`` en blocs dans le compteur
+    de séquence (unique sur toute l'instance, comme la contrainte du modèle),
+    en écartant ceux déjà pris par un employé ou présents dans ``reserves``.
+    """
+    annee = timezone.now().year
+    prefixe = f'EMP{annee}'
+    matricules = []
+    while len(matricules) < quantite:
+        manque = quantite - len(matricules)
+        premier = SequenceService.reserver(prefixe, annee, manque, depart=lambda: _dernier_matricule(prefixe))
+        candidats = [f'{prefixe}{numero:04d}' for numero in range(premier, premier + manque)]
+        pris = set(Employe.objects.filter(matricule__in=candidats).values_list('matricule', flat=True))
+        matricules.extend(m for m in candidats if m not in pris and m not in reserves)
+    return matricules
+
+
+def _construire_employe(ligne, entreprise, utilisateur):
+    d = ligne.donnees
+
+    def texte(champ):
+        return d.get(champ) or None
+
+    ext_val = d.get('formation_extincteur', '')
+    statut = d.get('statut_employe', '')
+    return Employe(
+        entreprise=entreprise,
+        matricule=ligne.matricule,
+        nom=d.get('nom'),
+        prenoms=d.get('prenoms'),
+        civilite=texte('civilite'),
+        sexe=texte('sexe'),
+        date_naissance=_parse_date(d.get('date_naissance')),
+        lieu_naissance=texte('lieu_naissance'),
+        nationalite=d.get('nationalite') or 'Guinéenne',
+        situation_matrimoniale=texte('situation_matrimoniale'),
+        nombre_enfants=_parse_int(d.get('nombre_enfants')),
+        numero_piece_identite=texte('numero_piece_identite'),
+        num_cnss_individuel=ligne.num_cnss or None,
+        telephone_principal=texte('telephone_principal'),
+        email_professionnel=texte('email_professionnel'),
+        adresse_actuelle=texte('adresse_actuelle'),
+        etablissement_id=ligne.etablissement_id,
+        service_id=ligne.service_id,
+        poste_id=ligne.poste_id,
+        date_embauche=_parse_date(d.get('date_embauche')),
+        type_contrat=texte('type_contrat'),
+        statut_employe=statut if statut in STATUTS_VALIDES else 'actif',
+        # Conducteur / Transport
+        id_conducteur=texte('id_conducteur'),
+        tracteur=texte('tracteur'),
+        citerne=texte('citerne'),
+        numero_permis=texte('numero_permis'),
+        date_obtention_permis=_parse_date(d.get('date_obtention_permis')),
+        date_validite_permis=_parse_date(d.get('date_validite_permis')),
+        groupe_sanguin=texte('groupe_sanguin'),
+        base_chauffeur=texte('base_chauffeur'),
+        vehicule_assigne=texte('vehicule_assigne'),
+        # Formation transport / sécurité
+        date_formation_apth=_parse_date(d.get('date_formation_apth')),
+        anciennete_transport_hcl=_parse_int(d.get('anciennete_transport_hcl')) or None,
+        date_dernier_recyclage=_parse_date(d.get('date_dernier_recyclage')),
+        formation_extincteur=ext_val.upper() in ('OUI', 'YES', '1', 'TRUE', 'O'),
+        # Visite médicale
+        date_derniere_visite_medicale=_parse_date(d.get('date_derniere_visite_medicale')),
+        service_medical_accredite=texte('service_medical_accredite'),
+        date_prochaine_visite_medicale=_parse_date(d.get('date_prochaine_visite_medicale')),
+        # Filiation
+        nombre_femmes=_parse_int(d.get('nombre_femmes')),
+        nom_pere=texte('nom_pere'),
+        nom_mere=texte('nom_mere'),
+        # Contact d'urgence
+        contact_urgence_nom=texte('contact_urgence_nom'),
+        contact_urgence_lien=texte('contact_urgence_lien'),
+        contact_urgence_telephone=texte('contact_urgence_telephone'),
+        # Bancaire
+        mode_paiement=d.get('mode_paiement') or 'virement',
+        nom_banque=texte('nom_banque'),
+        numero_compte=texte('numero_compte'),
+        rib=texte('rib'),
+        utilisateur_creation=utilisateur,
+        utilisateur_modification=utilisateur,
+    )
+
+
+def _creer_lot(lignes, employes):
+    """Crée un lot d'employés d'un bloc ; à défaut, ligne à ligne pour isoler les refus"""
+    from paie.signals import creer_elements_salaire_base
+
+    try:
+        with transaction.atomic():
+            Employe.objects.bulk_create(employes)
+            if any(e.pk is None for e in employes):
+                # Bases sans RETURNING : relire les clés par matricule
+                pks = dict(Employe.objects.filter(matricule__in=[e.matricule for e in employes])
+                           .values_list('matricule', 'pk'))
+                for e in employes:
+                    e.pk = pks[e.matricule]
+            # bulk_create n'émet pas post_save : élément de salaire de base en masse
+            creer_elements_salaire_base(employes)
+            for ligne, employe in zip(lignes, employes):
+                ligne.employe = employe
+            LigneImportEmploye.objects.bulk_update(lignes, ['employe'])
+        return
+    except DatabaseError:
+        pass
+
+    for ligne, employe in zip(lignes, employes):
+        employe.pk = None
+        employe._state.adding = True
+        try:
+            with transaction.atomic():
+                employe.save()
+                ligne.employe = employe
+                ligne.save(update_fields=['employe'])
+        except Exception as e:
+            ligne.employe = None
+            ligne.statut = 'erreur'
+            ligne.erreurs = ligne.erreurs + [str(e)]
+            ligne.save(update_fields=['employe', 'statut', 'erreurs'])
+
+
+def executer_import(import_employe, utilisateur=None, progression=None):
+    """
+    Crée les employés des lignes valides (ou avec avertissements), par lots de
+    TAILLE_LOT. Après chaque lot, ``lignes_traitees`` est enregistré et
+    ``progression(import_employe)`` appelé s'il est fourni.
+
+    :return: nombre d'employés créés
+    :raises ErreurImport: import déjà exécuté
+    """
+    # Mise à jour conditionnelle : deux exécutions simultanées ne peuvent réclamer l'import qu'une fois
+    if not ImportEmploye.objects.filter(pk=import_employe.pk, statut='analyse').update(
+            statut='en_cours', lignes_traitees=0):
+        raise ErreurImport('Cet import a déjà été exécuté.')
+    import_employe.statut = 'en_cours'
+    import_employe.lignes_traitees = 0
+
+    entreprise = import_employe.entreprise
+    utilisateur = utilisateur or import_employe.utilisateur
+    a_importer = list(import_employe.lignes.exclude(statut='erreur')
+                      .order_by('numero').values_list('pk', flat=True))
+    reserves = set(import_employe.lignes.exclude(matricule='').values_list('matricule', flat=True))
+    try:
+        for debut in range(0, len(a_importer), TAILLE_LOT):
+            lignes = list(LigneImportEmploye.objects.filter(pk__in=a_importer[debut:debut + TAILLE_LOT])
+                          .order_by('numero'))
+            sans_matricule = [ligne for ligne in lignes if not ligne.matricule]
+            for ligne, matricule in zip(sans_matricule, allouer_matricules(len(sans_matricule), reserves)):
+                ligne.matricule = matricule
+            _creer_lot(lignes, [_construire_employe(ligne, entreprise, utilisateur) for ligne in lignes])
+
+            import_employe.lignes_traitees += len(lignes)
+            import_employe.save(update_fields=['lignes_traitees'])
+            if progression:
+                progression(import_employe)
+    except Exception:
+        import_employe.statut = 'echec'
+        import_employe.save(update_fields=['statut'])
+        raise
+
+    import_employe.total_crees = import_employe.lignes.filter(employe__isnull=False).count()
+    import_employe.statut = 'termine'
+    import_employe.date_fin = timezone.now()
+    import_employe.save(update_fields=['total_crees', 'statut', 'date_fin'])
+    return import_employe.total_crees
@@ -0,0 +1,113 @@
+"""
+Tests de l'importation des employés par la table de transit
+"""
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from core.models import Entreprise, Service
+from employes.models import Employe, ImportEmploye
+from employes.services_import import ErreurImport, analyser_fichier, executer_import
+from paie.models import ElementSalaire
+from datetime import date
+
+User = get_user_model()
+
+ENTETE = 'Matricule;Nom*;Prénoms*;Sexe;N° CNSS;Service;Date embauche\n'
+
+
+def fichier_csv(*lignes):
+    contenu = ENTETE + ''.join(f'{ligne}\n' for ligne in lignes)
+    return SimpleUploadedFile('employes.csv', contenu.encode('utf-8'), content_type='text/csv')
+
+
+class ImportEmployesTest(TestCase):
+    """Analyse et importation d'un fichier CSV d'employés"""
+
+    def setUp(self):
+        self.entreprise = Entreprise.objects.create(
+            nom_entreprise="Entreprise Import",
+            slug="entreprise-import",
+            email="contact@import.com"
+        )
+        self.user = User.objects.create_user(
+            username='rh_import',
+            email='rh@import.com',
+            password='testpass123',
+            entreprise=self.entreprise
+        )
+        self.service = Service.objects.create(
+            entreprise=self.entreprise,
+            code_service='LOG',
+            nom_service='Logistique'
+        )
+        Employe.objects.create(
+            entreprise=self.entreprise,
+            matricule='EXIST01',
+            nom='Camara',
+            prenoms='Aïssatou',
+            sexe='F',
+            num_cnss_individuel='CNSS-EXIST'
+        )
+
+    def test_analyse_doublons_et_references(self):
+        """Doublons (base et fichier), champs obligatoires et service inconnu"""
+        job = analyser_fichier(fichier_csv(
+            ';Diallo;Mamadou;M;CNSS-1;Logistique;01/02/2024',
+            'EXIST01;Bah;Fatou;F;;;',
+            'A01;Sylla;Ibrahima;M;CNSS-1;;',
+            'A01;Barry;Alpha;M;;Inconnu;',
+            ';;Sans nom;M;;;',
+        ), self.entreprise, self.user)
+
+        self.assertEqual(job.total_lignes, 5)
+        lignes = {ligne.numero: ligne for ligne in job.lignes.all()}
+        self.assertEqual(lignes[1].statut, 'ok')
+        self.assertEqual(lignes[1].service, self.service)
+        self.assertIn('existe déjà', lignes[2].erreurs[0])
+        self.assertIn('N° CNSS "CNSS-1" en doublon dans le fichier', lignes[3].erreurs)
+        self.assertIn('Matricule "A01" en doublon dans le fichier', lignes[4].erreurs)
+        self.assertIn('Service "Inconnu" introuvable', lignes[4].avertissements)
+        self.assertEqual(lignes[5].erreurs, ['Nom obligatoire'])
+        self.assertEqual((job.total_ok, job.total_avertissements, job.total_erreurs), (1, 0, 4))
+
+    def test_execution_par_lots(self):
+        """Création en masse, matricules générés et salaire de base"""
+        job = analyser_fichier(fichier_csv(
+            ';Diallo;Mamadou;M;CNSS-1;Logistique;01/02/2024',
+            ';Soumah;Kadiatou;F;;;',
+            'B07;Condé;Sékou;M;CNSS-2;Inconnu;',
+        ), self.entreprise, self.user)
+        progression = []
+
+        crees = executer_import(job, self.user, progression=lambda j: progression.append(j.progression))
+
+        self.assertEqual(crees, 3)
+        job.refresh_from_db()
+        self.assertEqual(job.statut, 'termine')
+        self.assertEqual(progression, [100])
+        diallo = Employe.objects.get(num_cnss_individuel='CNSS-1')
+        self.assertTrue(diallo.matricule.startswith(f'EMP{date.today().year}'))
+        self.assertEqual(diallo.service, self.service)
+        self.assertEqual(diallo.date_embauche, date(2024, 2, 1))
+        self.assertEqual(diallo.entreprise, self.entreprise)
+        self.assertTrue(Employe.objects.filter(matricule='B07', service__isnull=True).exists())
+        self.assertEqual(ElementSalaire.objects.filter(employe__in=job.lignes.values('employe')).count(), 3)
+        with self.assertRaises(ErreurImport):
+            executer_import(job, self.user)
+
+    def test_execution_concurrente(self):
+        """Deux exécutions du même import (double clic) : une seule crée les employés"""
+        job = analyser_fichier(fichier_csv(';Diallo;Mamadou;M;CNSS-1;;'), self.entreprise, self.user)
+        copie = ImportEmploye.objects.get(pk=job.pk)  # chargée avant la première exécution
+
+        self.assertEqual(executer_import(job, self.user), 1)
+        with self.assertRaises(ErreurImport):
+            executer_import(copie, self.user)
+        self.assertEqual(Employe.objects.filter(num_cnss_individuel='CNSS-1').count(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.statut, 'termine')
+
+    def test_fichier_vide(self):
+        with self.assertRaises(ErreurImport):
+            analyser_fichier(fichier_csv(), self.entreprise, self.user)
+        self.assertFalse(ImportEmploye.objects.exists())
@@ -25,6 +25,7 @@ urlpatterns = [
     path('import/template/', views_import.telecharger_template_import, name='telecharger_template'),
     path('import/preview/', views_import.import_employes_preview, name='import_preview'),
     path('import/execute/', views_import.import_employes_execute, name='import_execute'),
+    path('import/<int:pk>/progression/', views_import.import_employes_progression, name='import_progression'),
     path('import/template-salaires/', views_import.telecharger_template_import_salaires, name='template_salaires'),
     
     # Contrats
@@ -3,144 +3,26 @@ Module d'importation des employés et données RH
 Supporte les formats Excel (.xlsx) et CSV (.csv)
 """
 import os
-import io
-import csv
 import traceback
-from datetime import datetime, date
 
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from core.decorators import reauth_required
 from django.contrib import messages
-from django.db import transaction
-from django.http import HttpResponse
+from django.db.models import Case, When
+from django.http import HttpResponse, JsonResponse
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, numbers
 from openpyxl.utils import get_column_letter
 from openpyxl.worksheet.datavalidation import DataValidation
 
-from .models import Employe
+from .models import ImportEmploye
+from .services_import import IMPORT_COLUMNS, ErreurImport, analyser_fichier, executer_import
 from core.models import Etablissement, Service, Poste, Entreprise
 from core.views import log_activity
 
 
-# ============================================================
-#  COLONNES DU TEMPLATE D'IMPORTATION
-# ============================================================
-IMPORT_COLUMNS = [
-    # (nom_colonne, champ_model, obligatoire, description, exemple)
-    # --- RENSEIGNEMENTS ---
-    ('Matricule', 'matricule', False, 'Laisser vide pour génération automatique', 'EMP-001'),
-    ('Civilité', 'civilite', False, 'M. / Mme / Mlle', 'M.'),
-    ('Nom*', 'nom', True, 'Nom de famille (obligatoire)', 'DIALLO'),
-    ('Prénoms*', 'prenoms', True, 'Prénoms (obligatoire)', 'Mamadou Alpha'),
-    ('Sexe', 'sexe', False, 'M ou F', 'M'),
-    ('N° CNSS', 'num_cnss_individuel', False, 'Numéro CNSS individuel', 'CNSS-2024-001'),
-    ('N° Pièce identité', 'numero_piece_identite', False, 'Numéro du document', 'CNI-123456'),
-    ('Statut', 'statut_employe', False, 'actif / suspendu / demissionnaire / licencie / retraite', 'actif'),
-    # --- CONDUCTEUR / TRANSPORT ---
-    ('ID Conducteur', 'id_conducteur', False, 'Identifiant conducteur', 'COND-001'),
-    ('Tracteur', 'tracteur', False, 'Immatriculation ou nom tracteur', 'RC-1234-AB'),
-    ('Citerne', 'citerne', False, 'Immatriculation ou nom citerne', 'CT-5678-CD'),
-    ('N° Permis', 'numero_permis', False, 'Numéro du permis de conduire', 'PG-2024-12345'),
-    ('Date obtention permis', 'date_obtention_permis', False, 'Format JJ/MM/AAAA', '10/05/2015'),
-    ('Date validité permis', 'date_validite_permis', False, 'Format JJ/MM/AAAA', '10/05/2030'),
-    ('Groupe sanguin', 'groupe_sanguin', False, 'A+ / A- / B+ / B- / AB+ / AB- / O+ / O-', 'O+'),
-    ('Chauffeur basé à', 'base_chauffeur', False, 'Lieu d\'affectation du chauffeur', 'Conakry'),
-    ('Camion/Voiture assigné(e)', 'vehicule_assigne', False, 'Véhicule assigné (immat. ou description)', 'RC-9999-AB / Toyota Hilux'),
-    # --- IMMATRICULATIONS / ÉTAT CIVIL ---
-    ('Date de naissance', 'date_naissance', False, 'Format JJ/MM/AAAA', '15/03/1990'),
-    ('Lieu de naissance', 'lieu_naissance', False, 'Ville de naissance', 'Conakry'),
-    ('Nationalité', 'nationalite', False, 'Par défaut : Guinéenne', 'Guinéenne'),
-    ('Situation matrimoniale', 'situation_matrimoniale', False, 'celibataire / marie / divorce / veuf', 'celibataire'),
-    ('Téléphone', 'telephone_principal', False, 'Numéro principal', '+224 620 00 00 00'),
-    ('Email professionnel', 'email_professionnel', False, 'Adresse email pro', 'mdiallo@entreprise.gn'),
-    ('Adresse', 'adresse_actuelle', False, 'Adresse de résidence', 'Kaloum, Conakry'),
-    ('Date embauche', 'date_embauche', False, 'Format JJ/MM/AAAA', '01/01/2024'),
-    # --- PROFESSIONNEL ---
-    ('Établissement', 'etablissement', False, 'Nom de l\'établissement (doit exister)', 'Siège Conakry'),
-    ('Service', 'service', False, 'Nom du service (doit exister)', 'Ressources Humaines'),
-    ('Poste', 'poste', False, 'Intitulé du poste (doit exister)', 'Responsable RH'),
-    ('Type contrat', 'type_contrat', False, 'CDI / CDD / Stage / etc.', 'CDI'),
-    # --- FORMATION TRANSPORT / SÉCURITÉ ---
-    ('Date formation APTH', 'date_formation_apth', False, 'Format JJ/MM/AAAA', '15/06/2023'),
-    ('Ancienneté transport HCL (ans)', 'anciennete_transport_hcl', False, 'Nombre d\'années', '5'),
-    ('Date dernier recyclage', 'date_dernier_recyclage', False, 'Format JJ/MM/AAAA', '20/01/2025'),
-    ('Formation extincteur', 'formation_extincteur', False, 'OUI / NON', 'OUI'),
-    # --- VISITE MÉDICALE ---
-    ('Date visite médicale', 'date_derniere_visite_medicale', False, 'Format JJ/MM/AAAA', '10/02/2025'),
-    ('Service médical accrédité', 'service_medical_accredite', False, 'Nom du centre médical', 'CMC Kaloum'),
-    ('Prochaine visite médicale', 'date_prochaine_visite_medicale', False, 'Format JJ/MM/AAAA', '10/02/2026'),
-    # --- FILIATION ---
-    ('Nombre de femmes', 'nombre_femmes', False, 'Nombre entier', '1'),
-    ('Nombre enfants', 'nombre_enfants', False, 'Nombre entier', '2'),
-    ('Nom du père', 'nom_pere', False, 'Nom complet du père', 'DIALLO Ibrahima'),
-    ('Nom de la mère', 'nom_mere', False, 'Nom complet de la mère', 'BAH Fatoumata'),
-    # --- CONTACT D\'URGENCE ---
-    ('Contact urgence - Nom', 'contact_urgence_nom', False, 'Nom et prénoms', 'CAMARA Moussa'),
-    ('Contact urgence - Lien', 'contact_urgence_lien', False, 'Lien de parenté', 'Frère'),
-    ('Contact urgence - Téléphone', 'contact_urgence_telephone', False, 'Numéro de téléphone', '+224 621 11 11 11'),
-    # --- BANCAIRE ---
-    ('Mode paiement', 'mode_paiement', False, 'virement / cheque / especes / mobile_money', 'virement'),
-    ('Nom banque', 'nom_banque', False, 'Nom de la banque', 'BCRG'),
-    ('N° Compte', 'numero_compte', False, 'Numéro de compte bancaire', '001-234567-89'),
-    ('RIB', 'rib', False, 'Relevé d\'identité bancaire', 'GN12345678901234'),
-]
-
-
-def _generate_matricule(entreprise):
-    """Génère un matricule automatique unique"""
-    prefix = 'EMP'
-    last = Employe.objects.filter(
-        entreprise=entreprise,
-        matricule__startswith=prefix
-    ).order_by('-matricule').first()
-
-    if last:
-        try:
-            num = int(last.matricule.replace(f'{prefix}-', '').replace(prefix, ''))
-            return f'{prefix}-{num + 1:04d}'
-        except (ValueError, AttributeError):
-            pass
-
-    count = Employe.objects.filter(entreprise=entreprise).count()
-    return f'{prefix}-{count + 1:04d}'
-
-
-def _parse_date(value):
-    """Parse une date depuis différents formats"""
-    if value is None or value == '':
-        return None
-    if isinstance(value, (date, datetime)):
-        if isinstance(value, datetime):
-            return value.date()
-        return value
-
-    value = str(value).strip()
-    formats = ['%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%d.%m.%Y', '%Y/%m/%d']
-    for fmt in formats:
-        try:
-            return datetime.strptime(value, fmt).date()
-        except ValueError:
-            continue
-    return None
-
-
-def _parse_int(value, default=0):
-    """Parse un entier"""
-    if value is None or value == '':
-        return default
-    try:
-        return int(float(str(value).strip()))
-    except (ValueError, TypeError):
-        return default
-
-
-def _clean_str(value):
-    """Nettoie une chaîne"""
-    if value is None:
-        return ''
-    return str(value).strip()
+LIMITE_APERCU = 500  # lignes affichées dans l'aperçu
 
 
 # ============================================================
@@ -341,163 +223,34 @@ def import_employes_preview(request):
         return redirect('employes:import_page')
 
     fichier = request.FILES['fichier']
-    nom_fichier = fichier.name.lower()
-
-    if not (nom_fichier.endswith('.xlsx') or nom_fichier.endswith('.csv')):
-        messages.error(request, 'Format non supporté. Utilisez .xlsx ou .csv')
-        return redirect('employes:import_page')
 
-    # Lire le fichier
+    # Lire le fichier en flux vers la table de transit, puis valider
     try:
-        if nom_fichier.endswith('.xlsx'):
-            rows = _read_xlsx(fichier)
-        else:
-            rows = _read_csv(fichier)
+        import_employe = analyser_fichier(fichier, request.user.entreprise, request.user)
+    except ErreurImport as e:
+        messages.error(request, str(e))
+        return redirect('employes:import_page')
     except Exception as e:
         messages.error(request, f'Erreur de lecture du fichier : {str(e)}')
         return redirect('employes:import_page')
 
-    if len(rows) == 0:
-        messages.warning(request, 'Le fichier est vide ou ne contient aucune donnée.')
-        return redirect('employes:import_page')
-
-    if len(rows) > 500:
-        messages.error(request, f'Le fichier contient {len(rows)} lignes. Maximum autorisé : 500.')
-        return redirect('employes:import_page')
+    # Seul l'identifiant de l'import est gardé en session
+    request.session['import_id'] = import_employe.pk
 
-    entreprise = request.user.entreprise
-
-    # Préparer les caches de référence
-    etabs_cache = {e.nom_etablissement.lower(): e for e in Etablissement.objects.filter(
-        societe__entreprise=entreprise, actif=True
-    )}
-    services_cache = {s.nom_service.lower(): s for s in Service.objects.filter(
-        entreprise=entreprise, actif=True
-    )}
-    postes_cache = {p.intitule_poste.lower(): p for p in Poste.objects.filter(
-        entreprise=entreprise, actif=True
-    )}
-
-    # Matricules et CNSS existants
-    matricules_existants = set(Employe.objects.filter(
-        entreprise=entreprise
-    ).values_list('matricule', flat=True))
-    cnss_existants = set(Employe.objects.filter(
-        entreprise=entreprise, num_cnss_individuel__isnull=False
-    ).exclude(num_cnss_individuel='').values_list('num_cnss_individuel', flat=True))
-
-    # Analyser chaque ligne
-    preview_data = []
-    total_ok = 0
-    total_warn = 0
-    total_err = 0
-    matricules_fichier = set()
-    cnss_fichier = set()
-
-    for idx, row in enumerate(rows, 1):
-        line = {'numero': idx, 'donnees': row, 'erreurs': [], 'avertissements': [], 'statut': 'ok'}
-
-        nom = _clean_str(row.get('nom', row.get('Nom*', row.get('Nom', ''))))
-        prenoms = _clean_str(row.get('prenoms', row.get('Prénoms*', row.get('Prénoms', ''))))
-        matricule = _clean_str(row.get('matricule', row.get('Matricule', '')))
-        cnss = _clean_str(row.get('num_cnss_individuel', row.get('N° CNSS', '')))
-
-        # Validations obligatoires
-        if not nom:
-            line['erreurs'].append('Nom obligatoire')
-        if not prenoms:
-            line['erreurs'].append('Prénoms obligatoire')
-
-        # Doublons matricule
-        if matricule:
-            if matricule in matricules_existants:
-                line['erreurs'].append(f'Matricule "{matricule}" existe déjà')
-            elif matricule in matricules_fichier:
-                line['erreurs'].append(f'Matricule "{matricule}" en doublon dans le fichier')
-            else:
-                matricules_fichier.add(matricule)
-
-        # Doublons CNSS
-        if cnss:
-            if cnss in cnss_existants:
-                line['erreurs'].append(f'N° CNSS "{cnss}" existe déjà')
-            elif cnss in cnss_fichier:
-                line['erreurs'].append(f'N° CNSS "{cnss}" en doublon dans le fichier')
-            else:
-                cnss_fichier.add(cnss)
-
-        # Validation dates
-        date_naissance_str = row.get('date_naissance', row.get('Date de naissance', ''))
-        if date_naissance_str and not _parse_date(date_naissance_str):
-            line['avertissements'].append(f'Date naissance invalide : "{date_naissance_str}"')
-
-        date_embauche_str = row.get('date_embauche', row.get('Date embauche', ''))
-        if date_embauche_str and not _parse_date(date_embauche_str):
-            line['avertissements'].append(f'Date embauche invalide : "{date_embauche_str}"')
-
-        # Validations dates supplémentaires (conducteur, formation, visite)
-        for field, label in [
-            ('date_obtention_permis', 'Date obtention permis'),
-            ('date_validite_permis', 'Date validité permis'),
-            ('date_formation_apth', 'Date formation APTH'),
-            ('date_dernier_recyclage', 'Date dernier recyclage'),
-            ('date_derniere_visite_medicale', 'Date visite médicale'),
-            ('date_prochaine_visite_medicale', 'Prochaine visite médicale'),
-        ]:
-            val = row.get(field, row.get(label, ''))
-            if val and not _parse_date(val):
-                line['avertissements'].append(f'{label} invalide : "{val}"')
-
-        # Validation groupe sanguin
-        gs = _clean_str(row.get('groupe_sanguin', row.get('Groupe sanguin', '')))
-        if gs and gs not in ('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-'):
-            line['avertissements'].append(f'Groupe sanguin invalide : "{gs}"')
-
-        # Validation références
-        etab = _clean_str(row.get('etablissement', row.get('Établissement', '')))
-        if etab and etab.lower() not in etabs_cache:
-            line['avertissements'].append(f'Établissement "{etab}" introuvable')
-
-        serv = _clean_str(row.get('service', row.get('Service', '')))
-        if serv and serv.lower() not in services_cache:
-            line['avertissements'].append(f'Service "{serv}" introuvable')
-
-        poste = _clean_str(row.get('poste', row.get('Poste', '')))
-        if poste and poste.lower() not in postes_cache:
-            line['avertissements'].append(f'Poste "{poste}" introuvable')
-
-        # Validation valeurs autorisées
-        sexe = _clean_str(row.get('sexe', row.get('Sexe', '')))
-        if sexe and sexe not in ('M', 'F'):
-            line['avertissements'].append(f'Sexe invalide : "{sexe}" (attendu M ou F)')
-
-        type_contrat = _clean_str(row.get('type_contrat', row.get('Type contrat', '')))
-        types_valides = ('CDI', 'CDD', 'CDImp', 'CTI', 'stage', 'apprentissage', 'temporaire')
-        if type_contrat and type_contrat not in types_valides:
-            line['avertissements'].append(f'Type contrat invalide : "{type_contrat}"')
-
-        # Statut final
-        if line['erreurs']:
-            line['statut'] = 'erreur'
-            total_err += 1
-        elif line['avertissements']:
-            line['statut'] = 'avertissement'
-            total_warn += 1
-        else:
-            total_ok += 1
-
-        preview_data.append(line)
-
-    # Sauvegarder en session pour l'import effectif
-    request.session['import_data'] = rows
-    request.session['import_filename'] = fichier.name
+    # Aperçu : lignes en erreur, puis avec avertissements, puis les autres
+    lignes = import_employe.lignes.order_by(
+        Case(When(statut='erreur', then=0), When(statut='avertissement', then=1), default=2),
+        'numero',
+    )[:LIMITE_APERCU]
 
     context = {
-        'preview_data': preview_data,
-        'total_lignes': len(rows),
-        'total_ok': total_ok,
-        'total_warn': total_warn,
-        'total_err': total_err,
+        'import_employe': import_employe,
+        'preview_data': lignes,
+        'limite_apercu': LIMITE_APERCU,
+        'total_lignes': import_employe.total_lignes,
+        'total_ok': import_employe.total_ok,
+        'total_warn': import_employe.total_avertissements,
+        'total_err': import_employe.total_erreurs,
         'nom_fichier': fichier.name,
         'colonnes': [c[0] for c in IMPORT_COLUMNS],
     }
@@ -505,101 +258,6 @@ def import_employes_preview(request):
     return render(request, 'employes/import_preview.html', context)
 
 
-def _read_xlsx(fichier):
-    """Lit un fichier Excel et retourne une liste de dictionnaires"""
-    from openpyxl import load_workbook
-
-    wb = load_workbook(fichier, read_only=True, data_only=True)
-    ws = wb.active
-
-    rows_iter = ws.iter_rows(values_only=True)
-    headers_raw = next(rows_iter, None)
-    if not headers_raw:
-        return []
-
-    # Nettoyer les en-têtes
-    headers = [_clean_str(h) if h else f'col_{i}' for i, h in enumerate(headers_raw)]
-
-    # Mapper les en-têtes du template vers les noms de champs
-    header_map = {}
-    for col_name, field_name, _, _, _ in IMPORT_COLUMNS:
-        header_map[col_name.lower().rstrip('*')] = field_name
-        header_map[field_name.lower()] = field_name
-
-    # Ligne 2 = descriptions, Ligne 3 = exemple → à ignorer
-    next(rows_iter, None)  # skip ligne 2 (descriptions)
-    next(rows_iter, None)  # skip ligne 3 (exemple)
-
-    rows = []
-    for row_values in rows_iter:
-        if not any(v for v in row_values):
-            continue  # ligne vide
-
-        row_dict = {}
-        for i, val in enumerate(row_values):
-            if i < len(headers):
-                header_lower = headers[i].lower().rstrip('*')
-                field = header_map.get(header_lower, headers[i])
-                row_dict[field] = val
-                # Garder aussi le header original pour le preview
-                row_dict[headers[i]] = val
-
-        rows.append(row_dict)
-
-    wb.close()
-    return rows
-
-
-def _read_csv(fichier):
-    """Lit un fichier CSV et retourne une liste de dictionnaires"""
-    content = fichier.read().decode('utf-8-sig')
-    reader = csv.DictReader(io.StringIO(content), delimiter=';')
-
-    header_map = {}
-    for col_name, field_name, _, _, _ in IMPORT_COLUMNS:
-        header_map[col_name.lower().rstrip('*')] = field_name
-        header_map[field_name.lower()] = field_name
-
-    rows = []
-    row_iter = iter(reader)
-
-    # Si le CSV vient du template, les 2 premières lignes de données
-    # sont les descriptions et l'exemple → les ignorer
-    first_row = next(row_iter, None)
-    if first_row:
-        # Détecter si c'est la ligne de description du template
-        first_vals = [str(v).strip().lower() for v in first_row.values() if v]
-        is_template_desc = any(
-            kw in ' '.join(first_vals)
-            for kw in ['obligatoire', 'laisser vide', 'format jj/mm', 'numéro']
-        )
-        if is_template_desc:
-            # C'est la ligne description → skip aussi la ligne exemple
-            next(row_iter, None)
-        else:
-            # C'est une vraie donnée → la traiter
-            row_dict = {}
-            for key, val in first_row.items():
-                if key:
-                    key_lower = key.strip().lower().rstrip('*')
-                    field = header_map.get(key_lower, key.strip())
-                    row_dict[field] = val
-                    row_dict[key.strip()] = val
-            rows.append(row_dict)
-
-    for row in row_iter:
-        row_dict = {}
-        for key, val in row.items():
-            if key:
-                key_lower = key.strip().lower().rstrip('*')
-                field = header_map.get(key_lower, key.strip())
-                row_dict[field] = val
-                row_dict[key.strip()] = val
-        rows.append(row_dict)
-
-    return rows
-
-
 # ============================================================
 #  IMPORTATION EFFECTIVE
 # ============================================================
@@ -610,172 +268,30 @@ def import_employes_execute(request):
     if request.method != 'POST':
         return redirect('employes:import_page')
 
-    rows = request.session.get('import_data')
-    if not rows:
+    import_employe = ImportEmploye.objects.filter(
+        pk=request.session.get('import_id'), entreprise=request.user.entreprise
+    ).first()
+    if import_employe is None:
         messages.error(request, 'Aucune donnée à importer. Veuillez recommencer.')
         return redirect('employes:import_page')
 
-    entreprise = request.user.entreprise
+    try:
+        created = executer_import(import_employe, request.user)
+    except ErreurImport as e:
+        messages.error(request, str(e))
+        return redirect('employes:import_page')
+    finally:
+        request.session.pop('import_id', None)
 
-    # Caches de référence
-    etabs_cache = {e.nom_etablissement.lower(): e for e in Etablissement.objects.filter(
-        societe__entreprise=entreprise, actif=True
-    )}
-    services_cache = {s.nom_service.lower(): s for s in Service.objects.filter(
-        entreprise=entreprise, actif=True
-    )}
-    postes_cache = {p.intitule_poste.lower(): p for p in Poste.objects.filter(
-        entreprise=entreprise, actif=True
-    )}
-
-    matricules_existants = set(Employe.objects.filter(
-        entreprise=entreprise
-    ).values_list('matricule', flat=True))
-
-    cnss_existants = set(Employe.objects.filter(
-        entreprise=entreprise, num_cnss_individuel__isnull=False
-    ).exclude(num_cnss_individuel='').values_list('num_cnss_individuel', flat=True))
-
-    created = 0
-    errors = []
-    warnings = []
-
-    for idx, row in enumerate(rows, 1):
-        nom = _clean_str(row.get('nom', row.get('Nom*', row.get('Nom', ''))))
-        prenoms = _clean_str(row.get('prenoms', row.get('Prénoms*', row.get('Prénoms', ''))))
-
-        if not nom or not prenoms:
-            errors.append(f'Ligne {idx}: Nom ou Prénoms manquant - ignorée')
-            continue
-
-        matricule = _clean_str(row.get('matricule', row.get('Matricule', '')))
-        cnss = _clean_str(row.get('num_cnss_individuel', row.get('N° CNSS', '')))
-
-        # Vérifier doublons
-        if matricule and matricule in matricules_existants:
-            errors.append(f'Ligne {idx}: Matricule "{matricule}" existe déjà - ignorée')
-            continue
-
-        if cnss and cnss in cnss_existants:
-            errors.append(f'Ligne {idx}: N° CNSS "{cnss}" existe déjà - ignorée')
-            continue
-
-        # Générer matricule si vide
-        if not matricule:
-            matricule = _generate_matricule(entreprise)
-            # S'assurer de l'unicité
-            while matricule in matricules_existants:
-                try:
-                    num = int(matricule.split('-')[-1])
-                    matricule = f'EMP-{num + 1:04d}'
-                except ValueError:
-                    matricule = f'EMP-{created + 1:04d}'
-
-        # Résoudre les références
-        etab_nom = _clean_str(row.get('etablissement', row.get('Établissement', '')))
-        etab = etabs_cache.get(etab_nom.lower()) if etab_nom else None
-
-        serv_nom = _clean_str(row.get('service', row.get('Service', '')))
-        serv = services_cache.get(serv_nom.lower()) if serv_nom else None
-
-        poste_nom = _clean_str(row.get('poste', row.get('Poste', '')))
-        poste = postes_cache.get(poste_nom.lower()) if poste_nom else None
-
-        if etab_nom and not etab:
-            warnings.append(f'Ligne {idx}: Établissement "{etab_nom}" introuvable')
-        if serv_nom and not serv:
-            warnings.append(f'Ligne {idx}: Service "{serv_nom}" introuvable')
-        if poste_nom and not poste:
-            warnings.append(f'Ligne {idx}: Poste "{poste_nom}" introuvable')
-
-        try:
-            with transaction.atomic():
-                # Résoudre le booléen extincteur
-                ext_val = _clean_str(row.get('formation_extincteur', row.get('Formation extincteur', '')))
-                formation_ext = ext_val.upper() in ('OUI', 'YES', '1', 'TRUE', 'O') if ext_val else False
-
-                # Résoudre le statut
-                statut_val = _clean_str(row.get('statut_employe', row.get('Statut', '')))
-                statut_valides = ['actif', 'suspendu', 'demissionnaire', 'licencie', 'retraite']
-                statut_final = statut_val if statut_val in statut_valides else 'actif'
-
-                employe = Employe(
-                    entreprise=entreprise,
-                    matricule=matricule,
-                    nom=nom,
-                    prenoms=prenoms,
-                    civilite=_clean_str(row.get('civilite', row.get('Civilité', ''))) or None,
-                    sexe=_clean_str(row.get('sexe', row.get('Sexe', ''))) or None,
-                    date_naissance=_parse_date(row.get('date_naissance', row.get('Date de naissance', ''))),
-                    lieu_naissance=_clean_str(row.get('lieu_naissance', row.get('Lieu de naissance', ''))) or None,
-                    nationalite=_clean_str(row.get('nationalite', row.get('Nationalité', ''))) or 'Guinéenne',
-                    situation_matrimoniale=_clean_str(row.get('situation_matrimoniale', row.get('Situation matrimoniale', ''))) or None,
-                    nombre_enfants=_parse_int(row.get('nombre_enfants', row.get('Nombre enfants', 0))),
-                    numero_piece_identite=_clean_str(row.get('numero_piece_identite', row.get('N° Pièce identité', ''))) or None,
-                    num_cnss_individuel=cnss or None,
-                    telephone_principal=_clean_str(row.get('telephone_principal', row.get('Téléphone', ''))) or None,
-                    email_professionnel=_clean_str(row.get('email_professionnel', row.get('Email professionnel', ''))) or None,
-                    adresse_actuelle=_clean_str(row.get('adresse_actuelle', row.get('Adresse', ''))) or None,
-                    etablissement=etab,
-                    service=serv,
-                    poste=poste,
-                    date_embauche=_parse_date(row.get('date_embauche', row.get('Date embauche', ''))),
-                    type_contrat=_clean_str(row.get('type_contrat', row.get('Type contrat', ''))) or None,
-                    statut_employe=statut_final,
-                    # Conducteur / Transport
-                    id_conducteur=_clean_str(row.get('id_conducteur', row.get('ID Conducteur', ''))) or None,
-                    tracteur=_clean_str(row.get('tracteur', row.get('Tracteur', ''))) or None,
-                    citerne=_clean_str(row.get('citerne', row.get('Citerne', ''))) or None,
-                    numero_permis=_clean_str(row.get('numero_permis', row.get('N° Permis', ''))) or None,
-                    date_obtention_permis=_parse_date(row.get('date_obtention_permis', row.get('Date obtention permis', ''))),
-                    date_validite_permis=_parse_date(row.get('date_validite_permis', row.get('Date validité permis', ''))),
-                    groupe_sanguin=_clean_str(row.get('groupe_sanguin', row.get('Groupe sanguin', ''))) or None,
-                    base_chauffeur=_clean_str(row.get('base_chauffeur', row.get('Chauffeur basé à', ''))) or None,
-                    vehicule_assigne=_clean_str(row.get('vehicule_assigne', row.get('Camion/Voiture assigné(e)', ''))) or None,
-                    # Formation transport / sécurité
-                    date_formation_apth=_parse_date(row.get('date_formation_apth', row.get('Date formation APTH', ''))),
-                    anciennete_transport_hcl=_parse_int(row.get('anciennete_transport_hcl', row.get('Ancienneté transport HCL (ans)', ''))) or None,
-                    date_dernier_recyclage=_parse_date(row.get('date_dernier_recyclage', row.get('Date dernier recyclage', ''))),
-                    formation_extincteur=formation_ext,
-                    # Visite médicale
-                    date_derniere_visite_medicale=_parse_date(row.get('date_derniere_visite_medicale', row.get('Date visite médicale', ''))),
-                    service_medical_accredite=_clean_str(row.get('service_medical_accredite', row.get('Service médical accrédité', ''))) or None,
-                    date_prochaine_visite_medicale=_parse_date(row.get('date_prochaine_visite_medicale', row.get('Prochaine visite médicale', ''))),
-                    # Filiation
-                    nombre_femmes=_parse_int(row.get('nombre_femmes', row.get('Nombre de femmes', 0))),
-                    nom_pere=_clean_str(row.get('nom_pere', row.get('Nom du père', ''))) or None,
-                    nom_mere=_clean_str(row.get('nom_mere', row.get('Nom de la mère', ''))) or None,
-                    # Contact d'urgence
-                    contact_urgence_nom=_clean_str(row.get('contact_urgence_nom', row.get('Contact urgence - Nom', ''))) or None,
-                    contact_urgence_lien=_clean_str(row.get('contact_urgence_lien', row.get('Contact urgence - Lien', ''))) or None,
-                    contact_urgence_telephone=_clean_str(row.get('contact_urgence_telephone', row.get('Contact urgence - Téléphone', ''))) or None,
-                    # Bancaire
-                    mode_paiement=_clean_str(row.get('mode_paiement', row.get('Mode paiement', ''))) or 'virement',
-                    nom_banque=_clean_str(row.get('nom_banque', row.get('Nom banque', ''))) or None,
-                    numero_compte=_clean_str(row.get('numero_compte', row.get('N° Compte', ''))) or None,
-                    rib=_clean_str(row.get('rib', row.get('RIB', ''))) or None,
-                    utilisateur_creation=request.user,
-                    utilisateur_modification=request.user,
-                )
-                employe.save()
-                matricules_existants.add(matricule)
-                if cnss:
-                    cnss_existants.add(cnss)
-                created += 1
-
-        except Exception as e:
-            errors.append(f'Ligne {idx} ({nom} {prenoms}): {str(e)}')
-
-    # Nettoyer la session
-    if 'import_data' in request.session:
-        del request.session['import_data']
-    if 'import_filename' in request.session:
-        del request.session['import_filename']
+    lignes_erreur = import_employe.lignes.filter(statut='erreur').order_by('numero')
+    lignes_avert = import_employe.lignes.filter(statut='avertissement').order_by('numero')
+    nb_errors = import_employe.total_lignes - created
+    nb_warnings = import_employe.total_avertissements
 
     # Log
     log_activity(
         request,
-        f"Import employés : {created} créés, {len(errors)} erreurs",
+        f"Import employés : {created} créés, {nb_errors} erreurs",
         'employes'
     )
 
@@ -783,23 +299,36 @@ def import_employes_execute(request):
     if created > 0:
         messages.success(request, f'{created} employé(s) importé(s) avec succès !')
 
-    for w in warnings[:10]:
-        messages.warning(request, w)
-    if len(warnings) > 10:
-        messages.warning(request, f'... et {len(warnings) - 10} autres avertissements')
+    for ligne in lignes_avert[:10]:
+        messages.warning(request, f'Ligne {ligne.numero}: {" ; ".join(ligne.avertissements)}')
+    if nb_warnings > 10:
+        messages.warning(request, f'... et {nb_warnings - 10} autres avertissements')
 
-    for e in errors[:10]:
-        messages.error(request, e)
-    if len(errors) > 10:
-        messages.error(request, f'... et {len(errors) - 10} autres erreurs')
+    for ligne in lignes_erreur[:10]:
+        messages.error(request, f'Ligne {ligne.numero}: {" ; ".join(ligne.erreurs)} - ignorée')
+    if nb_errors > 10:
+        messages.error(request, f'... et {nb_errors - 10} autres erreurs')
 
-    if created == 0 and errors:
+    if created == 0 and nb_errors:
         messages.error(request, "Aucun employé n'a été importé. Vérifiez votre fichier.")
         return redirect('employes:import_page')
 
     return redirect('employes:list')
 
 
+@login_required
+def import_employes_progression(request, pk):
+    """Progression d'un import (interrogée par la page d'aperçu pendant l'importation)"""
+    import_employe = get_object_or_404(ImportEmploye, pk=pk, entreprise=request.user.entreprise)
+    return JsonResponse({
+        'statut': import_employe.statut,
+        'lignes_traitees': import_employe.lignes_traitees,
+        'total': import_employe.total_importables,
+        'progression': import_employe.progression,
+        'total_crees': import_employe.total_crees,
+    })
+
+
 # ============================================================
 #  TEMPLATE D'IMPORTATION DES ÉLÉMENTS DE SALAIRE
 # ============================================================
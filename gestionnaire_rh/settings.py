@@ -92,10 +92,10 @@ MIDDLEWARE = [
     # Security middlewares
     'axes.middleware.AxesMiddleware',
     'django_permissions_policy.PermissionsPolicyMiddleware',
-    'core.middleware.SQLInjectionProtectionMiddleware',
-    'core.middleware.XSSProtectionMiddleware',
+    'core.middleware.RequestInspectionMiddleware',  # SQL + XSS en une passe
     'core.middleware.RequestLoggingMiddleware',
     # Multi-company middleware
+    'core.middleware.EntrepriseContextMiddleware',  # request.entreprise_ctx
     'core.middleware.EntrepriseQuotaMiddleware',
     # Protection anti-falsification
     'core.middleware_guardian.ProjectIntegrityMiddleware',
@@ -421,6 +421,9 @@ IP_WHITELIST = config('IP_WHITELIST', default='').split(',') if config('IP_WHITE
 # Security Logging
 SECURITY_LOGGING_ENABLED = True
 
+# Inspection SQL/XSS des requêtes : caractères examinés par valeur
+SECURITY_INSPECTION_MAX_CHARS = 20000
+
 # File Upload Security
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
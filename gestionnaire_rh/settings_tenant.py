@@ -107,8 +107,7 @@ MIDDLEWARE = [
     # Security middlewares
     'axes.middleware.AxesMiddleware',
     'core.middleware.SecurityHeadersMiddleware',
-    'core.middleware.SQLInjectionProtectionMiddleware',
-    'core.middleware.XSSProtectionMiddleware',
+    'core.middleware.RequestInspectionMiddleware',  # SQL + XSS en une passe
     'core.middleware.RequestLoggingMiddleware',
 ]
 
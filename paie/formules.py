@@ -18,10 +18,13 @@ Phases de calcul (restreignent les variables accessibles) :
   retenues    → + total_retenues (tout sauf net)
   net         → toutes les variables
 """
+import ast
 import re
+import threading
 from decimal import Decimal
+from functools import lru_cache
 
-from simpleeval import simple_eval, NameNotDefined, InvalidExpression
+from simpleeval import SimpleEval, InvalidExpression
 
 # ---------------------------------------------------------------------------
 # Variables & phases
@@ -46,16 +49,6 @@ VARIABLES_PAR_PHASE = {
     'net':         VARIABLES_AUTORISEES,
 }
 
-# Fonctions autorisées dans les formules
-FONCTIONS_AUTORISEES = {
-    'min': min,
-    'max': max,
-    'abs': abs,
-    'round': round,
-    'int': int,
-    'float': float,
-}
-
 # Mots interdits dans les formules (double sécurité en plus de simpleeval)
 MOTS_INTERDITS = [
     'import', 'exec', 'eval', 'open', 'file', '__',
@@ -66,55 +59,146 @@ MOTS_INTERDITS = [
 
 
 # ---------------------------------------------------------------------------
-# Évaluation sécurisée
+# Compilation & évaluation sécurisées
 # ---------------------------------------------------------------------------
 
+# Fonctions autorisées dans les formules (calcul en Decimal de bout en bout)
+FONCTIONS_AUTORISEES = {
+    'min': min,
+    'max': max,
+    'abs': abs,
+    'round': round,
+    'int': int,
+    'float': lambda valeur: _en_decimal(valeur),  # compatibilité des formules existantes
+}
+
+TAILLE_CACHE_FORMULES = 512
+
+_evaluateurs = threading.local()
+
+
+def _en_decimal(valeur) -> Decimal:
+    if isinstance(valeur, Decimal):
+        return valeur
+    if valeur is None:
+        return Decimal('0')
+    if isinstance(valeur, float):
+        return Decimal(str(valeur))
+    return Decimal(valeur)
+
+
+def _evaluateur() -> SimpleEval:
+    """Évaluateur simpleeval propre au thread (son état change à chaque évaluation)."""
+    evaluateur = getattr(_evaluateurs, 'evaluateur', None)
+    if evaluateur is None:
+        evaluateur = SimpleEval(functions=FONCTIONS_AUTORISEES)
+        _evaluateurs.evaluateur = evaluateur
+    return evaluateur
+
+
+class FormuleCompilee:
+    """
+    Formule validée et analysée une seule fois.
+
+    Les mots interdits, la syntaxe et les variables de la phase sont vérifiés
+    à la compilation ; les littéraux décimaux de l'arbre sont convertis en
+    ``Decimal``. L'évaluation ne fait plus que parcourir l'arbre avec les
+    variables utilisées par la formule.
+    """
+
+    def __init__(self, formule: str, phase: str = None):
+        if not formule or not formule.strip():
+            raise ValueError("Formule vide")
+
+        formule_lower = formule.lower()
+        for mot in MOTS_INTERDITS:
+            if mot in formule_lower:
+                raise ValueError(f"Mot interdit dans la formule : '{mot}'")
+
+        self.formule = formule
+        self.phase = phase
+        # Déterminer les variables accessibles selon la phase
+        self.vars_autorisees = VARIABLES_PAR_PHASE.get(phase, VARIABLES_AUTORISEES) if phase else VARIABLES_AUTORISEES
+
+        try:
+            self.arbre = SimpleEval.parse(formule)
+        except (InvalidExpression, SyntaxError) as exc:
+            raise ValueError(f"Formule invalide '{formule}' : {exc}") from exc
+
+        noms = set()
+        for noeud in ast.walk(self.arbre):
+            if isinstance(noeud, ast.Constant) and isinstance(noeud.value, float):
+                noeud.value = Decimal(repr(noeud.value))
+            elif isinstance(noeud, ast.Name) and noeud.id not in FONCTIONS_AUTORISEES:
+                noms.add(noeud.id)
+
+        inconnues = noms - self.vars_autorisees
+        if inconnues:
+            if phase:
+                raise ValueError(
+                    f"Variable indisponible en phase '{phase}' dans la formule '{formule}'. "
+                    f"Variables autorisées : {', '.join(sorted(self.vars_autorisees))}"
+                )
+            raise ValueError(
+                f"Erreur dans la formule '{formule}' : variable inconnue "
+                f"{', '.join(sorted(inconnues))}"
+            )
+        self.variables = frozenset(noms)
+
+    def evaluer(self, variables: dict) -> Decimal:
+        """Évalue la formule pour un jeu de variables (valeurs absentes = 0)."""
+        evaluateur = _evaluateur()
+        evaluateur.names = {var: _en_decimal(variables.get(var, 0)) for var in self.variables}
+        try:
+            resultat = evaluateur.eval(self.formule, previously_parsed=self.arbre)
+            return max(Decimal('0'), _en_decimal(resultat))
+        except ZeroDivisionError:
+            return Decimal('0')
+        except (InvalidExpression, SyntaxError, TypeError) as exc:
+            raise ValueError(f"Formule invalide '{self.formule}' : {exc}") from exc
+        except Exception as exc:
+            raise ValueError(f"Erreur dans la formule '{self.formule}' : {exc}") from exc
+
+    def evaluer_lot(self, lignes) -> list:
+        """Évalue la formule pour chaque jeu de variables de ``lignes`` (un par employé)."""
+        return [self.evaluer(variables) for variables in lignes]
+
+
+@lru_cache(maxsize=TAILLE_CACHE_FORMULES)
+def compiler_formule(formule: str, phase: str = None) -> FormuleCompilee:
+    """
+    Compile une formule (mémorisé par texte de formule et phase).
+
+    :raises ValueError: Si la formule est vide, contient des mots interdits,
+                        est invalide ou utilise une variable hors phase
+    """
+    return FormuleCompilee(formule, phase)
+
+
 def evaluer_formule(formule: str, variables: dict, phase: str = None) -> Decimal:
     """
     Évalue une formule de paie via simpleeval (sandboxé, pas de eval/exec).
 
+    La formule n'est analysée qu'une fois par (texte, phase) ; le calcul
+    se fait en ``Decimal``.
+
     :param formule: Expression simple (ex: ``brut * 0.25``, ``min(indemnites, brut * 0.25)``)
     :param variables: Dictionnaire des valeurs (clés = noms de variables)
     :param phase: Phase de calcul (gains/cotisations/fiscal/retenues/net).
                   Restreint les variables accessibles pour éviter les dépendances circulaires.
     :raises ValueError: Si la formule est vide, contient des mots interdits ou est invalide
     """
-    if not formule or not formule.strip():
-        raise ValueError("Formule vide")
-
-    formule_lower = formule.lower()
-    for mot in MOTS_INTERDITS:
-        if mot in formule_lower:
-            raise ValueError(f"Mot interdit dans la formule : '{mot}'")
+    return compiler_formule(formule, phase).evaluer(variables)
 
-    # Déterminer les variables accessibles selon la phase
-    vars_autorisees = VARIABLES_PAR_PHASE.get(phase, VARIABLES_AUTORISEES) if phase else VARIABLES_AUTORISEES
 
-    # Construire le namespace filtré
-    names = {}
-    for var in vars_autorisees:
-        names[var] = float(variables.get(var, 0))
+def evaluer_formule_lot(formule: str, lignes, phase: str = None) -> list:
+    """
+    Évalue une même formule pour une liste de jeux de variables (un par employé).
 
-    try:
-        resultat = simple_eval(
-            formule,
-            names=names,
-            functions=FONCTIONS_AUTORISEES,
-        )
-        return Decimal(str(max(0.0, float(resultat))))
-    except ZeroDivisionError:
-        return Decimal('0')
-    except NameNotDefined as exc:
-        if phase:
-            raise ValueError(
-                f"Variable indisponible en phase '{phase}' dans la formule '{formule}'. "
-                f"Variables autorisées : {', '.join(sorted(vars_autorisees))}"
-            ) from exc
-        raise ValueError(f"Erreur dans la formule '{formule}' : {exc}") from exc
-    except (InvalidExpression, SyntaxError, TypeError) as exc:
-        raise ValueError(f"Formule invalide '{formule}' : {exc}") from exc
-    except Exception as exc:
-        raise ValueError(f"Erreur dans la formule '{formule}' : {exc}") from exc
+    :return: Liste de ``Decimal`` dans l'ordre de ``lignes``
+    :raises ValueError: Si la formule est invalide (levée avant toute évaluation)
+    """
+    return compiler_formule(formule, phase).evaluer_lot(lignes)
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,58 @@
+"""
+Archivage légal des bulletins d'une période : archivage en lot, vérification
+d'intégrité d'après le manifeste, restauration des PDF dans un répertoire.
+Usage:
+    python manage.py archives_bulletins --periode 2025-10 --archiver [--workers 4]
+    python manage.py archives_bulletins --periode 2025-10 --verifier
+    python manage.py archives_bulletins --periode 2025-10 --restaurer /chemin/destination
+"""
+from django.core.management.base import BaseCommand
+
+from paie.models import PeriodePaie
+from paie.services_archive import ArchivageService
+
+
+class Command(BaseCommand):
+    help = 'Archiver, vérifier ou restaurer les bulletins archivés d\'une période'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--periode', type=str, required=True, help='Période au format AAAA-MM')
+        parser.add_argument('--entreprise', type=str, help='UUID de l\'entreprise (défaut : toutes)')
+        action = parser.add_mutually_exclusive_group(required=True)
+        action.add_argument('--archiver', action='store_true', help='Archiver les bulletins validés')
+        action.add_argument('--verifier', action='store_true', help='Vérifier l\'intégrité des archives')
+        action.add_argument('--restaurer', type=str, metavar='REPERTOIRE',
+                            help='Recopier les PDF archivés dans ce répertoire')
+        parser.add_argument('--workers', type=int, help='Threads de rendu PDF pour --archiver')
+
+    def handle(self, *args, **options):
+        try:
+            annee, mois = map(int, options['periode'].split('-'))
+        except ValueError:
+            self.stdout.write(self.style.ERROR('Format de période invalide. Utilisez AAAA-MM'))
+            return
+        periodes = PeriodePaie.objects.filter(annee=annee, mois=mois).select_related('entreprise')
+        if options.get('entreprise'):
+            periodes = periodes.filter(entreprise_id=options['entreprise'])
+
+        for periode in periodes:
+            libelle = f'{periode} ({periode.entreprise})'
+            if options['archiver']:
+                stats = ArchivageService.archiver_periode(periode, workers=options.get('workers'))
+                self.stdout.write(self.style.SUCCESS(
+                    f"{libelle} : {stats['archivés']} archivé(s), {stats['dedoublonnes']} déjà stocké(s), "
+                    f"{stats['erreurs']} erreur(s)"))
+            elif options['verifier']:
+                rapport = ArchivageService.verifier_periode(periode)
+                anomalies = rapport['alterees'] + rapport['manquantes']
+                style = self.style.ERROR if anomalies else self.style.SUCCESS
+                self.stdout.write(style(
+                    f"{libelle} : {rapport['verifiees']} intègre(s), {len(rapport['alterees'])} altérée(s), "
+                    f"{len(rapport['manquantes'])} manquante(s), "
+                    f"{len(rapport['hors_manifeste'])} hors manifeste"))
+                for matricule in anomalies:
+                    self.stdout.write(f'   ✗ {matricule}')
+            else:
+                stats = ArchivageService.restaurer_periode(periode, options['restaurer'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"{libelle} : {stats['restaures']} PDF restauré(s), {len(stats['erreurs'])} erreur(s)"))
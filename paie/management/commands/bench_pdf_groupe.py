@@ -0,0 +1,78 @@
+"""
+Mesure le débit du PDF groupé des bulletins (pages par seconde).
+
+Usage:
+    # Livre de paie complet d'une période
+    python manage.py bench_pdf_groupe --periode-id 12
+
+    # 500 bulletins seulement, avec filigrane, PDF conservé
+    python manage.py bench_pdf_groupe --periode-id 12 --limite 500 --filigrane --sortie livre.pdf
+"""
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from paie.models import BulletinPaie, PeriodePaie
+from paie.services_export_pdf import PDFGroupeTropVolumineux, generer_pdf_groupe, verifier_taille_pdf_groupe
+
+
+class Command(BaseCommand):
+    help = 'Mesure le nombre de pages par seconde du PDF groupé des bulletins'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--periode-id',
+            type=int,
+            required=True,
+            help='Identifiant de la période de paie'
+        )
+        parser.add_argument(
+            '--limite',
+            type=int,
+            help='Nombre maximum de bulletins à rendre'
+        )
+        parser.add_argument(
+            '--filigrane',
+            action='store_true',
+            help='Logo de l\'entreprise en filigrane sur chaque page'
+        )
+        parser.add_argument(
+            '--sortie',
+            type=str,
+            help='Chemin du PDF produit (par défaut : fichier temporaire supprimé)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            periode = PeriodePaie.objects.get(pk=options['periode_id'])
+        except PeriodePaie.DoesNotExist:
+            raise CommandError(f"Période {options['periode_id']} introuvable")
+
+        bulletins = BulletinPaie.objects.filter(periode=periode).select_related(
+            'employe__entreprise', 'employe__poste', 'employe__service', 'periode',
+        ).order_by('employe__nom', 'pk')
+        if options['limite']:
+            bulletins = bulletins[:options['limite']]
+
+        try:
+            verifier_taille_pdf_groupe(bulletins.count())
+        except PDFGroupeTropVolumineux as e:
+            raise CommandError(f"{e} (PAIE_PDF_GROUPE_MAX_BULLETINS ou --limite)")
+
+        if options['sortie']:
+            with open(options['sortie'], 'wb') as fichier:
+                resultat = generer_pdf_groupe(bulletins.iterator(chunk_size=200), fichier,
+                                              filigrane=options['filigrane'])
+            taille = os.path.getsize(options['sortie'])
+        else:
+            with tempfile.TemporaryFile() as fichier:
+                resultat = generer_pdf_groupe(bulletins.iterator(chunk_size=200), fichier,
+                                              filigrane=options['filigrane'])
+                taille = fichier.tell()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{periode} : {resultat['bulletins']} bulletins, {resultat['pages']} pages "
+            f"en {resultat['duree']:.2f} s → {resultat['pages_par_seconde']:.1f} pages/s "
+            f"({taille / 1024:.0f} Ko)"
+        ))
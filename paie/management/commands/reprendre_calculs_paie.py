@@ -0,0 +1,45 @@
+"""
+Reprend les calculs de période interrompus (redémarrage serveur, crash worker).
+Usage: python manage.py reprendre_calculs_paie [--periode 2025-10]
+"""
+from django.core.management.base import BaseCommand
+
+from paie.models import PeriodePaie
+from paie.services_bulk import CalculPeriodeParLots
+
+
+class Command(BaseCommand):
+    help = 'Reprendre les calculs de période par lots interrompus'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--periode',
+            type=str,
+            help='Période au format AAAA-MM (optionnel, sinon toutes les périodes)'
+        )
+
+    def handle(self, *args, **options):
+        periodes = PeriodePaie.objects.filter(calculs__isnull=False).distinct()
+        if options.get('periode'):
+            try:
+                annee, mois = map(int, options['periode'].split('-'))
+            except ValueError:
+                self.stdout.write(self.style.ERROR('Format de période invalide. Utilisez AAAA-MM'))
+                return
+            periodes = periodes.filter(annee=annee, mois=mois)
+
+        repris = 0
+        for periode in periodes:
+            job = CalculPeriodeParLots.job_a_reprendre(periode)
+            if job is None:
+                continue
+            restants = job.lots.exclude(statut='termine').count()
+            self.stdout.write(f'🔁 {periode} ({job.entreprise}) : {restants} lot(s) à reprendre')
+            job = CalculPeriodeParLots.demarrer(periode, job.entreprise).executer()
+            repris += 1
+            self.stdout.write(
+                self.style.SUCCESS(f'   → {job.get_statut_display()} : {job.bulletins_crees} bulletin(s)')
+            )
+
+        if not repris:
+            self.stdout.write('Aucun calcul interrompu.')
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0020_accesentreprise_actif_accesentreprise_date_debut_and_more'),
+        ('paie', '0133_modele_standard_guineerh'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalculPeriodeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('termine', 'Terminé'), ('partiel', 'Terminé avec erreurs'), ('echec', 'Échec')], default='en_attente', max_length=20)),
+                ('taille_lot', models.PositiveIntegerField(default=100)),
+                ('nombre_employes', models.PositiveIntegerField(default=0)),
+                ('nombre_lots', models.PositiveIntegerField(default=0)),
+                ('bulletins_crees', models.PositiveIntegerField(default=0)),
+                ('message', models.TextField(blank=True)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_debut', models.DateTimeField(blank=True, null=True)),
+                ('date_fin', models.DateTimeField(blank=True, null=True)),
+                ('date_maj', models.DateTimeField(auto_now=True, help_text='Dernier signe de vie du calcul')),
+                ('entreprise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calculs_paie', to='core.entreprise')),
+                ('periode', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calculs', to='paie.periodepaie')),
+                ('utilisateur', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Calcul de période',
+                'verbose_name_plural': 'Calculs de période',
+                'db_table': 'calculs_periode_paie',
+                'ordering': ['-date_creation'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LotCalculPaie',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.PositiveIntegerField()),
+                ('employe_ids', models.JSONField(default=list)),
+                ('numeros_bulletins', models.JSONField(blank=True, default=dict, help_text='Numéros réservés {employe_id: numero} pour les nouveaux bulletins')),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('termine', 'Terminé'), ('echec', 'Échec')], default='en_attente', max_length=20)),
+                ('bulletins_crees', models.PositiveIntegerField(default=0)),
+                ('erreurs', models.JSONField(blank=True, default=list)),
+                ('tentatives', models.PositiveIntegerField(default=0)),
+                ('date_debut', models.DateTimeField(blank=True, null=True)),
+                ('date_fin', models.DateTimeField(blank=True, null=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lots', to='paie.calculperiodejob')),
+            ],
+            options={
+                'verbose_name': 'Lot de calcul',
+                'verbose_name_plural': 'Lots de calcul',
+                'db_table': 'lots_calcul_paie',
+                'ordering': ['job', 'numero'],
+                'unique_together': {('job', 'numero')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='calculperiodejob',
+            index=models.Index(fields=['periode', 'statut'], name='idx_calcul_periode_statut'),
+        ),
+    ]
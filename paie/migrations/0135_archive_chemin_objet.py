@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paie', '0134_calcul_periode_lots'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivebulletin',
+            name='fichier_pdf',
+            field=models.FileField(help_text='Bulletin PDF archivé (stocké par empreinte SHA256)', max_length=255, upload_to='archives/bulletins/%Y/%m/'),
+        ),
+    ]
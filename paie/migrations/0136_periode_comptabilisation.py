@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comptabilite', '0021_vieillissement_index'),
+        ('paie', '0135_archive_chemin_objet'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='periodepaie',
+            name='date_comptabilisation',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='periodepaie',
+            name='ecritures_comptables',
+            field=models.ManyToManyField(blank=True, related_name='periodes_paie', to='comptabilite.ecriturecomptable'),
+        ),
+    ]
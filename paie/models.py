@@ -37,6 +37,10 @@ class PeriodePaie(models.Model):
     date_cloture = models.DateTimeField(blank=True, null=True)
     utilisateur_cloture = models.ForeignKey(Utilisateur, on_delete=models.SET_NULL, null=True, related_name='periodes_cloturees')
     observations = models.TextField(blank=True, null=True)
+    # Comptabilisation en cours : vidée par la contrepassation des écritures
+    date_comptabilisation = models.DateTimeField(blank=True, null=True)
+    ecritures_comptables = models.ManyToManyField('comptabilite.EcritureComptable', blank=True,
+                                                  related_name='periodes_paie')
     
     # Manager optimisé
     objects = PeriodePaieManager()
@@ -1013,7 +1017,8 @@ class ArchiveBulletin(models.Model):
     bulletin = models.OneToOneField(BulletinPaie, on_delete=models.CASCADE, related_name='archive')
     
     # Fichier PDF
-    fichier_pdf = models.FileField(upload_to='archives/bulletins/%Y/%m/', help_text='Bulletin PDF archivé')
+    fichier_pdf = models.FileField(upload_to='archives/bulletins/%Y/%m/', max_length=255,
+                                   help_text='Bulletin PDF archivé (stocké par empreinte SHA256)')
     taille_fichier = models.IntegerField(default=0, help_text='Taille en octets')
     hash_fichier = models.CharField(max_length=64, blank=True, help_text='SHA256 pour vérification intégrité')
     
@@ -1046,6 +1051,103 @@ class ArchiveBulletin(models.Model):
         return f"{self.employe_matricule} - {self.periode_mois:02d}/{self.periode_annee}"
 
 
+# ============================================================================
+# CALCUL DE PÉRIODE PAR LOTS (reprise après incident)
+# ============================================================================
+
+class CalculPeriodeJob(models.Model):
+    """Calcul d'une période découpé en lots validés séparément.
+
+    Chaque lot est commité dans sa propre transaction : un incident en fin de
+    calcul ne fait perdre que le lot en cours, et une reprise ne recalcule pas
+    les lots déjà terminés.
+    """
+    STATUTS = (
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours'),
+        ('termine', 'Terminé'),
+        ('partiel', 'Terminé avec erreurs'),
+        ('echec', 'Échec'),
+    )
+    STATUTS_ACTIFS = ('en_attente', 'en_cours')
+
+    periode = models.ForeignKey(PeriodePaie, on_delete=models.CASCADE, related_name='calculs')
+    entreprise = models.ForeignKey(Entreprise, on_delete=models.CASCADE, related_name='calculs_paie')
+    utilisateur = models.ForeignKey(Utilisateur, on_delete=models.SET_NULL, null=True, blank=True)
+    statut = models.CharField(max_length=20, choices=STATUTS, default='en_attente')
+    taille_lot = models.PositiveIntegerField(default=100)
+    nombre_employes = models.PositiveIntegerField(default=0)
+    nombre_lots = models.PositiveIntegerField(default=0)
+    bulletins_crees = models.PositiveIntegerField(default=0)
+    message = models.TextField(blank=True)
+
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_debut = models.DateTimeField(null=True, blank=True)
+    date_fin = models.DateTimeField(null=True, blank=True)
+    date_maj = models.DateTimeField(auto_now=True, help_text='Dernier signe de vie du calcul')
+
+    class Meta:
+        db_table = 'calculs_periode_paie'
+        verbose_name = 'Calcul de période'
+        verbose_name_plural = 'Calculs de période'
+        ordering = ['-date_creation']
+        indexes = [
+            models.Index(fields=['periode', 'statut'], name='idx_calcul_periode_statut'),
+        ]
+
+    def __str__(self):
+        return f"Calcul {self.periode} — {self.get_statut_display()}"
+
+    @property
+    def est_actif(self):
+        return self.statut in self.STATUTS_ACTIFS
+
+    @property
+    def lots_termines(self):
+        return self.lots.filter(statut='termine').count()
+
+    @property
+    def progression(self):
+        """Pourcentage de lots terminés (0-100)."""
+        if not self.nombre_lots:
+            return 100 if self.statut in ('termine', 'partiel') else 0
+        return int(self.lots_termines * 100 / self.nombre_lots)
+
+
+class LotCalculPaie(models.Model):
+    """Lot d'employés calculés et commités ensemble"""
+    STATUTS = (
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours'),
+        ('termine', 'Terminé'),
+        ('echec', 'Échec'),
+    )
+
+    job = models.ForeignKey(CalculPeriodeJob, on_delete=models.CASCADE, related_name='lots')
+    numero = models.PositiveIntegerField()
+    employe_ids = models.JSONField(default=list)
+    numeros_bulletins = models.JSONField(
+        default=dict, blank=True,
+        help_text='Numéros réservés {employe_id: numero} pour les nouveaux bulletins'
+    )
+    statut = models.CharField(max_length=20, choices=STATUTS, default='en_attente')
+    bulletins_crees = models.PositiveIntegerField(default=0)
+    erreurs = models.JSONField(default=list, blank=True)
+    tentatives = models.PositiveIntegerField(default=0)
+    date_debut = models.DateTimeField(null=True, blank=True)
+    date_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'lots_calcul_paie'
+        verbose_name = 'Lot de calcul'
+        verbose_name_plural = 'Lots de calcul'
+        ordering = ['job', 'numero']
+        unique_together = ['job', 'numero']
+
+    def __str__(self):
+        return f"Lot {self.numero} ({self.get_statut_display()})"
+
+
 class ConfigurationPaieEntreprise(models.Model):
     """Configuration des paramètres de paie par entreprise
     Permet d'adapter le système au Code du Travail OU aux conventions collectives
@@ -9,7 +9,7 @@ OPTIMISATIONS PERFORMANCE:
 """
 from decimal import Decimal, ROUND_HALF_UP, ROUND_FLOOR
 from paie.utils_arrondi import precise, money, money_int
-from datetime import date, timedelta
+from datetime import date
 import calendar
 from django.db import transaction
 from django.db import models
@@ -21,9 +21,10 @@ from .models import (
     RubriquePaie, Constante, TrancheRTS, PeriodePaie, HistoriquePaie
 )
 from .cache_service import PayrollCacheService
+from .services_temps_travail import TempsTravailPeriode
 from employes.models import Employe
-from temps_travail.models import Pointage, Absence, Conge
 from core.services.devises import DeviseService
+from core.services.sequences import SequenceService
 from core.models import Devise
 import calendar
 
@@ -78,12 +79,132 @@ CODES_EXACTS_FORFAITAIRES = {
 }
 
 
+# Mapping champ ConfigurationPaieEntreprise -> clé Constante
+# NB: taux_taxe_apprentissage et taux_onfpp sont EXCLUS car fixés par la loi
+MAPPING_CONFIG_CONSTANTES = {
+    'taux_cnss_employe': 'TAUX_CNSS_EMPLOYE',
+    'taux_cnss_employeur': 'TAUX_CNSS_EMPLOYEUR',
+    'plafond_cnss': 'PLAFOND_CNSS',
+    'plancher_cnss': 'PLANCHER_CNSS',
+    'taux_versement_forfaitaire': 'TAUX_VF',
+}
+# HS : ConfigPaie stocke la majoration (30%), le moteur attend le coefficient (130%)
+MAPPING_CONFIG_HS = {
+    'taux_hs_4_premieres': 'TAUX_HS_4PREM',
+    'taux_hs_au_dela': 'TAUX_HS_AUDELA',
+    'taux_hs_nuit': 'TAUX_HS_NUIT',
+    'taux_hs_dimanche': 'TAUX_HS_FERIE_JOUR',
+    'taux_hs_ferie_nuit': 'TAUX_HS_FERIE_NUIT',
+}
+
+
+def appliquer_config_entreprise(constantes, config):
+    """Surcharge (en place) les constantes globales avec la config de l'entreprise."""
+    for champ, cle in MAPPING_CONFIG_CONSTANTES.items():
+        valeur = getattr(config, champ, None)
+        if valeur is not None:
+            constantes[cle] = Decimal(str(valeur))
+
+    for champ, cle in MAPPING_CONFIG_HS.items():
+        valeur = getattr(config, champ, None)
+        if valeur is not None:
+            # Majoration (30) → coefficient (130)
+            constantes[cle] = Decimal(str(valeur)) + Decimal('100')
+
+
+def resoudre_config_conges(entreprise):
+    """Configuration de paie portant les règles de congés acquis."""
+    from .models import ConfigurationPaieEntreprise
+    config_paie = None
+    # Fallback robuste: chercher par entreprise directement dans le modèle
+    if entreprise:
+        config_paie = ConfigurationPaieEntreprise.objects.filter(
+            entreprise=entreprise
+        ).first()
+    # Fallback final: première config disponible
+    if not config_paie:
+        config_paie = ConfigurationPaieEntreprise.objects.first()
+    return config_paie
+
+
+def _dernier_numero_bulletin(periode):
+    """Dernier numéro de bulletin attribué pour la période, lu dans les bulletins existants."""
+    prefix = f"BUL-{periode.annee}-{periode.mois:02d}"
+    # Utiliser le dernier numéro existant pour ce préfixe, pas count()
+    # count() provoque des collisions si un bulletin a été supprimé
+    last = BulletinPaie.objects.filter(
+        numero_bulletin__startswith=prefix
+    ).order_by('-numero_bulletin').first()
+    if not last:
+        return 0
+    try:
+        return int(last.numero_bulletin.split('-')[-1])
+    except (ValueError, IndexError):
+        return BulletinPaie.objects.filter(
+            annee_paie=periode.annee,
+            mois_paie=periode.mois
+        ).count()
+
+
+def allouer_numeros_bulletins(periode, quantite=1):
+    """
+    Attribue ``quantite`` numéros de bulletin consécutifs pour la période.
+
+    Les numéros étant uniques sur toute l'instance, le compteur n'est pas
+    rattaché à une entreprise.
+    """
+    prefix = f"BUL-{periode.annee}-{periode.mois:02d}"
+    premier = SequenceService.reserver(
+        prefix, periode.annee, quantite, depart=lambda: _dernier_numero_bulletin(periode)
+    )
+    return [f"{prefix}-{numero:04d}" for numero in range(premier, premier + quantite)]
+
+
+RUBRIQUES_SYSTEME = ('absence', 'hs', 'cnss', 'irg')
+
+
+def rechercher_rubrique_systeme(cle):
+    """
+    Rubrique active portant une ligne calculée par le moteur.
+
+    :param cle: 'absence', 'hs', 'cnss' ou 'irg'
+    :return: RubriquePaie ou None si aucune rubrique ne correspond
+    """
+    rubriques = RubriquePaie.objects.filter(actif=True)
+    if cle == 'absence':
+        return rubriques.filter(code_rubrique__icontains='ABSENCE', type_rubrique='retenue').first()
+    if cle == 'hs':
+        return rubriques.filter(code_rubrique__icontains='HS', type_rubrique='gain').first()
+
+    retenues = rubriques.filter(type_rubrique__in=['retenue', 'cotisation'])
+    if cle == 'cnss':
+        # Par code, sinon par libellé
+        return (
+            retenues.filter(code_rubrique__icontains='CNSS').first()
+            or retenues.filter(libelle_rubrique__icontains='CNSS').first()
+        )
+    if cle == 'irg':
+        return (
+            retenues.filter(code_rubrique__iregex=r'(IRS|IRG|RTS|IRPP)').first()
+            or retenues.filter(libelle_rubrique__iregex=r'(IRS|IRG|RTS|IRPP|Impôt|Revenu)').first()
+        )
+    raise ValueError(f"Rubrique système inconnue : {cle}")
+
+
 class MoteurCalculPaie:
     """Moteur de calcul automatique de la paie"""
     
-    def __init__(self, employe, periode):
+    def __init__(self, employe, periode, contexte=None, temps_travail=None):
+        """
+        :param contexte: PeriodeContext optionnel (paie.services_contexte) partagé
+            par tous les employés de la période ; sans contexte, les données
+            communes sont chargées par le moteur lui-même.
+        :param temps_travail: totaux de temps de travail de l'employé déjà agrégés
+            (``TempsTravailPeriode.pour``) ; sinon lus pour cet employé seul.
+        """
         self.employe = employe
         self.periode = periode
+        self.temps_travail = temps_travail
         self.lignes = []
         self.montants = {
             'brut': Decimal('0'),
@@ -127,18 +248,28 @@ class MoteurCalculPaie:
             'base_rts': Decimal('0'),
             'taux_effectif_rts': Decimal('0'),
         }
-        # Nombre de salariés actifs de l'entreprise (pour TA vs ONFPP)
-        self.nb_salaries = Employe.objects.filter(
-            entreprise=employe.entreprise,
-            statut_employe='actif'
-        ).count() if employe.entreprise else 0
-        self.constantes = self._charger_constantes()
-        self._appliquer_config_entreprise()
-        self.tranches_irg = self._charger_tranches_irg()
-        
+        self.contexte = contexte
+        if contexte is not None:
+            # Données communes à toute la période : aucune requête par employé
+            if employe.entreprise_id == contexte.entreprise.pk:
+                employe.entreprise = contexte.entreprise
+            self.nb_salaries = contexte.nb_salaries
+            self.constantes = dict(contexte.constantes)
+            self.tranches_irg = contexte.tranches_irg
+            self.devise_base = contexte.devise_base
+        else:
+            # Nombre de salariés actifs de l'entreprise (pour TA vs ONFPP)
+            self.nb_salaries = Employe.objects.filter(
+                entreprise=employe.entreprise,
+                statut_employe='actif'
+            ).count() if employe.entreprise else 0
+            self.constantes = self._charger_constantes()
+            self._appliquer_config_entreprise()
+            self.tranches_irg = self._charger_tranches_irg()
+            self.devise_base = DeviseService.get_devise_base()
+
         # Devise de paie de l'employé et service de conversion
-        self.devise_employe = employe.devise_paie if employe.devise_paie else DeviseService.get_devise_base()
-        self.devise_base = DeviseService.get_devise_base()
+        self.devise_employe = employe.devise_paie if employe.devise_paie else self.devise_base
         self.date_conversion = date(self.periode.annee, self.periode.mois, 1)
     
     def _charger_constantes(self):
@@ -157,35 +288,19 @@ class MoteurCalculPaie:
             config = self.employe.entreprise.config_paie
         except (AttributeError, ConfigurationPaieEntreprise.DoesNotExist):
             return
+        appliquer_config_entreprise(self.constantes, config)
 
-        # Mapping champ ConfigurationPaieEntreprise -> clé Constante
-        # NB: taux_taxe_apprentissage et taux_onfpp sont EXCLUS car fixés par la loi
-        mapping = {
-            'taux_cnss_employe': 'TAUX_CNSS_EMPLOYE',
-            'taux_cnss_employeur': 'TAUX_CNSS_EMPLOYEUR',
-            'plafond_cnss': 'PLAFOND_CNSS',
-            'plancher_cnss': 'PLANCHER_CNSS',
-            'taux_versement_forfaitaire': 'TAUX_VF',
-        }
-        # HS : ConfigPaie stocke la majoration (30%), le moteur attend le coefficient (130%)
-        mapping_hs = {
-            'taux_hs_4_premieres': 'TAUX_HS_4PREM',
-            'taux_hs_au_dela': 'TAUX_HS_AUDELA',
-            'taux_hs_nuit': 'TAUX_HS_NUIT',
-            'taux_hs_dimanche': 'TAUX_HS_FERIE_JOUR',
-            'taux_hs_ferie_nuit': 'TAUX_HS_FERIE_NUIT',
-        }
-
-        for champ, cle in mapping.items():
-            valeur = getattr(config, champ, None)
-            if valeur is not None:
-                self.constantes[cle] = Decimal(str(valeur))
+    def _rubrique_systeme(self, cle):
+        """Rubrique des lignes calculées (absence, HS, CNSS, IRG), prise dans le contexte si fourni."""
+        if self.contexte is not None:
+            return self.contexte.rubriques.get(cle)
+        return rechercher_rubrique_systeme(cle)
 
-        for champ, cle in mapping_hs.items():
-            valeur = getattr(config, champ, None)
-            if valeur is not None:
-                # Majoration (30) → coefficient (130)
-                self.constantes[cle] = Decimal(str(valeur)) + Decimal('100')
+    def _convertir_vers_gnf(self, montant):
+        """Convertit un montant de la devise de l'employé vers la devise de base."""
+        if self.contexte is not None:
+            return self.contexte.convertir_vers_base(montant, self.devise_employe)
+        return DeviseService.convertir_vers_gnf(montant, self.devise_employe, self.date_conversion)
 
     def _charger_tranches_irg(self):
         """Charger le barème RTS (avec cache et fallback année précédente)"""
@@ -269,21 +384,21 @@ class MoteurCalculPaie:
             anciennete_mois = max(0, delta.days // 30)
 
         return {
-            'brut': float(self.montants.get('brut', Decimal('0'))),
-            'cnss': float(self.montants.get('cnss_employe', Decimal('0'))),
-            'indemnites': float(self.montants.get('indemnites_forfaitaires', Decimal('0'))),
-            'salaire_base': float(self.montants.get('salaire_base', Decimal('0'))),
-            'primes': float(self.montants.get('total_primes', Decimal('0'))),
-            'heures_sup': float(self.montants.get('total_heures_sup', Decimal('0'))),
-            'total_gains': float(self.montants.get('total_gains', Decimal('0'))),
-            'total_retenues': float(self.montants.get('total_retenues', Decimal('0'))),
-            'cnss_base': float(self.montants.get('cnss_base', Decimal('0'))),
-            'net': float(self.montants.get('net_a_payer', Decimal('0'))),
+            'brut': self.montants.get('brut', Decimal('0')),
+            'cnss': self.montants.get('cnss_employe', Decimal('0')),
+            'indemnites': self.montants.get('indemnites_forfaitaires', Decimal('0')),
+            'salaire_base': self.montants.get('salaire_base', Decimal('0')),
+            'primes': self.montants.get('total_primes', Decimal('0')),
+            'heures_sup': self.montants.get('total_heures_sup', Decimal('0')),
+            'total_gains': self.montants.get('total_gains', Decimal('0')),
+            'total_retenues': self.montants.get('total_retenues', Decimal('0')),
+            'cnss_base': self.montants.get('cnss_base', Decimal('0')),
+            'net': self.montants.get('net_a_payer', Decimal('0')),
             'anciennete_mois': anciennete_mois,
             'anciennete_ans': anciennete_mois // 12,
             'nb_enfants': int(getattr(employe, 'nombre_enfants', 0) or 0),
             'nb_conjoints': int(getattr(employe, 'nombre_femmes', 0) or 0),
-            'plafond_cnss': float(self.constantes.get('PLAFOND_CNSS', Decimal('2500000'))),
+            'plafond_cnss': self.constantes.get('PLAFOND_CNSS', Decimal('2500000')),
         }
 
     def _obtenir_taux_anciennete(self, annees):
@@ -385,115 +500,11 @@ class MoteurCalculPaie:
     
     def _calculer_temps_travail(self):
         """Calculer les données de temps de travail pour la période"""
-        # Dates de la période
-        premier_jour = date(self.periode.annee, self.periode.mois, 1)
-        dernier_jour = date(
-            self.periode.annee,
-            self.periode.mois,
-            calendar.monthrange(self.periode.annee, self.periode.mois)[1]
-        )
-
-        # Prendre en compte la date d'embauche : si l'employé a été embauché
-        # en cours de mois, les jours ouvrables et les pointages partent de
-        # cette date (pas du 1er du mois).
-        date_embauche = getattr(self.employe, 'date_embauche', None)
-        if date_embauche and premier_jour <= date_embauche <= dernier_jour:
-            debut_effectif = date_embauche
-        else:
-            debut_effectif = premier_jour
-
-        # Calculer les jours ouvrables à partir de la date d'entrée effective
-        jours_ouvrables = 0
-        current = debut_effectif
-        while current <= dernier_jour:
-            if current.weekday() < 5:  # Lundi=0, Vendredi=4
-                jours_ouvrables += 1
-            current += timedelta(days=1)
-
-        self.montants['jours_ouvrables'] = Decimal(str(jours_ouvrables))
-
-        # Récupérer les pointages à partir de la date d'entrée effective
-        pointages = Pointage.objects.filter(
-            employe=self.employe,
-            date_pointage__gte=debut_effectif,
-            date_pointage__lte=dernier_jour
-        )
-
-        # Compter les jours travaillés
-        jours_presents = pointages.filter(statut_pointage='present').count()
-        jours_retard = pointages.filter(statut_pointage='retard').count()
-        self.montants['jours_travailles'] = Decimal(str(jours_presents + jours_retard))
+        temps_travail = self.temps_travail
+        if temps_travail is None:
+            temps_travail = TempsTravailPeriode(self.periode, [self.employe]).pour(self.employe)
+        self.montants.update(temps_travail)
 
-        # Heures travaillées et supplémentaires (total)
-        from django.db.models import Sum
-        heures = pointages.aggregate(
-            heures_travaillees=Sum('heures_travaillees'),
-            heures_sup=Sum('heures_supplementaires')
-        )
-        self.montants['heures_travaillees'] = heures['heures_travaillees'] or Decimal('0')
-        self.montants['heures_supplementaires'] = heures['heures_sup'] or Decimal('0')
-
-        # Répartition hebdomadaire des HS : 4 premières h/semaine à +30%,
-        # au-delà à +60% (Code du Travail guinéen Art. 221).
-        # On groupe les pointages par semaine (lundi → dimanche) pour
-        # respecter le plafond de 4 h hebdomadaires.
-        hs_30 = Decimal('0')
-        hs_60 = Decimal('0')
-        semaine_map = {}
-        for p in pointages.order_by('date_pointage'):
-            if not p.heures_supplementaires:
-                continue
-            # Numéro ISO de la semaine (année, semaine) pour le regroupement
-            iso = p.date_pointage.isocalendar()
-            cle_semaine = (iso[0], iso[1])
-            semaine_map.setdefault(cle_semaine, Decimal('0'))
-            semaine_map[cle_semaine] += Decimal(str(p.heures_supplementaires))
-        for total_hs_semaine in semaine_map.values():
-            hs_30 += min(total_hs_semaine, Decimal('4'))
-            hs_60 += max(Decimal('0'), total_hs_semaine - Decimal('4'))
-        self.montants['heures_sup_30'] = hs_30
-        self.montants['heures_sup_60'] = hs_60
-        
-        # Récupérer les absences du mois
-        absences = Absence.objects.filter(
-            employe=self.employe,
-            date_absence__gte=premier_jour,
-            date_absence__lte=dernier_jour
-        )
-        
-        jours_absence_non_paye = Decimal('0')
-        jours_absence_total = Decimal('0')
-        
-        for absence in absences:
-            jours_absence_total += absence.duree_jours
-            if absence.impact_paie == 'non_paye':
-                jours_absence_non_paye += absence.duree_jours
-            elif absence.impact_paie == 'partiellement_paye':
-                # Calculer la partie non payée
-                taux_non_paye = (Decimal('100') - absence.taux_maintien_salaire) / Decimal('100')
-                jours_absence_non_paye += absence.duree_jours * taux_non_paye
-        
-        self.montants['jours_absence'] = jours_absence_total
-        self.montants['jours_absence_non_paye'] = jours_absence_non_paye
-        
-        # Récupérer les congés approuvés du mois
-        conges = Conge.objects.filter(
-            employe=self.employe,
-            statut_demande='approuve',
-            date_debut__lte=dernier_jour,
-            date_fin__gte=premier_jour
-        )
-        
-        jours_conge = Decimal('0')
-        for conge in conges:
-            # Calculer les jours de congé dans la période
-            debut_conge = max(conge.date_debut, premier_jour)
-            fin_conge = min(conge.date_fin, dernier_jour)
-            jours_dans_periode = (fin_conge - debut_conge).days + 1
-            jours_conge += Decimal(str(jours_dans_periode))
-        
-        self.montants['jours_conge'] = jours_conge
-    
     def _appliquer_retenues_absences(self):
         """Appliquer les retenues pour absences non payées"""
         jours_absence_non_paye = self.montants.get('jours_absence_non_paye', Decimal('0'))
@@ -513,11 +524,7 @@ class MoteurCalculPaie:
         self.montants['retenue_absence'] = retenue
         
         # Ajouter la ligne de retenue
-        rubrique_absence = RubriquePaie.objects.filter(
-            code_rubrique__icontains='ABSENCE',
-            type_rubrique='retenue',
-            actif=True
-        ).first()
+        rubrique_absence = self._rubrique_systeme('absence')
         
         if rubrique_absence:
             self.lignes.append({
@@ -719,11 +726,7 @@ class MoteurCalculPaie:
             self.montants['imposable'] += montant_hs_total
             
             # Ajouter les lignes pour chaque type d'heures supplémentaires
-            rubrique_hs = RubriquePaie.objects.filter(
-                code_rubrique__icontains='HS',
-                type_rubrique='gain',
-                actif=True
-            ).first()
+            rubrique_hs = self._rubrique_systeme('hs')
             
             # Auto-création de la rubrique HS si absente
             if not rubrique_hs:
@@ -744,6 +747,8 @@ class MoteurCalculPaie:
                         'entreprise': self.employe.entreprise if hasattr(self.employe, 'entreprise') else None,
                     }
                 )
+                if self.contexte is not None:
+                    self.contexte.rubriques['hs'] = rubrique_hs
             if rubrique_hs:
                 # Ligne récapitulative des heures supplémentaires
                 # Calculer le taux de majoration moyen (en pourcentage de majoration, pas le coefficient appliqué)
@@ -881,6 +886,7 @@ class MoteurCalculPaie:
                 employe=self.employe,
                 montants=self.montants,
                 indemnites_detectees=self._indemnites_detectees,
+                regles=self.contexte.regles_indemnites if self.contexte is not None else None,
             )
             resultat_conformite = analyseur.analyser()
             self.montants['conformite_indemnites'] = resultat_conformite
@@ -923,11 +929,7 @@ class MoteurCalculPaie:
             base_raw = self.montants['brut']
 
         if self.devise_employe != self.devise_base:
-            base_cnss_gnf = DeviseService.convertir_vers_gnf(
-                base_raw,
-                self.devise_employe,
-                self.date_conversion
-            )
+            base_cnss_gnf = self._convertir_vers_gnf(base_raw)
         else:
             base_cnss_gnf = base_raw
         
@@ -962,19 +964,7 @@ class MoteurCalculPaie:
         self.montants['total_retenues'] += cnss_employe
         
         # Ajouter ligne CNSS
-        rubrique_cnss = RubriquePaie.objects.filter(
-            code_rubrique__icontains='CNSS',
-            type_rubrique__in=['retenue', 'cotisation'],
-            actif=True
-        ).first()
-        
-        # Si pas trouvé, chercher par libellé
-        if not rubrique_cnss:
-            rubrique_cnss = RubriquePaie.objects.filter(
-                libelle_rubrique__icontains='CNSS',
-                type_rubrique__in=['retenue', 'cotisation'],
-                actif=True
-            ).first()
+        rubrique_cnss = self._rubrique_systeme('cnss')
         
         if rubrique_cnss:
             self.lignes.append({
@@ -995,11 +985,7 @@ class MoteurCalculPaie:
         # Base VF/TA = salaire brut total (en GNF si devise étrangère)
         base_vf_ta = max(Decimal('0'), self.montants['brut'])
         if self.devise_employe != self.devise_base:
-            base_vf_ta = DeviseService.convertir_vers_gnf(
-                self.montants['brut'],
-                self.devise_employe,
-                self.date_conversion
-            )
+            base_vf_ta = self._convertir_vers_gnf(self.montants['brut'])
         
         # Versement Forfaitaire (VF) - charge patronale
         # Règle CGI Guinée :
@@ -1019,7 +1005,7 @@ class MoteurCalculPaie:
         if params_vf and params_vf.mode_base_vf == 'formule' and params_vf.formule_base_vf:
             # Mode personnalisé : formule définie par l'entreprise
             variables_vf = self._construire_variables_formule()
-            variables_vf['brut'] = float(base_vf_ta)
+            variables_vf['brut'] = base_vf_ta
             try:
                 base_vf_nette = _evaluer_vf(params_vf.formule_base_vf, variables_vf)
                 deduction_vf = base_vf_ta - base_vf_nette
@@ -1152,11 +1138,7 @@ class MoteurCalculPaie:
         
         # Convertir en GNF si nécessaire (la RTS est toujours calculée en GNF)
         if self.devise_employe != self.devise_base:
-            base_imposable = DeviseService.convertir_vers_gnf(
-                base_imposable, 
-                self.devise_employe, 
-                self.date_conversion
-            )
+            base_imposable = self._convertir_vers_gnf(base_imposable)
         
         # Vérifier exonération RTS pour stagiaires/apprentis
         exoneration_rts, raison_exoneration = self._verifier_exoneration_rts_stagiaire()
@@ -1192,19 +1174,7 @@ class MoteurCalculPaie:
         self.montants['total_retenues'] += self.montants['irg']
         
         # Ajouter ligne RTS/IRG
-        rubrique_irg = RubriquePaie.objects.filter(
-            code_rubrique__iregex=r'(IRS|IRG|RTS|IRPP)',
-            type_rubrique__in=['retenue', 'cotisation'],
-            actif=True
-        ).first()
-        
-        # Si pas trouvé, chercher par libellé
-        if not rubrique_irg:
-            rubrique_irg = RubriquePaie.objects.filter(
-                libelle_rubrique__iregex=r'(IRS|IRG|RTS|IRPP|Impôt|Revenu)',
-                type_rubrique__in=['retenue', 'cotisation'],
-                actif=True
-            ).first()
+        rubrique_irg = self._rubrique_systeme('irg')
         
         if rubrique_irg:
             self.lignes.append({
@@ -1249,11 +1219,7 @@ class MoteurCalculPaie:
         
         # Convertir en GNF si nécessaire
         if self.devise_employe != self.devise_base:
-            salaire_brut = DeviseService.convertir_vers_gnf(
-                salaire_brut, 
-                self.devise_employe, 
-                self.date_conversion
-            )
+            salaire_brut = self._convertir_vers_gnf(salaire_brut)
         
         if salaire_brut > SEUIL_EXONERATION:
             return False, f"Indemnité {salaire_brut:,.0f} GNF > seuil {SEUIL_EXONERATION:,.0f} GNF"
@@ -1640,8 +1606,12 @@ class MoteurCalculPaie:
         return _to_json_safe(snapshot)
 
     @transaction.atomic
-    def generer_bulletin(self, utilisateur=None):
-        """Générer le bulletin de paie dans la base de données"""
+    def generer_bulletin(self, utilisateur=None, numero_bulletin=None):
+        """Générer le bulletin de paie dans la base de données
+
+        :param numero_bulletin: Numéro réservé à l'avance (calcul par lots) ;
+                                ignoré si le bulletin existe déjà.
+        """
         # Calculer le bulletin
         self.calculer_bulletin()
         
@@ -1649,16 +1619,52 @@ class MoteurCalculPaie:
             employe=self.employe,
             periode=self.periode,
         ).first()
+        self.verifier_recalcul_autorise(bulletin_existant)
+
+        # Générer le numéro de bulletin uniquement pour une nouvelle fiche.
+        if bulletin_existant:
+            numero = bulletin_existant.numero_bulletin
+        else:
+            numero = numero_bulletin or self._generer_numero_bulletin()
+        
+        bulletin_data = self.donnees_bulletin(numero)
+        
+        # ✨ NOUVEAU: Calculer et créer automatiquement les congés acquis
+        # Cela crée/met à jour le SoldeConge avec ancienneté-based calculation
+        self._calculer_conges_acquis()
+        
+        if bulletin_existant:
+            for champ, valeur in bulletin_data.items():
+                setattr(bulletin_existant, champ, valeur)
+            bulletin_existant.save()
+            LigneBulletin.objects.filter(bulletin=bulletin_existant).delete()
+            bulletin = bulletin_existant
+            action = 'recalcul'
+        else:
+            bulletin = BulletinPaie.objects.create(**bulletin_data)
+            action = 'creation'
+        
+        # Créer les lignes
+        LigneBulletin.objects.bulk_create(self.lignes_bulletin(bulletin))
+        
+        # Mettre à jour les cumuls
+        self._mettre_a_jour_cumuls(bulletin)
+        
+        # Historique
+        self.historique_bulletin(bulletin, action, utilisateur).save()
+        
+        return bulletin
+
+    def verifier_recalcul_autorise(self, bulletin_existant):
+        """Refuse de recalculer un bulletin validé ou payé."""
         if bulletin_existant and bulletin_existant.statut_bulletin in BulletinPaie.STATUTS_VERROUILLES:
             raise PermissionError(
                 f"Bulletin {bulletin_existant.numero_bulletin} déjà {bulletin_existant.statut_bulletin}; "
                 "impossible de le recalculer."
             )
 
-        # Générer le numéro de bulletin uniquement pour une nouvelle fiche.
-        numero = bulletin_existant.numero_bulletin if bulletin_existant else self._generer_numero_bulletin()
-        
-        # Créer le bulletin
+    def donnees_bulletin(self, numero):
+        """Valeurs des champs du bulletin calculé (après ``calculer_bulletin``)."""
         bulletin_data = {
             'employe': self.employe,
             'periode': self.periode,
@@ -1711,27 +1717,12 @@ class MoteurCalculPaie:
 
         # Snapshot des paramètres figés pour audit et reproductibilité
         bulletin_data['snapshot_parametres'] = self._construire_snapshot()
-        
-        # ✨ NOUVEAU: Calculer et créer automatiquement les congés acquis
-        # Cela crée/met à jour le SoldeConge avec ancienneté-based calculation
-        self._calculer_conges_acquis()
-        
-        if bulletin_existant:
-            for champ, valeur in bulletin_data.items():
-                setattr(bulletin_existant, champ, valeur)
-            bulletin_existant.save()
-            LigneBulletin.objects.filter(bulletin=bulletin_existant).delete()
-            bulletin = bulletin_existant
-            action = 'recalcul'
-            description = f'Recalcul du bulletin {numero}'
-        else:
-            bulletin = BulletinPaie.objects.create(**bulletin_data)
-            action = 'creation'
-            description = f'Création du bulletin {numero}'
-        
-        # Créer les lignes
-        for ligne_data in sorted(self.lignes, key=lambda x: x['ordre']):
-            LigneBulletin.objects.create(
+        return bulletin_data
+
+    def lignes_bulletin(self, bulletin):
+        """Lignes du bulletin (non enregistrées), dans l'ordre d'affichage."""
+        return [
+            LigneBulletin(
                 bulletin=bulletin,
                 rubrique=ligne_data['rubrique'],
                 base=ligne_data['base'],
@@ -1740,12 +1731,16 @@ class MoteurCalculPaie:
                 montant=ligne_data['montant'],
                 ordre=ligne_data['ordre']
             )
-        
-        # Mettre à jour les cumuls
-        self._mettre_a_jour_cumuls(bulletin)
-        
-        # Historique
-        HistoriquePaie.objects.create(
+            for ligne_data in sorted(self.lignes, key=lambda x: x['ordre'])
+        ]
+
+    def historique_bulletin(self, bulletin, action, utilisateur=None):
+        """Entrée d'historique (non enregistrée) du calcul du bulletin."""
+        if action == 'recalcul':
+            description = f'Recalcul du bulletin {bulletin.numero_bulletin}'
+        else:
+            description = f'Création du bulletin {bulletin.numero_bulletin}'
+        return HistoriquePaie(
             bulletin=bulletin,
             periode=self.periode,
             employe=self.employe,
@@ -1758,28 +1753,10 @@ class MoteurCalculPaie:
                 'irg': float(self.montants['irg']),
             }
         )
-        
-        return bulletin
     
     def _generer_numero_bulletin(self):
-        """Générer un numéro unique de bulletin — basé sur max id, jamais sur count()"""
-        prefix = f"BUL-{self.periode.annee}-{self.periode.mois:02d}"
-        # Utiliser le dernier numéro existant pour ce préfixe, pas count()
-        # count() provoque des collisions si un bulletin a été supprimé
-        last = BulletinPaie.objects.filter(
-            numero_bulletin__startswith=prefix
-        ).order_by('-numero_bulletin').first()
-        if last:
-            try:
-                last_num = int(last.numero_bulletin.split('-')[-1])
-            except (ValueError, IndexError):
-                last_num = BulletinPaie.objects.filter(
-                    annee_paie=self.periode.annee,
-                    mois_paie=self.periode.mois
-                ).count()
-        else:
-            last_num = 0
-        return f"{prefix}-{last_num + 1:04d}"
+        """Générer un numéro unique de bulletin (compteur de séquence)"""
+        return allouer_numeros_bulletins(self.periode)[0]
     
     def _mettre_a_jour_cumuls(self, bulletin):
         """Mettre à jour les cumuls annuels"""
@@ -1876,16 +1853,10 @@ class MoteurCalculPaie:
                 config_paie = self.config_paie
             except Exception:
                 pass
-            # Fallback robuste: chercher par entreprise directement dans le modèle
-            if not config_paie and emp.entreprise:
-                from paie.models import ConfigurationPaieEntreprise
-                config_paie = ConfigurationPaieEntreprise.objects.filter(
-                    entreprise=emp.entreprise
-                ).first()
-            # Fallback final: première config disponible
-            if not config_paie:
-                from paie.models import ConfigurationPaieEntreprise
-                config_paie = ConfigurationPaieEntreprise.objects.first()
+            if self.contexte is not None:
+                config_paie = self.contexte.config_conges
+            elif not config_paie:
+                config_paie = resoudre_config_conges(emp.entreprise)
             
             # Déterminer le nombre de jours par mois
             if config_paie:
@@ -2024,16 +1995,17 @@ class AnalyseurConformiteIndemnites:
         (Decimal('0'),        Decimal('15'), 'Petit salaire — 15% prudent'),
     ]
 
-    def __init__(self, employe, montants, indemnites_detectees):
+    def __init__(self, employe, montants, indemnites_detectees, regles=None):
         """
         :param employe: instance Employe
         :param montants: dict des montants calculés par MoteurCalculPaie
         :param indemnites_detectees: list de (rubrique, montant, raison)
+        :param regles: règles RegleIndemnite déjà chargées pour l'entreprise (optionnel)
         """
         self.employe = employe
         self.montants = montants
         self.indemnites_detectees = indemnites_detectees
-        self._regles_cache = None
+        self._regles_cache = list(regles) if regles is not None else None
 
     # ------------------------------------------------------------------
     # API publique
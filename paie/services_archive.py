@@ -1,13 +1,39 @@
 """
 Service d'archivage des bulletins de paie
 Conservation légale : 10 ans minimum
+
+Les PDF sont stockés par contenu : le nom du fichier est son empreinte SHA256,
+rangée dans des sous-répertoires à deux niveaux (``objets/ab/cd/abcd….pdf``)
+pour ne pas accumuler des centaines de milliers de fichiers dans un même
+dossier. Un PDF identique archivé deux fois n'est écrit qu'une fois ; le
+rendu des bulletins est invariant (``generer_bulletin_pdf``), un bulletin
+réarchivé retrouve donc son fichier.
+
+Chaque période archivée a un manifeste (une ligne JSON par bulletin :
+bulletin, matricule, fichier, empreinte, taille). La vérification, la
+restauration et le ZIP d'une période lisent le manifeste et les fichiers en
+flux, sans régénérer aucun PDF.
 """
 import hashlib
-import io
+import json
+import logging
+import os
+import zipfile
+
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Count, Sum
 from django.utils import timezone
+
 from .models import BulletinPaie, ArchiveBulletin
 
+logger = logging.getLogger(__name__)
+
+RACINE_OBJETS = 'archives/bulletins/objets'
+RACINE_MANIFESTES = 'archives/bulletins/manifestes'
+TAILLE_BLOC = 64 * 1024
+LOT_ARCHIVES = 500
+
 
 class ArchivageService:
     """Service de gestion des archives de bulletins"""
@@ -18,31 +44,40 @@ class ArchivageService:
         return hashlib.sha256(contenu_pdf).hexdigest()
     
     @staticmethod
-    def archiver_bulletin(bulletin, contenu_pdf):
+    def calculer_hash_flux(fichier):
+        """(hash SHA256, taille) d'un fichier ouvert, lu par blocs"""
+        empreinte = hashlib.sha256()
+        taille = 0
+        for bloc in iter(lambda: fichier.read(TAILLE_BLOC), b''):
+            empreinte.update(bloc)
+            taille += len(bloc)
+        return empreinte.hexdigest(), taille
+    
+    @staticmethod
+    def chemin_objet(hash_fichier):
+        """Chemin de stockage d'un PDF d'après son empreinte"""
+        return f"{RACINE_OBJETS}/{hash_fichier[:2]}/{hash_fichier[2:4]}/{hash_fichier}.pdf"
+    
+    @staticmethod
+    def stocker_pdf(contenu_pdf):
         """
-        Archive un bulletin de paie avec son PDF
+        Écrit le PDF dans le stockage par contenu (s'il n'y est pas déjà)
         
-        Args:
-            bulletin: Instance BulletinPaie
-            contenu_pdf: Bytes du fichier PDF
-            
         Returns:
-            ArchiveBulletin créé ou existant
+            tuple: (hash, chemin, nouveau)
         """
-        # Vérifier si déjà archivé
-        if hasattr(bulletin, 'archive'):
-            return bulletin.archive
-        
-        # Calculer le hash pour l'intégrité
         hash_fichier = ArchivageService.calculer_hash(contenu_pdf)
-        
-        # Créer le nom du fichier
-        nom_fichier = f"bulletin_{bulletin.employe.matricule}_{bulletin.annee_paie}{bulletin.mois_paie:02d}.pdf"
-        
-        # Créer l'archive
-        archive = ArchiveBulletin.objects.create(
+        chemin = ArchivageService.chemin_objet(hash_fichier)
+        if default_storage.exists(chemin):
+            return hash_fichier, chemin, False
+        return hash_fichier, default_storage.save(chemin, ContentFile(contenu_pdf)), True
+    
+    @staticmethod
+    def _nouvelle_archive(bulletin, hash_fichier, chemin, taille):
+        return ArchiveBulletin(
             bulletin=bulletin,
-            taille_fichier=len(contenu_pdf),
+            fichier_pdf=chemin,
+            taille_fichier=taille,
             hash_fichier=hash_fichier,
             employe_matricule=bulletin.employe.matricule,
             employe_nom=f"{bulletin.employe.nom} {bulletin.employe.prenoms}",
@@ -50,10 +85,26 @@ class ArchivageService:
             periode_mois=bulletin.mois_paie,
             montant_net=bulletin.net_a_payer,
         )
+    
+    @staticmethod
+    def archiver_bulletin(bulletin, contenu_pdf):
+        """
+        Archive un bulletin de paie avec son PDF
         
-        # Sauvegarder le fichier PDF
-        archive.fichier_pdf.save(nom_fichier, ContentFile(contenu_pdf))
+        Args:
+            bulletin: Instance BulletinPaie
+            contenu_pdf: Bytes du fichier PDF
         
+        Returns:
+            ArchiveBulletin créé ou existant
+        """
+        # Vérifier si déjà archivé
+        if hasattr(bulletin, 'archive'):
+            return bulletin.archive
+        
+        hash_fichier, chemin, _ = ArchivageService.stocker_pdf(contenu_pdf)
+        archive = ArchivageService._nouvelle_archive(bulletin, hash_fichier, chemin, len(contenu_pdf))
+        archive.save()
         return archive
     
     @staticmethod
@@ -67,44 +118,195 @@ class ArchivageService:
         if not archive.fichier_pdf:
             return False
         
-        with archive.fichier_pdf.open('rb') as f:
-            contenu = f.read()
-        
-        hash_actuel = ArchivageService.calculer_hash(contenu)
+        try:
+            with archive.fichier_pdf.open('rb') as f:
+                hash_actuel, _ = ArchivageService.calculer_hash_flux(f)
+        except (OSError, ValueError):
+            return False
         return hash_actuel == archive.hash_fichier
     
     @staticmethod
-    def archiver_periode(periode):
+    def archiver_periode(periode, workers=None):
         """
         Archive tous les bulletins validés d'une période
         
+        Les PDF sont rendus par un pool de threads (voir services_export_pdf),
+        stockés par contenu et les archives insérées par lots ; le manifeste
+        de la période est ensuite réécrit.
+        
         Returns:
             dict: Statistiques d'archivage
         """
-        from .utils import generer_bulletin_pdf
+        from .services_export_pdf import _pdfs_en_ordre, nombre_workers_export
         
         bulletins = BulletinPaie.objects.filter(
             periode=periode,
-            statut_bulletin__in=['valide', 'paye']
-        ).exclude(archive__isnull=False)
+            statut_bulletin__in=['valide', 'paye'],
+            archive__isnull=True,
+        ).select_related('employe', 'archive').order_by('employe__matricule')
         
-        stats = {'archivés': 0, 'erreurs': 0, 'deja_archives': 0}
+        stats = {
+            'archivés': 0, 'erreurs': 0, 'dedoublonnes': 0,
+            'deja_archives': ArchiveBulletin.objects.filter(bulletin__periode=periode).count(),
+        }
         
-        for bulletin in bulletins:
-            try:
-                # Générer le PDF
-                contenu_pdf = generer_bulletin_pdf(bulletin)
-                
-                # Archiver
-                ArchivageService.archiver_bulletin(bulletin, contenu_pdf)
-                stats['archivés'] += 1
-                
-            except Exception as e:
+        archives = []
+        for bulletin, contenu_pdf in _pdfs_en_ordre(bulletins.iterator(chunk_size=200),
+                                                     workers or nombre_workers_export()):
+            if contenu_pdf is None:
                 stats['erreurs'] += 1
-                print(f"Erreur archivage bulletin {bulletin.numero_bulletin}: {e}")
+                continue
+            hash_fichier, chemin, nouveau = ArchivageService.stocker_pdf(contenu_pdf)
+            if not nouveau:
+                stats['dedoublonnes'] += 1
+            archives.append(ArchivageService._nouvelle_archive(bulletin, hash_fichier, chemin, len(contenu_pdf)))
+            if len(archives) >= LOT_ARCHIVES:
+                stats['archivés'] += len(ArchiveBulletin.objects.bulk_create(archives))
+                archives = []
+        if archives:
+            stats['archivés'] += len(ArchiveBulletin.objects.bulk_create(archives))
         
+        if stats['archivés'] or (stats['deja_archives'] and not default_storage.exists(
+                ArchivageService.chemin_manifeste(periode))):
+            ArchivageService.ecrire_manifeste(periode)
         return stats
     
+    # ------------------------------------------------------------------
+    # Manifeste de période
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def chemin_manifeste(periode):
+        return f"{RACINE_MANIFESTES}/{periode.annee}/{periode.mois:02d}/periode_{periode.pk}.jsonl"
+    
+    @staticmethod
+    def ecrire_manifeste(periode):
+        """Réécrit le manifeste de la période depuis ses archives ; retourne le nombre d'entrées"""
+        archives = ArchiveBulletin.objects.filter(bulletin__periode=periode).order_by(
+            'employe_matricule', 'bulletin_id'
+        ).values_list('bulletin_id', 'employe_matricule', 'fichier_pdf', 'hash_fichier', 'taille_fichier')
+        lignes = [
+            json.dumps({'bulletin': bulletin_id, 'matricule': matricule, 'fichier': fichier,
+                        'sha256': hash_fichier, 'taille': taille}, ensure_ascii=False)
+            for bulletin_id, matricule, fichier, hash_fichier, taille in archives.iterator()
+        ]
+        chemin = ArchivageService.chemin_manifeste(periode)
+        if default_storage.exists(chemin):
+            default_storage.delete(chemin)
+        default_storage.save(chemin, ContentFile(''.join(f'{ligne}\n' for ligne in lignes).encode('utf-8')))
+        return len(lignes)
+    
+    @staticmethod
+    def lire_manifeste(periode):
+        """Entrées du manifeste de la période, lues en flux (aucune si absent)"""
+        chemin = ArchivageService.chemin_manifeste(periode)
+        if not default_storage.exists(chemin):
+            return
+        with default_storage.open(chemin, 'rb') as f:
+            for ligne in f:
+                if ligne.strip():
+                    yield json.loads(ligne)
+    
+    @staticmethod
+    def _etat_objet(entree):
+        """'ok', 'manquant' ou 'altere' pour le fichier d'une entrée du manifeste"""
+        try:
+            with default_storage.open(entree['fichier'], 'rb') as f:
+                hash_actuel, taille = ArchivageService.calculer_hash_flux(f)
+        except (OSError, ValueError):
+            return 'manquant'
+        if hash_actuel != entree['sha256'] or taille != entree['taille']:
+            return 'altere'
+        return 'ok'
+    
+    @staticmethod
+    def verifier_periode(periode):
+        """
+        Vérifie en un passage toutes les archives d'une période d'après son
+        manifeste. Chaque fichier est relu une seule fois, même s'il est
+        partagé par plusieurs bulletins.
+        
+        Returns:
+            dict: verifiees, alterees, manquantes, hors_manifeste (listes de matricules)
+        """
+        attendues = {bulletin_id: (hash_fichier, matricule) for bulletin_id, hash_fichier, matricule
+                     in ArchiveBulletin.objects.filter(bulletin__periode=periode).values_list(
+                         'bulletin_id', 'hash_fichier', 'employe_matricule')}
+        rapport = {'verifiees': 0, 'alterees': [], 'manquantes': [], 'hors_manifeste': []}
+        etats = {}
+        for entree in ArchivageService.lire_manifeste(periode):
+            if entree['fichier'] not in etats:
+                etats[entree['fichier']] = ArchivageService._etat_objet(entree)
+            etat = etats[entree['fichier']]
+            hash_base, _ = attendues.pop(entree['bulletin'], (None, None))
+            if etat == 'ok' and hash_base != entree['sha256']:
+                etat = 'altere'     # la base ne référence plus ce contenu
+            if etat == 'ok':
+                rapport['verifiees'] += 1
+            elif etat == 'manquant':
+                rapport['manquantes'].append(entree['matricule'])
+            else:
+                rapport['alterees'].append(entree['matricule'])
+        rapport['hors_manifeste'] = sorted(matricule for _, matricule in attendues.values())
+        return rapport
+    
+    @staticmethod
+    def nom_restitution(entree, periode):
+        return f"Bulletin_{entree['matricule']}_{periode.annee}_{periode.mois:02d}.pdf"
+    
+    @staticmethod
+    def restaurer_periode(periode, repertoire):
+        """
+        Recopie les PDF archivés de la période dans ``repertoire`` (un fichier
+        par bulletin), en contrôlant l'empreinte de chaque copie.
+        
+        Returns:
+            dict: restaures, erreurs (matricules)
+        """
+        os.makedirs(repertoire, exist_ok=True)
+        stats = {'restaures': 0, 'erreurs': []}
+        for entree in ArchivageService.lire_manifeste(periode):
+            destination = os.path.join(repertoire, ArchivageService.nom_restitution(entree, periode))
+            empreinte = hashlib.sha256()
+            try:
+                with default_storage.open(entree['fichier'], 'rb') as source, open(destination, 'wb') as copie:
+                    for bloc in iter(lambda: source.read(TAILLE_BLOC), b''):
+                        empreinte.update(bloc)
+                        copie.write(bloc)
+            except (OSError, ValueError):
+                stats['erreurs'].append(entree['matricule'])
+                continue
+            if empreinte.hexdigest() != entree['sha256']:
+                os.remove(destination)
+                stats['erreurs'].append(entree['matricule'])
+                continue
+            stats['restaures'] += 1
+        return stats
+    
+    @staticmethod
+    def zip_periode(periode):
+        """
+        ZIP des PDF archivés de la période, morceau par morceau (pour
+        ``StreamingHttpResponse``). Un fichier altéré ou absent est omis.
+        """
+        from .services_export_pdf import FluxZip
+        
+        flux = FluxZip()
+        with zipfile.ZipFile(flux, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for entree in ArchivageService.lire_manifeste(periode):
+                try:
+                    with default_storage.open(entree['fichier'], 'rb') as f:
+                        contenu = f.read()
+                except (OSError, ValueError):
+                    logger.error(f"ZIP archives : fichier absent pour {entree['matricule']} ({entree['fichier']})")
+                    continue
+                if ArchivageService.calculer_hash(contenu) != entree['sha256']:
+                    logger.error(f"ZIP archives : empreinte invalide pour {entree['matricule']}")
+                    continue
+                zip_file.writestr(ArchivageService.nom_restitution(entree, periode), contenu)
+                yield flux.vider()
+        yield flux.vider()
+    
     @staticmethod
     def telecharger_archive(archive):
         """
@@ -127,8 +329,6 @@ class ArchivageService:
     @staticmethod
     def stats_archives(entreprise):
         """Statistiques des archives pour une entreprise"""
-        from django.db.models import Sum, Count
-        
         archives = ArchiveBulletin.objects.filter(
             bulletin__employe__entreprise=entreprise
         )
@@ -0,0 +1,374 @@
+"""
+Noyau de calcul CNSS / RTS partagé par la rétropaie et les simulations.
+
+Le barème est normalisé une seule fois (``BaremeRTS``) : l'impôt cumulé des
+tranches pleines est précalculé et la tranche d'une base est trouvée par
+recherche dichotomique, si bien que le calcul d'une base ne coûte plus
+qu'une multiplication et un arrondi. Les variantes ``*_lot`` traitent une
+liste de bruts (balayages, comparaisons multi-barèmes, inversions net→brut)
+avec des résultats identiques au calcul unitaire.
+
+Deux conventions d'arrondi coexistent dans l'application :
+  - rétropaie  : arrondi HALF_UP par tranche, écarts d'1-2 GNF entre tranches comblés ;
+  - simulation : somme exacte des tranches puis arrondi HALF_UP du total.
+"""
+from bisect import bisect_left
+from decimal import Decimal, ROUND_HALF_UP, ROUND_FLOOR
+
+ZERO = Decimal('0')
+CENT = Decimal('100')
+UNITE = Decimal('1')
+
+
+def _d(valeur):
+    """Convertit en Decimal propre."""
+    return Decimal(str(valeur))
+
+
+def _arrondir(montant):
+    """Arrondit à l'unité (pas de centimes en GNF)."""
+    return _d(montant).quantize(UNITE, rounding=ROUND_HALF_UP)
+
+
+def _lire_tranche(tranche):
+    """(borne_inf, borne_sup, taux) quelle que soit la forme de la tranche."""
+    if isinstance(tranche, dict):
+        if 'borne_inferieure' in tranche:
+            bi, bs, tx = tranche['borne_inferieure'], tranche.get('borne_superieure'), tranche['taux_irg']
+        else:
+            bi, bs, tx = tranche['borne_inf'], tranche.get('borne_sup'), tranche['taux']
+    else:
+        bi, bs, tx = tranche.borne_inferieure, tranche.borne_superieure, tranche.taux_irg
+    return _d(bi), (_d(bs) if bs is not None else None), _d(tx)
+
+
+class BaremeRTS:
+    """
+    Barème RTS/IRG progressif normalisé.
+
+    :param tranches: dicts (``borne_inferieure``/``borne_superieure``/``taux_irg``
+                     ou ``borne_inf``/``borne_sup``/``taux``) ou objets TrancheRTS,
+                     dans l'ordre des tranches
+    :param arrondi_par_tranche: arrondir chaque tranche (rétropaie) ou seulement le total (simulation)
+    :param combler_ecarts: ramener une borne inférieure à la borne supérieure précédente
+                           si elles ne diffèrent que d'1 ou 2 GNF (1 000 001 → 1 000 000)
+    """
+
+    def __init__(self, tranches, arrondi_par_tranche=True, combler_ecarts=True):
+        self.arrondi_par_tranche = arrondi_par_tranche
+        self.combler_ecarts = combler_ecarts
+
+        seuils = []
+        for tranche in tranches:
+            bi, bs, tx = _lire_tranche(tranche)
+            if combler_ecarts and seuils:
+                prev_sup = seuils[-1][1]
+                if prev_sup is not None and prev_sup < bi <= prev_sup + 2:
+                    bi = prev_sup
+            seuils.append((bi, bs, tx))
+        self.seuils = seuils
+
+        # Recherche dichotomique possible si les tranches se suivent sans chevauchement ;
+        # sinon on garde le parcours tranche par tranche.
+        self._bornes_inf = [bi for bi, _, _ in seuils]
+        self._ordonne = all(
+            bs is not None and bi <= bs <= seuils[i + 1][0]
+            for i, (bi, bs, _) in enumerate(seuils[:-1])
+        ) and (not seuils or seuils[-1][1] is None or seuils[-1][0] <= seuils[-1][1])
+
+        # Impôt cumulé des tranches pleines précédant chaque tranche
+        self._cumuls = []
+        cumul = ZERO
+        for bi, bs, tx in seuils:
+            self._cumuls.append(cumul)
+            if bs is not None:
+                cumul += self._impot_tranche(bs - bi, tx)
+
+    @classmethod
+    def depuis(cls, tranches, **options):
+        """Retourne ``tranches`` si c'est déjà un barème compilé avec les mêmes options."""
+        if isinstance(tranches, cls):
+            if all(getattr(tranches, cle) == valeur for cle, valeur in options.items()):
+                return tranches
+            tranches = tranches.tranches()
+        return cls(tranches, **options)
+
+    def tranches(self):
+        """Tranches normalisées (forme ``borne_inf``/``borne_sup``/``taux``)."""
+        return [{'borne_inf': bi, 'borne_sup': bs, 'taux': tx} for bi, bs, tx in self.seuils]
+
+    def _impot_tranche(self, montant, taux):
+        impot = montant * taux / CENT
+        if self.arrondi_par_tranche:
+            return impot.quantize(UNITE, rounding=ROUND_HALF_UP) if montant > 0 else ZERO
+        return impot
+
+    def _impot_exact(self, base):
+        if not self._ordonne:
+            total = ZERO
+            for bi, bs, tx in self.seuils:
+                if base <= bi:
+                    break
+                total += self._impot_tranche((min(base, bs) if bs is not None else base) - bi, tx)
+            return total
+        k = bisect_left(self._bornes_inf, base)
+        if k == 0:
+            return ZERO
+        bi, bs, tx = self.seuils[k - 1]
+        montant = (min(base, bs) if bs is not None else base) - bi
+        return self._cumuls[k - 1] + self._impot_tranche(montant, tx)
+
+    def impot(self, base):
+        """Impôt d'une base imposable."""
+        base = _d(base)
+        if base <= 0:
+            return ZERO
+        impot = self._impot_exact(base)
+        if self.arrondi_par_tranche:
+            return impot
+        return impot.quantize(UNITE, rounding=ROUND_HALF_UP)
+
+    def impots_lot(self, bases):
+        """Impôt de chaque base de ``bases``."""
+        return [self.impot(base) for base in bases]
+
+    def detail(self, base):
+        """
+        Tranches atteintes par ``base`` : liste de (borne_inf, borne_sup, taux, montant, impôt)
+        où ``impôt`` suit la convention d'arrondi du barème.
+        """
+        base = _d(base)
+        lignes = []
+        if base <= 0:
+            return lignes
+        for bi, bs, tx in self.seuils:
+            if base <= bi:
+                break
+            montant = (min(base, bs) if bs is not None else base) - bi
+            lignes.append((bi, bs, tx, montant, self._impot_tranche(montant, tx)))
+        return lignes
+
+
+def compiler_bareme_retropaie(tranches):
+    """Barème avec les conventions de la rétropaie (arrondi par tranche, écarts comblés)."""
+    return BaremeRTS.depuis(tranches, arrondi_par_tranche=True, combler_ecarts=True)
+
+
+def compiler_bareme_simulation(tranches):
+    """Barème avec les conventions des simulations (arrondi du total, bornes brutes)."""
+    return BaremeRTS.depuis(tranches, arrondi_par_tranche=False, combler_ecarts=False)
+
+
+def calculer_cnss_salarie(brut, plancher, plafond, taux_employe, seuil_min=None):
+    """
+    CNSS salarié : rien sous 10 % du plancher, assiette encadrée plancher/plafond.
+
+    Retourne (cnss_employe, base_cnss_plafonnee).
+    """
+    if seuil_min is None:
+        seuil_min = _arrondir(plancher * Decimal('0.10'))
+    if brut < seuil_min:
+        return ZERO, ZERO
+    base = _arrondir(max(min(brut, plafond), plancher))
+    return _arrondir(base * taux_employe / CENT), base
+
+
+class CalculNetBrut:
+    """
+    Sens direct brut → net de la rétropaie, paramètres résolus une seule fois.
+
+    Exonération des indemnités forfaitaires : ``pct_indem_exonerees`` % du brut,
+    25 % au plus, arrondie vers le bas.
+    """
+
+    def __init__(self, constantes, tranches, pct_indem_exonerees=ZERO):
+        self.plancher = constantes.get('PLANCHER_CNSS', Decimal('550000'))
+        self.plafond = constantes.get('PLAFOND_CNSS', Decimal('2500000'))
+        self.taux_cnss = constantes.get('TAUX_CNSS_EMPLOYE', Decimal('5'))
+        self.seuil_min = _arrondir(self.plancher * Decimal('0.10'))
+        self.pct_exo = min(_d(pct_indem_exonerees), Decimal('25'))
+        self.bareme = compiler_bareme_retropaie(tranches)
+
+    def cnss(self, brut):
+        """(cnss_employe, base_cnss_plafonnee)."""
+        return calculer_cnss_salarie(brut, self.plancher, self.plafond, self.taux_cnss, self.seuil_min)
+
+    def calculer(self, brut):
+        """(net, cnss, base_cnss, base_rts, rts) pour un brut."""
+        brut = _d(brut)
+        cnss, base_cnss = self.cnss(brut)
+        exo = (brut * self.pct_exo / CENT).quantize(UNITE, rounding=ROUND_FLOOR)
+        base_rts = max(brut - cnss - exo, ZERO)
+        rts = self.bareme.impot(base_rts)
+        net = _arrondir(brut - cnss - rts)
+        return net, cnss, base_cnss, base_rts, rts
+
+    def calculer_lot(self, bruts):
+        """``calculer`` appliqué à chaque brut de ``bruts``."""
+        return [self.calculer(brut) for brut in bruts]
+
+    def nets_lot(self, bruts):
+        """Net de chaque brut de ``bruts``."""
+        return [self.calculer(brut)[0] for brut in bruts]
+
+    def cle(self):
+        """Clé de cache : paramètres dont dépend le calcul."""
+        return (self.plancher, self.plafond, self.taux_cnss, self.pct_exo, tuple(self.bareme.seuils))
+
+
+class ChargesPatronales:
+    """Charges patronales d'un brut : CNSS employeur, VF, TA (< 25 salariés) ou ONFPP."""
+
+    def __init__(self, constantes, nb_salaries=0):
+        self.plancher = constantes.get('PLANCHER_CNSS', Decimal('550000'))
+        self.plafond = constantes.get('PLAFOND_CNSS', Decimal('2500000'))
+        self.taux_cnss_pat = constantes.get('TAUX_CNSS_EMPLOYEUR', Decimal('18'))
+        self.taux_vf = constantes.get('TAUX_VF', Decimal('6'))
+        self.libelle_ta = 'ONFPP' if nb_salaries >= 25 else 'TA'
+        if nb_salaries >= 25:
+            self.taux_ta = constantes.get('TAUX_ONFPP', Decimal('1.5'))
+        else:
+            self.taux_ta = constantes.get('TAUX_TA', Decimal('2'))
+        self.seuil = _arrondir(self.plancher * Decimal('0.10'))
+
+    def calculer(self, brut):
+        """(cnss_employeur, base_vf, vf, ta)."""
+        if brut < self.seuil:
+            cnss_pat = ZERO
+        else:
+            base = _arrondir(max(min(brut, self.plafond), self.plancher))
+            cnss_pat = _arrondir(base * self.taux_cnss_pat / CENT)
+        deduction_vf = _arrondir(min(brut, self.plafond) * self.taux_vf / CENT)
+        base_vf = max(ZERO, brut - deduction_vf)
+        vf = _arrondir(base_vf * self.taux_vf / CENT)
+        ta = _arrondir(base_vf * self.taux_ta / CENT)
+        return cnss_pat, base_vf, vf, ta
+
+    def cout(self, brut):
+        """Coût total employeur : brut + charges patronales."""
+        cnss_pat, _, vf, ta = self.calculer(brut)
+        return brut + cnss_pat + vf + ta
+
+    def cle(self):
+        return (self.plancher, self.plafond, self.taux_cnss_pat, self.taux_vf, self.taux_ta)
+
+
+# ---------------------------------------------------------------------------
+# Inverse par segments (net → brut, coût total → brut)
+# ---------------------------------------------------------------------------
+
+class TableInverse:
+    """
+    Inverse d'une fonction du brut affine par morceaux (net, coût total).
+
+    Entre deux points de rupture (seuil CNSS, plancher, plafond, bruts où la
+    base RTS franchit une borne de tranche) la fonction est affine aux
+    arrondis GNF près. La table mémorise pour chaque segment sa valeur de
+    départ et sa pente ; ``inverser`` trouve le segment par dichotomie sur le
+    maximum atteint en fin de segment, calcule le brut par la pente puis le
+    corrige par quelques évaluations exactes autour de l'estimation.
+    """
+
+    MARGE = 8                      # GNF de brut autour de l'estimation
+    ETENDUE_DERNIER = 10 ** 9      # mesure de pente du segment non borné
+
+    def __init__(self, fonction, ruptures):
+        self.fonction = fonction
+        self.debuts = sorted({0} | {int(r) for r in ruptures if r > 0})
+        self.valeurs = []
+        self.pentes = []
+        self.maximums = []
+        maximum = None
+        for i, debut in enumerate(self.debuts):
+            dernier = i + 1 == len(self.debuts)
+            fin = debut + self.ETENDUE_DERNIER if dernier else self.debuts[i + 1] - 1
+            valeur_debut = fonction(debut)
+            valeur_fin = fonction(fin)
+            self.valeurs.append(valeur_debut)
+            self.pentes.append((valeur_fin - valeur_debut) / (fin - debut) if fin > debut else ZERO)
+            maximum = max(valeur_debut, valeur_fin) if maximum is None else max(maximum, valeur_debut, valeur_fin)
+            self.maximums.append(Decimal('Infinity') if dernier else maximum)
+
+    def inverser(self, cible):
+        """
+        Plus petit brut dont l'image atteint ``cible``.
+
+        Retourne (brut, nombre d'évaluations exactes).
+        """
+        cible = _d(cible)
+        i = bisect_left(self.maximums, cible)
+        debut, valeur, pente = self.debuts[i], self.valeurs[i], self.pentes[i]
+        if cible <= valeur or pente <= 0:
+            estimation = debut
+        else:
+            estimation = debut + int((cible - valeur) / pente)
+
+        evaluations = 0
+        brut = max(0, estimation - self.MARGE)
+        while brut > 0:
+            evaluations += 1
+            if self.fonction(brut) < cible:
+                break
+            brut = max(0, brut - self.MARGE)
+        while True:
+            evaluations += 1
+            if self.fonction(brut) >= cible:
+                return brut, evaluations
+            brut += 1
+
+
+def _premier_brut(fonction, cible, haut=1):
+    """Plus petit brut (entier) tel que ``fonction(brut) >= cible``, fonction croissante."""
+    while fonction(haut) < cible:
+        haut *= 2
+    bas = 0
+    while bas < haut:
+        milieu = (bas + haut) // 2
+        if fonction(milieu) >= cible:
+            haut = milieu
+        else:
+            bas = milieu + 1
+    return bas
+
+
+_TABLES_INVERSES = {}
+TAILLE_CACHE_TABLES = 128
+
+
+def _table_en_cache(cle, construire):
+    table = _TABLES_INVERSES.get(cle)
+    if table is None:
+        if len(_TABLES_INVERSES) >= TAILLE_CACHE_TABLES:
+            _TABLES_INVERSES.clear()
+        table = _TABLES_INVERSES[cle] = construire()
+    return table
+
+
+def table_inverse_net(calcul: CalculNetBrut) -> TableInverse:
+    """Table net → brut d'un (barème, constantes CNSS, % d'indemnités exonérées), mémorisée."""
+    def construire():
+        def net(brut):
+            return calcul.calculer(Decimal(brut))[0]
+
+        def base_rts(brut):
+            return calcul.calculer(Decimal(brut))[3]
+
+        ruptures = [calcul.seuil_min, calcul.plancher, calcul.plafond]
+        for bi, bs, _ in calcul.bareme.seuils:
+            for borne in (bi, bs):
+                if borne is not None and borne > 0:
+                    ruptures.append(_premier_brut(base_rts, borne, int(borne) + 1))
+        return TableInverse(net, ruptures)
+
+    return _table_en_cache(('net',) + calcul.cle(), construire)
+
+
+def table_inverse_cout(charges: ChargesPatronales) -> TableInverse:
+    """Table coût total employeur → brut, mémorisée par jeu de taux."""
+    def construire():
+        return TableInverse(
+            lambda brut: charges.cout(Decimal(brut)),
+            [charges.seuil, charges.plancher, charges.plafond],
+        )
+
+    return _table_en_cache(('cout',) + charges.cle(), construire)
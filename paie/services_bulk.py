@@ -3,37 +3,303 @@ Service de calcul de paie en masse avec optimisations.
 Permet le calcul parallélisé et batch des bulletins.
 """
 from decimal import Decimal
-from datetime import date
-from django.db import transaction
-from django.db.models import Prefetch
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.db import transaction, connection
+from django.db.models import Prefetch, Sum
+from django.utils import timezone
 from typing import List, Dict, Tuple, Optional
 import logging
+import os
+import threading
 
 from .models import (
-    BulletinPaie, LigneBulletin, ElementSalaire, CumulPaie,
-    RubriquePaie, PeriodePaie
+    BulletinPaie, LigneBulletin, ElementSalaire, CumulPaie, HistoriquePaie,
+    RubriquePaie, PeriodePaie, CalculPeriodeJob, LotCalculPaie
 )
 from .cache_service import PayrollCacheService
-from .services import MoteurCalculPaie
+from .services import MoteurCalculPaie, allouer_numeros_bulletins
+from .services_contexte import PeriodeContext
+from .services_temps_travail import TempsTravailPeriode
 from employes.models import Employe
 
 logger = logging.getLogger(__name__)
 
 
+def _journaliser_erreur_bulletin(employe, e) -> str:
+    """Journalise l'échec de calcul d'un bulletin (log + fichiers de crash).
+
+    Returns:
+        Message court « matricule: erreur » pour le rapport de calcul.
+    """
+    import traceback, tempfile, json as _json
+    tb = traceback.format_exc()
+    error_msg = f"{employe.matricule}: {str(e)}"
+    logger.error(f"Erreur calcul bulletin: {error_msg}\n{tb}")
+    paths = []
+    try:
+        base = getattr(settings, 'BASE_DIR', None)
+        if base:
+            paths.append(os.path.join(str(base), 'logs', 'bulletin_crash.log'))
+    except Exception:
+        pass
+    paths.append(os.path.join(tempfile.gettempdir(), 'gestionnairerh_bulletin_crash.log'))
+    paths.append(os.path.expanduser(r'~\gestionnairerh_bulletin_crash.log'))
+    patched = getattr(_json.JSONEncoder, '_gestionrh_patched', False)
+    for p in paths:
+        try:
+            os.makedirs(os.path.dirname(p), exist_ok=True)
+            with open(p, 'a', encoding='utf-8') as fp:
+                from datetime import datetime as _dt
+                fp.write(f"\n\n===== {_dt.now().isoformat()} | {employe.matricule} | json_patched={patched} =====\n")
+                fp.write(f"Exception: {type(e).__name__}: {e}\n")
+                fp.write(tb)
+        except Exception:
+            pass
+    return error_msg
+
+
+def reserver_numeros_bulletins(periode, employe_ids: List[int]) -> Dict[int, str]:
+    """Réserve d'un bloc les numéros des nouveaux bulletins.
+
+    Les bulletins écrits en groupe (ou par des lots parallèles) ne peuvent pas
+    prendre leur numéro un par un : le bloc est réservé en une seule
+    transaction courte sur le compteur de séquence.
+    """
+    if not employe_ids:
+        return {}
+    return dict(zip(employe_ids, allouer_numeros_bulletins(periode, len(employe_ids))))
+
+
+# Montants du bulletin reportés dans CumulPaie
+CHAMPS_CUMUL = {
+    'cumul_brut': 'salaire_brut',
+    'cumul_net': 'net_a_payer',
+    'cumul_cnss_employe': 'cnss_employe',
+    'cumul_cnss_employeur': 'cnss_employeur',
+    'cumul_irg': 'irg',
+}
+
+
+class EnregistrementBulletinsLot:
+    """
+    Écriture groupée des bulletins calculés d'un lot d'employés.
+
+    Les bulletins, lignes et historiques sont écrits par ``bulk_create`` /
+    ``bulk_update`` ; les cumuls annuels sont mis à jour par différence avec
+    l'ancien bulletin (recalcul) au lieu de ré-additionner l'année de chaque
+    employé.
+
+    Usage::
+
+        lot = EnregistrementBulletinsLot(periode, employes, utilisateur)
+        for employe in employes:
+            lot.ajouter(MoteurCalculPaie(employe, periode, contexte))
+        lot.enregistrer()
+    """
+
+    def __init__(self, periode: PeriodePaie, employes: List[Employe], utilisateur=None,
+                 cumuls_incrementaux: bool = True):
+        """
+        :param cumuls_incrementaux: False si des bulletins de l'année ont été
+            supprimés hors de ce lot : les cumuls sont alors recalculés (une
+            requête groupée) au lieu d'être incrémentés.
+        """
+        self.periode = periode
+        self.utilisateur = utilisateur
+        self.cumuls_incrementaux = cumuls_incrementaux
+        self._existants = {
+            b.employe_id: b for b in BulletinPaie.objects.filter(
+                periode=periode, employe__in=[e.pk for e in employes],
+            )
+        }
+        self._en_attente = []
+
+    def ajouter(self, moteur: MoteurCalculPaie, numero_bulletin: Optional[str] = None):
+        """Calcule le bulletin du moteur et le met en attente d'écriture.
+
+        Les écritures de l'employé (solde de congés) ont leur propre point de
+        sauvegarde : un échec n'interrompt pas la transaction du lot.
+        Lève PermissionError si le bulletin existant est validé ou payé.
+        """
+        with transaction.atomic():
+            moteur.calculer_bulletin()
+            existant = self._existants.get(moteur.employe.pk)
+            moteur.verifier_recalcul_autorise(existant)
+            numero = existant.numero_bulletin if existant else numero_bulletin
+            donnees = moteur.donnees_bulletin(numero)
+            moteur._calculer_conges_acquis()
+        ancien = {champ: getattr(existant, champ) for champ in CHAMPS_CUMUL.values()} if existant else None
+        self._en_attente.append((moteur, existant, donnees, ancien))
+
+    def __len__(self):
+        return len(self._en_attente)
+
+    def enregistrer(self, erreurs: Optional[List[str]] = None) -> List[BulletinPaie]:
+        """Écrit les bulletins en attente et retourne les bulletins enregistrés.
+
+        Si l'écriture groupée échoue et qu'une liste ``erreurs`` est fournie,
+        les bulletins sont réécrits un par un, chacun dans son point de
+        sauvegarde : seuls les employés en échec sont ignorés (et ajoutés à
+        ``erreurs``), comme lors du calcul.
+        """
+        en_attente, self._en_attente = self._en_attente, []
+        if not en_attente:
+            return []
+        sans_numero = [donnees for _, _, donnees, _ in en_attente if not donnees['numero_bulletin']]
+        try:
+            with transaction.atomic():
+                return self._ecrire(en_attente)
+        except Exception:
+            if erreurs is None:
+                raise
+            logger.warning(f"Écriture groupée des bulletins {self.periode} en échec, reprise employé par employé")
+        # Réservation du bloc annulée avec la transaction : numéros à reprendre
+        for donnees in sans_numero:
+            donnees['numero_bulletin'] = None
+
+        bulletins = []
+        for element in en_attente:
+            try:
+                with transaction.atomic():
+                    bulletins.extend(self._ecrire([element]))
+            except Exception as e:
+                erreurs.append(_journaliser_erreur_bulletin(element[0].employe, e))
+        return bulletins
+
+    def _ecrire(self, en_attente) -> List[BulletinPaie]:
+        sans_numero = [m.employe.pk for m, existant, d, ancien in en_attente if not d['numero_bulletin']]
+        numeros = reserver_numeros_bulletins(self.periode, sans_numero)
+
+        bulletins, nouveaux, modifies, anciens = [], [], [], {}
+        for moteur, existant, donnees, ancien in en_attente:
+            if not donnees['numero_bulletin']:
+                donnees['numero_bulletin'] = numeros[moteur.employe.pk]
+            if existant:
+                anciens[existant.employe_id] = ancien
+                for champ, valeur in donnees.items():
+                    setattr(existant, champ, valeur)
+                modifies.append(existant)
+                bulletins.append(existant)
+            else:
+                bulletin = BulletinPaie(**donnees)
+                nouveaux.append(bulletin)
+                bulletins.append(bulletin)
+
+        champs = [c for c in en_attente[0][2] if c not in ('employe', 'periode')]
+        if modifies:
+            BulletinPaie.objects.bulk_update(modifies, champs, batch_size=500)
+            LigneBulletin.objects.filter(bulletin__in=modifies).delete()
+        if nouveaux:
+            BulletinPaie.objects.bulk_create(nouveaux, batch_size=500)
+            if any(b.pk is None for b in nouveaux):
+                # Backends sans RETURNING : relire les clés par numéro
+                pks = dict(BulletinPaie.objects.filter(
+                    numero_bulletin__in=[b.numero_bulletin for b in nouveaux]
+                ).values_list('numero_bulletin', 'pk'))
+                for b in nouveaux:
+                    b.pk = pks[b.numero_bulletin]
+
+        lignes, historiques = [], []
+        for (moteur, existant, _, _), bulletin in zip(en_attente, bulletins):
+            lignes.extend(moteur.lignes_bulletin(bulletin))
+            historiques.append(moteur.historique_bulletin(
+                bulletin, 'recalcul' if existant else 'creation', self.utilisateur
+            ))
+        LigneBulletin.objects.bulk_create(lignes, batch_size=1000)
+        HistoriquePaie.objects.bulk_create(historiques, batch_size=500)
+
+        self._mettre_a_jour_cumuls(bulletins, anciens)
+        return bulletins
+
+    def _mettre_a_jour_cumuls(self, bulletins: List[BulletinPaie], anciens: Dict[int, Dict]):
+        """Une lecture et une écriture groupées des cumuls de l'année."""
+        annee = self.periode.annee
+        employe_ids = [b.employe_id for b in bulletins]
+        cumuls = {}
+        if self.cumuls_incrementaux:
+            cumuls = {
+                c.employe_id: c for c in CumulPaie.objects.filter(employe_id__in=employe_ids, annee=annee)
+            }
+
+        maintenant = timezone.now()
+        a_modifier = []
+        for bulletin in bulletins:
+            cumul = cumuls.get(bulletin.employe_id)
+            if cumul is None:
+                continue
+            ancien = anciens.get(bulletin.employe_id)
+            for champ_cumul, champ in CHAMPS_CUMUL.items():
+                delta = getattr(bulletin, champ) - (ancien[champ] if ancien else Decimal('0'))
+                setattr(cumul, champ_cumul, getattr(cumul, champ_cumul) + delta)
+            if ancien is None:
+                cumul.nombre_bulletins += 1
+            cumul.date_mise_a_jour = maintenant
+            a_modifier.append(cumul)
+        if a_modifier:
+            CumulPaie.objects.bulk_update(
+                a_modifier, list(CHAMPS_CUMUL) + ['nombre_bulletins', 'date_mise_a_jour'],
+                batch_size=500,
+            )
+
+        # Cumuls absents (ou non fiables) : recalcul de l'année en une requête groupée
+        a_recalculer = [pk for pk in employe_ids if pk not in cumuls]
+        if a_recalculer:
+            recalculer_cumuls(annee, a_recalculer)
+
+
+def recalculer_cumuls(annee: int, employe_ids: List[int]):
+    """Recalcule les cumuls annuels de plusieurs employés (une agrégation groupée)."""
+    from django.db.models import Count
+    totaux = {
+        t['employe_id']: t for t in BulletinPaie.objects.filter(
+            employe_id__in=employe_ids, periode__annee=annee,
+        ).values('employe_id').annotate(
+            nombre_bulletins=Count('id'),
+            **{champ_cumul: Sum(champ) for champ_cumul, champ in CHAMPS_CUMUL.items()}
+        ).order_by()
+    }
+    existants = {
+        c.employe_id: c for c in CumulPaie.objects.filter(employe_id__in=employe_ids, annee=annee)
+    }
+    maintenant = timezone.now()
+    a_creer, a_modifier = [], []
+    for employe_id in employe_ids:
+        t = totaux.get(employe_id, {})
+        cumul = existants.get(employe_id) or CumulPaie(employe_id=employe_id, annee=annee)
+        for champ_cumul in CHAMPS_CUMUL:
+            setattr(cumul, champ_cumul, t.get(champ_cumul) or Decimal('0'))
+        cumul.nombre_bulletins = t.get('nombre_bulletins') or 0
+        if cumul.pk:
+            cumul.date_mise_a_jour = maintenant
+            a_modifier.append(cumul)
+        else:
+            a_creer.append(cumul)
+    if a_modifier:
+        CumulPaie.objects.bulk_update(
+            a_modifier, list(CHAMPS_CUMUL) + ['nombre_bulletins', 'date_mise_a_jour'],
+            batch_size=500,
+        )
+    if a_creer:
+        CumulPaie.objects.bulk_create(a_creer, batch_size=500)
+
+
 class BulkPayrollService:
     """
     Service optimisé pour le calcul de paie en masse.
     Réduit drastiquement le nombre de requêtes DB.
     """
     
-    def __init__(self, periode: PeriodePaie, entreprise):
+    def __init__(self, periode: PeriodePaie, entreprise, warmup: bool = True):
         self.periode = periode
         self.entreprise = entreprise
         self.errors = []
         self.bulletins_created = 0
         
         # Préchauffer le cache
-        PayrollCacheService.warmup_cache(periode.annee)
+        if warmup:
+            PayrollCacheService.warmup_cache(periode.annee)
     
     def calculer_tous_bulletins(self, utilisateur) -> Dict:
         """
@@ -50,6 +316,7 @@ class BulkPayrollService:
         
         self.errors = []
         self.bulletins_created = 0
+        contexte = PeriodeContext(self.periode, self.entreprise)
         
         with transaction.atomic():
             # Supprimer les bulletins existants en une seule requête
@@ -65,7 +332,7 @@ class BulkPayrollService:
             batch_size = 50
             for i in range(0, len(employes), batch_size):
                 batch = employes[i:i + batch_size]
-                self._process_batch(batch, utilisateur)
+                self._process_batch(batch, utilisateur, contexte)
         
         elapsed = time.time() - start_time
         
@@ -76,15 +343,18 @@ class BulkPayrollService:
             'employes_total': len(employes),
         }
     
-    def _get_employes_optimized(self) -> List[Employe]:
+    def _get_employes_optimized(self, employe_ids: Optional[List[int]] = None) -> List[Employe]:
         """
         Récupère les employés avec toutes les relations préchargées.
         """
+        employes = Employe.objects.filter(
+            entreprise=self.entreprise,
+            statut_employe='actif'
+        )
+        if employe_ids is not None:
+            employes = employes.filter(pk__in=employe_ids)
         return list(
-            Employe.objects.filter(
-                entreprise=self.entreprise,
-                statut_employe='actif'
-            ).select_related(
+            employes.order_by('pk').select_related(
                 'etablissement',
                 'service',
                 'poste',
@@ -106,42 +376,25 @@ class BulkPayrollService:
             )
         )
     
-    def _process_batch(self, employes: List[Employe], utilisateur):
+    def _process_batch(self, employes: List[Employe], utilisateur,
+                       contexte: Optional[PeriodeContext] = None):
         """
         Traite un batch d'employés.
         """
+        temps_travail = TempsTravailPeriode(self.periode, employes)
+        # Bulletins de la période supprimés avant le calcul : cumuls recalculés
+        enregistrement = EnregistrementBulletinsLot(
+            self.periode, employes, utilisateur, cumuls_incrementaux=False,
+        )
         for employe in employes:
             try:
-                moteur = MoteurCalculPaie(employe, self.periode)
-                bulletin = moteur.generer_bulletin(utilisateur=utilisateur)
-                self.bulletins_created += 1
+                enregistrement.ajouter(MoteurCalculPaie(
+                    employe, self.periode, contexte,
+                    temps_travail=temps_travail.pour(employe),
+                ))
             except Exception as e:
-                import traceback, os, tempfile, json as _json
-                tb = traceback.format_exc()
-                error_msg = f"{employe.matricule}: {str(e)}"
-                self.errors.append(error_msg)
-                logger.error(f"Erreur calcul bulletin: {error_msg}\n{tb}")
-                paths = []
-                try:
-                    from django.conf import settings
-                    base = getattr(settings, 'BASE_DIR', None)
-                    if base:
-                        paths.append(os.path.join(str(base), 'logs', 'bulletin_crash.log'))
-                except Exception:
-                    pass
-                paths.append(os.path.join(tempfile.gettempdir(), 'gestionnairerh_bulletin_crash.log'))
-                paths.append(os.path.expanduser(r'~\gestionnairerh_bulletin_crash.log'))
-                patched = getattr(_json.JSONEncoder, '_gestionrh_patched', False)
-                for p in paths:
-                    try:
-                        os.makedirs(os.path.dirname(p), exist_ok=True)
-                        with open(p, 'a', encoding='utf-8') as fp:
-                            from datetime import datetime as _dt
-                            fp.write(f"\n\n===== {_dt.now().isoformat()} | {employe.matricule} | json_patched={patched} =====\n")
-                            fp.write(f"Exception: {type(e).__name__}: {e}\n")
-                            fp.write(tb)
-                    except Exception:
-                        pass
+                self.errors.append(_journaliser_erreur_bulletin(employe, e))
+        self.bulletins_created += len(enregistrement.enregistrer(self.errors))
     
     @classmethod
     def recalculer_bulletin(cls, bulletin_id: int, utilisateur) -> Tuple[bool, str]:
@@ -177,6 +430,336 @@ class BulkPayrollService:
             return False, f"Erreur: {str(e)}"
 
 
+class CalculPeriodeParLots:
+    """
+    Calcul d'une période découpé en lots commités séparément.
+
+    - Les employés actifs sont répartis en lots de ``taille_lot``.
+    - Chaque lot est calculé puis marqué « terminé » dans la même transaction :
+      un incident ne fait perdre que les lots non commités.
+    - Une reprise (job interrompu ou en échec) ne recalcule que les lots
+      non terminés.
+    - Les lots sont exécutés dans un pool de threads (``PAIE_CALCUL_WORKERS``),
+      chaque thread disposant de sa propre connexion DB. SQLite n'acceptant
+      qu'un écrivain à la fois, le calcul y reste séquentiel.
+    """
+
+    TAILLE_LOT_DEFAUT = 100
+    # Au-delà de ce délai sans signe de vie, un job « en cours » est considéré interrompu
+    DELAI_INACTIVITE = timedelta(minutes=10)
+
+    def __init__(self, job: CalculPeriodeJob):
+        self.job = job
+        self.periode = job.periode
+        self.entreprise = job.entreprise
+        self._contexte = None
+
+    @property
+    def contexte(self) -> PeriodeContext:
+        """Contexte de la période, construit une fois et partagé par tous les lots."""
+        if self._contexte is None:
+            self._contexte = PeriodeContext(self.periode, self.entreprise)
+        return self._contexte
+
+    # ------------------------------------------------------------------
+    # Préparation / reprise
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def job_en_cours(cls, periode: PeriodePaie) -> Optional[CalculPeriodeJob]:
+        """Dernier job actif (non interrompu) de la période, s'il existe."""
+        job = periode.calculs.filter(statut__in=CalculPeriodeJob.STATUTS_ACTIFS).first()
+        if job and not cls._est_interrompu(job):
+            return job
+        return None
+
+    @classmethod
+    def job_a_reprendre(cls, periode: PeriodePaie) -> Optional[CalculPeriodeJob]:
+        """Dernier job interrompu ou en échec dont des lots restent à calculer."""
+        job = periode.calculs.first()
+        if job is None or job.statut in ('termine', 'partiel'):
+            return None
+        if job.est_actif and not cls._est_interrompu(job):
+            return None
+        if not job.lots.exclude(statut='termine').exists():
+            return None
+        return job
+
+    @classmethod
+    def _est_interrompu(cls, job: CalculPeriodeJob) -> bool:
+        return job.est_actif and job.date_maj < timezone.now() - cls.DELAI_INACTIVITE
+
+    @classmethod
+    def demarrer(cls, periode: PeriodePaie, entreprise, utilisateur=None,
+                 taille_lot: Optional[int] = None) -> 'CalculPeriodeParLots':
+        """
+        Retourne le service pour un job de la période : job interrompu repris
+        tel quel, sinon nouveau job découpé en lots.
+        """
+        job = cls.job_a_reprendre(periode)
+        if job:
+            logger.info(f"Reprise du calcul {job.pk} ({periode})")
+            cls._reconcilier_job(job)
+            job.statut = 'en_attente'
+            job.message = ''
+            job.save(update_fields=['statut', 'message', 'date_maj'])
+            return cls(job)
+        return cls(cls._preparer_job(periode, entreprise, utilisateur, taille_lot or cls.TAILLE_LOT_DEFAUT))
+
+    @staticmethod
+    def _employes_perimetre(periode, entreprise) -> List[int]:
+        """Employés actifs de la période ; les bulletins des employés sortis
+        du périmètre sont supprimés comme lors d'un calcul complet."""
+        employe_ids = list(
+            Employe.objects.filter(
+                entreprise=entreprise,
+                statut_employe='actif',
+            ).order_by('pk').values_list('pk', flat=True)
+        )
+        BulletinPaie.objects.filter(
+            periode=periode,
+            employe__entreprise=entreprise,
+        ).exclude(
+            employe_id__in=employe_ids,
+        ).exclude(
+            statut_bulletin__in=BulletinPaie.STATUTS_VERROUILLES,
+        ).delete()
+        return employe_ids
+
+    @staticmethod
+    def _deja_numerotes(periode, employe_ids: List[int]) -> set:
+        """Employés ayant déjà un bulletin (et donc un numéro) sur la période."""
+        return set(
+            BulletinPaie.objects.filter(
+                periode=periode, employe_id__in=employe_ids,
+            ).values_list('employe_id', flat=True)
+        )
+
+    @classmethod
+    @transaction.atomic
+    def _preparer_job(cls, periode, entreprise, utilisateur, taille_lot) -> CalculPeriodeJob:
+        employe_ids = cls._employes_perimetre(periode, entreprise)
+        deja_numerotes = cls._deja_numerotes(periode, employe_ids)
+        numeros = reserver_numeros_bulletins(
+            periode, [pk for pk in employe_ids if pk not in deja_numerotes]
+        )
+
+        job = CalculPeriodeJob.objects.create(
+            periode=periode,
+            entreprise=entreprise,
+            utilisateur=utilisateur,
+            taille_lot=taille_lot,
+            nombre_employes=len(employe_ids),
+        )
+        lots = []
+        for numero, i in enumerate(range(0, len(employe_ids), taille_lot), start=1):
+            ids = employe_ids[i:i + taille_lot]
+            lots.append(LotCalculPaie(
+                job=job,
+                numero=numero,
+                employe_ids=ids,
+                numeros_bulletins={str(pk): numeros[pk] for pk in ids if pk in numeros},
+            ))
+        LotCalculPaie.objects.bulk_create(lots)
+        job.nombre_lots = len(lots)
+        job.save(update_fields=['nombre_lots', 'date_maj'])
+        return job
+
+    @classmethod
+    @transaction.atomic
+    def _reconcilier_job(cls, job: CalculPeriodeJob):
+        """
+        Remet à jour les lots restants d'un job repris : les employés sortis
+        depuis son démarrage en sont retirés, les embauchés sont ajoutés dans
+        de nouveaux lots, et les numéros réservés devenus inutiles ou pris
+        entre-temps par un autre bulletin sont remplacés.
+        """
+        periode = job.periode
+        employe_ids = cls._employes_perimetre(periode, job.entreprise)
+        actifs = set(employe_ids)
+        deja_numerotes = cls._deja_numerotes(periode, employe_ids)
+
+        lots = list(job.lots.order_by('numero'))
+        restants = [lot for lot in lots if lot.statut != 'termine']
+        deja_lotis = {pk for lot in lots for pk in lot.employe_ids}
+        reserves = [n for lot in restants for n in lot.numeros_bulletins.values()]
+        pris = set(
+            BulletinPaie.objects.filter(numero_bulletin__in=reserves).values_list('numero_bulletin', flat=True)
+        )
+
+        a_numeroter = []
+        for lot in restants:
+            lot.employe_ids = [pk for pk in lot.employe_ids if pk in actifs]
+            lot.numeros_bulletins = {
+                cle: numero for cle, numero in lot.numeros_bulletins.items()
+                if int(cle) in actifs and int(cle) not in deja_numerotes and numero not in pris
+            }
+            a_numeroter.extend(
+                pk for pk in lot.employe_ids
+                if pk not in deja_numerotes and str(pk) not in lot.numeros_bulletins
+            )
+        embauches = [pk for pk in employe_ids if pk not in deja_lotis]
+        a_numeroter.extend(pk for pk in embauches if pk not in deja_numerotes)
+        numeros = reserver_numeros_bulletins(periode, a_numeroter)
+
+        for lot in restants:
+            lot.numeros_bulletins.update({str(pk): numeros[pk] for pk in lot.employe_ids if pk in numeros})
+        LotCalculPaie.objects.bulk_update(restants, ['employe_ids', 'numeros_bulletins'])
+
+        dernier = lots[-1].numero if lots else 0
+        nouveaux = []
+        for numero, i in enumerate(range(0, len(embauches), job.taille_lot), start=dernier + 1):
+            ids = embauches[i:i + job.taille_lot]
+            nouveaux.append(LotCalculPaie(
+                job=job,
+                numero=numero,
+                employe_ids=ids,
+                numeros_bulletins={str(pk): numeros[pk] for pk in ids if pk in numeros},
+            ))
+        LotCalculPaie.objects.bulk_create(nouveaux)
+
+        job.nombre_employes = len(employe_ids)
+        job.nombre_lots = len(lots) + len(nouveaux)
+        job.save(update_fields=['nombre_employes', 'nombre_lots', 'date_maj'])
+
+    # ------------------------------------------------------------------
+    # Exécution
+    # ------------------------------------------------------------------
+
+    def nombre_workers(self) -> int:
+        if connection.vendor == 'sqlite':
+            return 1
+        workers = getattr(settings, 'PAIE_CALCUL_WORKERS', None) or min(4, os.cpu_count() or 1)
+        return max(1, int(workers))
+
+    def lancer_en_arriere_plan(self) -> threading.Thread:
+        """Exécute le job dans un thread pour ne pas bloquer la requête HTTP."""
+        thread = threading.Thread(
+            target=self._executer_thread,
+            name=f"calcul-paie-{self.job.pk}",
+            daemon=True,
+        )
+        thread.start()
+        return thread
+
+    def _executer_thread(self):
+        try:
+            self.executer()
+        except Exception:
+            logger.exception(f"Calcul {self.job.pk} interrompu")
+        finally:
+            connection.close()
+
+    def executer(self, workers: Optional[int] = None) -> CalculPeriodeJob:
+        """Calcule tous les lots non terminés du job puis consolide son statut."""
+        job = self.job
+        job.statut = 'en_cours'
+        job.date_debut = job.date_debut or timezone.now()
+        job.save(update_fields=['statut', 'date_debut', 'date_maj'])
+
+        PayrollCacheService.warmup_cache(self.periode.annee)
+        # Construit avant le pool : les threads ne font que le lire
+        self._contexte = PeriodeContext(self.periode, self.entreprise)
+
+        lot_ids = list(
+            job.lots.exclude(statut='termine').order_by('numero').values_list('pk', flat=True)
+        )
+        workers = workers or self.nombre_workers()
+
+        if workers <= 1 or len(lot_ids) <= 1:
+            for lot_id in lot_ids:
+                self._executer_lot(lot_id)
+                self._signe_de_vie()
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"lot-paie-{job.pk}") as pool:
+                futures = [pool.submit(self._executer_lot_thread, lot_id) for lot_id in lot_ids]
+                for future in as_completed(futures):
+                    future.result()
+                    self._signe_de_vie()
+
+        return self._finaliser()
+
+    def _executer_lot_thread(self, lot_id: int):
+        try:
+            self._executer_lot(lot_id)
+        finally:
+            connection.close()
+
+    def _executer_lot(self, lot_id: int):
+        lot = LotCalculPaie.objects.get(pk=lot_id)
+        lot.statut = 'en_cours'
+        lot.tentatives += 1
+        lot.date_debut = timezone.now()
+        lot.save(update_fields=['statut', 'tentatives', 'date_debut'])
+
+        employes = BulkPayrollService(self.periode, self.entreprise, warmup=False)._get_employes_optimized(
+            employe_ids=lot.employe_ids
+        )
+        utilisateur = self.job.utilisateur
+        try:
+            temps_travail = TempsTravailPeriode(self.periode, employes)
+            with transaction.atomic():
+                enregistrement = EnregistrementBulletinsLot(self.periode, employes, utilisateur)
+                erreurs = []
+                for employe in employes:
+                    try:
+                        enregistrement.ajouter(
+                            MoteurCalculPaie(
+                                employe, self.periode, self.contexte,
+                                temps_travail=temps_travail.pour(employe),
+                            ),
+                            numero_bulletin=lot.numeros_bulletins.get(str(employe.pk)),
+                        )
+                    except Exception as e:
+                        erreurs.append(_journaliser_erreur_bulletin(employe, e))
+                crees = len(enregistrement.enregistrer(erreurs))
+                # Le lot n'est marqué terminé que si ses bulletins sont commités
+                lot.statut = 'termine'
+                lot.bulletins_crees = crees
+                lot.erreurs = erreurs
+                lot.date_fin = timezone.now()
+                lot.save(update_fields=['statut', 'bulletins_crees', 'erreurs', 'date_fin'])
+        except Exception as e:
+            logger.exception(f"Échec du lot {lot.numero} du calcul {self.job.pk}")
+            LotCalculPaie.objects.filter(pk=lot_id).update(
+                statut='echec', erreurs=[f"Lot {lot.numero}: {e}"], date_fin=timezone.now(),
+            )
+
+    def _signe_de_vie(self):
+        CalculPeriodeJob.objects.filter(pk=self.job.pk).update(
+            date_maj=timezone.now(),
+            bulletins_crees=self.job.lots.filter(statut='termine').aggregate(
+                n=Sum('bulletins_crees'))['n'] or 0,
+        )
+
+    def _finaliser(self) -> CalculPeriodeJob:
+        job = self.job
+        lots = list(job.lots.all())
+        job.bulletins_crees = sum(lot.bulletins_crees for lot in lots if lot.statut == 'termine')
+        nb_erreurs = sum(len(lot.erreurs) for lot in lots)
+        if any(lot.statut != 'termine' for lot in lots):
+            job.statut = 'echec'
+            job.message = 'Calcul interrompu : relancez-le pour reprendre les lots restants.'
+        elif nb_erreurs:
+            job.statut = 'partiel'
+            job.message = f"{nb_erreurs} erreur(s) de calcul."
+        else:
+            job.statut = 'termine'
+            job.message = ''
+        job.date_fin = timezone.now()
+        job.save(update_fields=['statut', 'message', 'bulletins_crees', 'date_fin', 'date_maj'])
+
+        if job.bulletins_crees and self.periode.statut_periode == 'ouverte':
+            PeriodePaie.objects.filter(pk=self.periode.pk).update(statut_periode='calculee')
+        return job
+
+    def erreurs(self, limite: Optional[int] = None) -> List[str]:
+        erreurs = []
+        for lot_erreurs in self.job.lots.values_list('erreurs', flat=True):
+            erreurs.extend(lot_erreurs or [])
+        return erreurs[:limite] if limite else erreurs
+
+
 class PayrollStatsService:
     """
     Service pour les statistiques de paie optimisées.
@@ -0,0 +1,233 @@
+"""
+Comptabilisation d'une période de paie validée dans le journal des salaires.
+
+Les bulletins de la période sont agrégés en base (GROUP BY service et
+établissement) : deux requêtes groupées, une sur les lignes de gains par
+catégorie de rubrique, une sur les totaux des bulletins, quel que soit
+l'effectif. Chaque groupe devient une ligne de charge imputée au centre
+d'analyse du service (centre de même code que le service) ; les dettes
+envers le personnel, la CNSS et l'État sont totalisées par écriture.
+
+Schéma SYSCOHADA d'une écriture (journal SA, date de fin de période) :
+    D 661x  rémunérations (salaire de base, primes, avantages, autres)
+    D 6641  charges sociales patronales (CNSS employeur)
+    D 6413  taxes sur salaires (VF, TA, ONFPP)
+        C 4221  personnel, rémunérations dues (net à payer)
+        C 4211  personnel, avances et autres retenues
+        C 4311  CNSS (parts salariale et patronale)
+        C 4471  État, RTS retenue à la source
+        C 4472  État, impôts sur salaires (VF, TA, ONFPP)
+
+La comptabilisation est enregistrée sur la période (date et écritures) : une
+période comptabilisée est refusée, quel que soit le découpage ou le montant,
+tant que ses écritures n'ont pas été contrepassées.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from comptabilite.models import CentreAnalyse
+from comptabilite.moteur_comptable import (
+    ErreurComptabilisation, generer_ecritures_en_masse, obtenir_compte,
+)
+from core.models import Etablissement, Service
+from .models import BulletinPaie, LigneBulletin, PeriodePaie
+
+ZERO = Decimal('0')
+
+STATUTS_COMPTABILISABLES = ('validee', 'cloturee', 'payee')
+
+# Catégorie de rubrique de gain → compte de charge 661x
+COMPTES_REMUNERATION = {
+    'salaire_base': ('6611', 'Appointements, salaires et commissions'),
+    'prime':        ('6612', 'Primes et gratifications'),
+    'avantage':     ('6617', 'Avantages en nature'),
+}
+COMPTE_AUTRES_REMUNERATIONS = ('6618', 'Autres rémunérations directes')
+
+COMPTES_PAIE = {
+    'charges_sociales': ('6641', 'Charges sociales sur rémunération du personnel national'),
+    'taxes_salaires':   ('6413', 'Taxes sur appointements et salaires'),
+    'net':              ('4221', 'Personnel, rémunérations dues'),
+    'retenues':         ('4211', 'Personnel, avances et acomptes'),
+    'cnss':             ('4311', 'Sécurité sociale, CNSS'),
+    'rts':              ('4471', 'État, impôt retenu à la source (RTS)'),
+    'impots_salaires':  ('4472', 'État, impôts sur salaires (VF, TA, ONFPP)'),
+}
+
+_TOTAUX = ('brut', 'rappel', 'cnss_employe', 'cnss_employeur', 'rts', 'taxes', 'net')
+
+
+def agreger_periode(periode):
+    """
+    Totaux de la période par (établissement, service) en deux requêtes groupées.
+
+    :return: {(etablissement_id, service_id): {'gains': {categorie: montant},
+             'brut', 'rappel', 'cnss_employe', 'cnss_employeur', 'rts', 'taxes', 'net'}}
+    """
+    bulletins = BulletinPaie.objects.filter(periode=periode).exclude(statut_bulletin='brouillon')
+    groupes = defaultdict(lambda: dict({cle: ZERO for cle in _TOTAUX}, gains=defaultdict(lambda: ZERO)))
+
+    gains = (LigneBulletin.objects
+             .filter(bulletin__in=bulletins, rubrique__type_rubrique='gain')
+             .order_by()
+             .values(etablissement=F('bulletin__employe__etablissement_id'),
+                     service=F('bulletin__employe__service_id'),
+                     categorie=F('rubrique__categorie_rubrique'))
+             .annotate(montant=Sum('montant')))
+    for ligne in gains:
+        groupe = groupes[(ligne['etablissement'], ligne['service'])]
+        groupe['gains'][ligne['categorie']] += ligne['montant'] or ZERO
+
+    totaux = (bulletins.order_by()
+              .values(etablissement=F('employe__etablissement_id'), service=F('employe__service_id'))
+              .annotate(brut=Sum('salaire_brut'), rappel=Sum('rappel_salaire'),
+                        cnss_employe=Sum('cnss_employe'), cnss_employeur=Sum('cnss_employeur'),
+                        rts=Sum('irg'), net=Sum('net_a_payer'),
+                        vf=Sum('versement_forfaitaire'), ta=Sum('taxe_apprentissage'),
+                        onfpp=Sum('contribution_onfpp')))
+    for ligne in totaux:
+        groupe = groupes[(ligne['etablissement'], ligne['service'])]
+        for cle in ('brut', 'rappel', 'cnss_employe', 'cnss_employeur', 'rts', 'net'):
+            groupe[cle] = ligne[cle] or ZERO
+        groupe['taxes'] = (ligne['vf'] or ZERO) + (ligne['ta'] or ZERO) + (ligne['onfpp'] or ZERO)
+    return groupes
+
+
+def _services(entreprise, groupes):
+    """{service_id: (nom, centre d'analyse ou None)} ; le centre est celui du même code que le service."""
+    services = {pk: (code, nom) for pk, code, nom in Service.objects.filter(
+        pk__in={service for _, service in groupes if service}).values_list('pk', 'code_service', 'nom_service')}
+    centres = {centre.code: centre for centre in CentreAnalyse.objects.filter(
+        entreprise=entreprise, est_actif=True, code__in={code for code, _ in services.values()})}
+    return {pk: (nom, centres.get(code)) for pk, (code, nom) in services.items()}
+
+
+def lignes_ecriture_paie(entreprise, groupes, libelle):
+    """Lignes (compte, libellé, débit, crédit, centre) équilibrées d'un ensemble de groupes."""
+    comptes = {}
+
+    def compte(numero, intitule):
+        if numero not in comptes:
+            comptes[numero] = obtenir_compte(entreprise, numero, intitule)
+        return comptes[numero]
+
+    services = _services(entreprise, groupes)
+    lignes = []
+    dettes = defaultdict(lambda: ZERO)
+    for (_, service), groupe in sorted(groupes.items(), key=lambda g: services.get(g[0][1], ('',))[0]):
+        nom, centre = services.get(service, (None, None))
+        suffixe = f" - {nom}" if nom else ''
+        charges = defaultdict(lambda: ZERO)
+        for categorie, montant in groupe['gains'].items():
+            charges[COMPTES_REMUNERATION.get(categorie, COMPTE_AUTRES_REMUNERATIONS)] += montant
+        # Retenues d'absence, exonérations… : le brut (+ rappels) fait foi
+        ecart = groupe['brut'] + groupe['rappel'] - sum(charges.values(), ZERO)
+        charges[COMPTES_REMUNERATION['salaire_base']] += ecart
+        for (numero, intitule), montant in sorted(charges.items()):
+            if montant:
+                lignes.append((compte(numero, intitule), f"{intitule}{suffixe}",
+                               max(montant, ZERO), max(-montant, ZERO), centre))
+        if groupe['cnss_employeur']:
+            lignes.append((compte(*COMPTES_PAIE['charges_sociales']), f"CNSS part patronale{suffixe}",
+                           groupe['cnss_employeur'], ZERO, centre))
+        if groupe['taxes']:
+            lignes.append((compte(*COMPTES_PAIE['taxes_salaires']), f"VF, TA et ONFPP{suffixe}",
+                           groupe['taxes'], ZERO, centre))
+        dettes['net'] += groupe['net']
+        dettes['cnss'] += groupe['cnss_employe'] + groupe['cnss_employeur']
+        dettes['rts'] += groupe['rts']
+        dettes['impots_salaires'] += groupe['taxes']
+        # Avances, prêts, trop-perçus… (ou écart d'arrondi du net s'il est négatif)
+        dettes['retenues'] += (groupe['brut'] + groupe['rappel'] - groupe['cnss_employe']
+                               - groupe['rts'] - groupe['net'])
+
+    for cle in ('net', 'retenues', 'cnss', 'rts', 'impots_salaires'):
+        montant = dettes[cle]
+        if not montant:
+            continue
+        if cle == 'retenues' and montant < 0:
+            numero, intitule = COMPTE_AUTRES_REMUNERATIONS
+            lignes.append((compte(numero, intitule), f"Écart d'arrondi du net - {libelle}", -montant, ZERO))
+            continue
+        numero, intitule = COMPTES_PAIE[cle]
+        lignes.append((compte(numero, intitule), f"{intitule} - {libelle}", ZERO, montant))
+    return lignes
+
+
+def comptabiliser_periode_paie(periode, utilisateur, par_etablissement=False):
+    """
+    Passe l'écriture de salaires d'une période validée (une par établissement
+    si ``par_etablissement``) et l'enregistre sur la période. Une période déjà
+    comptabilisée est refusée jusqu'à la contrepassation de ses écritures.
+
+    :return: liste des écritures créées
+    :raises ErreurComptabilisation: période non validée, sans bulletin, déjà
+        comptabilisée, ou refus du moteur
+    """
+    if periode.statut_periode not in STATUTS_COMPTABILISABLES:
+        raise ErreurComptabilisation("La période doit être validée avant d'être comptabilisée.")
+    groupes = agreger_periode(periode)
+    if not groupes:
+        raise ErreurComptabilisation("Aucun bulletin à comptabiliser pour cette période.")
+
+    if par_etablissement:
+        lots = defaultdict(dict)
+        for cle, groupe in groupes.items():
+            lots[cle[0]][cle] = groupe
+        noms = dict(Etablissement.objects.filter(pk__in=[pk for pk in lots if pk])
+                    .values_list('pk', 'nom_etablissement'))
+        lots = {f"Salaires {periode} - {noms.get(pk, 'Sans établissement')}": lot
+                for pk, lot in lots.items()}
+    else:
+        lots = {f"Salaires {periode}": groupes}
+
+    operations = [{
+        'type_journal': 'SA', 'date': periode.date_fin, 'libelle': libelle,
+        'lignes': lignes_ecriture_paie(periode.entreprise, lot, libelle),
+    } for libelle, lot in sorted(lots.items())]
+
+    maintenant = timezone.now()
+    with transaction.atomic():
+        # La période fait foi (et non l'empreinte) : une seule comptabilisation active
+        if not PeriodePaie.objects.filter(pk=periode.pk, date_comptabilisation__isnull=True).update(
+                date_comptabilisation=maintenant):
+            raise ErreurComptabilisation(
+                "Période déjà comptabilisée : contrepassez ses écritures avant de la comptabiliser à nouveau.")
+        ecritures = generer_ecritures_en_masse(periode.entreprise, utilisateur, operations,
+                                               verifier_doublon=False)
+        periode.ecritures_comptables.set(ecritures)
+    periode.date_comptabilisation = maintenant
+    return ecritures
+
+
+def contrepasser_periode_paie(periode, utilisateur):
+    """
+    Contrepasse les écritures de salaires de la période (débits et crédits
+    inversés, même journal, même date) et la libère pour une nouvelle
+    comptabilisation.
+
+    :return: liste des écritures de contrepassation
+    :raises ErreurComptabilisation: période non comptabilisée, ou refus du moteur
+    """
+    with transaction.atomic():
+        if not PeriodePaie.objects.filter(pk=periode.pk, date_comptabilisation__isnull=False).update(
+                date_comptabilisation=None):
+            raise ErreurComptabilisation("Cette période n'est pas comptabilisée.")
+        ecritures = (periode.ecritures_comptables.select_related('journal')
+                     .prefetch_related('lignes__compte', 'lignes__centre_analyse')
+                     .order_by('numero_ecriture'))
+        operations = [{
+            'type_journal': ecriture.journal.type_journal, 'date': ecriture.date_ecriture,
+            'libelle': f"Contrepassation {ecriture.libelle}",
+            'lignes': [(ligne.compte, ligne.libelle, ligne.montant_credit, ligne.montant_debit,
+                        ligne.centre_analyse) for ligne in ecriture.lignes.all()],
+        } for ecriture in ecritures]
+        contrepassations = generer_ecritures_en_masse(periode.entreprise, utilisateur, operations,
+                                                      verifier_doublon=False)
+        periode.ecritures_comptables.clear()
+    periode.date_comptabilisation = None
+    return contrepassations
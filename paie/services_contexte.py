@@ -0,0 +1,87 @@
+"""
+Contexte de calcul partagé par tous les employés d'une période.
+
+Les données qui ne dépendent pas de l'employé (constantes surchargées par la
+configuration entreprise, barème RTS, effectif, taux de change, rubriques
+des lignes calculées, règles d'indemnités) sont chargées une seule
+fois par (entreprise, période) puis transmises à ``MoteurCalculPaie``,
+à la rétropaie et aux simulations.
+"""
+import calendar
+from datetime import date
+from decimal import Decimal
+
+from .cache_service import PayrollCacheService
+from .services import (
+    RUBRIQUES_SYSTEME, appliquer_config_entreprise, rechercher_rubrique_systeme,
+    resoudre_config_conges,
+)
+from core.services.devises import DeviseService
+from employes.models import Employe
+
+
+class PeriodeContext:
+    """
+    Instantané des données communes d'une période de paie.
+
+    Construit une fois (une dizaine de requêtes) puis partagé en lecture par
+    tous les moteurs de la période, y compris entre threads : le calcul d'un
+    employé n'exécute plus aucune requête pour ces données.
+    """
+
+    def __init__(self, periode, entreprise):
+        self.periode = periode
+        self.entreprise = entreprise
+        self.date_reference = date(periode.annee, periode.mois, 1)
+        self.date_fin = date(
+            periode.annee, periode.mois,
+            calendar.monthrange(periode.annee, periode.mois)[1]
+        )
+
+        # Relations de l'entreprise lues par le moteur : chargées (et mises en
+        # cache sur l'instance partagée) avant tout calcul
+        from .models import ConfigurationPaieEntreprise
+        try:
+            self.config_paie = entreprise.config_paie
+        except ConfigurationPaieEntreprise.DoesNotExist:
+            self.config_paie = None
+        self.parametres_calcul = getattr(entreprise, 'parametres_calcul_paie', None)
+
+        self.constantes = dict(PayrollCacheService.get_constantes(date_reference=self.date_reference))
+        if self.config_paie is not None:
+            appliquer_config_entreprise(self.constantes, self.config_paie)
+        self.tranches_irg = PayrollCacheService.get_tranches_rts(periode.annee)
+
+        self.nb_salaries = Employe.objects.filter(
+            entreprise=entreprise,
+            statut_employe='actif'
+        ).count()
+        self.config_conges = resoudre_config_conges(entreprise)
+        self.regles_indemnites = self._charger_regles_indemnites()
+        self.rubriques = {cle: rechercher_rubrique_systeme(cle) for cle in RUBRIQUES_SYSTEME}
+
+        self.devise_base = DeviseService.get_devise_base()
+        self._taux_change = {}
+
+    def _charger_regles_indemnites(self):
+        from .models import RegleIndemnite
+        return list(RegleIndemnite.objects.filter(entreprise=self.entreprise, actif=True))
+
+    def taux_vers_base(self, devise):
+        """Taux de change devise → devise de base à la date de la période (mémorisé)."""
+        if devise.pk not in self._taux_change:
+            self._taux_change[devise.pk] = DeviseService.get_taux_change(
+                devise, self.devise_base, self.date_reference
+            )
+        return self._taux_change[devise.pk]
+
+    def convertir_vers_base(self, montant, devise):
+        """Équivalent de ``DeviseService.convertir_vers_gnf`` sans requête répétée."""
+        if not self.devise_base:
+            raise ValueError("Devise de base (GNF) non configurée")
+        if devise == self.devise_base:
+            return montant
+        taux = self.taux_vers_base(devise)
+        if taux is None:
+            raise ValueError(f"Aucun taux de change trouvé pour {devise.code} -> {self.devise_base.code}")
+        return Decimal(str(montant)) * taux
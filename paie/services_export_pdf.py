@@ -0,0 +1,209 @@
+"""
+Export des bulletins de paie en volume : ZIP en flux continu et PDF groupé.
+
+Chaque entrée du ZIP est envoyée au client dès que son PDF est prêt : le
+téléchargement commence immédiatement et la mémoire reste constante quel
+que soit le nombre de bulletins. Les PDF sont rendus par un pool de threads
+(fenêtre bornée, ordre conservé) ; un PDF déjà archivé est réutilisé tant
+que son empreinte SHA256 correspond encore au fichier stocké.
+
+Le PDF groupé (livre de paie d'une période) est dessiné sur un seul canvas
+écrit dans un fichier temporaire ; en-tête, pied de page commun et filigrane
+y sont des formes partagées par toutes les pages (voir ``FormesBulletin``).
+ReportLab garde les flux de page en mémoire jusqu'à ``save()`` : la mémoire
+croît avec le nombre de pages, d'où un plafond de bulletins par PDF groupé
+(``PAIE_PDF_GROUPE_MAX_BULLETINS``, 5000 par défaut) au-delà duquel
+``PDFGroupeTropVolumineux`` est levée. Le ZIP, lui, n'a pas de limite.
+"""
+import io
+import logging
+import os
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+
+from .services_archive import ArchivageService
+
+logger = logging.getLogger(__name__)
+
+
+class FluxZip(io.RawIOBase):
+    """Tampon en écriture seule : zipfile y écrit, le générateur le vide à chaque entrée."""
+
+    def __init__(self):
+        super().__init__()
+        self._morceaux = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, donnees):
+        self._morceaux.append(bytes(donnees))
+        self._position += len(donnees)
+        return len(donnees)
+
+    def tell(self):
+        return self._position
+
+    def vider(self) -> bytes:
+        donnees = b''.join(self._morceaux)
+        self._morceaux = []
+        return donnees
+
+
+def nombre_workers_export() -> int:
+    """Threads de rendu PDF (1 sous SQLite, comme pour le calcul par lots)."""
+    if connection.vendor == 'sqlite':
+        return 1
+    workers = getattr(settings, 'PAIE_EXPORT_PDF_WORKERS', None) or min(4, os.cpu_count() or 1)
+    return max(1, int(workers))
+
+
+def pdf_archive_valide(bulletin):
+    """Contenu du PDF archivé si son empreinte correspond encore, sinon None."""
+    if not hasattr(bulletin, 'archive'):
+        return None
+    archive = bulletin.archive
+    if not archive.fichier_pdf or not archive.hash_fichier:
+        return None
+    try:
+        with archive.fichier_pdf.open('rb') as f:
+            contenu = f.read()
+    except (OSError, ValueError):
+        return None
+    if ArchivageService.calculer_hash(contenu) != archive.hash_fichier:
+        return None
+    return contenu
+
+
+def pdf_bulletin(bulletin) -> bytes:
+    """PDF du bulletin : archive intègre réutilisée, sinon rendu."""
+    contenu = pdf_archive_valide(bulletin)
+    if contenu is None:
+        from .utils import generer_bulletin_pdf
+        contenu = generer_bulletin_pdf(bulletin)
+    return contenu
+
+
+def _pdf_ou_erreur(bulletin):
+    try:
+        return pdf_bulletin(bulletin)
+    except Exception:
+        logger.exception(f"Export ZIP : PDF du bulletin {bulletin.numero_bulletin} non généré")
+        return None
+
+
+def _pdf_thread(bulletin):
+    try:
+        return _pdf_ou_erreur(bulletin)
+    finally:
+        connection.close()
+
+
+def _pdfs_en_ordre(bulletins, workers):
+    """(bulletin, pdf) dans l'ordre de ``bulletins`` ; au plus ``2 × workers`` PDF en attente."""
+    if workers <= 1:
+        for bulletin in bulletins:
+            yield bulletin, _pdf_ou_erreur(bulletin)
+        return
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export-pdf')
+    try:
+        en_cours = deque()
+        for bulletin in bulletins:
+            en_cours.append((bulletin, pool.submit(_pdf_thread, bulletin)))
+            if len(en_cours) >= 2 * workers:
+                suivant, future = en_cours.popleft()
+                yield suivant, future.result()
+        while en_cours:
+            suivant, future = en_cours.popleft()
+            yield suivant, future.result()
+    finally:
+        # Client déconnecté : ne pas rendre les PDF restants
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def generer_zip_bulletins(bulletins, nom_fichier, workers=None):
+    """
+    Génère le ZIP morceau par morceau (à passer à ``StreamingHttpResponse``).
+
+    :param bulletins: itérable de BulletinPaie (``select_related('employe', 'archive')`` conseillé)
+    :param nom_fichier: fonction bulletin → nom de l'entrée dans le ZIP
+    :param workers: threads de rendu (défaut : ``nombre_workers_export()``)
+    """
+    flux = FluxZip()
+    with zipfile.ZipFile(flux, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for bulletin, contenu in _pdfs_en_ordre(bulletins, workers or nombre_workers_export()):
+            if contenu is None:
+                continue
+            zip_file.writestr(nom_fichier(bulletin), contenu)
+            yield flux.vider()
+    # Répertoire central écrit à la fermeture
+    yield flux.vider()
+
+
+class PDFGroupeTropVolumineux(ValueError):
+    """Trop de bulletins pour un PDF groupé (mémoire bornée)"""
+
+    def __init__(self, nombre, maximum):
+        self.nombre = nombre
+        self.maximum = maximum
+        super().__init__(
+            f"Le PDF groupé est limité à {maximum} bulletins ({nombre} demandés). "
+            f"Utilisez le téléchargement ZIP des bulletins."
+        )
+
+
+def max_bulletins_pdf_groupe() -> int:
+    return int(getattr(settings, 'PAIE_PDF_GROUPE_MAX_BULLETINS', 5000))
+
+
+def verifier_taille_pdf_groupe(nombre):
+    """Lève PDFGroupeTropVolumineux si ``nombre`` bulletins dépassent le plafond."""
+    maximum = max_bulletins_pdf_groupe()
+    if nombre > maximum:
+        raise PDFGroupeTropVolumineux(nombre, maximum)
+
+
+def generer_pdf_groupe(bulletins, fichier, filigrane=False):
+    """
+    Dessine tous les bulletins dans un PDF unique écrit dans ``fichier``.
+
+    :param bulletins: itérable de BulletinPaie (``.iterator()`` conseillé : les
+        bulletins ne sont pas conservés après leur page)
+    :param fichier: chemin ou fichier binaire ouvert en écriture
+    :param filigrane: logo de l'entreprise en filigrane sur chaque page
+    :return: dict ``bulletins``, ``pages``, ``duree`` (s), ``pages_par_seconde``
+    :raises PDFGroupeTropVolumineux: plus de ``PAIE_PDF_GROUPE_MAX_BULLETINS``
+        bulletins (vérifiez le nombre avant avec ``verifier_taille_pdf_groupe``)
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    from .utils import FormesBulletin, dessiner_bulletin
+
+    maximum = max_bulletins_pdf_groupe()
+    debut = time.perf_counter()
+    p = canvas.Canvas(fichier, pagesize=A4, pageCompression=1)
+    formes = FormesBulletin(p, filigrane=filigrane)
+    nombre = 0
+    for bulletin in bulletins:
+        if nombre >= maximum:
+            raise PDFGroupeTropVolumineux(nombre + 1, maximum)
+        dessiner_bulletin(p, bulletin, formes)
+        nombre += 1
+    pages = p.getPageNumber() - 1
+    if pages == 0:
+        p.showPage()
+    p.save()
+    duree = time.perf_counter() - debut
+    return {
+        'bulletins': nombre,
+        'pages': pages,
+        'duree': duree,
+        'pages_par_seconde': pages / duree if duree else 0,
+    }
@@ -4,29 +4,21 @@ Service de rétro-calcul salarial : Net → Brut
 Permet de déterminer le salaire BRUT à saisir pour qu'un employé
 reçoive exactement le NET négocié/convenu (ex: 5 500 000 GNF net).
 
-Algorithme : Dichotomie (binary search) sur la fonction brut→net
+Algorithme : Inverse par segments de la fonction brut→net (table par barème)
 Conformité  : Législation guinéenne (CNSS + RTS barème CGI officiel)
 
 Utilisation :
     from paie.services_retropaie import retropaie_net_vers_brut
     resultat = retropaie_net_vers_brut(net_cible=5_500_000, annee=2025)
 """
-from decimal import Decimal, ROUND_HALF_UP, ROUND_FLOOR
+import warnings
+from decimal import Decimal
 from datetime import date
 
-
-# ---------------------------------------------------------------------------
-# Helpers
-# ---------------------------------------------------------------------------
-
-def _d(valeur):
-    """Convertit en Decimal propre."""
-    return Decimal(str(valeur))
-
-
-def _arrondir(montant):
-    """Arrondit à l'unité (pas de centimes en GNF)."""
-    return _d(montant).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+from .services_bareme import (
+    CalculNetBrut, ChargesPatronales, _arrondir, _d, calculer_cnss_salarie,
+    compiler_bareme_retropaie, table_inverse_cout, table_inverse_net,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -45,13 +37,7 @@ def _calculer_cnss(brut, plancher, plafond, taux_employe):
 
     Retourne (cnss_employe, base_cnss_plafonnee).
     """
-    seuil_min = _arrondir(plancher * Decimal('0.10'))   # 10 % du plancher
-    if brut < seuil_min:
-        return Decimal('0'), Decimal('0')
-
-    base = _arrondir(max(min(brut, plafond), plancher))
-    cnss = _arrondir(base * taux_employe / Decimal('100'))
-    return cnss, base
+    return calculer_cnss_salarie(brut, plancher, plafond, taux_employe)
 
 
 # ---------------------------------------------------------------------------
@@ -62,41 +48,10 @@ def _calculer_rts(base_imposable, tranches):
     """
     Calcule l'IRG/RTS selon le barème progressif à tranches.
 
-    tranches : liste de dict {borne_inferieure, borne_superieure, taux_irg}
-               ou objets TrancheRTS (accès par attributs).
+    tranches : liste de dict {borne_inferieure, borne_superieure, taux_irg},
+               objets TrancheRTS ou BaremeRTS déjà compilé.
     """
-    if base_imposable <= 0:
-        return Decimal('0')
-
-    # Normaliser les tranches en tuples (borne_inf, borne_sup, taux)
-    seuils = []
-    for i, t in enumerate(tranches):
-        if isinstance(t, dict):
-            bi  = _d(t['borne_inferieure'])
-            bs  = _d(t['borne_superieure']) if t.get('borne_superieure') is not None else None
-            tx  = _d(t['taux_irg'])
-        else:
-            bi  = _d(t.borne_inferieure)
-            bs  = _d(t.borne_superieure) if t.borne_superieure is not None else None
-            tx  = _d(t.taux_irg)
-
-        # Combler les gaps d'1 GNF entre tranches (1 000 001 → 1 000 000)
-        if i > 0 and seuils:
-            prev_sup = seuils[-1][1]
-            if prev_sup is not None and bi > prev_sup and bi <= prev_sup + 2:
-                bi = prev_sup
-
-        seuils.append((bi, bs, tx))
-
-    irg = Decimal('0')
-    for bi, bs, tx in seuils:
-        if base_imposable <= bi:
-            break
-        montant = (min(base_imposable, bs) - bi) if bs is not None else (base_imposable - bi)
-        if montant > 0:
-            irg += _arrondir(montant * tx / Decimal('100'))
-
-    return irg
+    return compiler_bareme_retropaie(tranches).impot(base_imposable)
 
 
 # ---------------------------------------------------------------------------
@@ -111,34 +66,40 @@ def _net_depuis_brut(brut, constantes, tranches, pct_indem_exonerees=Decimal('0'
                           forfaitaires exonérées de RTS (0 à 25, ex: 15 pour 15 %).
     Retourne (net, cnss, base_cnss, base_rts, rts).
     """
-    plancher  = constantes.get('PLANCHER_CNSS',     Decimal('550000'))
-    plafond   = constantes.get('PLAFOND_CNSS',      Decimal('2500000'))
-    taux_cnss = constantes.get('TAUX_CNSS_EMPLOYE', Decimal('5'))
+    return CalculNetBrut(constantes, tranches, pct_indem_exonerees).calculer(brut)
 
-    cnss, base_cnss = _calculer_cnss(brut, plancher, plafond, taux_cnss)
 
-    # Exonération indemnités forfaitaires (CGI Guinée : max 25 % du brut)
-    # ROUND_FLOOR pour cohérence avec services.py (plafond CGI arrondi vers le bas)
-    exo = _d(brut * min(pct_indem_exonerees, Decimal('25')) / Decimal('100')).quantize(Decimal('1'), rounding=ROUND_FLOOR)
+# ---------------------------------------------------------------------------
+# Service principal : Net → Brut (inverse par segments)
+# ---------------------------------------------------------------------------
 
-    base_rts = max(brut - cnss - exo, Decimal('0'))
-    rts      = _calculer_rts(base_rts, tranches)
-    net      = _arrondir(brut - cnss - rts)
+def _charger_bareme(annee, contexte=None):
+    """Constantes (copie modifiable) et tranches RTS : celles du contexte de période si fourni."""
+    if contexte is not None:
+        return dict(contexte.constantes), contexte.tranches_irg
+    from .cache_service import PayrollCacheService
+    return (
+        PayrollCacheService.get_constantes(date_reference=date(annee, 1, 1)),
+        PayrollCacheService.get_tranches_rts(annee),
+    )
 
-    return net, cnss, base_cnss, base_rts, rts
 
+def _signaler_max_iterations(max_iterations):
+    if max_iterations is not None:
+        warnings.warn(
+            "max_iterations est ignoré depuis l'inverse par segments et sera retiré",
+            DeprecationWarning, stacklevel=3,
+        )
 
-# ---------------------------------------------------------------------------
-# Service principal : Net → Brut (dichotomie)
-# ---------------------------------------------------------------------------
 
 def retropaie_net_vers_brut(
     net_cible,
     annee=None,
     pct_indemnites_forfaitaires=0,
     garantir_net_minimum=True,
-    max_iterations=50,
+    max_iterations=None,
     tolerance=1,
+    contexte=None,
 ):
     """
     Calcule le salaire BRUT nécessaire pour obtenir exactement le NET convenu.
@@ -156,9 +117,13 @@ def retropaie_net_vers_brut(
         Si True, arrondit légèrement le brut vers le haut pour s'assurer que
         l'employé reçoit AU MOINS le net négocié (recommandé).
     max_iterations : int
-        Nombre maximum d'itérations de dichotomie (120 suffit largement).
+        Obsolète, ignoré : l'inverse par segments n'itère plus. Le passer
+        émet une DeprecationWarning ; il sera retiré.
     tolerance : int
         Écart maximal acceptable en GNF entre net_calculé et net_cible (défaut : 1 GNF).
+    contexte : PeriodeContext, optionnel
+        Contexte de période déjà chargé (constantes surchargées par l'entreprise
+        et barème RTS) ; évite de relire les paramètres à chaque appel.
 
     Retourne
     --------
@@ -172,105 +137,52 @@ def retropaie_net_vers_brut(
         net_cible      – Net demandé
         ecart          – net_calcule − net_cible (0 ou 1 GNF max)
         ok             – True si convergence réussie
-        iterations     – Nombre d'itérations utilisées
+        iterations     – Nombre d'évaluations exactes du net utilisées
         detail_tranches – Détail par tranche RTS (liste)
+        meta           – Version du barème, méthode d'inversion et tolérance
+                         (plus de clé max_iterations)
     """
-    from .cache_service import PayrollCacheService
-
+    _signaler_max_iterations(max_iterations)
     net_cible = _arrondir(_d(net_cible))
     pct_indem = _d(pct_indemnites_forfaitaires)
 
     if annee is None:
-        annee = date.today().year
+        annee = contexte.periode.annee if contexte is not None else date.today().year
 
     # ---- Chargement des paramètres de paie --------------------------------
-    constantes = PayrollCacheService.get_constantes(date_reference=date(annee, 1, 1))
-    tranches   = PayrollCacheService.get_tranches_rts(annee)
+    constantes, tranches = _charger_bareme(annee, contexte)
 
     # Valeurs par défaut si base vide
     constantes.setdefault('PLANCHER_CNSS',     Decimal('550000'))
     constantes.setdefault('PLAFOND_CNSS',      Decimal('2500000'))
     constantes.setdefault('TAUX_CNSS_EMPLOYE', Decimal('5'))
+    calcul = CalculNetBrut(constantes, tranches, pct_indem)
 
-    # ---- Dichotomie entière robuste (pas de float, binary search exact) ---
-    low  = int(net_cible)                          # Brut minimum = net cible
-    high = int(_arrondir(net_cible * Decimal('2')))  # Borne haute (généreux)
-
-    brut_opt  = high
-    iterations = 0
-
-    # Phase 1 : binary search entier strict (convergence log2)
-    for _ in range(max_iterations):
-        iterations += 1
-        mid = (low + high) // 2
+    # ---- Inverse par segments (table mémorisée par barème et % exonéré) ---
+    # brut_opt = plus petit brut dont le net atteint la cible
+    brut_min, iterations = table_inverse_net(calcul).inverser(net_cible)
+    brut_opt = Decimal(brut_min)
 
-        net_mid, *_ = _net_depuis_brut(Decimal(str(mid)), constantes, tranches, pct_indem)
-        net_mid = int(net_mid)
-
-        if net_mid == int(net_cible):
-            brut_opt = Decimal(str(mid))
-            break
-        elif net_mid < int(net_cible):
-            low = mid + 1
-        else:
-            high = mid - 1
-
-        brut_opt = Decimal(str(mid))
-
-        if low > high:
-            # Pas de solution exacte à ce stade, prendre le plus proche
-            brut_opt = Decimal(str(mid))
-            break
-
-    # ---- Garantie du net minimum OU affinement net exact ------------------
     if garantir_net_minimum:
-        # Mode net_minimum : s'assurer que net >= net_cible
-        net_test, *_ = _net_depuis_brut(brut_opt, constantes, tranches, pct_indem)
-        while int(net_test) < int(net_cible):
-            brut_opt += Decimal('1')
-            net_test, *_ = _net_depuis_brut(brut_opt, constantes, tranches, pct_indem)
         mode = 'net_minimum'
     else:
-        # Mode net_exact : affiner au GNF près par balayage linéaire
-        net_test, *_ = _net_depuis_brut(brut_opt, constantes, tranches, pct_indem)
-        if int(net_test) > int(net_cible):
-            # Descendre d'1 GNF à la fois
-            while int(brut_opt) > int(net_cible):
-                brut_candidat = brut_opt - Decimal('1')
-                net_candidat, *_ = _net_depuis_brut(brut_candidat, constantes, tranches, pct_indem)
-                if int(net_candidat) < int(net_cible):
-                    ecart_actuel = abs(int(net_test) - int(net_cible))
-                    ecart_candidat = abs(int(net_candidat) - int(net_cible))
-                    if ecart_candidat < ecart_actuel:
-                        brut_opt = brut_candidat
-                    break
-                brut_opt = brut_candidat
-                net_test = net_candidat
-        elif int(net_test) < int(net_cible):
-            # Monter d'1 GNF
-            while True:
-                brut_candidat = brut_opt + Decimal('1')
-                net_candidat, *_ = _net_depuis_brut(brut_candidat, constantes, tranches, pct_indem)
-                if int(net_candidat) > int(net_cible):
-                    ecart_actuel = int(net_cible) - int(net_test)
-                    ecart_candidat = int(net_candidat) - int(net_cible)
-                    if ecart_candidat < ecart_actuel:
-                        brut_opt = brut_candidat
-                    break
-                brut_opt = brut_candidat
-                net_test = net_candidat
+        # Mode net_exact : retenir le brut dont le net est le plus proche de la cible
+        net_test, *_ = calcul.calculer(brut_opt)
+        if int(net_test) > int(net_cible) and brut_opt > 0:
+            net_inferieur, *_ = calcul.calculer(brut_opt - 1)
+            iterations += 1
+            if int(net_cible) - int(net_inferieur) < int(net_test) - int(net_cible):
+                brut_opt -= 1
         mode = 'net_exact'
 
     # ---- Résultat final + Assertion de sécurité ---------------------------
-    net_final, cnss_f, base_cnss_f, base_rts_f, rts_f = _net_depuis_brut(
-        brut_opt, constantes, tranches, pct_indem
-    )
+    net_final, cnss_f, base_cnss_f, base_rts_f, rts_f = calcul.calculer(brut_opt)
 
     ecart_final = abs(int(net_final) - int(net_cible))
     precision_ok = ecart_final <= int(tolerance)
 
     # Détail par tranche RTS
-    detail_tranches = _detail_tranches(base_rts_f, tranches)
+    detail_tranches = _detail_tranches(base_rts_f, calcul.bareme)
 
     return {
         'brut':            brut_opt,
@@ -288,43 +200,37 @@ def retropaie_net_vers_brut(
         'precision_ok':    precision_ok,
         'meta': {
             'version_bareme': f'GN-{annee}-v1',
-            'methode_inverse': 'binary_search_int_v2',
-            'max_iterations': max_iterations,
+            'methode_inverse': 'table_inverse_segments_v3',
             'tolerance_gnf': int(tolerance),
         },
     }
 
 
 def verifier_monotonie(annee=None, pct_indemnites_forfaitaires=0, pas=500_000,
-                       brut_max=50_000_000):
+                       brut_max=50_000_000, contexte=None):
     """
     Vérifie que la fonction brut→net est monotone croissante.
     Retourne True si OK, lève ValueError si une anomalie est détectée.
     Utile en CI/dev pour valider un barème.
     """
-    from .cache_service import PayrollCacheService
-
     if annee is None:
-        annee = date.today().year
+        annee = contexte.periode.annee if contexte is not None else date.today().year
 
-    constantes = PayrollCacheService.get_constantes(date_reference=date(annee, 1, 1))
-    tranches   = PayrollCacheService.get_tranches_rts(annee)
+    constantes, tranches = _charger_bareme(annee, contexte)
     constantes.setdefault('PLANCHER_CNSS',     Decimal('550000'))
     constantes.setdefault('PLAFOND_CNSS',      Decimal('2500000'))
     constantes.setdefault('TAUX_CNSS_EMPLOYE', Decimal('5'))
 
-    pct_indem = _d(pct_indemnites_forfaitaires)
-    prev_net = 0
-
-    for brut in range(0, brut_max + 1, pas):
-        net, *_ = _net_depuis_brut(Decimal(str(brut)), constantes, tranches, pct_indem)
-        net = int(net)
+    bruts = range(0, brut_max + 1, pas)
+    nets = CalculNetBrut(constantes, tranches, _d(pct_indemnites_forfaitaires)).nets_lot(
+        Decimal(brut) for brut in bruts
+    )
+    for brut, prev_net, net in zip(bruts[1:], nets, nets[1:]):
         if net < prev_net:
             raise ValueError(
-                f"Anomalie de monotonicité : brut={brut:,} → net={net:,} "
-                f"< précédent net={prev_net:,} (brut={brut - pas:,})"
+                f"Anomalie de monotonicité : brut={brut:,} → net={int(net):,} "
+                f"< précédent net={int(prev_net):,} (brut={brut - pas:,})"
             )
-        prev_net = net
 
     return True
 
@@ -333,19 +239,17 @@ def verifier_monotonie(annee=None, pct_indemnites_forfaitaires=0, pas=500_000,
 # Détail par tranche (pour affichage pédagogique)
 # ---------------------------------------------------------------------------
 
-def calculer_charges_patronales(brut, annee=None, nb_salaries=0):
+def calculer_charges_patronales(brut, annee=None, nb_salaries=0, contexte=None):
     """
     Calcule les charges patronales pour un brut donné.
 
     Retourne dict :
         cnss_employeur, vf, ta, libelle_ta, total, cout_total_employeur
     """
-    from .cache_service import PayrollCacheService
-
     if annee is None:
-        annee = date.today().year
+        annee = contexte.periode.annee if contexte is not None else date.today().year
 
-    constantes = PayrollCacheService.get_constantes(date_reference=date(annee, 1, 1))
+    constantes, _ = _charger_bareme(annee, contexte)
     constantes.setdefault('PLANCHER_CNSS',       Decimal('550000'))
     constantes.setdefault('PLAFOND_CNSS',        Decimal('2500000'))
     constantes.setdefault('TAUX_CNSS_EMPLOYEUR', Decimal('18'))
@@ -354,24 +258,8 @@ def calculer_charges_patronales(brut, annee=None, nb_salaries=0):
     constantes.setdefault('TAUX_ONFPP',          Decimal('1.5'))
 
     brut = _arrondir(_d(brut))
-    plancher     = constantes['PLANCHER_CNSS']
-    plafond      = constantes['PLAFOND_CNSS']
-    taux_cnss_pat = constantes['TAUX_CNSS_EMPLOYEUR']
-    taux_vf       = constantes['TAUX_VF']
-    libelle_ta    = 'ONFPP' if nb_salaries >= 25 else 'TA'
-    taux_ta       = constantes['TAUX_ONFPP'] if nb_salaries >= 25 else constantes['TAUX_TA']
-
-    seuil = _arrondir(plancher * Decimal('0.10'))
-    if brut < seuil:
-        cnss_pat = Decimal('0')
-    else:
-        base = _arrondir(max(min(brut, plafond), plancher))
-        cnss_pat = _arrondir(base * taux_cnss_pat / Decimal('100'))
-
-    deduction_vf = _arrondir(min(brut, plafond) * taux_vf / Decimal('100'))
-    base_vf = max(Decimal('0'), brut - deduction_vf)
-    vf = _arrondir(base_vf * taux_vf / Decimal('100'))
-    ta = _arrondir(base_vf * taux_ta / Decimal('100'))
+    charges = ChargesPatronales(constantes, nb_salaries)
+    cnss_pat, base_vf, vf, ta = charges.calculer(brut)
     total = cnss_pat + vf + ta
 
     return {
@@ -379,7 +267,7 @@ def calculer_charges_patronales(brut, annee=None, nb_salaries=0):
         'base_vf':             int(base_vf),
         'vf':                  int(vf),
         'ta':                  int(ta),
-        'libelle_ta':          libelle_ta,
+        'libelle_ta':          charges.libelle_ta,
         'total':               int(total),
         'cout_total_employeur': int(brut) + int(total),
     }
@@ -390,7 +278,8 @@ def cout_total_vers_brut(
     annee=None,
     pct_indemnites_forfaitaires=0,
     nb_salaries=0,
-    max_iterations=50,
+    max_iterations=None,
+    contexte=None,
 ):
     """
     Calcule le brut et le net depuis un coût total employeur (budget tout compris).
@@ -401,21 +290,21 @@ def cout_total_vers_brut(
     ----------
     cout_total : montant total que l'entreprise paie pour l'employé
     nb_salaries : nombre de salariés (>= 25 → ONFPP 1.5%, sinon TA 2%)
+    max_iterations : obsolète, ignoré (DeprecationWarning)
+    contexte : PeriodeContext optionnel (constantes et barème de la période)
 
     Retourne
     --------
     dict : brut, net, cnss_employe, rts, charges_patronales (détail), cout_total_reel
     """
-    from .cache_service import PayrollCacheService
-
+    _signaler_max_iterations(max_iterations)
     cout_total = _arrondir(_d(cout_total))
     pct_indem = _d(pct_indemnites_forfaitaires)
 
     if annee is None:
-        annee = date.today().year
+        annee = contexte.periode.annee if contexte is not None else date.today().year
 
-    constantes = PayrollCacheService.get_constantes(date_reference=date(annee, 1, 1))
-    tranches = PayrollCacheService.get_tranches_rts(annee)
+    constantes, tranches = _charger_bareme(annee, contexte)
 
     constantes.setdefault('PLANCHER_CNSS',     Decimal('550000'))
     constantes.setdefault('PLAFOND_CNSS',      Decimal('2500000'))
@@ -425,61 +314,23 @@ def cout_total_vers_brut(
     constantes.setdefault('TAUX_TA',           Decimal('2'))
     constantes.setdefault('TAUX_ONFPP',        Decimal('1.5'))
 
-    plancher     = constantes['PLANCHER_CNSS']
-    plafond      = constantes['PLAFOND_CNSS']
-    taux_cnss_pat = constantes['TAUX_CNSS_EMPLOYEUR']
-    taux_vf       = constantes['TAUX_VF']
-    taux_ta_onfpp = constantes['TAUX_ONFPP'] if nb_salaries >= 25 else constantes['TAUX_TA']
-    libelle_ta    = 'ONFPP' if nb_salaries >= 25 else 'TA'
-
-    def _charges_pat(brut):
-        seuil = _arrondir(plancher * Decimal('0.10'))
-        if brut < seuil:
-            cnss_pat = Decimal('0')
-        else:
-            base = _arrondir(max(min(brut, plafond), plancher))
-            cnss_pat = _arrondir(base * taux_cnss_pat / Decimal('100'))
-        deduction_vf = _arrondir(min(brut, plafond) * taux_vf / Decimal('100'))
-        base_vf = max(Decimal('0'), brut - deduction_vf)
-        vf = _arrondir(base_vf * taux_vf / Decimal('100'))
-        ta = _arrondir(base_vf * taux_ta_onfpp / Decimal('100'))
-        return cnss_pat, vf, ta
-
-    def _cout(brut):
-        c, v, t = _charges_pat(brut)
-        return brut + c + v + t
-
-    # Dichotomie : trouver brut tel que _cout(brut) ≈ cout_total
-    low  = Decimal('0')
-    high = cout_total  # brut ne peut dépasser le budget total
-    brut_opt = _arrondir(cout_total / Decimal('1.26'))  # estimation init
-
-    for _ in range(max_iterations):
-        mid = _arrondir((low + high) / 2)
-        if abs(_cout(mid) - cout_total) <= _d('1'):
-            brut_opt = mid
-            break
-        if _cout(mid) < cout_total:
-            low = mid
-        else:
-            high = mid
-        brut_opt = mid
-
-    # Garantir que le coût calculé ne dépasse pas le budget
-    while _cout(brut_opt) > cout_total:
-        brut_opt -= Decimal('1')
+    charges = ChargesPatronales(constantes, nb_salaries)
+
+    # Inverse par segments : plus grand brut dont le coût ne dépasse pas le budget
+    brut_min, _ = table_inverse_cout(charges).inverser(cout_total + 1)
+    brut_opt = Decimal(max(brut_min - 1, 0))
 
     # Résultats complets
-    cnss_pat, vf, ta = _charges_pat(brut_opt)
+    cnss_pat, _, vf, ta = charges.calculer(brut_opt)
     total_pat = cnss_pat + vf + ta
-    net, cnss_emp, base_cnss, base_rts, rts = _net_depuis_brut(
-        brut_opt, constantes, tranches, pct_indem
-    )
-    detail_t = _detail_tranches(base_rts, tranches)
+    cout_reel = brut_opt + total_pat
+    calcul = CalculNetBrut(constantes, tranches, pct_indem)
+    net, cnss_emp, base_cnss, base_rts, rts = calcul.calculer(brut_opt)
+    detail_t = _detail_tranches(base_rts, calcul.bareme)
 
     return {
         'cout_total_vise':  int(cout_total),
-        'cout_total_reel':  int(_cout(brut_opt)),
+        'cout_total_reel':  int(cout_reel),
         'brut':             brut_opt,
         'cnss_employe':     cnss_emp,
         'base_cnss':        base_cnss,
@@ -490,44 +341,20 @@ def cout_total_vers_brut(
             'cnss_employeur': int(cnss_pat),
             'vf':             int(vf),
             'ta':             int(ta),
-            'libelle_ta':     libelle_ta,
+            'libelle_ta':     charges.libelle_ta,
             'total':          int(total_pat),
         },
         'detail_tranches':  detail_t,
-        'ok': abs(int(_cout(brut_opt)) - int(cout_total)) <= 1000,
+        'ok': abs(int(cout_reel) - int(cout_total)) <= 1000,
         'annee':            annee,
     }
 
 
 def _detail_tranches(base_imposable, tranches):
     """Retourne le détail du calcul RTS tranche par tranche."""
-    if base_imposable <= 0:
-        return []
-
-    seuils = []
-    for i, t in enumerate(tranches):
-        if isinstance(t, dict):
-            bi = _d(t['borne_inferieure'])
-            bs = _d(t['borne_superieure']) if t.get('borne_superieure') is not None else None
-            tx = _d(t['taux_irg'])
-        else:
-            bi = _d(t.borne_inferieure)
-            bs = _d(t.borne_superieure) if t.borne_superieure is not None else None
-            tx = _d(t.taux_irg)
-
-        if i > 0 and seuils:
-            prev_sup = seuils[-1][1]
-            if prev_sup is not None and bi > prev_sup and bi <= prev_sup + 2:
-                bi = prev_sup
-        seuils.append((bi, bs, tx))
-
     detail = []
-    for bi, bs, tx in seuils:
-        if base_imposable <= bi:
-            break
-        montant = (min(base_imposable, bs) - bi) if bs is not None else (base_imposable - bi)
+    for bi, bs, tx, montant, impot_tranche in compiler_bareme_retropaie(tranches).detail(base_imposable):
         if montant > 0:
-            impot_tranche = _arrondir(montant * tx / Decimal('100'))
             detail.append({
                 'borne_inf': int(bi),
                 'borne_sup': int(bs) if bs is not None else None,
@@ -8,6 +8,7 @@ from decimal import Decimal, ROUND_HALF_UP, ROUND_FLOOR
 from datetime import date
 
 from .models import TrancheRTS, Constante
+from .services_bareme import compiler_bareme_simulation
 
 
 # ---------------------------------------------------------------------------
@@ -74,14 +75,17 @@ def _charger_tranches_db(annee: int, type_bareme: str = 'officiel') -> list:
     return result
 
 
-def _charger_constantes() -> dict:
+def _charger_constantes(contexte=None) -> dict:
     """
-    Charge les constantes fiscales actives.
+    Charge les constantes fiscales actives (celles du PeriodeContext si fourni).
     Complète avec des valeurs par défaut si absentes de la DB.
     """
-    constantes = {}
-    for c in Constante.objects.filter(actif=True):
-        constantes[c.code] = c.valeur
+    if contexte is not None:
+        constantes = dict(contexte.constantes)
+    else:
+        constantes = {}
+        for c in Constante.objects.filter(actif=True):
+            constantes[c.code] = c.valeur
 
     defaults = {
         'TAUX_CNSS_EMPLOYE':   Decimal('5'),
@@ -143,41 +147,25 @@ def get_baremes_disponibles() -> list:
 def _calcul_rts_par_tranches(base: Decimal, tranches: list) -> tuple:
     """
     Calcul progressif de la RTS par tranches.
+    ``tranches`` : liste de dicts ou BaremeRTS déjà compilé (cf. services_bareme).
     Retourne (total_rts: int, detail_tranches: list).
 
     Formule: pour chaque tranche [borne_inf, borne_sup) :
         base_tranche = min(base, borne_sup) - borne_inf  (si base > borne_inf)
         impot_tranche = base_tranche * taux / 100  (arrondi HALF_UP)
     """
-    if base <= 0:
-        return 0, []
-
-    base = Decimal(str(base))
-    impot_total = Decimal('0')
-    details = []
-
-    for t in tranches:
-        borne_inf = Decimal(str(t['borne_inf']))
-        taux = Decimal(str(t['taux']))
-        borne_sup = Decimal(str(t['borne_sup'])) if t['borne_sup'] is not None else None
-
-        if base <= borne_inf:
-            break
-
-        plafond = min(base, borne_sup) if borne_sup is not None else base
-        base_tranche = plafond - borne_inf
-        impot_tranche = base_tranche * taux / Decimal('100')
-        impot_total += impot_tranche
-
-        details.append({
+    bareme = compiler_bareme_simulation(tranches)
+    details = [
+        {
             'borne_inf': int(borne_inf),
             'borne_sup': int(borne_sup) if borne_sup is not None else None,
             'taux': float(taux),
             'base_tranche': _half_up(base_tranche),
             'impot_tranche': _half_up(impot_tranche),
-        })
-
-    return _half_up(impot_total), details
+        }
+        for borne_inf, borne_sup, taux, base_tranche, impot_tranche in bareme.detail(base)
+    ]
+    return int(bareme.impot(base)), details
 
 
 def calculer_un_bareme(
@@ -280,6 +268,29 @@ def calculer_un_bareme(
     }
 
 
+def calculer_un_bareme_lot(
+    bruts,
+    total_indemnites,
+    tranches: list,
+    constantes: dict,
+    nb_salaries: int = 0,
+) -> list:
+    """
+    ``calculer_un_bareme`` pour une série de bruts (balayage, courbes),
+    barème compilé une seule fois.
+
+    total_indemnites : montant unique ou liste alignée sur ``bruts``.
+    """
+    bareme = compiler_bareme_simulation(tranches)
+    bruts = list(bruts)
+    if not isinstance(total_indemnites, (list, tuple)):
+        total_indemnites = [total_indemnites] * len(bruts)
+    return [
+        calculer_un_bareme(brut, indem, bareme, constantes, nb_salaries)
+        for brut, indem in zip(bruts, total_indemnites)
+    ]
+
+
 # ---------------------------------------------------------------------------
 # Optimisation dynamique de la structuration (10-25%)
 # ---------------------------------------------------------------------------
@@ -308,6 +319,7 @@ def optimiser_structure_dynamique(
         scenarios : liste de tous les scénarios testés
     """
     taux_max = max(0, min(25, int(taux_max)))  # Sécurité : borné à [0, 25]
+    tranches = compiler_bareme_simulation(tranches)
     brut_d = Decimal(str(brut))
     best = None
     scenarios = []
@@ -373,6 +385,7 @@ def simuler_multi_baremes(
     baremes_ids: list,
     annee_ref: int = None,
     nb_salaries: int = 0,
+    contexte=None,
 ) -> list:
     """
     Lance la simulation pour plusieurs barèmes et retourne les résultats comparatifs.
@@ -385,7 +398,7 @@ def simuler_multi_baremes(
 
     brut             = Decimal(str(brut))
     total_indemnites = Decimal(str(max(0, total_indemnites)))
-    constantes       = _charger_constantes()
+    constantes       = _charger_constantes(contexte)
     resultats        = []
     type_labels      = {'officiel': 'Officiel', 'simulation': 'Simulation', 'test': 'Test'}
 
@@ -437,6 +450,7 @@ def optimiser_net(
     bareme_id: str = None,
     annee_ref: int = None,
     nb_salaries: int = 0,
+    contexte=None,
 ) -> dict:
     """
     Trouve la répartition brut / indemnités qui maximise le net à payer
@@ -456,7 +470,7 @@ def optimiser_net(
         annee_ref = date.today().year
 
     enveloppe = Decimal(str(enveloppe_totale))
-    constantes = _charger_constantes()
+    constantes = _charger_constantes(contexte)
 
     # Charger le barème
     if bareme_id and bareme_id != BAREME_FALLBACK_ID:
@@ -472,6 +486,7 @@ def optimiser_net(
             tranches = list(BAREME_CGI_REFERENCE)
     else:
         tranches = list(BAREME_CGI_REFERENCE)
+    tranches = compiler_bareme_simulation(tranches)
 
     # Scénario 1 : Tout en brut (indemnités = 0)
     r_brut_pur = calculer_un_bareme(enveloppe, Decimal('0'), tranches, constantes, nb_salaries)
@@ -538,6 +553,7 @@ def simuler_scenario_augmentation(
     baremes_ids: list,
     annee_ref: int = None,
     nb_salaries: int = 0,
+    contexte=None,
 ) -> dict:
     """
     Simule l'impact d'une augmentation (%) sur le brut.
@@ -550,10 +566,10 @@ def simuler_scenario_augmentation(
     nouveau_brut = _half_up(brut * (Decimal('100') + pct) / Decimal('100'))
     nouvelles_indemnites = _half_up(indemnites * (Decimal('100') + pct) / Decimal('100'))
 
-    avant = simuler_multi_baremes(brut, indemnites, baremes_ids, annee_ref, nb_salaries)
+    avant = simuler_multi_baremes(brut, indemnites, baremes_ids, annee_ref, nb_salaries, contexte)
     apres = simuler_multi_baremes(
         Decimal(str(nouveau_brut)), Decimal(str(nouvelles_indemnites)),
-        baremes_ids, annee_ref, nb_salaries
+        baremes_ids, annee_ref, nb_salaries, contexte
     )
 
     comparaison = []
@@ -572,7 +588,7 @@ def simuler_scenario_augmentation(
             'cout_total_apres': b['brut'] + b['total_charges_pat'],
         })
 
-    constantes = _charger_constantes()
+    constantes = _charger_constantes(contexte)
     return {
         'pourcentage': float(pct),
         'brut_actuel': int(brut),
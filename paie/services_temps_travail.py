@@ -0,0 +1,136 @@
+"""
+Agrégation du temps de travail d'une période pour le calcul de paie.
+
+Les pointages, absences et congés approuvés de tous les employés d'un lot
+sont lus en trois requêtes groupées ; les totaux de chaque employé
+(jours travaillés, heures, répartition hebdomadaire des HS, absences,
+congés) sont ensuite calculés en mémoire et transmis à MoteurCalculPaie.
+"""
+import calendar
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from temps_travail.models import Pointage, Absence, Conge
+
+# 4 premières HS de la semaine à +30%, au-delà à +60% (Code du Travail guinéen Art. 221)
+SEUIL_HS_HEBDO = Decimal('4')
+
+
+def compter_jours_ouvrables(debut, fin):
+    """Nombre de jours du lundi au vendredi entre ``debut`` et ``fin`` inclus."""
+    if fin < debut:
+        return 0
+    semaines, reste = divmod((fin - debut).days + 1, 7)
+    jours = semaines * 5
+    premier = debut.weekday()
+    for i in range(reste):
+        if (premier + i) % 7 < 5:  # Lundi=0, Vendredi=4
+            jours += 1
+    return jours
+
+
+class TempsTravailPeriode:
+    """
+    Totaux de temps de travail d'un ensemble d'employés pour une période.
+
+    Usage::
+
+        temps = TempsTravailPeriode(periode, employes)
+        moteur = MoteurCalculPaie(employe, periode, temps_travail=temps.pour(employe))
+    """
+
+    def __init__(self, periode, employes):
+        self.premier_jour = date(periode.annee, periode.mois, 1)
+        self.dernier_jour = date(
+            periode.annee, periode.mois,
+            calendar.monthrange(periode.annee, periode.mois)[1]
+        )
+        employe_ids = [e.pk for e in employes]
+
+        self._pointages = defaultdict(list)
+        for ligne in Pointage.objects.filter(
+            employe_id__in=employe_ids,
+            date_pointage__gte=self.premier_jour,
+            date_pointage__lte=self.dernier_jour,
+        ).order_by('employe_id', 'date_pointage').values_list(
+            'employe_id', 'date_pointage', 'statut_pointage',
+            'heures_travaillees', 'heures_supplementaires',
+        ):
+            self._pointages[ligne[0]].append(ligne[1:])
+
+        self._absences = defaultdict(list)
+        for employe_id, *absence in Absence.objects.filter(
+            employe_id__in=employe_ids,
+            date_absence__gte=self.premier_jour,
+            date_absence__lte=self.dernier_jour,
+        ).values_list('employe_id', 'duree_jours', 'impact_paie', 'taux_maintien_salaire'):
+            self._absences[employe_id].append(absence)
+
+        self._conges = defaultdict(list)
+        for employe_id, *conge in Conge.objects.filter(
+            employe_id__in=employe_ids,
+            statut_demande='approuve',
+            date_debut__lte=self.dernier_jour,
+            date_fin__gte=self.premier_jour,
+        ).values_list('employe_id', 'date_debut', 'date_fin'):
+            self._conges[employe_id].append(conge)
+
+    def _debut_effectif(self, employe):
+        """Embauche en cours de mois : jours ouvrables et pointages partent de cette date."""
+        date_embauche = getattr(employe, 'date_embauche', None)
+        if date_embauche and self.premier_jour <= date_embauche <= self.dernier_jour:
+            return date_embauche
+        return self.premier_jour
+
+    def pour(self, employe) -> dict:
+        """Montants de temps de travail de l'employé (clés de ``MoteurCalculPaie.montants``)."""
+        debut_effectif = self._debut_effectif(employe)
+        pointages = [p for p in self._pointages.get(employe.pk, ()) if p[0] >= debut_effectif]
+
+        jours_travailles = sum(1 for p in pointages if p[1] in ('present', 'retard'))
+        heures = [p[2] for p in pointages if p[2] is not None]
+        heures_sup = [p[3] for p in pointages if p[3] is not None]
+
+        # Répartition hebdomadaire des HS, semaines ISO (lundi → dimanche)
+        semaine_map = {}
+        for date_pointage, _, _, hs in pointages:
+            if not hs:
+                continue
+            iso = date_pointage.isocalendar()
+            cle_semaine = (iso[0], iso[1])
+            semaine_map[cle_semaine] = semaine_map.get(cle_semaine, Decimal('0')) + Decimal(str(hs))
+        hs_30 = Decimal('0')
+        hs_60 = Decimal('0')
+        for total_hs_semaine in semaine_map.values():
+            hs_30 += min(total_hs_semaine, SEUIL_HS_HEBDO)
+            hs_60 += max(Decimal('0'), total_hs_semaine - SEUIL_HS_HEBDO)
+
+        jours_absence_total = Decimal('0')
+        jours_absence_non_paye = Decimal('0')
+        for duree_jours, impact_paie, taux_maintien in self._absences.get(employe.pk, ()):
+            jours_absence_total += duree_jours
+            if impact_paie == 'non_paye':
+                jours_absence_non_paye += duree_jours
+            elif impact_paie == 'partiellement_paye':
+                # Partie non payée
+                taux_non_paye = (Decimal('100') - taux_maintien) / Decimal('100')
+                jours_absence_non_paye += duree_jours * taux_non_paye
+
+        jours_conge = Decimal('0')
+        for date_debut, date_fin in self._conges.get(employe.pk, ()):
+            debut_conge = max(date_debut, self.premier_jour)
+            fin_conge = min(date_fin, self.dernier_jour)
+            jours_conge += Decimal(str((fin_conge - debut_conge).days + 1))
+
+        return {
+            'jours_ouvrables': Decimal(str(compter_jours_ouvrables(debut_effectif, self.dernier_jour))),
+            'jours_travailles': Decimal(str(jours_travailles)),
+            'heures_travaillees': sum(heures) if heures else Decimal('0'),
+            'heures_supplementaires': sum(heures_sup) if heures_sup else Decimal('0'),
+            'heures_sup_30': hs_30,
+            'heures_sup_60': hs_60,
+            'jours_absence': jours_absence_total,
+            'jours_absence_non_paye': jours_absence_non_paye,
+            'jours_conge': jours_conge,
+        }
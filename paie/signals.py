@@ -11,6 +11,46 @@ from employes.models import Employe
 from .models import ElementSalaire, RubriquePaie
 
 
+def _rubrique_salaire_base():
+    """Rubrique de salaire de base (par code, sinon par libellé), créée au besoin"""
+    rubrique_base = RubriquePaie.objects.filter(
+        code_rubrique__icontains='SAL_BASE',
+        type_rubrique='gain',
+        actif=True
+    ).first()
+
+    # Si pas trouvée, chercher par libellé
+    if not rubrique_base:
+        rubrique_base = RubriquePaie.objects.filter(
+            libelle_rubrique__icontains='Salaire de base',
+            type_rubrique='gain',
+            actif=True
+        ).first()
+
+    # Si toujours pas trouvée, créer la rubrique
+    if not rubrique_base:
+        rubrique_base, _ = RubriquePaie.objects.get_or_create(
+            code_rubrique='SAL_BASE',
+            defaults={
+                'libelle_rubrique': 'Salaire de base',
+                'type_rubrique': 'gain',
+                'soumis_cnss': True,
+                'soumis_irg': True,
+                'ordre_calcul': 10,
+                'ordre_affichage': 10,
+                'actif': True
+            }
+        )
+    return rubrique_base
+
+
+def _montant_base(employe):
+    """Salaire de base de l'employé s'il est défini, sinon le SMIG guinéen"""
+    if hasattr(employe, 'salaire_base') and employe.salaire_base:
+        return employe.salaire_base
+    return Decimal('550000')  # SMIG par défaut
+
+
 @receiver(post_save, sender=Employe)
 def creer_element_salaire_base(sender, instance, created, **kwargs):
     """
@@ -18,51 +58,34 @@ def creer_element_salaire_base(sender, instance, created, **kwargs):
     Utilise le salaire_base de l'employé s'il est défini, sinon un montant par défaut.
     """
     if created:
-        # Chercher la rubrique de salaire de base
-        rubrique_base = RubriquePaie.objects.filter(
-            code_rubrique__icontains='SAL_BASE',
-            type_rubrique='gain',
-            actif=True
-        ).first()
-        
-        # Si pas trouvée, chercher par libellé
-        if not rubrique_base:
-            rubrique_base = RubriquePaie.objects.filter(
-                libelle_rubrique__icontains='Salaire de base',
-                type_rubrique='gain',
-                actif=True
-            ).first()
-        
-        # Si toujours pas trouvée, créer la rubrique
-        if not rubrique_base:
-            rubrique_base, _ = RubriquePaie.objects.get_or_create(
-                code_rubrique='SAL_BASE',
-                defaults={
-                    'libelle_rubrique': 'Salaire de base',
-                    'type_rubrique': 'gain',
-                    'soumis_cnss': True,
-                    'soumis_irg': True,
-                    'ordre_calcul': 10,
-                    'ordre_affichage': 10,
-                    'actif': True
-                }
-            )
-        
-        # Déterminer le montant du salaire de base
-        # Utiliser le salaire_base de l'employé s'il existe, sinon le SMIG guinéen
-        montant_base = Decimal('550000')  # SMIG par défaut
-        
-        if hasattr(instance, 'salaire_base') and instance.salaire_base:
-            montant_base = instance.salaire_base
-        
-        # Créer l'élément de salaire de base
         ElementSalaire.objects.get_or_create(
             employe=instance,
-            rubrique=rubrique_base,
+            rubrique=_rubrique_salaire_base(),
             defaults={
-                'montant': montant_base,
+                'montant': _montant_base(instance),
                 'date_debut': instance.date_embauche or date.today(),
                 'actif': True,
                 'recurrent': True
             }
         )
+
+
+def creer_elements_salaire_base(employes):
+    """
+    Équivalent en masse de ``creer_element_salaire_base`` pour des employés
+    nouvellement créés par bulk_create (qui n'émet pas post_save).
+    """
+    if not employes:
+        return
+    rubrique_base = _rubrique_salaire_base()
+    ElementSalaire.objects.bulk_create([
+        ElementSalaire(
+            employe=employe,
+            rubrique=rubrique_base,
+            montant=_montant_base(employe),
+            date_debut=employe.date_embauche or date.today(),
+            actif=True,
+            recurrent=True,
+        )
+        for employe in employes
+    ], batch_size=1000)
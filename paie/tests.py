@@ -5,8 +5,9 @@ Exécution: python manage.py test paie.tests
 
 Référence: CGI 2022 + Code du Travail Guinée
 """
+from datetime import date
 from decimal import Decimal
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
 
 
 class CNSSCalculTests(SimpleTestCase):
@@ -386,6 +387,23 @@ class FormuleSecuriteTests(SimpleTestCase):
         r = evaluer_formule('brut / 0', self._vars())
         self.assertEqual(r, Decimal('0'))
 
+    def test_calcul_en_decimal(self):
+        """Les littéraux et variables sont évalués en Decimal, sans erreur d'arrondi flottant"""
+        from paie.formules import evaluer_formule
+        r = evaluer_formule('brut * 0.1 + primes * 0.2', {'brut': Decimal('0.1'), 'primes': Decimal('0.1')})
+        self.assertEqual(r, Decimal('0.03'))
+
+    def test_formule_compilee_une_seule_fois(self):
+        """Même formule et même phase : une seule analyse, réutilisée pour tout le lot"""
+        from paie.formules import compiler_formule, evaluer_formule_lot
+        compiler_formule.cache_clear()
+        lignes = [dict(self._vars(), brut=brut) for brut in (1000000, 2000000, 4000000)]
+        resultats = evaluer_formule_lot('min(indemnites, brut * 0.25)', lignes)
+        self.assertEqual(resultats, [Decimal('250000'), Decimal('500000'), Decimal('1000000')])
+        evaluer_formule_lot('min(indemnites, brut * 0.25)', lignes)
+        info = compiler_formule.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 1))
+
 
 class FormulePhaseTests(SimpleTestCase):
     """Tests des phases de calcul du moteur de formules"""
@@ -500,3 +518,893 @@ class BulletinCasReferenceTests(SimpleTestCase):
     def test_total_charges_patronales(self):
         self.assertEqual(self.CNSS_PAT + self.VF + self.TA, Decimal('905200'))
 
+
+class BaremeRTSTests(SimpleTestCase):
+    """Noyau barème compilé : résultats identiques au parcours tranche par tranche"""
+
+    TRANCHES = [
+        {'borne_inferieure': 0, 'borne_superieure': 1000000, 'taux_irg': 0},
+        {'borne_inferieure': 1000001, 'borne_superieure': 3000000, 'taux_irg': 5},
+        {'borne_inferieure': 3000001, 'borne_superieure': 5000000, 'taux_irg': 8},
+        {'borne_inferieure': 5000001, 'borne_superieure': 10000000, 'taux_irg': 10},
+        {'borne_inferieure': 10000001, 'borne_superieure': 20000000, 'taux_irg': 15},
+        {'borne_inferieure': 20000001, 'borne_superieure': None, 'taux_irg': 20},
+    ]
+    BASES = [0, 1, 999999, 1000000, 1000001, 1000003, 2999999, 3000000, 3475000,
+             7875000, 10000000, 19999999, 20000001, 45678901]
+
+    def _rts_parcours(self, base, arrondi_par_tranche):
+        """Référence : parcours tranche par tranche (écarts d'1 GNF comblés)"""
+        from decimal import ROUND_HALF_UP
+        total = Decimal('0')
+        borne_prec = None
+        for t in self.TRANCHES:
+            bi = Decimal(t['borne_inferieure'])
+            if arrondi_par_tranche and borne_prec is not None and borne_prec < bi <= borne_prec + 2:
+                bi = borne_prec
+            bs = Decimal(t['borne_superieure']) if t['borne_superieure'] is not None else None
+            borne_prec = bs
+            if base <= bi:
+                break
+            impot = ((min(base, bs) if bs is not None else base) - bi) * Decimal(t['taux_irg']) / 100
+            total += impot.quantize(Decimal('1'), rounding=ROUND_HALF_UP) if arrondi_par_tranche else impot
+        return total.quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+
+    def test_retropaie_identique_au_parcours(self):
+        from paie.services_bareme import compiler_bareme_retropaie
+        bareme = compiler_bareme_retropaie(self.TRANCHES)
+        bases = [Decimal(b) for b in self.BASES]
+        self.assertEqual(bareme.impots_lot(bases), [self._rts_parcours(b, True) for b in bases])
+        self.assertEqual(bareme.impot(Decimal('7875000')), Decimal('547500'))
+
+    def test_simulation_identique_au_parcours(self):
+        from paie.services_bareme import compiler_bareme_simulation
+        bareme = compiler_bareme_simulation(self.TRANCHES)
+        for base in self.BASES:
+            self.assertEqual(bareme.impot(Decimal(base)), self._rts_parcours(Decimal(base), False))
+
+    def _net_parcours(self, brut, pct):
+        """Référence : brut → net de la rétropaie avant le noyau compilé"""
+        from decimal import ROUND_FLOOR, ROUND_HALF_UP
+        unite = Decimal('1')
+        if brut < Decimal('55000'):  # 10 % du plancher CNSS
+            cnss = base_cnss = Decimal('0')
+        else:
+            base_cnss = max(min(brut, Decimal('2500000')), Decimal('550000'))
+            cnss = (base_cnss * 5 / 100).quantize(unite, rounding=ROUND_HALF_UP)
+        exo = (brut * min(pct, Decimal('25')) / 100).quantize(unite, rounding=ROUND_FLOOR)
+        base_rts = max(brut - cnss - exo, Decimal('0'))
+        rts = self._rts_parcours(base_rts, True)
+        return brut - cnss - rts, cnss, base_cnss, base_rts, rts
+
+    def test_nets_lot_identiques_au_parcours(self):
+        from paie.services_bareme import CalculNetBrut
+        from paie.services_retropaie import _net_depuis_brut
+        constantes = {'PLANCHER_CNSS': Decimal('550000'), 'PLAFOND_CNSS': Decimal('2500000'),
+                      'TAUX_CNSS_EMPLOYE': Decimal('5')}
+        bruts = [Decimal(b) for b in [40000, 54999, 55000] + list(range(0, 30_000_001, 250_000))]
+        lot = CalculNetBrut(constantes, self.TRANCHES, Decimal('15')).calculer_lot(bruts)
+        self.assertEqual(lot, [self._net_parcours(b, Decimal('15')) for b in bruts])
+        self.assertEqual(
+            _net_depuis_brut(Decimal('3000000'), constantes, self.TRANCHES, Decimal('15')),
+            (Decimal('2803750'), Decimal('125000'), Decimal('2500000'), Decimal('2425000'), Decimal('71250')),
+        )
+
+
+class TableInverseTests(SimpleTestCase):
+    """Inverse par segments net → brut et coût total → brut"""
+
+    CONSTANTES = {'PLANCHER_CNSS': Decimal('550000'), 'PLAFOND_CNSS': Decimal('2500000'),
+                  'TAUX_CNSS_EMPLOYE': Decimal('5')}
+
+    def test_brut_minimal_pour_le_net(self):
+        from paie.services_bareme import CalculNetBrut, table_inverse_net
+        for pct in (Decimal('0'), Decimal('25')):
+            calcul = CalculNetBrut(self.CONSTANTES, BaremeRTSTests.TRANCHES, pct)
+            table = table_inverse_net(calcul)
+            for net_cible in (40000, 60000, 980000, 2500000, 5500000, 9999999, 48000000):
+                brut, _ = table.inverser(net_cible)
+                self.assertGreaterEqual(calcul.calculer(Decimal(brut))[0], net_cible)
+                for b in range(max(0, brut - 30), brut):
+                    self.assertLess(calcul.calculer(Decimal(b))[0], net_cible)
+
+    def test_table_memorisee_par_bareme_et_pct(self):
+        from paie.services_bareme import CalculNetBrut, table_inverse_net
+        t1 = table_inverse_net(CalculNetBrut(self.CONSTANTES, BaremeRTSTests.TRANCHES, Decimal('10')))
+        t2 = table_inverse_net(CalculNetBrut(dict(self.CONSTANTES), list(BaremeRTSTests.TRANCHES), Decimal('10')))
+        t3 = table_inverse_net(CalculNetBrut(self.CONSTANTES, BaremeRTSTests.TRANCHES, Decimal('15')))
+        self.assertIs(t1, t2)
+        self.assertIsNot(t1, t3)
+
+    def test_plus_grand_brut_dans_le_budget(self):
+        from paie.services_bareme import ChargesPatronales, table_inverse_cout
+        charges = ChargesPatronales({}, nb_salaries=30)
+        table = table_inverse_cout(charges)
+        for budget in (50000, 700000, 3000000, 12500000):
+            brut, _ = table.inverser(budget + 1)
+            brut -= 1
+            self.assertLessEqual(charges.cout(Decimal(brut)), budget)
+            self.assertGreater(charges.cout(Decimal(brut + 1)), budget)
+
+
+
+class CalculPeriodeParLotsTests(TestCase):
+    """Calcul d'une période par lots commités séparément et reprise"""
+
+    def setUp(self):
+        from core.models import Entreprise
+        from employes.models import Employe
+        from paie.models import PeriodePaie
+
+        self.entreprise = Entreprise.objects.create(
+            nom_entreprise='Lots SARL', slug='lots-sarl', email='lots@sarl.gn')
+        for i in range(5):
+            Employe.objects.create(
+                entreprise=self.entreprise, matricule=f'LOT{i:03d}',
+                nom='Employe', prenoms=str(i), sexe='M',
+                date_naissance=date(1990, 1, 1), date_embauche=date(2020, 1, 1),
+                type_contrat='CDI')
+        self.periode = PeriodePaie.objects.create(
+            entreprise=self.entreprise, annee=2026, mois=1,
+            date_debut=date(2026, 1, 1), date_fin=date(2026, 1, 31))
+
+    def test_decoupage_en_lots_et_numeros_reserves(self):
+        from paie.services_bulk import CalculPeriodeParLots
+        job = CalculPeriodeParLots.demarrer(self.periode, self.entreprise, taille_lot=2).job
+
+        self.assertEqual(job.nombre_employes, 5)
+        self.assertEqual(job.nombre_lots, 3)
+        numeros = [n for lot in job.lots.all() for n in lot.numeros_bulletins.values()]
+        self.assertEqual(len(set(numeros)), 5)
+
+    def test_calcul_complet(self):
+        from paie.models import BulletinPaie
+        from paie.services_bulk import CalculPeriodeParLots
+        job = CalculPeriodeParLots.demarrer(self.periode, self.entreprise, taille_lot=2).executer()
+
+        self.assertEqual(job.statut, 'termine')
+        self.assertEqual(job.progression, 100)
+        self.assertEqual(BulletinPaie.objects.filter(periode=self.periode).count(), 5)
+        self.periode.refresh_from_db()
+        self.assertEqual(self.periode.statut_periode, 'calculee')
+
+    def test_reprise_ne_recalcule_pas_les_lots_termines(self):
+        from paie.models import BulletinPaie
+        from paie.services_bulk import CalculPeriodeParLots
+        service = CalculPeriodeParLots.demarrer(self.periode, self.entreprise, taille_lot=2)
+        premier_lot = service.job.lots.get(numero=1)
+        service._executer_lot(premier_lot.pk)
+        service.job.statut = 'echec'
+        service.job.save()
+        calcules = set(BulletinPaie.objects.values_list('pk', 'date_calcul'))
+
+        reprise = CalculPeriodeParLots.demarrer(self.periode, self.entreprise)
+        self.assertEqual(reprise.job.pk, service.job.pk)
+        job = reprise.executer()
+
+        self.assertEqual(job.statut, 'termine')
+        self.assertEqual(BulletinPaie.objects.count(), 5)
+        self.assertTrue(calcules <= set(BulletinPaie.objects.values_list('pk', 'date_calcul')))
+        self.assertEqual(job.lots.get(numero=1).tentatives, 1)
+
+    def test_reprise_reconcilie_employes_et_numeros(self):
+        from employes.models import Employe
+        from paie.models import BulletinPaie
+        from paie.services_bulk import CalculPeriodeParLots
+        service = CalculPeriodeParLots.demarrer(self.periode, self.entreprise, taille_lot=2)
+        service._executer_lot(service.job.lots.get(numero=1).pk)
+        service.job.statut = 'echec'
+        service.job.save()
+
+        # Entre-temps : une sortie, une embauche, un numéro réservé déjà utilisé
+        lot2 = service.job.lots.get(numero=2)
+        sorti = Employe.objects.get(pk=lot2.employe_ids[0])
+        sorti.statut_employe = 'demissionnaire'
+        sorti.save()
+        embauche = Employe.objects.create(
+            entreprise=self.entreprise, matricule='LOT999', nom='Employe', prenoms='Nouveau',
+            sexe='F', date_naissance=date(1995, 1, 1), date_embauche=date(2026, 1, 5),
+            type_contrat='CDI')
+        lot3 = service.job.lots.get(numero=3)
+        numero_pris = lot3.numeros_bulletins[str(lot3.employe_ids[0])]
+        BulletinPaie.objects.filter(pk=BulletinPaie.objects.filter(periode=self.periode).values('pk')[:1]).update(
+            numero_bulletin=numero_pris)
+
+        reprise = CalculPeriodeParLots.demarrer(self.periode, self.entreprise)
+        self.assertNotIn(sorti.pk, reprise.job.lots.get(numero=2).employe_ids)
+        self.assertEqual(reprise.job.lots.get(numero=4).employe_ids, [embauche.pk])
+        self.assertNotEqual(reprise.job.lots.get(numero=3).numeros_bulletins[str(lot3.employe_ids[0])], numero_pris)
+        job = reprise.executer()
+
+        self.assertEqual(job.statut, 'termine')
+        self.assertEqual(job.nombre_employes, 5)
+        self.assertEqual(
+            set(BulletinPaie.objects.filter(periode=self.periode).values_list('employe_id', flat=True)),
+            set(Employe.objects.filter(entreprise=self.entreprise, statut_employe='actif').values_list('pk', flat=True)),
+        )
+
+
+class PeriodeContextTests(TestCase):
+    """Contexte de période partagé : pas de requête commune répétée par employé"""
+
+    def setUp(self):
+        from core.models import Entreprise
+        from employes.models import Employe
+        from paie.models import PeriodePaie
+
+        self.entreprise = Entreprise.objects.create(
+            nom_entreprise='Contexte SARL', slug='contexte-sarl', email='ctx@sarl.gn')
+        for i in range(6):
+            Employe.objects.create(
+                entreprise=self.entreprise, matricule=f'CTX{i:03d}',
+                nom='Employe', prenoms=str(i), sexe='F',
+                date_naissance=date(1990, 1, 1), date_embauche=date(2020, 1, 1),
+                type_contrat='CDI')
+        self.periode = PeriodePaie.objects.create(
+            entreprise=self.entreprise, annee=2026, mois=1,
+            date_debut=date(2026, 1, 1), date_fin=date(2026, 1, 31))
+
+    def _employes(self):
+        from employes.models import Employe
+        return list(Employe.objects.filter(entreprise=self.entreprise)
+                    .select_related('devise_paie', 'poste').order_by('pk'))
+
+    def _requetes_par_employe(self, contexte):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from paie.services import MoteurCalculPaie
+        comptes = []
+        for employe in self._employes():
+            with CaptureQueriesContext(connection) as requetes:
+                MoteurCalculPaie(employe, self.periode, contexte).calculer_bulletin()
+            comptes.append(len(requetes))
+        return comptes
+
+    def test_construction_moteur_sans_requete(self):
+        from paie.services import MoteurCalculPaie
+        from paie.services_contexte import PeriodeContext
+        contexte = PeriodeContext(self.periode, self.entreprise)
+        employes = self._employes()
+
+        with self.assertNumQueries(0):
+            for employe in employes:
+                MoteurCalculPaie(employe, self.periode, contexte)
+
+    def test_requetes_constantes_quand_effectif_augmente(self):
+        from paie.services_contexte import PeriodeContext
+        contexte = PeriodeContext(self.periode, self.entreprise)
+
+        avec_contexte = self._requetes_par_employe(contexte)
+        sans_contexte = self._requetes_par_employe(None)
+
+        # Coût identique pour chaque employé : le total croît linéairement,
+        # sans part commune rechargée à chaque bulletin
+        self.assertEqual(len(set(avec_contexte)), 1)
+        self.assertLess(avec_contexte[0], sans_contexte[0])
+
+    def test_memes_montants_avec_ou_sans_contexte(self):
+        from paie.services import MoteurCalculPaie
+        from paie.services_contexte import PeriodeContext
+        contexte = PeriodeContext(self.periode, self.entreprise)
+        employe = self._employes()[0]
+
+        sans = MoteurCalculPaie(employe, self.periode).calculer_bulletin()
+        avec = MoteurCalculPaie(employe, self.periode, contexte).calculer_bulletin()
+        self.assertEqual(sans['net'], avec['net'])
+        self.assertEqual(sans['irg'], avec['irg'])
+
+
+class TempsTravailPeriodeTests(TestCase):
+    """Agrégation groupée des pointages, absences et congés d'une période"""
+
+    def setUp(self):
+        from core.models import Entreprise
+        from employes.models import Employe
+        from paie.models import PeriodePaie
+        from temps_travail.models import Absence, Conge, Pointage
+
+        entreprise = Entreprise.objects.create(
+            nom_entreprise='Temps SARL', slug='temps-sarl', email='temps@sarl.gn')
+        self.ancien = Employe.objects.create(
+            entreprise=entreprise, matricule='TT001', nom='Ancien', prenoms='A', sexe='M',
+            date_naissance=date(1990, 1, 1), date_embauche=date(2020, 1, 1), type_contrat='CDI')
+        self.nouveau = Employe.objects.create(
+            entreprise=entreprise, matricule='TT002', nom='Nouveau', prenoms='B', sexe='F',
+            date_naissance=date(1995, 1, 1), date_embauche=date(2026, 1, 15), type_contrat='CDI')
+        self.periode = PeriodePaie.objects.create(
+            entreprise=entreprise, annee=2026, mois=1,
+            date_debut=date(2026, 1, 1), date_fin=date(2026, 1, 31))
+
+        # Semaine du 5 janvier : 5 × 2 HS = 10 h (4 à +30 %, 6 à +60 %) ; 12 janvier : 1 HS
+        for jour in range(5, 10):
+            Pointage.objects.create(
+                employe=self.ancien, date_pointage=date(2026, 1, jour), statut_pointage='present',
+                heures_travaillees=Decimal('8'), heures_supplementaires=Decimal('2'))
+        Pointage.objects.create(
+            employe=self.ancien, date_pointage=date(2026, 1, 12), statut_pointage='retard',
+            heures_travaillees=Decimal('8'), heures_supplementaires=Decimal('1'))
+        # Pointage antérieur à l'embauche : ignoré
+        Pointage.objects.create(
+            employe=self.nouveau, date_pointage=date(2026, 1, 14), statut_pointage='present',
+            heures_travaillees=Decimal('8'))
+        Absence.objects.create(
+            employe=self.ancien, date_absence=date(2026, 1, 20), type_absence='absence_injustifiee',
+            duree_jours=Decimal('1'), impact_paie='non_paye')
+        Absence.objects.create(
+            employe=self.ancien, date_absence=date(2026, 1, 21), type_absence='maladie',
+            duree_jours=Decimal('2'), impact_paie='partiellement_paye',
+            taux_maintien_salaire=Decimal('50'))
+        Conge.objects.create(
+            employe=self.ancien, type_conge='annuel', date_debut=date(2025, 12, 28),
+            date_fin=date(2026, 1, 3), nombre_jours=5, statut_demande='approuve')
+
+    def test_jours_ouvrables(self):
+        from paie.services_temps_travail import compter_jours_ouvrables
+        self.assertEqual(compter_jours_ouvrables(date(2026, 1, 1), date(2026, 1, 31)), 22)
+        self.assertEqual(compter_jours_ouvrables(date(2026, 1, 15), date(2026, 1, 31)), 12)
+        self.assertEqual(compter_jours_ouvrables(date(2026, 1, 3), date(2026, 1, 4)), 0)
+        self.assertEqual(compter_jours_ouvrables(date(2026, 1, 31), date(2026, 1, 1)), 0)
+
+    def test_totaux_par_employe_en_trois_requetes(self):
+        from paie.services_temps_travail import TempsTravailPeriode
+        with self.assertNumQueries(3):
+            temps = TempsTravailPeriode(self.periode, [self.ancien, self.nouveau])
+
+        ancien = temps.pour(self.ancien)
+        self.assertEqual(ancien['jours_ouvrables'], Decimal('22'))
+        self.assertEqual(ancien['jours_travailles'], Decimal('6'))
+        self.assertEqual(ancien['heures_travaillees'], Decimal('48'))
+        self.assertEqual(ancien['heures_supplementaires'], Decimal('11'))
+        self.assertEqual(ancien['heures_sup_30'], Decimal('5'))
+        self.assertEqual(ancien['heures_sup_60'], Decimal('6'))
+        self.assertEqual(ancien['jours_absence'], Decimal('3'))
+        self.assertEqual(ancien['jours_absence_non_paye'], Decimal('2'))
+        self.assertEqual(ancien['jours_conge'], Decimal('3'))
+
+        nouveau = temps.pour(self.nouveau)
+        self.assertEqual(nouveau['jours_ouvrables'], Decimal('12'))
+        self.assertEqual(nouveau['jours_travailles'], Decimal('0'))
+        self.assertEqual(nouveau['heures_travaillees'], Decimal('0'))
+
+    def test_moteur_identique_avec_totaux_precalcules(self):
+        from paie.services import MoteurCalculPaie
+        from paie.services_temps_travail import TempsTravailPeriode
+        temps = TempsTravailPeriode(self.periode, [self.ancien])
+
+        seul = MoteurCalculPaie(self.ancien, self.periode).calculer_bulletin()
+        groupe = MoteurCalculPaie(
+            self.ancien, self.periode, temps_travail=temps.pour(self.ancien)
+        ).calculer_bulletin()
+        self.assertEqual(seul['heures_sup_60'], groupe['heures_sup_60'])
+        self.assertEqual(seul['net'], groupe['net'])
+
+
+class EnregistrementBulletinsLotTests(TestCase):
+    """Écriture groupée des bulletins, lignes, historiques et cumuls"""
+
+    def setUp(self):
+        from core.models import Entreprise
+        from employes.models import Employe
+        from paie.models import ElementSalaire, PeriodePaie, RubriquePaie
+
+        self.entreprise = Entreprise.objects.create(
+            nom_entreprise='Lot Ecriture SARL', slug='lot-ecriture', email='ecr@sarl.gn')
+        salaire = RubriquePaie.objects.create(
+            code_rubrique='SAL_BASE', libelle_rubrique='Salaire de base', type_rubrique='gain',
+            soumis_cnss=True, soumis_irg=True, ordre_affichage=1)
+        RubriquePaie.objects.create(
+            code_rubrique='CNSS_EMP', libelle_rubrique='CNSS salarié', type_rubrique='cotisation',
+            ordre_affichage=50)
+        for i in range(6):
+            employe = Employe.objects.create(
+                entreprise=self.entreprise, matricule=f'ECR{i:03d}',
+                nom='Employe', prenoms=str(i), sexe='M',
+                date_naissance=date(1990, 1, 1), date_embauche=date(2020, 1, 1),
+                type_contrat='CDI')
+            ElementSalaire.objects.create(
+                employe=employe, rubrique=salaire, montant=Decimal('3000000') + i * 100000,
+                date_debut=date(2020, 1, 1))
+        self.periode = PeriodePaie.objects.create(
+            entreprise=self.entreprise, annee=2026, mois=1,
+            date_debut=date(2026, 1, 1), date_fin=date(2026, 1, 31))
+
+    def _employes(self, nombre=None):
+        from employes.models import Employe
+        employes = list(Employe.objects.filter(entreprise=self.entreprise).order_by('pk'))
+        return employes[:nombre] if nombre else employes
+
+    def _enregistrer(self, employes):
+        from paie.services import MoteurCalculPaie
+        from paie.services_bulk import EnregistrementBulletinsLot
+        enregistrement = EnregistrementBulletinsLot(self.periode, employes)
+        for employe in employes:
+            enregistrement.ajouter(MoteurCalculPaie(employe, self.periode))
+        return enregistrement
+
+    def test_meme_resultat_que_le_calcul_unitaire(self):
+        from paie.models import BulletinPaie, CumulPaie
+        from paie.services import MoteurCalculPaie
+        unitaire, groupe = self._employes(2)
+        MoteurCalculPaie(unitaire, self.periode).generer_bulletin()
+        self._enregistrer([groupe]).enregistrer()
+
+        b1 = BulletinPaie.objects.get(employe=unitaire)
+        b2 = BulletinPaie.objects.get(employe=groupe)
+        self.assertEqual(b1.lignes.count(), b2.lignes.count())
+        self.assertGreater(b2.lignes.count(), 0)
+        self.assertEqual(b2.historique.get().type_action, 'creation')
+        self.assertNotEqual(b1.numero_bulletin, b2.numero_bulletin)
+        cumul = CumulPaie.objects.get(employe=groupe, annee=2026)
+        self.assertEqual(cumul.cumul_brut, b2.salaire_brut)
+        self.assertEqual(cumul.cumul_net, b2.net_a_payer)
+        self.assertEqual(cumul.nombre_bulletins, 1)
+
+    def test_recalcul_met_a_jour_les_cumuls_par_difference(self):
+        from paie.models import BulletinPaie, CumulPaie, ElementSalaire
+        employes = self._employes(2)
+        self._enregistrer(employes).enregistrer()
+        ElementSalaire.objects.filter(employe=employes[0]).update(montant=Decimal('4000000'))
+
+        self._enregistrer(employes).enregistrer()
+
+        self.assertEqual(BulletinPaie.objects.filter(periode=self.periode).count(), 2)
+        bulletin = BulletinPaie.objects.get(employe=employes[0])
+        self.assertEqual(bulletin.historique.filter(type_action='recalcul').count(), 1)
+        cumul = CumulPaie.objects.get(employe=employes[0], annee=2026)
+        self.assertEqual(cumul.nombre_bulletins, 1)
+        self.assertEqual(cumul.cumul_brut, bulletin.salaire_brut)
+        self.assertEqual(cumul.cumul_irg, bulletin.irg)
+
+    def test_nombre_de_requetes_independant_de_la_taille_du_lot(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        petit = self._enregistrer(self._employes(2))
+        grand = self._enregistrer(self._employes()[2:])
+        # Création du compteur de numérotation : coût unique, hors mesure
+        from paie.services import allouer_numeros_bulletins
+        allouer_numeros_bulletins(self.periode)
+
+        with CaptureQueriesContext(connection) as requetes_petit:
+            petit.enregistrer()
+        with CaptureQueriesContext(connection) as requetes_grand:
+            grand.enregistrer()
+        self.assertEqual(len(requetes_petit), len(requetes_grand))
+
+    def test_echec_d_un_employe_a_l_ecriture_n_annule_pas_le_lot(self):
+        from paie.models import BulletinPaie
+        from paie.services import MoteurCalculPaie
+        from paie.services_bulk import EnregistrementBulletinsLot
+        employes = self._employes(3)
+        existant, = self._enregistrer(employes[:1]).enregistrer()
+
+        # Numéro déjà attribué : l'insertion groupée échoue sur la contrainte d'unicité
+        enregistrement = EnregistrementBulletinsLot(self.periode, employes[1:])
+        enregistrement.ajouter(MoteurCalculPaie(employes[1], self.periode))
+        enregistrement.ajouter(MoteurCalculPaie(employes[2], self.periode),
+                               numero_bulletin=existant.numero_bulletin)
+        erreurs = []
+        bulletins = enregistrement.enregistrer(erreurs)
+
+        self.assertEqual([b.employe_id for b in bulletins], [employes[1].pk])
+        self.assertEqual(len(erreurs), 1)
+        self.assertTrue(erreurs[0].startswith(employes[2].matricule))
+        self.assertTrue(BulletinPaie.objects.filter(employe=employes[1], periode=self.periode).exists())
+        self.assertFalse(BulletinPaie.objects.filter(employe=employes[2], periode=self.periode).exists())
+        # Numéros réservés pendant l'essai groupé annulé : pas de collision ensuite
+        self._enregistrer(employes[2:]).enregistrer()
+
+
+class NumerotationBulletinsTests(TestCase):
+    """Numéros de bulletin attribués par le compteur de séquence"""
+
+    def test_reprise_apres_bulletins_existants_et_bloc(self):
+        from core.models import Entreprise
+        from employes.models import Employe
+        from paie.models import BulletinPaie, PeriodePaie
+        from paie.services import allouer_numeros_bulletins
+
+        entreprise = Entreprise.objects.create(
+            nom_entreprise='Numeros SARL', slug='numeros-sarl', email='num@sarl.gn')
+        employe = Employe.objects.create(
+            entreprise=entreprise, matricule='NUM001', nom='Employe', prenoms='A', sexe='M',
+            date_naissance=date(1990, 1, 1), date_embauche=date(2020, 1, 1), type_contrat='CDI')
+        periode = PeriodePaie.objects.create(
+            entreprise=entreprise, annee=2026, mois=2,
+            date_debut=date(2026, 2, 1), date_fin=date(2026, 2, 28))
+        BulletinPaie.objects.create(
+            employe=employe, periode=periode, numero_bulletin='BUL-2026-02-0041',
+            mois_paie=2, annee_paie=2026)
+
+        self.assertEqual(allouer_numeros_bulletins(periode), ['BUL-2026-02-0042'])
+        self.assertEqual(
+            allouer_numeros_bulletins(periode, 3),
+            ['BUL-2026-02-0043', 'BUL-2026-02-0044', 'BUL-2026-02-0045'],
+        )
+
+
+class ExportZipBulletinsTests(TestCase):
+    """ZIP des bulletins envoyé en flux, PDF archivés réutilisés"""
+
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        from core.models import Entreprise
+        from employes.models import Employe
+        from paie.models import BulletinPaie, PeriodePaie
+
+        self.media = tempfile.TemporaryDirectory()
+        reglages = override_settings(MEDIA_ROOT=self.media.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.addCleanup(self.media.cleanup)
+
+        entreprise = Entreprise.objects.create(
+            nom_entreprise='Export SARL', slug='export-sarl', email='export@sarl.gn')
+        periode = PeriodePaie.objects.create(
+            entreprise=entreprise, annee=2026, mois=3,
+            date_debut=date(2026, 3, 1), date_fin=date(2026, 3, 31))
+        self.bulletins = []
+        for i in range(2):
+            employe = Employe.objects.create(
+                entreprise=entreprise, matricule=f'EXP{i:03d}', nom='Employe', prenoms=str(i),
+                sexe='M', date_naissance=date(1990, 1, 1), date_embauche=date(2020, 1, 1),
+                type_contrat='CDI')
+            self.bulletins.append(BulletinPaie.objects.create(
+                employe=employe, periode=periode, numero_bulletin=f'BUL-2026-03-{i + 1:04d}',
+                mois_paie=3, annee_paie=2026, statut_bulletin='valide'))
+
+    def _zip(self):
+        import io
+        import zipfile
+        from paie.models import BulletinPaie
+        from paie.services_export_pdf import generer_zip_bulletins
+        bulletins = BulletinPaie.objects.filter(
+            pk__in=[b.pk for b in self.bulletins]
+        ).select_related('employe', 'archive').order_by('numero_bulletin')
+        morceaux = list(generer_zip_bulletins(bulletins, lambda b: f'{b.employe.matricule}.pdf', workers=1))
+        return morceaux, zipfile.ZipFile(io.BytesIO(b''.join(morceaux)))
+
+    def test_pdf_archive_reutilise_et_entrees_envoyees_une_a_une(self):
+        from paie.services_archive import ArchivageService
+        contenu_archive = b'%PDF-1.4 archive'
+        ArchivageService.archiver_bulletin(self.bulletins[0], contenu_archive)
+
+        morceaux, archive_zip = self._zip()
+
+        self.assertEqual(len(morceaux), 3)  # une entrée par bulletin + répertoire central
+        self.assertEqual(archive_zip.namelist(), ['EXP000.pdf', 'EXP001.pdf'])
+        self.assertEqual(archive_zip.read('EXP000.pdf'), contenu_archive)
+        self.assertTrue(archive_zip.read('EXP001.pdf').startswith(b'%PDF'))
+
+    def test_archive_alteree_regeneree(self):
+        from paie.services_archive import ArchivageService
+        archive = ArchivageService.archiver_bulletin(self.bulletins[0], b'%PDF-1.4 archive')
+        archive.hash_fichier = '0' * 64
+        archive.save(update_fields=['hash_fichier'])
+
+        _, archive_zip = self._zip()
+
+        contenu = archive_zip.read('EXP000.pdf')
+        self.assertNotEqual(contenu, b'%PDF-1.4 archive')
+        self.assertTrue(contenu.startswith(b'%PDF'))
+
+    def test_pdf_groupe_formes_partagees(self):
+        import io
+        from paie.models import BulletinPaie
+        from paie.services_export_pdf import generer_pdf_groupe
+        sortie = io.BytesIO()
+        bulletins = BulletinPaie.objects.filter(pk__in=[b.pk for b in self.bulletins])
+
+        resultat = generer_pdf_groupe(bulletins.iterator(), sortie)
+
+        contenu = sortie.getvalue()
+        self.assertEqual(resultat['bulletins'], 2)
+        self.assertEqual(resultat['pages'], 2)
+        self.assertEqual(contenu.count(b'/Type /Page\n'), 2)
+        # En-tête et pied de page définis une seule fois pour les deux bulletins
+        self.assertEqual(contenu.count(b'/Subtype /Form'), 2)
+
+    def test_pdf_groupe_plafonne(self):
+        import io
+        from django.test import override_settings
+        from paie.models import BulletinPaie
+        from paie.services_export_pdf import (
+            PDFGroupeTropVolumineux, generer_pdf_groupe, verifier_taille_pdf_groupe,
+        )
+        bulletins = BulletinPaie.objects.filter(pk__in=[b.pk for b in self.bulletins])
+
+        with override_settings(PAIE_PDF_GROUPE_MAX_BULLETINS=1):
+            with self.assertRaises(PDFGroupeTropVolumineux) as erreur:
+                verifier_taille_pdf_groupe(bulletins.count())
+            self.assertEqual((erreur.exception.nombre, erreur.exception.maximum), (2, 1))
+            with self.assertRaises(PDFGroupeTropVolumineux):
+                generer_pdf_groupe(bulletins.iterator(), io.BytesIO())
+        with override_settings(PAIE_PDF_GROUPE_MAX_BULLETINS=2):
+            self.assertEqual(generer_pdf_groupe(bulletins.iterator(), io.BytesIO())['bulletins'], 2)
+
+
+class ArchivesBulletinsTests(TestCase):
+    """Archives stockées par empreinte, manifeste de période, ZIP et restauration"""
+
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        from core.models import Entreprise
+        from employes.models import Employe
+        from paie.models import BulletinPaie, PeriodePaie
+
+        self.media = tempfile.TemporaryDirectory()
+        reglages = override_settings(MEDIA_ROOT=self.media.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.addCleanup(self.media.cleanup)
+
+        entreprise = Entreprise.objects.create(
+            nom_entreprise='Archives SARL', slug='archives-sarl', email='archives@sarl.gn')
+        self.periode = PeriodePaie.objects.create(
+            entreprise=entreprise, annee=2026, mois=5,
+            date_debut=date(2026, 5, 1), date_fin=date(2026, 5, 31))
+        self.bulletins = []
+        for i in range(3):
+            employe = Employe.objects.create(
+                entreprise=entreprise, matricule=f'ARC{i:03d}', nom='Employe', prenoms=str(i),
+                sexe='M', date_naissance=date(1990, 1, 1), date_embauche=date(2020, 1, 1),
+                type_contrat='CDI')
+            self.bulletins.append(BulletinPaie.objects.create(
+                employe=employe, periode=self.periode, numero_bulletin=f'BUL-2026-05-{i + 1:04d}',
+                mois_paie=5, annee_paie=2026, statut_bulletin='valide'))
+
+    def test_contenu_identique_stocke_une_fois(self):
+        from paie.services_archive import ArchivageService
+        a = ArchivageService.archiver_bulletin(self.bulletins[0], b'%PDF-1.4 identique')
+        b = ArchivageService.archiver_bulletin(self.bulletins[1], b'%PDF-1.4 identique')
+
+        self.assertEqual(a.fichier_pdf.name, b.fichier_pdf.name)
+        h = a.hash_fichier
+        self.assertEqual(a.fichier_pdf.name, f'archives/bulletins/objets/{h[:2]}/{h[2:4]}/{h}.pdf')
+        self.assertTrue(ArchivageService.verifier_integrite(b))
+
+    def test_bulletin_rearchive_dedoublonne(self):
+        from datetime import datetime, timezone as tz
+        from unittest import mock
+        from paie.models import ArchiveBulletin, BulletinPaie
+        from paie.services_archive import ArchivageService
+        from paie.utils import generer_bulletin_pdf
+        BulletinPaie.objects.filter(periode=self.periode).update(
+            date_calcul=datetime(2026, 5, 28, 9, 15, tzinfo=tz.utc))
+        bulletin = BulletinPaie.objects.get(pk=self.bulletins[0].pk)
+        premier = datetime(2026, 6, 1, 10, 0, tzinfo=tz.utc)
+        second = datetime(2026, 9, 14, 16, 42, tzinfo=tz.utc)
+
+        with mock.patch('django.utils.timezone.now', return_value=premier):
+            rendu = generer_bulletin_pdf(bulletin)
+            ArchivageService.archiver_periode(self.periode, workers=1)
+        fichiers = sorted(ArchiveBulletin.objects.values_list('fichier_pdf', flat=True))
+        ArchiveBulletin.objects.all().delete()
+        with mock.patch('django.utils.timezone.now', return_value=second):
+            self.assertEqual(generer_bulletin_pdf(bulletin), rendu)
+            stats = ArchivageService.archiver_periode(self.periode, workers=1)
+
+        self.assertEqual((stats['archivés'], stats['dedoublonnes']), (3, 3))
+        self.assertEqual(sorted(ArchiveBulletin.objects.values_list('fichier_pdf', flat=True)), fichiers)
+
+    def test_archivage_periode_verification_zip_et_restauration(self):
+        import io
+        import os
+        import tempfile
+        import zipfile
+        from django.core.files.storage import default_storage
+        from paie.services_archive import ArchivageService
+
+        stats = ArchivageService.archiver_periode(self.periode, workers=1)
+        self.assertEqual((stats['archivés'], stats['erreurs']), (3, 0))
+        self.assertEqual(ArchivageService.archiver_periode(self.periode, workers=1)['archivés'], 0)
+        self.assertEqual([e['matricule'] for e in ArchivageService.lire_manifeste(self.periode)],
+                         ['ARC000', 'ARC001', 'ARC002'])
+        self.assertEqual(ArchivageService.verifier_periode(self.periode),
+                         {'verifiees': 3, 'alterees': [], 'manquantes': [], 'hors_manifeste': []})
+
+        archive_zip = zipfile.ZipFile(io.BytesIO(b''.join(ArchivageService.zip_periode(self.periode))))
+        self.assertEqual(archive_zip.namelist(), [f'Bulletin_ARC00{i}_2026_05.pdf' for i in range(3)])
+        with self.bulletins[1].archive.fichier_pdf.open('rb') as f:
+            self.assertEqual(archive_zip.read('Bulletin_ARC001_2026_05.pdf'), f.read())
+
+        with tempfile.TemporaryDirectory() as destination:
+            self.assertEqual(ArchivageService.restaurer_periode(self.periode, destination),
+                             {'restaures': 3, 'erreurs': []})
+            self.assertEqual(len(os.listdir(destination)), 3)
+
+        # Fichier altéré : détecté, omis du ZIP
+        with open(default_storage.path(self.bulletins[2].archive.fichier_pdf.name), 'ab') as f:
+            f.write(b'x')
+        self.assertEqual(ArchivageService.verifier_periode(self.periode)['alterees'], ['ARC002'])
+        archive_zip = zipfile.ZipFile(io.BytesIO(b''.join(ArchivageService.zip_periode(self.periode))))
+        self.assertEqual(len(archive_zip.namelist()), 2)
+
+
+class ComptabilisationPaieTests(TestCase):
+    """Écriture de salaires d'une période, agrégée par service"""
+
+    def setUp(self):
+        from comptabilite.models import CentreAnalyse
+        from core.models import Entreprise, Service, Utilisateur
+        from employes.models import Employe
+        from paie.models import BulletinPaie, LigneBulletin, PeriodePaie, RubriquePaie
+
+        self.entreprise = Entreprise.objects.create(
+            nom_entreprise='Compta Paie SARL', slug='compta-paie', email='cp@sarl.gn')
+        self.utilisateur = Utilisateur.objects.create_user(
+            username='paie', password='x', email='p@sarl.gn', entreprise=self.entreprise)
+        self.periode = PeriodePaie.objects.create(
+            entreprise=self.entreprise, annee=2026, mois=4, statut_periode='validee',
+            date_debut=date(2026, 4, 1), date_fin=date(2026, 4, 30))
+        self.centre = CentreAnalyse.objects.create(
+            entreprise=self.entreprise, code='ADM', libelle='Administration', type_centre='cout')
+        services = [Service.objects.create(entreprise=self.entreprise, code_service=code, nom_service=nom)
+                    for code, nom in (('ADM', 'Administration'), ('PROD', 'Production'))]
+        base = RubriquePaie.objects.create(
+            entreprise=self.entreprise, code_rubrique='SB', libelle_rubrique='Salaire de base',
+            type_rubrique='gain', categorie_rubrique='salaire_base')
+        prime = RubriquePaie.objects.create(
+            entreprise=self.entreprise, code_rubrique='PR', libelle_rubrique='Prime',
+            type_rubrique='gain', categorie_rubrique='prime')
+        for i in range(4):
+            employe = Employe.objects.create(
+                entreprise=self.entreprise, matricule=f'CP{i:03d}', nom='Employe', prenoms=str(i),
+                sexe='M', date_naissance=date(1990, 1, 1), date_embauche=date(2020, 1, 1),
+                type_contrat='CDI', service=services[i % 2])
+            bulletin = BulletinPaie.objects.create(
+                employe=employe, periode=self.periode, numero_bulletin=f'BUL-2026-04-{i + 1:04d}',
+                mois_paie=4, annee_paie=2026, statut_bulletin='valide',
+                salaire_brut=Decimal('1100000'), cnss_employe=Decimal('55000'),
+                cnss_employeur=Decimal('198000'), irg=Decimal('45000'),
+                versement_forfaitaire=Decimal('66000'), taxe_apprentissage=Decimal('22000'),
+                net_a_payer=Decimal('950000'))
+            LigneBulletin.objects.create(bulletin=bulletin, rubrique=base, montant=Decimal('1000000'))
+            LigneBulletin.objects.create(bulletin=bulletin, rubrique=prime, montant=Decimal('100000'))
+
+    def _soldes(self, ecriture):
+        soldes = {}
+        for ligne in ecriture.lignes.select_related('compte'):
+            numero = ligne.compte.numero_compte
+            soldes[numero] = soldes.get(numero, Decimal('0')) + ligne.montant_debit - ligne.montant_credit
+        return soldes
+
+    def test_ecriture_equilibree_par_service(self):
+        from paie.services_comptabilite import agreger_periode, comptabiliser_periode_paie
+        with self.assertNumQueries(2):
+            self.assertEqual(len(agreger_periode(self.periode)), 2)
+        [ecriture] = comptabiliser_periode_paie(self.periode, self.utilisateur)
+
+        self.assertEqual(ecriture.journal.type_journal, 'SA')
+        self.assertEqual(ecriture.date_ecriture, date(2026, 4, 30))
+        self.assertEqual(self._soldes(ecriture), {
+            '6611': Decimal('4000000'), '6612': Decimal('400000'),
+            '6641': Decimal('792000'), '6413': Decimal('352000'),
+            '4221': Decimal('-3800000'), '4211': Decimal('-200000'),
+            '4311': Decimal('-1012000'), '4471': Decimal('-180000'), '4472': Decimal('-352000'),
+        })
+        # Charges imputées au centre du service de même code, une ligne par service
+        charges = ecriture.lignes.filter(compte__numero_compte='6611')
+        self.assertEqual(charges.count(), 2)
+        self.assertEqual(charges.filter(centre_analyse=self.centre).count(), 1)
+
+    def test_periode_deja_comptabilisee_ou_non_validee(self):
+        from comptabilite.moteur_comptable import ErreurComptabilisation
+        from paie.services_comptabilite import comptabiliser_periode_paie
+        comptabiliser_periode_paie(self.periode, self.utilisateur)
+        with self.assertRaises(ErreurComptabilisation):
+            comptabiliser_periode_paie(self.periode, self.utilisateur)
+        self.periode.statut_periode = 'calculee'
+        with self.assertRaises(ErreurComptabilisation):
+            comptabiliser_periode_paie(self.periode, self.utilisateur, par_etablissement=True)
+
+    def test_decoupage_different_refuse(self):
+        from comptabilite.models import EcritureComptable
+        from comptabilite.moteur_comptable import ErreurComptabilisation
+        from paie.services_comptabilite import comptabiliser_periode_paie
+        ecritures = comptabiliser_periode_paie(self.periode, self.utilisateur)
+        # autre libellé, donc autre empreinte : seule la période bloque
+        with self.assertRaises(ErreurComptabilisation):
+            comptabiliser_periode_paie(self.periode, self.utilisateur, par_etablissement=True)
+        self.assertEqual(EcritureComptable.objects.filter(entreprise=self.entreprise).count(), 1)
+        self.periode.refresh_from_db()
+        self.assertIsNotNone(self.periode.date_comptabilisation)
+        self.assertEqual(list(self.periode.ecritures_comptables.all()), ecritures)
+
+    def test_bulletins_recalcules_contrepassation_puis_nouvelle_ecriture(self):
+        from comptabilite.models import EcritureComptable
+        from comptabilite.moteur_comptable import ErreurComptabilisation
+        from comptabilite.soldes import soldes_par_prefixe
+        from paie.models import BulletinPaie
+        from paie.services_comptabilite import comptabiliser_periode_paie, contrepasser_periode_paie
+        [initiale] = comptabiliser_periode_paie(self.periode, self.utilisateur)
+        # recalcul : autre total, donc autre empreinte
+        BulletinPaie.objects.filter(periode=self.periode).update(
+            salaire_brut=Decimal('1200000'), net_a_payer=Decimal('1050000'))
+        with self.assertRaises(ErreurComptabilisation):
+            comptabiliser_periode_paie(self.periode, self.utilisateur)
+        self.assertEqual(EcritureComptable.objects.filter(entreprise=self.entreprise).count(), 1)
+
+        [contrepassation] = contrepasser_periode_paie(self.periode, self.utilisateur)
+        self.assertEqual(self._soldes(contrepassation),
+                         {compte: -solde for compte, solde in self._soldes(initiale).items()})
+        debit, credit = soldes_par_prefixe(self.entreprise, ['4221'])
+        self.assertEqual(debit, credit)
+        with self.assertRaises(ErreurComptabilisation):
+            contrepasser_periode_paie(self.periode, self.utilisateur)
+
+        [nouvelle] = comptabiliser_periode_paie(self.periode, self.utilisateur)
+        self.assertEqual(self._soldes(nouvelle)['4221'], Decimal('-4200000'))
+        self.periode.refresh_from_db()
+        self.assertEqual(list(self.periode.ecritures_comptables.all()), [nouvelle])
+
+
+class DecompositionBrutApiTests(TestCase):
+    """API de décomposition du brut, brut déduit d'un net cible"""
+
+    def setUp(self):
+        from core.models import Entreprise, Utilisateur
+        entreprise = Entreprise.objects.create(
+            nom_entreprise='Decomposition SARL', slug='decomposition', email='d@sarl.gn')
+        self.client.force_login(Utilisateur.objects.create_user(
+            username='decomposition', password='x', email='u@sarl.gn', entreprise=entreprise))
+
+    def _poster(self, donnees):
+        import json
+        from django.urls import reverse
+        return self.client.post(reverse('paie:api_decomposer_brut'), json.dumps(donnees),
+                                content_type='application/json')
+
+    def test_net_cible_non_fini_ou_hors_precision(self):
+        for net_cible in ('Infinity', '1E30', 'NaN', '-5000'):
+            reponse = self._poster({'net_cible': net_cible})
+            self.assertEqual(reponse.status_code, 400, net_cible)
+            self.assertEqual(reponse.json()['error'], 'Montant net invalide', net_cible)
+
+    def test_net_cible_valide(self):
+        reponse = self._poster({'net_cible': '4 800 000'})
+        self.assertEqual(reponse.status_code, 200)
+        composantes = reponse.json()['composantes']
+        self.assertGreater(sum(c['montant'] for c in composantes), 4800000)
+
+
+class ClasseurExcelTests(SimpleTestCase):
+    """Moteur d'export Excel en écriture seule (core.excel_utils)."""
+
+    def test_styles_nommes_largeurs_et_fusion(self):
+        import io
+        from decimal import Decimal
+        from openpyxl import load_workbook
+        from core.excel_utils import ClasseurExcel, LARGEUR_MAX, LIGNES_MESUREES
+
+        classeur = ClasseurExcel()
+        feuille = classeur.feuille('État')
+        feuille.ligne(['ÉTAT DE PAIE — un titre bien plus long que les colonnes'], style='titre_centre')
+        feuille.fusionner(1, 3)
+        feuille.ligne(['Matricule', 'Nom', 'Net'], style='entete')
+        for i in range(LIGNES_MESUREES + 50):
+            feuille.ligne([f'M{i:04d}', 'x' * (60 if i == 0 else 5), Decimal('1234567.00')])
+        feuille.ligne(['TOTAUX', None, Decimal('9')], style='total')
+        sortie = io.BytesIO()
+        classeur.enregistrer(sortie)
+
+        ws = load_workbook(io.BytesIO(sortie.getvalue())).active
+        self.assertEqual(ws.max_row, LIGNES_MESUREES + 53)
+        self.assertEqual([str(r) for r in ws.merged_cells.ranges], ['A1:C1'])
+        self.assertEqual(ws['A2'].style, 'export_entete')
+        self.assertEqual(ws['C3'].number_format, '#,##0')
+        self.assertEqual(ws['C3'].value, 1234567)
+        self.assertEqual(ws.cell(row=ws.max_row, column=3).style, 'export_total_montant')
+        # Largeurs estimées sur les lignes de données, pas sur le titre
+        self.assertEqual(ws.column_dimensions['A'].width, len('Matricule') + 4)
+        self.assertEqual(ws.column_dimensions['B'].width, LARGEUR_MAX)
+        self.assertEqual(ws.column_dimensions['C'].width, len('1,234,567') + 4)
+
+    def test_reponse_en_flux(self):
+        from comptabilite.exports_livres import reponse_excel
+        reponse = reponse_excel('Journal', 'Janvier', ['Compte', 'Montant'],
+                                [['411', 1000], ['701', 2000]], 'journal', totaux=['Total', 3000])
+        self.assertTrue(reponse.streaming)
+        self.assertIn('journal.xlsx', reponse['Content-Disposition'])
+        self.assertTrue(b''.join(reponse.streaming_content).startswith(b'PK'))
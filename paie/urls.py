@@ -21,8 +21,12 @@ urlpatterns = [
     path('periodes/creer/', views.creer_periode, name='creer_periode'),
     path('periodes/<int:pk>/', views.detail_periode, name='detail_periode'),
     path('periodes/<int:pk>/calculer/', views.calculer_periode, name='calculer_periode'),
+    path('periodes/<int:pk>/calcul/', views.progression_calcul_periode, name='progression_calcul_periode'),
+    path('periodes/<int:pk>/calcul/statut/', views.statut_calcul_periode, name='statut_calcul_periode'),
     path('periodes/<int:pk>/valider/', views.valider_periode, name='valider_periode'),
     path('periodes/<int:pk>/cloturer/', views.cloturer_periode, name='cloturer_periode'),
+    path('periodes/<int:pk>/comptabiliser/', views.comptabiliser_periode, name='comptabiliser_periode'),
+    path('periodes/<int:pk>/contrepasser/', views.contrepasser_periode, name='contrepasser_periode'),
     
     # Bulletins de paie
     path('bulletins/', views.liste_bulletins, name='liste_bulletins'),
@@ -132,6 +136,8 @@ urlpatterns = [
     path('archives/', views.liste_archives, name='liste_archives'),
     path('archives/<int:pk>/telecharger/', views.telecharger_archive, name='telecharger_archive'),
     path('archives/<int:pk>/verifier/', views.verifier_integrite_archive, name='verifier_integrite_archive'),
+    path('archives/periode/<int:pk>/verifier/', views.verifier_archives_periode, name='verifier_archives_periode'),
+    path('archives/periode/<int:pk>/zip/', views.zip_archives_periode, name='zip_archives_periode'),
     
     # Configuration paie entreprise
     path('configuration/', views.config_paie_entreprise, name='config_entreprise'),
@@ -193,8 +193,10 @@ def calculer_detail_tranches_rts(base_rts):
     return detail
 
 
-def _dessiner_footer(p, width, margin_left, margin_right, entreprise, emp, bulletin):
+def _dessiner_footer(p, width, margin_left, margin_right, entreprise, emp, bulletin, formes):
     """Dessine le pied de page (signatures, infos légales, badge, QR) — positions absolues.
+    La partie commune à tous les employés est la forme ``formes.pied`` ; seuls
+    le nom de l'employé et le QR code sont dessinés ici.
     Layout :
         L'Employeur (gauche)           L'Employé(e) (droite)    ← 2.15cm
         Nom entreprise                 Nom employé               ← 1.93cm
@@ -206,8 +208,41 @@ def _dessiner_footer(p, width, margin_left, margin_right, entreprise, emp, bulle
            Document généré le ...                                ← 1.15cm
         ✓ Conforme CGI ...                        [QR Code]     ← 0.78cm / 0.30cm
     """
-    from reportlab.lib.units import cm
+    formes.pied(entreprise)
 
+    p.setFont(_FONT_NORMAL, 5.5)
+    p.setFillColor(colors.black)
+    p.drawRightString(width - margin_right, 1.93*cm, f"{emp.nom} {emp.prenoms}")
+
+    # QR Code (coin bas droit)
+    qr_size = 1.4*cm
+    qr_x = width - margin_right - qr_size
+    qr_y = 0.30*cm
+    try:
+        qr_contenu = (
+            f"BUL:{bulletin.numero_bulletin}|"
+            f"EMP:{emp.nom} {emp.prenoms}|"
+            f"NET:{int(bulletin.net_a_payer)} GNF|"
+            f"DATE:{bulletin.date_bulletin.strftime('%d/%m/%Y') if bulletin.date_bulletin else ''}|"
+            f"CNSS:{emp.num_cnss_individuel or '-'}"
+        )
+        qr_img = _generer_qr_code(qr_contenu, taille_cm=qr_size / cm)
+        if qr_img:
+            p.drawImage(qr_img, qr_x, qr_y, width=qr_size, height=qr_size, mask='auto')
+            p.setFont(_FONT_NORMAL, 4.5)
+            p.setFillColor(colors.HexColor("#666666"))
+            p.drawCentredString(qr_x + qr_size / 2, qr_y - 0.18*cm, "Vérification")
+    except Exception:
+        pass
+    p.setFillColor(colors.black)
+
+
+def _dessiner_footer_fixe(p, width, margin_left, margin_right, entreprise, genere_le,
+                          libelle_date="Document généré le"):
+    """
+    Partie du pied de page identique pour tous les employés d'une entreprise.
+    La ligne datée est omise si ``genere_le`` est None.
+    """
     # ── Signatures (angles gauche / droit) ──
     p.setFont(_FONT_BOLD, 6)
     p.setFillColor(colors.black)
@@ -216,7 +251,6 @@ def _dessiner_footer(p, width, margin_left, margin_right, entreprise, emp, bulle
     p.setFont(_FONT_NORMAL, 5.5)
     if entreprise:
         p.drawString(margin_left, 1.93*cm, entreprise.nom_entreprise or '')
-    p.drawRightString(width - margin_right, 1.93*cm, f"{emp.nom} {emp.prenoms}")
     p.setFont(_FONT_NORMAL, 5)
     p.drawString(margin_left, 1.74*cm, "Date et signature")
     p.drawRightString(width - margin_right, 1.74*cm, "Lu et approuvé, date et signature")
@@ -238,9 +272,9 @@ def _dessiner_footer(p, width, margin_left, margin_right, entreprise, emp, bulle
             f"{entreprise.nom_entreprise} — {entreprise.adresse or ''} — Tél: {entreprise.telephone or ''}")
         p.drawCentredString(width/2, 1.30*cm,
             f"NIF: {entreprise.nif or '-'} — CNSS: {entreprise.num_cnss or '-'}")
-    from django.utils import timezone
-    p.drawCentredString(width/2, 1.15*cm,
-        f"Document généré le {timezone.now().strftime('%d/%m/%Y à %H:%M')}")
+    if genere_le is not None:
+        p.drawCentredString(width/2, 1.15*cm,
+            f"{libelle_date} {genere_le.strftime('%d/%m/%Y à %H:%M')}")
 
     # Badge conformité
     badge_x = margin_left
@@ -254,37 +288,16 @@ def _dessiner_footer(p, width, margin_left, margin_right, entreprise, emp, bulle
     p.drawCentredString(badge_x + badge_w / 2, badge_y + 0.12*cm,
                         "\u2713 Conforme CGI Guinee | Compatible CNSS")
 
-    # QR Code (coin bas droit)
-    qr_size = 1.4*cm
-    qr_x = width - margin_right - qr_size
-    qr_y = 0.30*cm
-    try:
-        qr_contenu = (
-            f"BUL:{bulletin.numero_bulletin}|"
-            f"EMP:{emp.nom} {emp.prenoms}|"
-            f"NET:{int(bulletin.net_a_payer)} GNF|"
-            f"DATE:{bulletin.date_bulletin.strftime('%d/%m/%Y') if bulletin.date_bulletin else ''}|"
-            f"CNSS:{emp.num_cnss_individuel or '-'}"
-        )
-        qr_img = _generer_qr_code(qr_contenu, taille_cm=qr_size / cm)
-        if qr_img:
-            p.drawImage(qr_img, qr_x, qr_y, width=qr_size, height=qr_size, mask='auto')
-            p.setFont(_FONT_NORMAL, 4.5)
-            p.setFillColor(colors.HexColor("#666666"))
-            p.drawCentredString(qr_x + qr_size / 2, qr_y - 0.18*cm, "Vérification")
-    except Exception:
-        pass
-    p.setFillColor(colors.black)
-
 
 def _saut_page_si_necessaire(p, y, hauteur_necessaire, width, height, margin_top,
                               margin_left, margin_right, footer_zone,
-                              entreprise, emp, bulletin):
+                              entreprise, emp, bulletin, formes):
     """Si l'espace restant est insuffisant, dessine le footer, saute de page
     et ajoute un mini en-tête de continuation."""
     if y - hauteur_necessaire < footer_zone:
-        _dessiner_footer(p, width, margin_left, margin_right, entreprise, emp, bulletin)
+        _dessiner_footer(p, width, margin_left, margin_right, entreprise, emp, bulletin, formes)
         p.showPage()
+        formes.page(entreprise)
         y = height - margin_top
         p.setFont(_FONT_BOLD, 9)
         p.setFillColor(colors.black)
@@ -298,36 +311,19 @@ def _saut_page_si_necessaire(p, y, hauteur_necessaire, width, height, margin_top
     return y
 
 
-def generer_bulletin_pdf(bulletin):
-    """
-    Génère le PDF d'un bulletin de paie et retourne les bytes du PDF.
+# Marges du bulletin et hauteur de l'en-tête fixe (titres, entreprise, séparateur)
+_MARGE_HAUT = 0.8*cm
+_MARGE_GAUCHE = 1.2*cm
+_MARGE_DROITE = 1.2*cm
+_HAUTEUR_EN_TETE = 2.10*cm
 
-    Args:
-        bulletin: Instance BulletinPaie
-        
-    Returns:
-        bytes: Contenu du fichier PDF
-    """
-    from .models import LigneBulletin
-    
-    lignes = LigneBulletin.objects.filter(bulletin=bulletin).select_related('rubrique')
-    gains = lignes.filter(rubrique__type_rubrique='gain')
-    retenues = lignes.filter(rubrique__type_rubrique__in=['retenue', 'cotisation'])
-    
-    # Créer le buffer PDF
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-    
-    # Variables de position — marges optimisées pour éviter chevauchement
-    margin_top = 0.8*cm
-    margin_left = 1.2*cm
-    margin_right = 1.2*cm
-    footer_zone = 4.5*cm  # zone réservée en bas (footer absolu à 3.1cm + marge sécurité 1.4cm)
-    y = height - margin_top
 
-    # === EN-TÊTE ===
-    entreprise = bulletin.employe.entreprise
+def _dessiner_en_tete_fixe(p, entreprise):
+    """En-tête commun aux bulletins d'une entreprise (logo, titres, NIF/CNSS)."""
+    width, height = A4
+    margin_left = _MARGE_GAUCHE
+    margin_right = _MARGE_DROITE
+    y = height - _MARGE_HAUT
 
     # Logo entreprise à gauche
     if entreprise and entreprise.logo:
@@ -370,7 +366,123 @@ def generer_bulletin_pdf(bulletin):
     p.setStrokeColor(colors.HexColor("#ce1126"))
     p.setLineWidth(2)
     p.line(margin_left, y, width - margin_right, y)
-    y -= 0.40*cm
+
+
+class FormesBulletin:
+    """
+    Éléments fixes des bulletins d'un canvas, enregistrés comme formes
+    (XObjects) ReportLab à la première utilisation puis rappelés par
+    ``doForm`` : un PDF groupé de N bulletins contient un seul exemplaire
+    de l'en-tête, du pied de page commun et du filigrane de chaque entreprise.
+
+    Usage::
+
+        formes = FormesBulletin(p, filigrane=True)
+        for bulletin in bulletins:
+            dessiner_bulletin(p, bulletin, formes)
+
+    Pour le canvas d'un seul bulletin, ``bulletin`` date le pied de page de
+    son calcul au lieu de l'heure du rendu : le PDF est alors reproductible.
+    """
+
+    def __init__(self, p, filigrane=False, bulletin=None):
+        self.p = p
+        self.filigrane = filigrane
+        if bulletin is None:
+            self.genere_le, self.libelle_date = timezone.now(), "Document généré le"
+        else:
+            self.genere_le, self.libelle_date = bulletin.date_calcul, "Bulletin calculé le"
+        self._definies = set()
+
+    def _utiliser(self, nom, dessiner):
+        if nom not in self._definies:
+            # beginForm met de côté la page en cours et l'état graphique
+            self.p.beginForm(nom)
+            dessiner()
+            self.p.endForm()
+            self._definies.add(nom)
+        self.p.doForm(nom)
+
+    @staticmethod
+    def _suffixe(entreprise):
+        return entreprise.pk if entreprise else 0
+
+    def page(self, entreprise):
+        """Début de page : filigrane du logo (si demandé)."""
+        if not (self.filigrane and entreprise and entreprise.logo):
+            return
+        from core.pdf_utils import add_watermark_logo
+        try:
+            logo_path = entreprise.logo.path
+        except (ValueError, NotImplementedError):
+            return
+        self._utiliser(f"filigrane_{self._suffixe(entreprise)}",
+                       lambda: add_watermark_logo(self.p, logo_path))
+
+    def en_tete(self, entreprise):
+        self._utiliser(f"en_tete_{self._suffixe(entreprise)}",
+                       lambda: _dessiner_en_tete_fixe(self.p, entreprise))
+
+    def pied(self, entreprise):
+        width, _ = A4
+        self._utiliser(f"pied_{self._suffixe(entreprise)}",
+                       lambda: _dessiner_footer_fixe(self.p, width, _MARGE_GAUCHE, _MARGE_DROITE,
+                                                     entreprise, self.genere_le, self.libelle_date))
+
+
+def generer_bulletin_pdf(bulletin):
+    """
+    Génère le PDF d'un bulletin de paie et retourne les bytes du PDF.
+    Le canvas est invariant (ni date de création ni identifiant aléatoire)
+    et le pied de page porte la date de calcul du bulletin, pas l'heure du
+    rendu : un même bulletin donne toujours les mêmes octets, ce qui permet
+    à l'archivage par contenu de dédoublonner.
+
+    Args:
+        bulletin: Instance BulletinPaie
+        
+    Returns:
+        bytes: Contenu du fichier PDF
+    """
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+    dessiner_bulletin(p, bulletin, FormesBulletin(p, bulletin=bulletin))
+    p.save()
+    
+    buffer.seek(0)
+    return buffer.read()
+
+
+def dessiner_bulletin(p, bulletin, formes):
+    """
+    Dessine un bulletin de paie sur le canvas ``p`` (une ou plusieurs pages,
+    la dernière est terminée par ``showPage``).
+
+    Args:
+        p: Canvas ReportLab (partagé entre bulletins pour un PDF groupé)
+        bulletin: Instance BulletinPaie
+        formes: FormesBulletin du canvas (en-tête, pied de page, filigrane)
+    """
+    from .models import LigneBulletin
+    
+    lignes = LigneBulletin.objects.filter(bulletin=bulletin).select_related('rubrique')
+    gains = lignes.filter(rubrique__type_rubrique='gain')
+    retenues = lignes.filter(rubrique__type_rubrique__in=['retenue', 'cotisation'])
+    
+    width, height = A4
+    
+    # Variables de position — marges optimisées pour éviter chevauchement
+    margin_top = _MARGE_HAUT
+    margin_left = _MARGE_GAUCHE
+    margin_right = _MARGE_DROITE
+    footer_zone = 4.5*cm  # zone réservée en bas (footer absolu à 3.1cm + marge sécurité 1.4cm)
+    y = height - margin_top
+
+    # === EN-TÊTE ===
+    entreprise = bulletin.employe.entreprise
+    formes.page(entreprise)
+    formes.en_tete(entreprise)
+    y -= _HAUTEUR_EN_TETE
 
     # Infos bulletin sur une ligne
     p.setFont(_FONT_NORMAL, 8)
@@ -496,7 +608,7 @@ def generer_bulletin_pdf(bulletin):
     table_height = len(gains_data) * row_height
     # Vérifier espace pour le tableau des gains
     y = _saut_page_si_necessaire(p, y, table_height + 0.3*cm, width, height, margin_top,
-                                  margin_left, margin_right, footer_zone, entreprise, emp, bulletin)
+                                  margin_left, margin_right, footer_zone, entreprise, emp, bulletin, formes)
     gains_table.wrapOn(p, width, height)
     gains_table.drawOn(p, margin_left, y - table_height)
     y -= table_height + 0.3*cm
@@ -581,7 +693,7 @@ def generer_bulletin_pdf(bulletin):
         hs_table_h = nb_hs_rows * hs_row_h
         # Vérifier espace pour le tableau HS
         y = _saut_page_si_necessaire(p, y, hs_table_h + 0.60*cm, width, height, margin_top,
-                                      margin_left, margin_right, footer_zone, entreprise, emp, bulletin)
+                                      margin_left, margin_right, footer_zone, entreprise, emp, bulletin, formes)
         hs_table.wrapOn(p, width, height)
         hs_table.drawOn(p, 1.5*cm, y - hs_table_h)
         y -= hs_table_h + 0.35*cm
@@ -617,7 +729,7 @@ def generer_bulletin_pdf(bulletin):
     ret_table_height = len(retenues_data) * row_height
     ret_section_height = ret_table_height + 0.7*cm
     y = _saut_page_si_necessaire(p, y, ret_section_height, width, height, margin_top,
-                                  margin_left, margin_right, footer_zone, entreprise, emp, bulletin)
+                                  margin_left, margin_right, footer_zone, entreprise, emp, bulletin, formes)
 
     p.setFillColor(colors.HexColor("#dc3545"))
     p.setFont(_FONT_BOLD, 9)
@@ -647,7 +759,7 @@ def generer_bulletin_pdf(bulletin):
         rts_est_rows = len(detail_rts) + 2
         rts_est_height = rts_est_rows * 12 + 0.5*cm
         y = _saut_page_si_necessaire(p, y, rts_est_height, width, height, margin_top,
-                                      margin_left, margin_right, footer_zone, entreprise, emp, bulletin)
+                                      margin_left, margin_right, footer_zone, entreprise, emp, bulletin, formes)
 
         p.setFont(_FONT_BOLD, 7)
         p.setFillColor(colors.HexColor("#6c757d"))
@@ -714,7 +826,7 @@ def generer_bulletin_pdf(bulletin):
     extra_lines = (1 if has_rappel else 0) + (1 if has_trop_percu else 0)
     recap_height = 1.6*cm + extra_lines * 0.3*cm
     y = _saut_page_si_necessaire(p, y, recap_height + 0.3*cm, width, height, margin_top,
-                                  margin_left, margin_right, footer_zone, entreprise, emp, bulletin)
+                                  margin_left, margin_right, footer_zone, entreprise, emp, bulletin, formes)
     p.setStrokeColor(colors.HexColor("#ce1126"))
     p.setLineWidth(2)
     p.rect(margin_left, y - recap_height, width - 2*margin_left, recap_height, stroke=1, fill=0)
@@ -788,7 +900,7 @@ def generer_bulletin_pdf(bulletin):
     # Espace nécessaire = tableau charges + note VF + marge sécurité
     espace_necessaire = ch_table_h + 0.8*cm
     y = _saut_page_si_necessaire(p, y, espace_necessaire, width, height, margin_top,
-                                  margin_left, margin_right, footer_zone, entreprise, emp, bulletin)
+                                  margin_left, margin_right, footer_zone, entreprise, emp, bulletin, formes)
 
     charges_table = Table(charges_data, colWidths=[7*cm, 3.5*cm, 2*cm, 4.5*cm], rowHeights=ch_row_h)
     charges_table.setStyle(TableStyle([
@@ -818,14 +930,9 @@ def generer_bulletin_pdf(bulletin):
     # === PIED DE PAGE (footer unique — position absolue en bas de la dernière page) ===
     # _saut_page_si_necessaire garantit que y >= footer_zone (4.5cm) > footer_top (2.15cm)
     # → aucun chevauchement possible ; on dessine simplement le footer sur la page courante.
-    _dessiner_footer(p, width, margin_left, margin_right, entreprise, emp, bulletin)
+    _dessiner_footer(p, width, margin_left, margin_right, entreprise, emp, bulletin, formes)
 
-    # Finaliser le PDF
     p.showPage()
-    p.save()
-    
-    buffer.seek(0)
-    return buffer.read()
 
 
 def generer_bulletin_pdf_sdbk(bulletin):
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, permission_required
@@ -224,35 +225,26 @@ def calculer_periode(request, pk):
         )
         return redirect('paie:detail_periode', pk=pk)
     
+    from .services_bulk import CalculPeriodeParLots
+
     if request.method == 'POST':
+        if CalculPeriodeParLots.job_en_cours(periode):
+            messages.info(request, 'Un calcul est déjà en cours pour cette période.')
+            return redirect('paie:progression_calcul_periode', pk=pk)
         try:
-            # Utiliser le service bulk optimisé
-            from .services_bulk import BulkPayrollService
-            
-            bulk_service = BulkPayrollService(periode, request.user.entreprise)
-            result = bulk_service.calculer_tous_bulletins(utilisateur=request.user)
-            
-            # Mettre à jour le statut de la période
-            periode.statut_periode = 'calculee'
-            periode.save()
-            
-            if result['erreurs']:
-                messages.warning(
-                    request,
-                    f"{result['bulletins_crees']} bulletins créés en {result['temps_execution']}s. "
-                    f"Erreurs: {', '.join(result['erreurs'][:5])}"
-                    f"{'...' if len(result['erreurs']) > 5 else ''}"
-                )
+            # Calcul par lots commités séparément, exécuté hors de la requête
+            service = CalculPeriodeParLots.demarrer(
+                periode, request.user.entreprise, utilisateur=request.user
+            )
+            if getattr(settings, 'PAIE_CALCUL_ASYNCHRONE', True):
+                service.lancer_en_arriere_plan()
             else:
-                messages.success(
-                    request,
-                    f"{result['bulletins_crees']} bulletins calculés en {result['temps_execution']}s."
-                )
-                
+                service.executer()
         except Exception as e:
             messages.error(request, f'Erreur lors du calcul : {str(e)}')
+            return redirect('paie:detail_periode', pk=pk)
         
-        return redirect('paie:detail_periode', pk=pk)
+        return redirect('paie:progression_calcul_periode', pk=pk)
     
     # GET: Afficher la page de confirmation
     employes_count = Employe.objects.filter(
@@ -261,10 +253,56 @@ def calculer_periode(request, pk):
     ).count()
     return render(request, 'paie/periodes/calculer.html', {
         'periode': periode,
-        'employes_count': employes_count
+        'employes_count': employes_count,
+        'job_a_reprendre': CalculPeriodeParLots.job_a_reprendre(periode),
     })
 
 
+def _etat_calcul_periode(job):
+    """Résumé JSON-sérialisable d'un calcul de période par lots."""
+    from .services_bulk import CalculPeriodeParLots
+    return {
+        'statut': job.statut,
+        'statut_libelle': job.get_statut_display(),
+        'progression': job.progression,
+        'lots_termines': job.lots_termines,
+        'nombre_lots': job.nombre_lots,
+        'nombre_employes': job.nombre_employes,
+        'bulletins_crees': job.lots.filter(statut='termine').aggregate(
+            n=Sum('bulletins_crees'))['n'] or 0,
+        'erreurs': CalculPeriodeParLots(job).erreurs(limite=5),
+        'message': job.message,
+        'termine': not job.est_actif,
+    }
+
+
+@login_required
+@entreprise_active_required
+def progression_calcul_periode(request, pk):
+    """Page de suivi du calcul d'une période (interroge statut_calcul_periode)"""
+    periode = get_object_or_404(PeriodePaie, pk=pk, entreprise=request.user.entreprise)
+    job = periode.calculs.first()
+    if job is None:
+        return redirect('paie:calculer_periode', pk=pk)
+    return render(request, 'paie/periodes/calcul_progression.html', {
+        'periode': periode,
+        'job': job,
+        'etat': _etat_calcul_periode(job),
+    })
+
+
+@login_required
+@entreprise_active_required
+@require_GET
+def statut_calcul_periode(request, pk):
+    """API JSON : avancement du dernier calcul de la période"""
+    periode = get_object_or_404(PeriodePaie, pk=pk, entreprise=request.user.entreprise)
+    job = periode.calculs.first()
+    if job is None:
+        return JsonResponse({'error': 'Aucun calcul pour cette période'}, status=404)
+    return JsonResponse(_etat_calcul_periode(job))
+
+
 @login_required
 @entreprise_active_required
 @reauth_required
@@ -331,6 +369,47 @@ def cloturer_periode(request, pk):
     return render(request, 'paie/periodes/cloturer.html', {'periode': periode})
 
 
+@login_required
+@entreprise_active_required
+@reauth_required
+@require_POST
+def comptabiliser_periode(request, pk):
+    """Passer l'écriture de salaires de la période dans le journal SA"""
+    from comptabilite.moteur_comptable import ErreurComptabilisation
+    from .services_comptabilite import comptabiliser_periode_paie
+
+    periode = get_object_or_404(PeriodePaie, pk=pk, entreprise=request.user.entreprise)
+    try:
+        ecritures = comptabiliser_periode_paie(
+            periode, request.user, par_etablissement=bool(request.POST.get('par_etablissement')))
+    except ErreurComptabilisation as exc:
+        messages.error(request, f"Comptabilisation impossible : {exc}")
+    else:
+        numeros = ', '.join(ecriture.numero_ecriture for ecriture in ecritures)
+        messages.success(request, f"Paie comptabilisée : écriture(s) {numeros}.")
+    return redirect('paie:detail_periode', pk=pk)
+
+
+@login_required
+@entreprise_active_required
+@reauth_required
+@require_POST
+def contrepasser_periode(request, pk):
+    """Contrepasser l'écriture de salaires de la période pour la comptabiliser à nouveau"""
+    from comptabilite.moteur_comptable import ErreurComptabilisation
+    from .services_comptabilite import contrepasser_periode_paie
+
+    periode = get_object_or_404(PeriodePaie, pk=pk, entreprise=request.user.entreprise)
+    try:
+        ecritures = contrepasser_periode_paie(periode, request.user)
+    except ErreurComptabilisation as exc:
+        messages.error(request, f"Contrepassation impossible : {exc}")
+    else:
+        numeros = ', '.join(ecriture.numero_ecriture for ecriture in ecritures)
+        messages.success(request, f"Écriture de paie contrepassée : écriture(s) {numeros}.")
+    return redirect('paie:detail_periode', pk=pk)
+
+
 @login_required
 @entreprise_active_required
 @reauth_required
@@ -2916,45 +2995,36 @@ def historique_bulletins(request):
 @reauth_required
 @entreprise_active_required
 def telecharger_bulletins_masse(request):
-    """Télécharge plusieurs bulletins en ZIP"""
-    import zipfile
-    import io
-    
+    """Télécharge plusieurs bulletins en ZIP (envoyé en flux, entrée par entrée)"""
+    from django.http import StreamingHttpResponse
+    from .services_export_pdf import generer_zip_bulletins
+
     entreprise = request.user.entreprise
-    annee = request.GET.get('annee')
-    mois = request.GET.get('mois')
-    
-    if not annee or not mois:
+    try:
+        annee = int(request.GET.get('annee'))
+        mois = int(request.GET.get('mois'))
+    except (TypeError, ValueError):
         messages.error(request, "Veuillez sélectionner une année et un mois")
         return redirect('paie:historique_bulletins')
-    
+
     bulletins = BulletinPaie.objects.filter(
         employe__entreprise=entreprise,
-        periode__annee=int(annee),
-        periode__mois=int(mois),
+        periode__annee=annee,
+        periode__mois=mois,
         statut_bulletin__in=['valide', 'paye']
-    ).select_related('employe', 'periode')
-    
+    ).select_related('employe', 'periode', 'archive').order_by('employe__matricule')
+
     if not bulletins.exists():
         messages.warning(request, "Aucun bulletin trouvé pour cette période")
         return redirect('paie:historique_bulletins')
-    
-    # Créer le ZIP en mémoire
-    buffer = io.BytesIO()
-    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for bulletin in bulletins:
-            # Générer le PDF du bulletin
-            from .utils import generer_bulletin_pdf
-            try:
-                pdf_content = generer_bulletin_pdf(bulletin)
-                filename = f"Bulletin_{bulletin.employe.matricule}_{annee}_{mois:02d}.pdf"
-                zip_file.writestr(filename, pdf_content)
-            except Exception as e:
-                continue
-    
-    buffer.seek(0)
-    
-    response = HttpResponse(buffer.read(), content_type='application/zip')
+
+    response = StreamingHttpResponse(
+        generer_zip_bulletins(
+            bulletins.iterator(chunk_size=200),
+            lambda bulletin: f"Bulletin_{bulletin.employe.matricule}_{annee}_{mois:02d}.pdf",
+        ),
+        content_type='application/zip',
+    )
     response['Content-Disposition'] = f'attachment; filename="Bulletins_{annee}_{mois:02d}.zip"'
     return response
 
@@ -3260,6 +3330,11 @@ def liste_archives(request):
     if mois:
         archives = archives.filter(periode_mois=int(mois))
     
+    # Période sélectionnée : vérification et ZIP depuis l'archive
+    periode = None
+    if annee and mois:
+        periode = PeriodePaie.objects.filter(entreprise=entreprise, annee=int(annee), mois=int(mois)).first()
+    
     # Stats
     stats = ArchivageService.stats_archives(entreprise)
     
@@ -3274,6 +3349,7 @@ def liste_archives(request):
         'annees': annees,
         'annee_filtre': annee,
         'mois_filtre': mois,
+        'periode': periode,
     })
 
 
@@ -3321,6 +3397,47 @@ def verifier_integrite_archive(request, pk):
     return redirect('paie:liste_archives')
 
 
+def _url_archives_periode(periode):
+    from django.urls import reverse
+    return f"{reverse('paie:liste_archives')}?annee={periode.annee}&mois={periode.mois}"
+
+
+@login_required
+@reauth_required
+@entreprise_active_required
+def verifier_archives_periode(request, pk):
+    """Vérifier en un passage toutes les archives d'une période (d'après son manifeste)"""
+    from .services_archive import ArchivageService
+    
+    periode = get_object_or_404(PeriodePaie, pk=pk, entreprise=request.user.entreprise)
+    rapport = ArchivageService.verifier_periode(periode)
+    anomalies = rapport['alterees'] + rapport['manquantes']
+    if anomalies:
+        messages.error(request, f"✗ ALERTE: {len(anomalies)} archive(s) compromise(s) pour {periode} : "
+                                f"{', '.join(anomalies[:20])}")
+    else:
+        messages.success(request, f"✓ {rapport['verifiees']} archive(s) vérifiée(s) pour {periode}")
+    if rapport['hors_manifeste']:
+        messages.warning(request, f"{len(rapport['hors_manifeste'])} archive(s) absente(s) du manifeste : "
+                                  f"{', '.join(rapport['hors_manifeste'][:20])}")
+    return redirect(_url_archives_periode(periode))
+
+
+@login_required
+@reauth_required
+@entreprise_active_required
+def zip_archives_periode(request, pk):
+    """ZIP des bulletins archivés d'une période, lus depuis l'archive (sans régénération)"""
+    from django.http import StreamingHttpResponse
+    from .services_archive import ArchivageService
+    
+    periode = get_object_or_404(PeriodePaie, pk=pk, entreprise=request.user.entreprise)
+    response = StreamingHttpResponse(ArchivageService.zip_periode(periode), content_type='application/zip')
+    response['Content-Disposition'] = (
+        f'attachment; filename="Archives_bulletins_{periode.annee}_{periode.mois:02d}.zip"')
+    return response
+
+
 @login_required
 @reauth_required
 @entreprise_active_required
@@ -3408,19 +3525,13 @@ def bulletins_groupes_pdf(request):
     """
     Génère un PDF unique contenant tous les bulletins d'une période (un par page).
     URL: /paie/bulletins/groupe/pdf/?periode_id=X  OU  ?annee=X&mois=Y
-    Limite à 100 bulletins max.
+    Option: &filigrane=1 pour le logo de l'entreprise en filigrane.
+    Le PDF est écrit dans un fichier temporaire puis envoyé par morceaux ; il
+    est plafonné à PAIE_PDF_GROUPE_MAX_BULLETINS bulletins (au-delà : ZIP).
     """
-    from io import BytesIO
-    try:
-        from reportlab.lib.pagesizes import A4
-        from reportlab.pdfgen import canvas as rl_canvas
-        REPORTLAB_OK = True
-    except ImportError:
-        REPORTLAB_OK = False
-
-    if not REPORTLAB_OK:
-        messages.error(request, "ReportLab n'est pas disponible.")
-        return redirect('paie:liste_bulletins')
+    import tempfile
+    from django.http import FileResponse
+    from .services_export_pdf import PDFGroupeTropVolumineux, generer_pdf_groupe, verifier_taille_pdf_groupe
 
     entreprise = request.user.entreprise
     periode_id = request.GET.get('periode_id')
@@ -3434,94 +3545,57 @@ def bulletins_groupes_pdf(request):
             periode=periode,
             employe__entreprise=entreprise,
             statut_bulletin__in=['calcule', 'valide', 'paye'],
-        ).select_related('employe').order_by('employe__nom')
+        )
+        nom_fichier = f"bulletins_groupes_periode_{periode_id}.pdf"
     elif annee and mois_param:
+        try:
+            annee, mois_param = int(annee), int(mois_param)
+        except ValueError:
+            messages.error(request, "Période invalide.")
+            return redirect('paie:liste_bulletins')
         bulletins_qs = BulletinPaie.objects.filter(
             employe__entreprise=entreprise,
-            annee_paie=int(annee),
-            mois_paie=int(mois_param),
+            annee_paie=annee,
+            mois_paie=mois_param,
             statut_bulletin__in=['calcule', 'valide', 'paye'],
-        ).select_related('employe').order_by('employe__nom')
+        )
+        nom_fichier = f"bulletins_groupes_{annee}_{mois_param:02d}.pdf"
     else:
         messages.error(request, "Veuillez préciser une période (periode_id ou annee+mois).")
         return redirect('paie:liste_bulletins')
 
-    # Limite de 100 bulletins
-    total = bulletins_qs.count()
-    if total == 0:
+    nombre = bulletins_qs.count()
+    if not nombre:
         messages.warning(request, "Aucun bulletin trouvé pour cette période.")
         return redirect('paie:liste_bulletins')
-    if total > 100:
-        messages.warning(request, f"Trop de bulletins ({total}). Limité à 100.")
-        bulletins_qs = bulletins_qs[:100]
+    try:
+        verifier_taille_pdf_groupe(nombre)
+    except PDFGroupeTropVolumineux as e:
+        messages.error(request, str(e))
+        return redirect('paie:liste_bulletins')
 
-    from .utils import generer_bulletin_pdf
+    bulletins_qs = bulletins_qs.select_related(
+        'employe__entreprise', 'employe__poste', 'employe__service', 'periode',
+    ).order_by('employe__nom', 'pk')
 
-    # Générer chaque bulletin et les concaténer
+    fichier = tempfile.TemporaryFile()
     try:
-        from PyPDF2 import PdfMerger
-        merger = PdfMerger()
-        for bulletin in bulletins_qs:
-            pdf_bytes = generer_bulletin_pdf(bulletin)
-            merger.append(BytesIO(pdf_bytes))
-        output = BytesIO()
-        merger.write(output)
-        merger.close()
-        output.seek(0)
-        pdf_final = output.read()
-    except ImportError:
-        # Fallback: concaténation simple page par page sans PyPDF2
-        # Utiliser reportlab pour créer un PDF multi-pages d'aperçu simplifié
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-        from reportlab.lib.styles import getSampleStyleSheet
-        from reportlab.lib.units import cm
-
-        output = BytesIO()
-        doc = SimpleDocTemplate(output, pagesize=A4)
-        styles = getSampleStyleSheet()
-        elements = []
-        mois_noms = ['', 'Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin',
-                     'Juillet', 'Août', 'Septembre', 'Octobre', 'Novembre', 'Décembre']
-
-        for i, bulletin in enumerate(bulletins_qs):
-            if i > 0:
-                elements.append(PageBreak())
-            elements.append(Paragraph(
-                f"<b>BULLETIN DE PAIE</b>",
-                styles['Title']
-            ))
-            mois_label = mois_noms[bulletin.mois_paie] if 1 <= bulletin.mois_paie <= 12 else str(bulletin.mois_paie)
-            elements.append(Paragraph(
-                f"{mois_label} {bulletin.annee_paie}",
-                styles['Heading2']
-            ))
-            elements.append(Spacer(1, 0.3*cm))
-            infos = [
-                f"Employé: {bulletin.employe.nom} {bulletin.employe.prenoms}",
-                f"Matricule: {bulletin.employe.matricule}",
-                f"N° Bulletin: {bulletin.numero_bulletin}",
-                f"Salaire Brut: {bulletin.salaire_brut:,.0f} GNF",
-                f"CNSS Salarié: {bulletin.cnss_employe:,.0f} GNF",
-                f"RTS: {bulletin.irg:,.0f} GNF",
-                f"Net à Payer: {bulletin.net_a_payer:,.0f} GNF",
-            ]
-            for info in infos:
-                elements.append(Paragraph(info, styles['Normal']))
-                elements.append(Spacer(1, 0.2*cm))
-
-        doc.build(elements)
-        output.seek(0)
-        pdf_final = output.read()
-
-    # Nom du fichier
-    if periode_id:
-        nom_fichier = f"bulletins_groupes_periode_{periode_id}.pdf"
-    else:
-        nom_fichier = f"bulletins_groupes_{annee}_{int(mois_param):02d}.pdf"
+        generer_pdf_groupe(
+            bulletins_qs.iterator(chunk_size=200), fichier,
+            filigrane=request.GET.get('filigrane') == '1',
+        )
+    except PDFGroupeTropVolumineux as e:
+        # Bulletins ajoutés entre le comptage et le rendu
+        fichier.close()
+        messages.error(request, str(e))
+        return redirect('paie:liste_bulletins')
+    except Exception:
+        fichier.close()
+        raise
+    fichier.seek(0)
 
-    response = HttpResponse(pdf_final, content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="{nom_fichier}"'
-    return response
+    # FileResponse lit et ferme le fichier temporaire (supprimé à la fermeture)
+    return FileResponse(fichier, content_type='application/pdf', filename=nom_fichier)
 
 
 # ============================================================================
@@ -4092,7 +4166,7 @@ def api_decomposer_brut(request):
     POST JSON → retourne une proposition de décomposition du brut.
 
     Entrée :
-        { "brut": 5500000 }
+        { "brut": 5500000 }  ou  { "net_cible": 4800000 } (brut déduit du net)
     Sortie :
         { "composantes": [
             {"cle": "salaire_base",   "label": "Salaire de base",        "pct": 60, "montant": 3300000},
@@ -4115,15 +4189,6 @@ def api_decomposer_brut(request):
     except (json.JSONDecodeError, ValueError):
         return JsonResponse({'error': 'JSON invalide'}, status=400)
 
-    brut_raw = data.get('brut', 0)
-    try:
-        brut = int(str(brut_raw).replace(' ', '').replace('\u202f', '').replace('\xa0', ''))
-    except (ValueError, TypeError):
-        return JsonResponse({'error': 'Montant brut invalide'}, status=400)
-
-    if brut <= 0:
-        return JsonResponse({'error': 'Le montant brut doit être positif'}, status=400)
-
     # Pourcentages par défaut (optimisés pour la fiscalité guinéenne)
     pcts = data.get('pourcentages', {})
     pct_base = int(pcts.get('salaire_base', 60))
@@ -4135,6 +4200,35 @@ def api_decomposer_brut(request):
     if total_pct != 100:
         return JsonResponse({'error': f'La somme des pourcentages doit être 100% (actuellement {total_pct}%)'}, status=400)
 
+    net_cible = None
+    if data.get('net_cible') and not data.get('brut'):
+        # Brut déduit du net convenu : les indemnités forfaitaires proposées
+        # sont exonérées de RTS dans la limite de 25 % du brut
+        try:
+            net_cible = Decimal(str(data['net_cible']).replace(' ', '').replace('\u202f', '').replace('\xa0', ''))
+            if not net_cible.is_finite() or net_cible <= 0:
+                raise ValueError
+        except (InvalidOperation, ValueError):
+            return JsonResponse({'error': 'Montant net invalide'}, status=400)
+        from .services_retropaie import retropaie_net_vers_brut
+        try:
+            brut = int(retropaie_net_vers_brut(
+                net_cible=net_cible,
+                pct_indemnites_forfaitaires=min(25, pct_transport + pct_logement + pct_cherte),
+            )['brut'])
+        except (InvalidOperation, ValueError, OverflowError):
+            # Montant hors de la précision du calcul (ex. 1E30)
+            return JsonResponse({'error': 'Montant net invalide'}, status=400)
+    else:
+        brut_raw = data.get('brut', 0)
+        try:
+            brut = int(str(brut_raw).replace(' ', '').replace('\u202f', '').replace('\xa0', ''))
+        except (ValueError, TypeError):
+            return JsonResponse({'error': 'Montant brut invalide'}, status=400)
+
+    if brut <= 0:
+        return JsonResponse({'error': 'Le montant brut doit être positif'}, status=400)
+
     # Calcul des montants : chaque indemnité floor indépendamment, base absorbe le résidu
     import math as _math
     m_transport = _math.floor(brut * pct_transport / 100)
@@ -4209,6 +4303,7 @@ def api_decomposer_brut(request):
 
     return JsonResponse({
         'brut': brut,
+        'net_cible': int(net_cible) if net_cible is not None else None,
         'composantes': composantes,
         'rubriques': rubriques_map,
     })
@@ -15,12 +15,11 @@ import io
 from .models import PeriodePaie, BulletinPaie, Constante
 from employes.models import Employe
 from core.decorators import entreprise_active_required
+from core.excel_utils import ClasseurExcel
 
 # Imports pour génération Excel
 try:
-    import openpyxl
-    from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-    from openpyxl.utils import get_column_letter
+    import openpyxl  # noqa: F401 (moteur core.excel_utils)
     OPENPYXL_AVAILABLE = True
 except ImportError:
     OPENPYXL_AVAILABLE = False
@@ -159,53 +158,26 @@ def export_cnss_excel(request):
     
     data = get_declarations_data(request.user.entreprise, int(annee), int(mois) if mois else None)
     
-    # Créer le workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Bordereau CNSS"
-    
-    # Styles
-    header_font = Font(bold=True, size=14)
-    title_font = Font(bold=True, size=11)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font_white = Font(bold=True, color="FFFFFF")
+    classeur = ClasseurExcel(couleur_entete='4472C4')
+    ws = classeur.feuille("Bordereau CNSS", largeurs=[15] * 9)
     
     # En-tête du document
-    ws.merge_cells('A1:H1')
-    ws['A1'] = "BORDEREAU DE COTISATIONS CNSS"
-    ws['A1'].font = header_font
-    ws['A1'].alignment = Alignment(horizontal='center')
-    
-    ws.merge_cells('A2:H2')
-    ws['A2'] = f"Période: {data['mois']:02d}/{data['annee']}" if data['mois'] else f"Année: {data['annee']}"
-    ws['A2'].alignment = Alignment(horizontal='center')
+    ws.ligne(["BORDEREAU DE COTISATIONS CNSS"], style='titre_centre')
+    ws.fusionner(1, 8)
+    ws.ligne([f"Période: {data['mois']:02d}/{data['annee']}" if data['mois'] else f"Année: {data['annee']}"],
+             style='sous_titre_centre')
+    ws.fusionner(1, 8)
+    ws.vide()
     
     # Informations entreprise
-    row = 4
-    ws[f'A{row}'] = "Entreprise:"
-    ws[f'B{row}'] = data['entreprise'].nom_entreprise
-    ws[f'B{row}'].font = title_font
-    
-    row += 1
-    ws[f'A{row}'] = "N° CNSS Employeur:"
-    ws[f'B{row}'] = getattr(data['entreprise'], 'num_cnss', 'N/A')
-    
-    row += 1
-    ws[f'A{row}'] = "Date de génération:"
-    ws[f'B{row}'] = data['date_generation'].strftime('%d/%m/%Y %H:%M')
+    ws.ligne(["Entreprise:", data['entreprise'].nom_entreprise], style=None, styles={1: 'section'})
+    ws.ligne(["N° CNSS Employeur:", getattr(data['entreprise'], 'num_cnss', 'N/A')], style=None)
+    ws.ligne(["Date de génération:", data['date_generation'].strftime('%d/%m/%Y %H:%M')], style=None)
     
     # Récapitulatif
-    row += 2
-    ws[f'A{row}'] = "RÉCAPITULATIF DES COTISATIONS"
-    ws[f'A{row}'].font = title_font
+    ws.vide()
+    ws.ligne(["RÉCAPITULATIF DES COTISATIONS"], style='section')
     
-    row += 1
     recap_data = [
         ["Nombre de salariés", data['nb_salaries']],
         ["Masse salariale brute", f"{data['masse_salariale']:,.0f} GNF"],
@@ -217,68 +189,33 @@ def export_cnss_excel(request):
         ["TOTAL À VERSER (23%)", f"{data['total_cnss']:,.0f} GNF"],
     ]
     
-    for item in recap_data:
-        ws[f'A{row}'] = item[0]
-        ws[f'C{row}'] = item[1]
-        if "TOTAL" in str(item[0]):
-            ws[f'A{row}'].font = title_font
-            ws[f'C{row}'].font = title_font
-        row += 1
+    for libelle, valeur in recap_data:
+        ws.ligne([libelle, None, valeur], style='section' if "TOTAL" in libelle else None)
     
     # Liste nominative
-    row += 2
-    ws[f'A{row}'] = "LISTE NOMINATIVE DES ASSURÉS"
-    ws[f'A{row}'].font = title_font
+    ws.vide()
+    ws.vide()
+    ws.ligne(["LISTE NOMINATIVE DES ASSURÉS"], style='section')
     
-    row += 1
     headers = ["N°", "Matricule", "N° CNSS", "Nom", "Prénoms", "Salaire Brut", "CNSS Employé", "CNSS Employeur", "Total CNSS"]
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=row, column=col, value=header)
-        cell.font = header_font_white
-        cell.fill = header_fill
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center')
-    
-    row += 1
+    ws.ligne(headers, style='entete')
+    
     for idx, emp in enumerate(data['detail_employes'], 1):
-        ws.cell(row=row, column=1, value=idx).border = border
-        ws.cell(row=row, column=2, value=emp['matricule']).border = border
-        ws.cell(row=row, column=3, value=emp['num_cnss']).border = border
-        ws.cell(row=row, column=4, value=emp['nom']).border = border
-        ws.cell(row=row, column=5, value=emp['prenoms']).border = border
-        ws.cell(row=row, column=6, value=float(emp['salaire_brut'])).border = border
-        ws.cell(row=row, column=7, value=float(emp['cnss_employe'])).border = border
-        ws.cell(row=row, column=8, value=float(emp['cnss_employeur'])).border = border
-        ws.cell(row=row, column=9, value=float(emp['total_cnss'])).border = border
-        row += 1
+        ws.ligne([
+            idx, emp['matricule'], emp['num_cnss'], emp['nom'], emp['prenoms'],
+            emp['salaire_brut'], emp['cnss_employe'], emp['cnss_employeur'], emp['total_cnss'],
+        ])
     
     # Totaux
-    ws.cell(row=row, column=5, value="TOTAUX").font = title_font
-    ws.cell(row=row, column=6, value=float(data['masse_salariale'])).font = title_font
-    ws.cell(row=row, column=7, value=float(data['total_cnss_employe'])).font = title_font
-    ws.cell(row=row, column=8, value=float(data['total_cnss_employeur'])).font = title_font
-    ws.cell(row=row, column=9, value=float(data['total_cnss'])).font = title_font
-    
-    # Ajuster les largeurs de colonnes
-    for col in range(1, 10):
-        ws.column_dimensions[get_column_letter(col)].width = 15
-    
-    # Générer le fichier
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
+    ws.ligne([None, None, None, None, "TOTAUX", data['masse_salariale'], data['total_cnss_employe'],
+              data['total_cnss_employeur'], data['total_cnss']], style='gras')
     
     filename = f"CNSS_{data['entreprise'].nom_entreprise}_{data['annee']}"
     if data['mois']:
         filename += f"_{data['mois']:02d}"
     filename += ".xlsx"
     
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    return response
+    return classeur.reponse(filename)
 
 
 @login_required
@@ -419,163 +356,74 @@ def export_dmu_excel(request):
     
     data = get_declarations_data(request.user.entreprise, int(annee), int(mois))
     
-    # Créer le workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "DMU"
-    
-    # Styles
-    header_font = Font(bold=True, size=14)
-    title_font = Font(bold=True, size=11)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    header_fill = PatternFill(start_color="2E7D32", end_color="2E7D32", fill_type="solid")
-    header_font_white = Font(bold=True, color="FFFFFF")
+    classeur = ClasseurExcel(couleur_entete='2E7D32')
+    ws = classeur.feuille("DMU", largeurs=[5, 12, 15, 15, 15, 15, 12, 12, 15])
     
     # En-tête du document
-    ws.merge_cells('A1:J1')
-    ws['A1'] = "DÉCLARATION MENSUELLE UNIQUE (DMU)"
-    ws['A1'].font = header_font
-    ws['A1'].alignment = Alignment(horizontal='center')
-    
-    ws.merge_cells('A2:J2')
-    ws['A2'] = f"Période: {data['mois']:02d}/{data['annee']}"
-    ws['A2'].alignment = Alignment(horizontal='center')
+    ws.ligne(["DÉCLARATION MENSUELLE UNIQUE (DMU)"], style='titre_centre')
+    ws.fusionner(1, 10)
+    ws.ligne([f"Période: {data['mois']:02d}/{data['annee']}"], style='sous_titre_centre')
+    ws.fusionner(1, 10)
+    ws.vide()
     
     # Informations entreprise
-    row = 4
-    ws[f'A{row}'] = "IDENTIFICATION EMPLOYEUR"
-    ws[f'A{row}'].font = title_font
-    
-    row += 1
-    ws[f'A{row}'] = "Raison sociale:"
-    ws[f'C{row}'] = data['entreprise'].nom_entreprise
-    
-    row += 1
-    ws[f'A{row}'] = "NIF:"
-    ws[f'C{row}'] = getattr(data['entreprise'], 'nif', 'N/A')
-    
-    row += 1
-    ws[f'A{row}'] = "RCCM:"
-    ws[f'C{row}'] = getattr(data['entreprise'], 'rccm', 'N/A')
-    
-    row += 1
-    ws[f'A{row}'] = "N° CNSS:"
-    ws[f'C{row}'] = getattr(data['entreprise'], 'num_cnss', 'N/A')
-    
-    row += 1
-    ws[f'A{row}'] = "Adresse:"
-    ws[f'C{row}'] = getattr(data['entreprise'], 'adresse', 'N/A')
+    ws.ligne(["IDENTIFICATION EMPLOYEUR"], style='section')
+    for libelle, attribut in [("Raison sociale:", 'nom_entreprise'), ("NIF:", 'nif'), ("RCCM:", 'rccm'),
+                              ("N° CNSS:", 'num_cnss'), ("Adresse:", 'adresse')]:
+        ws.ligne([libelle, None, getattr(data['entreprise'], attribut, 'N/A')], style=None)
     
     # Liste des salariés
-    row += 2
-    ws[f'A{row}'] = "LISTE DES SALARIÉS"
-    ws[f'A{row}'].font = title_font
+    ws.vide()
+    ws.ligne(["LISTE DES SALARIÉS"], style='section')
     
-    row += 1
     headers = ["N°", "Matricule", "N° CNSS", "Nom", "Prénoms", "Salaire Brut", "CNSS (5%)", "RTS", "Net à Payer"]
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=row, column=col, value=header)
-        cell.font = header_font_white
-        cell.fill = header_fill
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center')
-    
-    row += 1
+    ws.ligne(headers, style='entete')
+    
     for idx, emp in enumerate(data['detail_employes'], 1):
-        ws.cell(row=row, column=1, value=idx).border = border
-        ws.cell(row=row, column=2, value=emp['matricule']).border = border
-        ws.cell(row=row, column=3, value=emp['num_cnss']).border = border
-        ws.cell(row=row, column=4, value=emp['nom']).border = border
-        ws.cell(row=row, column=5, value=emp['prenoms']).border = border
-        ws.cell(row=row, column=6, value=float(emp['salaire_brut'])).border = border
-        ws.cell(row=row, column=7, value=float(emp['cnss_employe'])).border = border
-        ws.cell(row=row, column=8, value=float(emp['rts'])).border = border
-        ws.cell(row=row, column=9, value=float(emp['net_a_payer'])).border = border
-        row += 1
+        ws.ligne([
+            idx, emp['matricule'], emp['num_cnss'], emp['nom'], emp['prenoms'],
+            emp['salaire_brut'], emp['cnss_employe'], emp['rts'], emp['net_a_payer'],
+        ])
     
     # Totaux salariés
-    ws.cell(row=row, column=5, value="TOTAUX").font = title_font
-    ws.cell(row=row, column=6, value=float(data['masse_salariale'])).font = title_font
-    ws.cell(row=row, column=7, value=float(data['total_cnss_employe'])).font = title_font
-    ws.cell(row=row, column=8, value=float(data['total_rts'])).font = title_font
+    ws.ligne([None, None, None, None, "TOTAUX", data['masse_salariale'], data['total_cnss_employe'],
+              data['total_rts']], style='gras')
     
     # Récapitulatif des impôts et taxes
-    row += 3
-    ws[f'A{row}'] = "RÉCAPITULATIF DES IMPÔTS ET TAXES"
-    ws[f'A{row}'].font = title_font
-    
-    row += 1
-    recap_headers = ["Désignation", "Assiette", "Taux", "Montant"]
-    for col, header in enumerate(recap_headers, 1):
-        cell = ws.cell(row=row, column=col, value=header)
-        cell.font = header_font_white
-        cell.fill = header_fill
-        cell.border = border
-    
-    row += 1
+    ws.vide()
+    ws.vide()
+    ws.ligne(["RÉCAPITULATIF DES IMPÔTS ET TAXES"], style='section')
+    ws.ligne(["Désignation", "Assiette", "Taux", "Montant"], style='entete')
+    
     recap_data = [
-        ["RTS (Retenue sur Traitements et Salaires)", float(data['masse_salariale']), "Barème", float(data['total_rts'])],
-        ["VF (Versement Forfaitaire)", float(data['total_base_vf']), f"{data['taux_vf']}%", float(data['total_vf'])],
-        ["ONFPP", float(data['total_base_vf']), f"{data['taux_onfpp']}%", float(data['total_onfpp'])],
-        ["TA (Taxe d'Apprentissage)", float(data['total_base_vf']), f"{data['taux_ta']}%", float(data['total_ta'])],
+        ["RTS (Retenue sur Traitements et Salaires)", data['masse_salariale'], "Barème", data['total_rts']],
+        ["VF (Versement Forfaitaire)", data['total_base_vf'], f"{data['taux_vf']}%", data['total_vf']],
+        ["ONFPP", data['total_base_vf'], f"{data['taux_onfpp']}%", data['total_onfpp']],
+        ["TA (Taxe d'Apprentissage)", data['total_base_vf'], f"{data['taux_ta']}%", data['total_ta']],
     ]
-    
     for item in recap_data:
-        for col, val in enumerate(item, 1):
-            cell = ws.cell(row=row, column=col, value=val)
-            cell.border = border
-        row += 1
+        ws.ligne(item)
     
     # Total à verser DNI
     total_dni = data['total_rts'] + data['total_vf'] + data['total_onfpp'] + data['total_ta']
-    ws.cell(row=row, column=1, value="TOTAL À VERSER À LA DNI").font = title_font
-    ws.cell(row=row, column=4, value=float(total_dni)).font = title_font
-    for col in range(1, 5):
-        ws.cell(row=row, column=col).border = border
+    ws.ligne(["TOTAL À VERSER À LA DNI", None, None, total_dni], style='cellule',
+             styles={0: 'gras', 3: 'gras'})
     
     # CNSS
-    row += 2
-    ws[f'A{row}'] = "COTISATIONS CNSS"
-    ws[f'A{row}'].font = title_font
+    ws.vide()
+    ws.ligne(["COTISATIONS CNSS"], style='section')
     
-    row += 1
     cnss_data = [
-        ["Part salariale (5%)", float(data['total_cnss_employe'])],
-        ["Part patronale (18%)", float(data['total_cnss_employeur'])],
-        ["TOTAL À VERSER À LA CNSS", float(data['total_cnss'])],
+        ["Part salariale (5%)", data['total_cnss_employe']],
+        ["Part patronale (18%)", data['total_cnss_employeur']],
+        ["TOTAL À VERSER À LA CNSS", data['total_cnss']],
     ]
-    
-    for item in cnss_data:
-        ws.cell(row=row, column=1, value=item[0]).border = border
-        ws.cell(row=row, column=2, value=item[1]).border = border
-        if "TOTAL" in item[0]:
-            ws.cell(row=row, column=1).font = title_font
-            ws.cell(row=row, column=2).font = title_font
-        row += 1
-    
-    # Ajuster les largeurs
-    col_widths = [5, 12, 15, 15, 15, 15, 12, 12, 15]
-    for col, width in enumerate(col_widths, 1):
-        ws.column_dimensions[get_column_letter(col)].width = width
-    
-    # Générer le fichier
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
+    for libelle, montant in cnss_data:
+        ws.ligne([libelle, montant], style='cellule',
+                 styles={0: 'total', 1: 'total'} if "TOTAL" in libelle else None)
     
     filename = f"DMU_{data['entreprise'].nom_entreprise}_{data['annee']}_{data['mois']:02d}.xlsx"
-    
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    return response
+    return classeur.reponse(filename)
 
 
 @login_required
@@ -24,6 +24,7 @@ from .models import BulletinPaie, PeriodePaie, LigneBulletin, RubriquePaie, Avan
 from employes.models import Employe
 from core.models import Service
 from core.decorators import reauth_required, entreprise_active_required
+from core.excel_utils import ClasseurExcel
 
 # Imports optionnels
 try:
@@ -1058,75 +1059,32 @@ def rapport_etat_paie_excel(request):
     )
     rows, totaux, nb_jours_mois = _construire_donnees_etat_paie(bulletins, annee, mois, entreprise)
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "État de Paie"
-
-    header_font = Font(bold=True, color="FFFFFF", size=9)
-    header_fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
-    center = Alignment(horizontal='center', wrap_text=True)
-    right_align = Alignment(horizontal='right')
-    thin = Side(style='thin')
-    border = Border(left=thin, right=thin, top=thin, bottom=thin)
-    total_fill = PatternFill(start_color="D9E2F3", end_color="D9E2F3", fill_type="solid")
-
     mois_label = MOIS_FR[int(mois)] if mois else ''
     nb_cols = len(ETAT_PAIE_HEADERS)
 
-    # Titre
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=nb_cols)
-    ws.cell(row=1, column=1, value=f"ÉTAT DE PAIE — {mois_label} {annee}").font = Font(bold=True, size=14)
-    ws.cell(row=1, column=1).alignment = Alignment(horizontal='center')
+    classeur = ClasseurExcel(couleur_entete='1F4E79', couleur_total='D9E2F3')
+    ws = classeur.feuille("État de Paie", largeurs=([5, 18, 14, 14, 12] + [14] * 20)[:nb_cols])
 
-    ws.merge_cells(start_row=2, start_column=1, end_row=2, end_column=nb_cols)
-    ws.cell(row=2, column=1, value=f"Généré le {date.today().strftime('%d/%m/%Y')} — {len(rows)} employés").alignment = Alignment(horizontal='center')
+    # Titre
+    ws.ligne([f"ÉTAT DE PAIE — {mois_label} {annee}"], style='titre_centre')
+    ws.fusionner(1, nb_cols)
+    ws.ligne([f"Généré le {date.today().strftime('%d/%m/%Y')} — {len(rows)} employés"], style='sous_titre_centre')
+    ws.fusionner(1, nb_cols)
+    ws.vide()
 
     # En-têtes
-    for col_idx, h in enumerate(ETAT_PAIE_HEADERS, 1):
-        c = ws.cell(row=4, column=col_idx, value=h)
-        c.font = header_font
-        c.fill = header_fill
-        c.alignment = center
-        c.border = border
+    ws.ligne(ETAT_PAIE_HEADERS, style='entete')
 
     # Données
-    row_num = 5
     for row in rows:
-        for col_idx, key in enumerate(ETAT_PAIE_KEYS, 1):
-            val = row.get(key, '')
-            if isinstance(val, Decimal):
-                val = float(val)
-            c = ws.cell(row=row_num, column=col_idx, value=val)
-            c.border = border
-            if col_idx >= 6:
-                c.number_format = '#,##0'
-        row_num += 1
+        ws.ligne([row.get(key, '') for key in ETAT_PAIE_KEYS])
 
     # Ligne totaux
-    ws.cell(row=row_num, column=1, value='TOTAUX').font = Font(bold=True)
-    for col_idx, key in enumerate(ETAT_PAIE_KEYS, 1):
-        c = ws.cell(row=row_num, column=col_idx)
-        if key in totaux:
-            c.value = float(totaux[key])
-            c.number_format = '#,##0'
-        c.font = Font(bold=True)
-        c.fill = total_fill
-        c.border = border
+    valeurs = [totaux.get(key) for key in ETAT_PAIE_KEYS]
+    valeurs[0] = 'TOTAUX'
+    ws.ligne(valeurs, style='total')
 
-    # Largeurs colonnes
-    widths = [5, 18, 14, 14, 12] + [14] * 20
-    for i, w in enumerate(widths[:nb_cols], 1):
-        ws.column_dimensions[get_column_letter(i)].width = w
-
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="etat_paie_{annee}_{mois}.xlsx"'
-    return response
+    return classeur.reponse(f"etat_paie_{annee}_{mois}.xlsx")
 
 
 @login_required
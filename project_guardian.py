@@ -140,6 +140,28 @@ def _hash_file(filepath: Path) -> str:
         return ''
 
 
+# Empreintes déjà calculées : {chemin: (mtime_ns, taille, hash)}
+_hash_memo = {}
+
+
+def _hash_file_incremental(filepath: Path) -> str:
+    """
+    Comme ``_hash_file``, mais ne relit le fichier que si sa date de
+    modification ou sa taille a changé depuis le dernier calcul.
+    """
+    try:
+        st = filepath.stat()
+    except OSError:
+        return ''
+    cle = str(filepath)
+    memo = _hash_memo.get(cle)
+    if memo and memo[0] == st.st_mtime_ns and memo[1] == st.st_size:
+        return memo[2]
+    digest = _hash_file(filepath)
+    _hash_memo[cle] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+
 # ─── Génération de la carte d'intégrité ───────────────────────────────────────
 def generate_integrity_manifest() -> dict:
     """
@@ -244,7 +266,7 @@ def verify_project_integrity() -> dict:
             result['missing_files'].append(rel_path)
             result['intact'] = False
         else:
-            current_hash = _hash_file(fpath)
+            current_hash = _hash_file_incremental(fpath)
             if not hmac.compare_digest(current_hash, expected_hash):
                 result['tampered_files'].append(rel_path)
                 result['intact'] = False
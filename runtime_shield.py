@@ -244,15 +244,22 @@ def _verify_exe_integrity() -> dict:
             stored_sig = stored_data[:64].decode('ascii')
             stored_size = struct.unpack('<Q', stored_data[64:72])[0]
 
-            actual_size = exe_path.stat().st_size
+            exe_stat = exe_path.stat()
+            actual_size = exe_stat.st_size
             # Tolérance de 0 byte - taille exacte requise
             if actual_size != stored_size:
                 result['valid'] = False
                 result['reason'] = 'exe_size_modified'
                 return result
 
-            # Vérifier le hash
-            exe_hash = hashlib.sha256(exe_path.read_bytes()).hexdigest()
+            # Vérifier le hash (recalculé seulement si l'exécutable a changé)
+            cle = str(exe_path)
+            memo = _checksum_memo.get(cle)
+            if memo and memo[0] == exe_stat.st_mtime_ns and memo[1] == actual_size:
+                exe_hash = memo[2]
+            else:
+                exe_hash = hashlib.sha256(exe_path.read_bytes()).hexdigest()
+                _checksum_memo[cle] = (exe_stat.st_mtime_ns, actual_size, exe_hash)
             expected_hash = hmac.new(
                 _SHIELD_KEY,
                 exe_hash.encode(),
@@ -398,11 +405,25 @@ def _detect_extraction_environment() -> dict:
 # SECTION 4 : PROTECTION ANTI-MODIFICATION DES FICHIERS .PY
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# Checksums déjà calculés : {chemin: (mtime_ns, taille, checksum)}
+_checksum_memo = {}
+
+
 def _generate_file_checksum(filepath: Path) -> str:
-    """Génère un checksum HMAC pour un fichier."""
+    """
+    Génère un checksum HMAC pour un fichier. Le fichier n'est relu que si sa
+    date de modification ou sa taille a changé depuis le dernier calcul.
+    """
     try:
+        st = filepath.stat()
+        cle = str(filepath)
+        memo = _checksum_memo.get(cle)
+        if memo and memo[0] == st.st_mtime_ns and memo[1] == st.st_size:
+            return memo[2]
         content = filepath.read_bytes()
-        return hmac.new(_SHIELD_KEY, content, hashlib.sha256).hexdigest()
+        checksum = hmac.new(_SHIELD_KEY, content, hashlib.sha256).hexdigest()
+        _checksum_memo[cle] = (st.st_mtime_ns, st.st_size, checksum)
+        return checksum
     except Exception:
         return ''
 